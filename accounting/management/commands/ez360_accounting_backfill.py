@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Sum
+
+from accounting.models import JournalLine
+from accounting.services import BATCH_PLAN_BUILDERS, ChartAccounts, iter_batch_source_chunks, post_batch
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        "Post missing journal entries for invoices, payments and expenses in bounded, resumable chunks. "
+        "Idempotent: sources that already have a posted entry are skipped. "
+        "With --verify, only report what is missing (and any unbalanced entries)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default=None, help="Optional Company ID (UUID) to scope the run.")
+        parser.add_argument(
+            "--source",
+            action="append",
+            choices=sorted(BATCH_PLAN_BUILDERS),
+            help="Source type to process (repeatable). Default: all.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--after",
+            default=None,
+            help="Resume after this source pk (printed as `last=` on each chunk). Requires --company-id and one --source.",
+        )
+        parser.add_argument("--verify", action="store_true", help="Report only; write nothing.")
+
+    def handle(self, *args, **opts):
+        company_id = (str(opts.get("company_id") or "").strip() or None)
+        sources = opts.get("source") or sorted(BATCH_PLAN_BUILDERS)
+        chunk_size = max(1, int(opts.get("chunk_size") or 500))
+        after = (str(opts.get("after") or "").strip() or None)
+        verify = bool(opts.get("verify"))
+
+        if after and (not company_id or len(sources) != 1):
+            raise CommandError("--after requires --company-id and exactly one --source.")
+
+        companies = Company.all_objects.order_by("id")
+        if company_id:
+            companies = companies.filter(id=company_id)
+
+        totals = {"posted": 0, "already_posted": 0, "skipped": 0, "unbalanced": 0}
+        for company in companies.iterator():
+            accounts = ChartAccounts(company)
+            for source_type in sources:
+                self._run_source(company, source_type, accounts, chunk_size, after, verify, totals)
+
+            unbalanced = self._unbalanced_entry_count(company)
+            if unbalanced:
+                totals["unbalanced"] += unbalanced
+                self.stdout.write(self.style.WARNING(f"company={company.id} unbalanced_entries={unbalanced}"))
+
+        mode = "VERIFY" if verify else "DONE"
+        verb = "missing" if verify else "posted"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[{mode}] {verb}={totals['posted']} already_posted={totals['already_posted']} "
+                f"not_postable={totals['skipped']} unbalanced_entries={totals['unbalanced']}"
+            )
+        )
+
+    def _run_source(self, company, source_type, accounts, chunk_size, after, verify, totals) -> None:
+        for chunk in iter_batch_source_chunks(company, source_type, chunk_size=chunk_size, after=after):
+            last_pk = chunk[-1].pk
+            # Each chunk commits on its own, so an interrupted run keeps its progress.
+            result = post_batch(company, source_type, chunk, accounts=accounts, dry_run=verify)
+            totals["posted"] += result.posted
+            totals["already_posted"] += result.already_posted
+            totals["skipped"] += result.skipped
+            verb = "missing" if verify else "posted"
+            self.stdout.write(f"company={company.id} source={source_type} {verb}={result.posted} last={last_pk}")
+
+    def _unbalanced_entry_count(self, company) -> int:
+        return (
+            JournalLine.objects.filter(entry__company=company, entry__deleted_at__isnull=True)
+            .values("entry_id")
+            .annotate(d=Sum("debit_cents"), c=Sum("credit_cents"))
+            .exclude(d=F("c"))
+            .count()
+        )
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounting.services_balances import rebuild_company_balances, verify_company_balances
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the daily account balance rollup against journal lines, per company. "
+        "With --rebuild, recompute the rollup from journal lines (always, or only where drift is found with --fix)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default=None, help="Optional Company ID (UUID) to scope the run.")
+        parser.add_argument("--rebuild", action="store_true", help="Rebuild every selected company's rollup.")
+        parser.add_argument("--fix", action="store_true", help="Rebuild only companies whose rollup drifted.")
+        parser.add_argument("--fail-on-drift", action="store_true", help="Exit non-zero if drift is found.")
+
+    def handle(self, *args, **opts):
+        company_id = (str(opts.get("company_id") or "").strip() or None)
+        rebuild = bool(opts.get("rebuild"))
+        fix = bool(opts.get("fix"))
+
+        company_ids = list(Company.all_objects.values_list("id", flat=True).order_by("id"))
+        if company_id:
+            company_ids = [cid for cid in company_ids if str(cid) == company_id]
+
+        drifted = 0
+        for cid in company_ids:
+            if rebuild:
+                written = rebuild_company_balances(cid)
+                self.stdout.write(f"company={cid} rebuilt rows={written}")
+                continue
+
+            drift = verify_company_balances(cid)
+            if not drift:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f"company={cid} drifted buckets={len(drift)}"))
+            for d in drift[:10]:
+                self.stdout.write(
+                    f"  day={d.day} account={d.account_id} client={d.client_id} "
+                    f"expected(d,c,n)={d.expected} actual={d.actual}"
+                )
+            if fix:
+                written = rebuild_company_balances(cid)
+                self.stdout.write(f"company={cid} rebuilt rows={written}")
+
+        if rebuild:
+            self.stdout.write(self.style.SUCCESS(f"[DONE] rebuilt {len(company_ids)} company rollup(s)"))
+            return
+
+        summary = f"companies checked={len(company_ids)} drifted={drifted}"
+        if drifted and opts.get("fail_on_drift") and not fix:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(f"[OK] {summary}"))
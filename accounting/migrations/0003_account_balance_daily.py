@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    JournalLine = apps.get_model("accounting", "JournalLine")
+    AccountBalanceDaily = apps.get_model("accounting", "AccountBalanceDaily")
+
+    rows = (
+        JournalLine.objects.filter(deleted_at__isnull=True, entry__deleted_at__isnull=True)
+        .values("entry__company_id", "account_id", "client_id", "entry__entry_date")
+        .annotate(debits=Sum("debit_cents"), credits=Sum("credit_cents"), lines=Count("id"))
+        .order_by()
+    )
+    batch = []
+    for r in rows.iterator(chunk_size=2000):
+        batch.append(
+            AccountBalanceDaily(
+                company_id=r["entry__company_id"],
+                account_id=r["account_id"],
+                client_id=r["client_id"],
+                day=r["entry__entry_date"],
+                debit_cents=int(r["debits"] or 0),
+                credit_cents=int(r["credits"] or 0),
+                line_count=int(r["lines"] or 0),
+            )
+        )
+        if len(batch) >= 2000:
+            AccountBalanceDaily.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        AccountBalanceDaily.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_initial'),
+        ('companies', '0002_company_suspension_fields'),
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountBalanceDaily',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('debit_cents', models.BigIntegerField(default=0)),
+                ('credit_cents', models.BigIntegerField(default=0)),
+                ('line_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances_daily', to='accounting.account')),
+                ('client', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='account_balances_daily', to='crm.client')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_balances_daily', to='companies.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'day'], name='acct_bal_company_day_idx'), models.Index(fields=['company', 'account', 'day'], name='acct_bal_account_day_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -81,7 +81,8 @@ class JournalEntry(SyncModel):
 
 
     def save(self, *args, **kwargs):
-        if self.pk:
+        # UUID pks are assigned before the first save, so "posted" means "not adding".
+        if not self._state.adding:
             # Immutable once created (posted)
             raise ValidationError("Journal entries are immutable once posted.")
         return super().save(*args, **kwargs)
@@ -114,7 +115,7 @@ class JournalLine(SyncModel):
 
 
     def save(self, *args, **kwargs):
-        if self.pk:
+        if not self._state.adding:
             raise ValidationError("Journal lines are immutable once posted.")
         if self.entry_id:
             # If entry already has lines, treat as posted
@@ -128,6 +129,38 @@ class JournalLine(SyncModel):
         return f"{self.account} {amt}"
 
 
+class AccountBalanceDaily(models.Model):
+    """Per-day debit/credit totals for one account (and client), maintained on posting.
+
+    Derived data: reports sum these rows instead of scanning JournalLine. Rows are
+    additive, so a duplicate (company, account, day, client) bucket is harmless.
+    Rebuild/verify with `python manage.py ez360_accounting_balances`.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="account_balances_daily")
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="balances_daily")
+    client = models.ForeignKey(
+        Client, on_delete=models.SET_NULL, null=True, blank=True, related_name="account_balances_daily"
+    )
+    day = models.DateField()
+
+    debit_cents = models.BigIntegerField(default=0)
+    credit_cents = models.BigIntegerField(default=0)
+    line_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "day"], name="acct_bal_company_day_idx"),
+            models.Index(fields=["company", "account", "day"], name="acct_bal_account_day_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.account_id} {self.day} D{self.debit_cents} C{self.credit_cents}"
+
+
 @dataclass(frozen=True)
 class DefaultAccountCodes:
     CASH: str = "1000"
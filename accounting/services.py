@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+
 from django.db import transaction
 from django.utils import timezone
 
@@ -11,11 +13,15 @@ from crm.models import Client
 from projects.models import Project
 
 from .models import (
+    DEFAULT_ACCOUNTS,
+    Account,
     JournalEntry,
     JournalLine,
     DefaultAccountCodes,
+    ensure_default_chart,
     get_account,
 )
+from .services_balances import apply_entry_to_balances, apply_lines_to_balances
 
 
 CODES = DefaultAccountCodes()
@@ -57,20 +63,56 @@ def _replace_lines(entry: JournalEntry, lines: list[dict]) -> None:
     if debit_total != credit_total:
         raise ValueError("Unbalanced journal entry (debits must equal credits).")
 
+    created = []
     for l in lines:
-        JournalLine.objects.create(
-            entry=entry,
-            account=l["account"],
-            description=l.get("description", "")[:240],
-            debit_cents=int(l.get("debit_cents") or 0),
-            credit_cents=int(l.get("credit_cents") or 0),
-            client=l.get("client"),
-            project=l.get("project"),
+        created.append(
+            JournalLine.objects.create(
+                entry=entry,
+                account=l["account"],
+                description=l.get("description", "")[:240],
+                debit_cents=int(l.get("debit_cents") or 0),
+                credit_cents=int(l.get("credit_cents") or 0),
+                client=l.get("client"),
+                project=l.get("project"),
+            )
         )
+    apply_entry_to_balances(entry, created)
 
 
-@transaction.atomic
-def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
+@dataclass
+class PostingPlan:
+    """Journal entry (header + balanced lines) a source document should post."""
+
+    source_type: str
+    source_id: object
+    entry_date: object
+    memo: str
+    created_by: object
+    lines: list[dict]
+
+
+class ChartAccounts:
+    """Default chart accounts for one company, loaded in one query on first use.
+
+    Replaces per-line get_account() lookups; batch posting shares one instance.
+    """
+
+    def __init__(self, company: Company):
+        self.company = company
+        self._by_code: dict[str, Account] | None = None
+
+    def __getitem__(self, code: str) -> Account:
+        if self._by_code is None:
+            codes = [c for c, *_rest in DEFAULT_ACCOUNTS]
+            found = {a.code: a for a in Account.objects.filter(company=self.company, code__in=codes)}
+            if len(found) < len(codes):
+                ensure_default_chart(self.company)
+                found = {a.code: a for a in Account.objects.filter(company=self.company, code__in=codes)}
+            self._by_code = found
+        return self._by_code[code]
+
+
+def _invoice_plan(invoice: Document, accounts: ChartAccounts) -> PostingPlan | None:
     if invoice.doc_type != DocumentType.INVOICE:
         return None
     if invoice.status == DocumentStatus.DRAFT or invoice.status == DocumentStatus.VOID:
@@ -78,11 +120,6 @@ def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
     if invoice.deleted_at:
         return None
 
-    company = invoice.company
-    ar = get_account(company, CODES.AR)
-    revenue = get_account(company, CODES.REVENUE)
-    sales_tax = get_account(company, CODES.SALES_TAX_PAYABLE)
-
     subtotal = int(invoice.subtotal_cents or 0)
     tax = int(invoice.tax_cents or 0)
     total = int(invoice.total_cents or 0)
@@ -90,22 +127,9 @@ def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
     if total <= 0:
         return None
 
-    entry = _create_entry(
-        company=company,
-        source_type="invoice",
-        source_id=invoice.id,
-        entry_date=invoice.issue_date or timezone.localdate(),
-        memo=f"Invoice {invoice.number or str(invoice.id)[:8]}",
-        created_by=getattr(invoice, "created_by_user", None),
-    )
-
-    # Phase 3A (proper): Once invoice journal is posted, do not mutate lines.
-    if entry.lines.exists():
-        return entry
-
     lines = [
         {
-            "account": ar,
+            "account": accounts[CODES.AR],
             "description": "Accounts Receivable",
             "debit_cents": total,
             "credit_cents": 0,
@@ -113,7 +137,7 @@ def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
             "project": getattr(invoice, "project", None),
         },
         {
-            "account": revenue,
+            "account": accounts[CODES.REVENUE],
             "description": "Revenue",
             "debit_cents": 0,
             "credit_cents": subtotal,
@@ -124,7 +148,7 @@ def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
     if tax:
         lines.append(
             {
-                "account": sales_tax,
+                "account": accounts[CODES.SALES_TAX_PAYABLE],
                 "description": "Sales Tax Payable",
                 "debit_cents": 0,
                 "credit_cents": tax,
@@ -133,12 +157,17 @@ def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
             }
         )
 
-    _replace_lines(entry, lines)
-    return entry
+    return PostingPlan(
+        source_type="invoice",
+        source_id=invoice.id,
+        entry_date=invoice.issue_date or timezone.localdate(),
+        memo=f"Invoice {invoice.number or str(invoice.id)[:8]}",
+        created_by=getattr(invoice, "created_by_user", None),
+        lines=lines,
+    )
 
 
-@transaction.atomic
-def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
+def _payment_plan(payment: Payment, accounts: ChartAccounts) -> PostingPlan | None:
     if payment.status != PaymentStatus.SUCCEEDED:
         return None
     if payment.deleted_at:
@@ -146,11 +175,6 @@ def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
     if not payment.amount_cents or int(payment.amount_cents) <= 0:
         return None
 
-    company = payment.company
-    cash = get_account(company, CODES.CASH)
-    ar = get_account(company, CODES.AR)
-    credits = get_account(company, CODES.CUSTOMER_CREDITS)
-
     amount = int(payment.amount_cents or 0)
 
     # Determine how much of this payment actually reduces AR
@@ -169,18 +193,9 @@ def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
         except Exception:
             ar_credit = amount
 
-    entry = _create_entry(
-        company=company,
-        source_type="payment",
-        source_id=payment.id,
-        entry_date=payment.payment_date or timezone.localdate(),
-        memo=f"Payment {str(payment.id)[:8]}",
-        created_by=getattr(payment, "created_by_user", None),
-    )
-
     lines = [
         {
-            "account": cash,
+            "account": accounts[CODES.CASH],
             "description": "Cash",
             "debit_cents": amount,
             "credit_cents": 0,
@@ -188,7 +203,7 @@ def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
             "project": getattr(invoice, "project", None) if invoice else None,
         },
         {
-            "account": ar,
+            "account": accounts[CODES.AR],
             "description": "Accounts Receivable",
             "debit_cents": 0,
             "credit_cents": ar_credit,
@@ -199,7 +214,7 @@ def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
     if credit_liability:
         lines.append(
             {
-                "account": credits,
+                "account": accounts[CODES.CUSTOMER_CREDITS],
                 "description": "Customer Credits",
                 "debit_cents": 0,
                 "credit_cents": credit_liability,
@@ -208,10 +223,80 @@ def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
             }
         )
 
-    _replace_lines(entry, lines)
+    return PostingPlan(
+        source_type="payment",
+        source_id=payment.id,
+        entry_date=payment.payment_date or timezone.localdate(),
+        memo=f"Payment {str(payment.id)[:8]}",
+        created_by=getattr(payment, "created_by_user", None),
+        lines=lines,
+    )
+
+
+def _expense_plan(expense: Expense, accounts: ChartAccounts) -> PostingPlan | None:
+    if expense.status in {ExpenseStatus.VOID, ExpenseStatus.DRAFT}:
+        return None
+    if expense.deleted_at:
+        return None
+    total = int(expense.total_cents or 0)
+    if total <= 0:
+        return None
+
+    lines = [
+        {
+            "account": accounts[CODES.EXPENSES],
+            "description": expense.description or "Expense",
+            "debit_cents": total,
+            "credit_cents": 0,
+            "client": getattr(expense, "client", None),
+            "project": getattr(expense, "project", None),
+        },
+        {
+            "account": accounts[CODES.CASH],
+            "description": "Cash",
+            "debit_cents": 0,
+            "credit_cents": total,
+            "client": getattr(expense, "client", None),
+            "project": getattr(expense, "project", None),
+        },
+    ]
+
+    return PostingPlan(
+        source_type="expense",
+        source_id=expense.id,
+        entry_date=expense.date or timezone.localdate(),
+        memo=f"Expense {(expense.merchant.name if expense.merchant else '')}".strip()[:240] or f"Expense {str(expense.id)[:8]}",
+        created_by=getattr(expense, "created_by_user", None),
+        lines=lines,
+    )
+
+
+def _post_plan(company: Company, plan: PostingPlan | None) -> JournalEntry | None:
+    if plan is None:
+        return None
+    entry = _create_entry(
+        company=company,
+        source_type=plan.source_type,
+        source_id=plan.source_id,
+        entry_date=plan.entry_date,
+        memo=plan.memo,
+        created_by=plan.created_by,
+    )
+    # Phase 3A (proper): Once a journal is posted, do not mutate lines.
+    _replace_lines(entry, plan.lines)
     return entry
 
 
+@transaction.atomic
+def post_invoice_if_needed(invoice: Document) -> JournalEntry | None:
+    return _post_plan(invoice.company, _invoice_plan(invoice, ChartAccounts(invoice.company)))
+
+
+@transaction.atomic
+def post_payment_if_needed(payment: Payment) -> JournalEntry | None:
+    return _post_plan(payment.company, _payment_plan(payment, ChartAccounts(payment.company)))
+
+
 @transaction.atomic
 
 def post_payment_refund_if_needed(refund) -> JournalEntry | None:
@@ -295,49 +380,156 @@ def post_payment_refund_if_needed(refund) -> JournalEntry | None:
     return entry
 
 
-
+@transaction.atomic
 def post_expense_if_needed(expense: Expense) -> JournalEntry | None:
-    if expense.status in {ExpenseStatus.VOID, ExpenseStatus.DRAFT}:
-        return None
-    if expense.deleted_at:
-        return None
-    total = int(expense.total_cents or 0)
-    if total <= 0:
-        return None
+    return _post_plan(expense.company, _expense_plan(expense, ChartAccounts(expense.company)))
 
-    company = expense.company
-    expenses_acc = get_account(company, CODES.EXPENSES)
-    cash = get_account(company, CODES.CASH)
 
-    entry = _create_entry(
-        company=company,
-        source_type="expense",
-        source_id=expense.id,
-        entry_date=expense.date or timezone.localdate(),
-        memo=f"Expense {(expense.merchant.name if expense.merchant else '')}".strip()[:240] or f"Expense {str(expense.id)[:8]}",
-        created_by=getattr(expense, "created_by_user", None),
+# -------------------------
+# Batch posting (backfills, drift repair)
+# -------------------------
+
+def batch_source_queryset(company: Company, source_type: str):
+    """Candidate sources for post_batch, keyset-ordered by pk with plan relations preloaded."""
+    if source_type == "invoice":
+        qs = (
+            Document.objects.filter(company=company, doc_type=DocumentType.INVOICE)
+            .exclude(status__in=[DocumentStatus.DRAFT, DocumentStatus.VOID])
+            .select_related("client", "project")
+        )
+    elif source_type == "payment":
+        qs = Payment.objects.filter(company=company, status=PaymentStatus.SUCCEEDED).select_related(
+            "client", "invoice", "invoice__client", "invoice__project"
+        )
+    elif source_type == "expense":
+        qs = (
+            Expense.objects.filter(company=company)
+            .exclude(status__in=[ExpenseStatus.DRAFT, ExpenseStatus.VOID])
+            .select_related("merchant", "client", "project")
+        )
+    else:
+        raise ValueError(f"Unsupported batch source type: {source_type}")
+    return qs.order_by("pk")
+
+
+def iter_batch_source_chunks(company: Company, source_type: str, *, chunk_size: int = 500, after=None):
+    """Yield candidate sources in pk-keyset chunks; pass the last pk as `after` to resume."""
+    qs = batch_source_queryset(company, source_type)
+    last_pk = after
+    while True:
+        chunk = list((qs if last_pk is None else qs.filter(pk__gt=last_pk))[:chunk_size])
+        if not chunk:
+            return
+        last_pk = chunk[-1].pk
+        yield chunk
+
+
+BATCH_PLAN_BUILDERS = {
+    "invoice": _invoice_plan,
+    "payment": _payment_plan,
+    "expense": _expense_plan,
+}
+
+
+@dataclass
+class BatchPostResult:
+    posted: int = 0
+    already_posted: int = 0
+    skipped: int = 0
+
+
+def _check_balanced(lines: list[dict]) -> None:
+    debit_total = sum(int(l.get("debit_cents") or 0) for l in lines)
+    credit_total = sum(int(l.get("credit_cents") or 0) for l in lines)
+    if debit_total != credit_total:
+        raise ValueError("Unbalanced journal entry (debits must equal credits).")
+
+
+@transaction.atomic
+def post_batch(
+    company: Company,
+    source_type: str,
+    sources,
+    *,
+    accounts: ChartAccounts | None = None,
+    dry_run: bool = False,
+) -> BatchPostResult:
+    """Post many invoices/payments/expenses of one company in a handful of queries.
+
+    Same rules as the post_*_if_needed functions: sources that don't qualify are
+    skipped, entries that already have lines are left untouched (immutability),
+    and every entry must balance. Entries and lines go out via bulk_create; the
+    daily balance rollup is updated in the same transaction.
+
+    With dry_run=True nothing is written; `posted` counts what would be posted.
+    Use batch_source_queryset() so the plans' related rows are preloaded.
+    """
+    builder = BATCH_PLAN_BUILDERS[source_type]
+    accounts = accounts or ChartAccounts(company)
+    sources = list(sources)
+    result = BatchPostResult()
+    if not sources:
+        return result
+
+    existing = {
+        e.source_id: e
+        for e in JournalEntry.objects.select_for_update().filter(
+            company=company, source_type=source_type, source_id__in=[s.id for s in sources]
+        )
+    }
+    posted_entry_ids = set(
+        JournalLine.objects.filter(entry_id__in=[e.id for e in existing.values()]).values_list("entry_id", flat=True)
     )
 
-    lines = [
-        {
-            "account": expenses_acc,
-            "description": expense.description or "Expense",
-            "debit_cents": total,
-            "credit_cents": 0,
-            "client": getattr(expense, "client", None),
-            "project": getattr(expense, "project", None),
-        },
-        {
-            "account": cash,
-            "description": "Cash",
-            "debit_cents": 0,
-            "credit_cents": total,
-            "client": getattr(expense, "client", None),
-            "project": getattr(expense, "project", None),
-        },
-    ]
-    _replace_lines(entry, lines)
-    return entry
+    new_entries: list[JournalEntry] = []
+    new_lines: list[JournalLine] = []
+    for source in sources:
+        if source.company_id != company.id:
+            raise ValueError("post_batch sources must belong to the given company.")
+        plan = builder(source, accounts)
+        if plan is None:
+            result.skipped += 1
+            continue
+        entry = existing.get(plan.source_id)
+        if entry is not None and entry.id in posted_entry_ids:
+            result.already_posted += 1
+            continue
+        _check_balanced(plan.lines)
+
+        if entry is None:
+            entry = JournalEntry(
+                company=company,
+                source_type=plan.source_type,
+                source_id=plan.source_id,
+                entry_date=plan.entry_date,
+                memo=plan.memo[:240],
+                created_by=plan.created_by,
+            )
+            new_entries.append(entry)
+            existing[plan.source_id] = entry
+
+        new_lines.extend(
+            JournalLine(
+                entry=entry,
+                account=l["account"],
+                description=(l.get("description") or "")[:240],
+                debit_cents=int(l.get("debit_cents") or 0),
+                credit_cents=int(l.get("credit_cents") or 0),
+                client=l.get("client"),
+                project=l.get("project"),
+            )
+            for l in plan.lines
+        )
+        posted_entry_ids.add(entry.id)
+        result.posted += 1
+
+    if dry_run:
+        return result
+    JournalEntry.objects.bulk_create(new_entries, batch_size=500)
+    JournalLine.objects.bulk_create(new_lines, batch_size=1000)
+    apply_lines_to_balances(new_lines)
+    return result
+
 
 @transaction.atomic
 def post_credit_note_if_needed(credit_note) -> JournalEntry | None:
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from .models import AccountBalanceDaily, AccountType, JournalEntry, JournalLine
+
+
+def _bucket_deltas(rows: Iterable[tuple]) -> dict[tuple, list[int]]:
+    """Fold (company_id, account_id, client_id, day, debit, credit) rows into per-bucket totals."""
+    deltas: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0])
+    for company_id, account_id, client_id, day, debit, credit in rows:
+        bucket = deltas[(company_id, account_id, client_id, day)]
+        bucket[0] += int(debit or 0)
+        bucket[1] += int(credit or 0)
+        bucket[2] += 1
+    return deltas
+
+
+def apply_lines_to_balances(lines: Iterable[JournalLine]) -> None:
+    """Add freshly posted lines (of any number of entries) to the daily balance rollup.
+
+    Call inside the posting transaction so the rollup commits (or rolls back)
+    together with the lines. Issues one UPDATE (or INSERT) per touched bucket.
+    """
+    deltas = _bucket_deltas(
+        (ln.entry.company_id, ln.account_id, ln.client_id, ln.entry.entry_date, ln.debit_cents, ln.credit_cents)
+        for ln in lines
+    )
+    for (company_id, account_id, client_id, day), (debit, credit, count) in deltas.items():
+        updated = AccountBalanceDaily.objects.filter(
+            company_id=company_id,
+            account_id=account_id,
+            client_id=client_id,
+            day=day,
+        ).update(
+            debit_cents=F("debit_cents") + debit,
+            credit_cents=F("credit_cents") + credit,
+            line_count=F("line_count") + count,
+        )
+        if not updated:
+            AccountBalanceDaily.objects.create(
+                company_id=company_id,
+                account_id=account_id,
+                client_id=client_id,
+                day=day,
+                debit_cents=debit,
+                credit_cents=credit,
+                line_count=count,
+            )
+
+
+def apply_entry_to_balances(entry: JournalEntry, lines: Iterable[JournalLine]) -> None:
+    """Add a freshly posted entry's lines (created with entry=entry) to the daily balance rollup."""
+    apply_lines_to_balances(lines)
+
+
+def _line_totals(company_id) -> dict[tuple, tuple[int, int, int]]:
+    """Authoritative per-bucket totals straight from live journal lines."""
+    rows = (
+        JournalLine.objects.filter(entry__company_id=company_id, entry__deleted_at__isnull=True)
+        .values("account_id", "client_id", "entry__entry_date")
+        .annotate(
+            debits=Coalesce(Sum("debit_cents"), 0),
+            credits=Coalesce(Sum("credit_cents"), 0),
+            lines=Count("id"),
+        )
+        .order_by()
+    )
+    return {
+        (r["account_id"], r["client_id"], r["entry__entry_date"]): (int(r["debits"]), int(r["credits"]), int(r["lines"]))
+        for r in rows
+    }
+
+
+def _rollup_totals(company_id) -> dict[tuple, tuple[int, int, int]]:
+    rows = (
+        AccountBalanceDaily.objects.filter(company_id=company_id)
+        .values("account_id", "client_id", "day")
+        .annotate(
+            debits=Coalesce(Sum("debit_cents"), 0),
+            credits=Coalesce(Sum("credit_cents"), 0),
+            lines=Coalesce(Sum("line_count"), 0),
+        )
+        .order_by()
+    )
+    totals = {
+        (r["account_id"], r["client_id"], r["day"]): (int(r["debits"]), int(r["credits"]), int(r["lines"]))
+        for r in rows
+    }
+    # Empty buckets (e.g. left behind by a deleted client) carry no information.
+    return {k: v for k, v in totals.items() if v != (0, 0, 0)}
+
+
+@dataclass(frozen=True)
+class BalanceDrift:
+    account_id: object
+    client_id: object
+    day: date
+    expected: tuple[int, int, int]
+    actual: tuple[int, int, int]
+
+
+def verify_company_balances(company_id) -> list[BalanceDrift]:
+    """Compare the rollup with journal lines; returns the buckets that disagree."""
+    expected = _line_totals(company_id)
+    actual = _rollup_totals(company_id)
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (str(k[2]), str(k[0]), str(k[1]))):
+        exp = expected.get(key, (0, 0, 0))
+        act = actual.get(key, (0, 0, 0))
+        if exp != act:
+            drift.append(BalanceDrift(account_id=key[0], client_id=key[1], day=key[2], expected=exp, actual=act))
+    return drift
+
+
+@transaction.atomic
+def rebuild_company_balances(company_id, *, batch_size: int = 1000) -> int:
+    """Recompute a company's rollup from journal lines. Returns rows written."""
+    AccountBalanceDaily.objects.filter(company_id=company_id).delete()
+    rows = [
+        AccountBalanceDaily(
+            company_id=company_id,
+            account_id=account_id,
+            client_id=client_id,
+            day=day,
+            debit_cents=debits,
+            credit_cents=credits,
+            line_count=lines,
+        )
+        for (account_id, client_id, day), (debits, credits, lines) in _line_totals(company_id).items()
+    ]
+    AccountBalanceDaily.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def _balances_qs(company, start: date | None, end: date | None):
+    qs = AccountBalanceDaily.objects.filter(company=company)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs
+
+
+def account_totals(company, start: date | None, end: date | None, *, account_types=None):
+    """Debit/credit totals per account over a date range, from the daily rollup.
+
+    Row shape matches the JournalLine aggregation the reports used before:
+    account_id, account__code, account__name, account__type, account__normal_balance,
+    debits, credits.
+    """
+    qs = _balances_qs(company, start, end)
+    if account_types:
+        qs = qs.filter(account__type__in=list(account_types))
+    return (
+        qs.values("account_id", "account__code", "account__name", "account__type", "account__normal_balance")
+        .annotate(debits=Coalesce(Sum("debit_cents"), 0), credits=Coalesce(Sum("credit_cents"), 0))
+        .order_by("account__type", "account__code", "account__name")
+    )
+
+
+def client_revenue_totals(company, start: date | None, end: date | None):
+    """Income-account revenue per client over a date range, from the daily rollup."""
+    return (
+        _balances_qs(company, start, end)
+        .filter(account__type=AccountType.INCOME)
+        .values("client_id", "client__company_name", "client__last_name", "client__first_name")
+        .annotate(revenue_cents=Coalesce(Sum("credit_cents"), 0) - Coalesce(Sum("debit_cents"), 0))
+        .order_by("-revenue_cents")
+    )
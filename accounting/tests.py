@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from datetime import date
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounting.models import AccountBalanceDaily, AccountType, JournalEntry, JournalLine
+from accounting.services import iter_batch_source_chunks, post_batch
+from accounting.services_balances import account_totals, rebuild_company_balances, verify_company_balances
+from companies.models import Company
+from expenses.models import Expense, ExpenseStatus
+
+
+class AccountBalanceRollupTests(TestCase):
+    """Posting keeps the daily balance rollup in step with journal lines."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Ledger Co")
+
+    def _expense(self, day: date, cents: int) -> Expense:
+        return Expense.objects.create(
+            company=self.company,
+            date=day,
+            amount_cents=cents,
+            total_cents=cents,
+            status=ExpenseStatus.APPROVED,
+        )
+
+    def test_posting_updates_rollup_and_reports_sum_periods(self):
+        self._expense(date(2026, 1, 5), 1500)
+        self._expense(date(2026, 1, 5), 500)
+        self._expense(date(2026, 2, 10), 700)
+
+        self.assertEqual(verify_company_balances(self.company.id), [])
+        # Same-day postings share one bucket per account.
+        self.assertEqual(AccountBalanceDaily.objects.filter(company=self.company, day=date(2026, 1, 5)).count(), 2)
+
+        jan = {
+            r["account__type"]: r
+            for r in account_totals(self.company, date(2026, 1, 1), date(2026, 1, 31))
+        }
+        self.assertEqual(jan[AccountType.EXPENSE]["debits"], 2000)
+        self.assertEqual(jan[AccountType.ASSET]["credits"], 2000)
+
+    def test_rebuild_repairs_drift(self):
+        self._expense(date(2026, 3, 1), 900)
+        AccountBalanceDaily.objects.filter(company=self.company).update(debit_cents=0)
+        self.assertTrue(verify_company_balances(self.company.id))
+
+        rebuild_company_balances(self.company.id)
+        self.assertEqual(verify_company_balances(self.company.id), [])
+
+
+class BatchPostingTests(TestCase):
+    """post_batch matches the per-source posting rules and stays idempotent."""
+
+    def setUp(self):
+        self.company = Company.objects.create(name="Backfill Co")
+        for i in range(5):
+            Expense.objects.create(
+                company=self.company,
+                date=date(2026, 4, 1 + i),
+                amount_cents=100 * (i + 1),
+                total_cents=100 * (i + 1),
+                status=ExpenseStatus.APPROVED,
+            )
+        Expense.objects.create(company=self.company, total_cents=50, status=ExpenseStatus.DRAFT)
+        # Simulate a migrated tenant: sources exist, postings do not.
+        JournalEntry.all_objects.filter(company=self.company).delete()
+        AccountBalanceDaily.objects.filter(company=self.company).delete()
+
+    def test_batch_posts_missing_entries_once(self):
+        chunks = list(iter_batch_source_chunks(self.company, "expense", chunk_size=2))
+        self.assertEqual([len(c) for c in chunks], [2, 2, 1])
+
+        posted = sum(post_batch(self.company, "expense", chunk).posted for chunk in chunks)
+        self.assertEqual(posted, 5)
+        self.assertEqual(JournalEntry.objects.filter(company=self.company).count(), 5)
+        self.assertEqual(JournalLine.objects.filter(entry__company=self.company).count(), 10)
+        self.assertEqual(verify_company_balances(self.company.id), [])
+
+        again = post_batch(self.company, "expense", chunks[0])
+        self.assertEqual((again.posted, again.already_posted), (0, 2))
+
+    def test_backfill_command_verify_then_post(self):
+        out = StringIO()
+        call_command("ez360_accounting_backfill", "--company-id", str(self.company.id), "--verify", stdout=out)
+        self.assertIn("missing=5", out.getvalue())
+        self.assertFalse(JournalEntry.objects.filter(company=self.company).exists())
+
+        call_command("ez360_accounting_backfill", "--company-id", str(self.company.id), stdout=StringIO())
+        self.assertEqual(JournalEntry.objects.filter(company=self.company).count(), 5)
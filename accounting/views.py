@@ -8,7 +8,7 @@ from django.shortcuts import render
 from django.utils import timezone
 
 from core.cache_utils import build_company_request_cache_key, get_or_set
-from core.csv_utils import csv_response
+from core.csv_utils import EXPORT_CHUNK_SIZE, csv_response
 
 from companies.decorators import company_context_required, require_min_role
 from companies.models import EmployeeRole
@@ -19,6 +19,7 @@ from billing.models import PlanCode
 
 from .forms import DateRangeForm
 from .models import Account, AccountType, JournalLine, NormalBalance
+from .services_balances import account_totals, client_revenue_totals
 
 
 def _get_range(request):
@@ -78,16 +79,7 @@ def profit_loss(request):
     form, start, end = _get_range(request)
 
     def _build():
-        lines = _lines_qs(company, start, end).filter(account__type__in=[AccountType.INCOME, AccountType.EXPENSE])
-
-        by_account = (
-            lines.values("account_id", "account__code", "account__name", "account__type", "account__normal_balance")
-            .annotate(
-                debits=Coalesce(Sum("debit_cents"), 0),
-                credits=Coalesce(Sum("credit_cents"), 0),
-            )
-            .order_by("account__type", "account__code", "account__name")
-        )
+        by_account = account_totals(company, start, end, account_types=[AccountType.INCOME, AccountType.EXPENSE])
 
         income_rows = []
         expense_rows = []
@@ -132,13 +124,7 @@ def trial_balance(request):
     form, start, end = _get_range(request)
 
     def _build():
-        lines = _lines_qs(company, start, end)
-
-        by_account = (
-            lines.values("account_id", "account__code", "account__name", "account__type", "account__normal_balance")
-            .annotate(debits=Coalesce(Sum("debit_cents"), 0), credits=Coalesce(Sum("credit_cents"), 0))
-            .order_by("account__type", "account__code", "account__name")
-        )
+        by_account = account_totals(company, start, end)
 
         rows = []
         total_debits = 0
@@ -170,12 +156,8 @@ def balance_sheet(request):
     form, start, end = _get_range(request)
 
     def _build():
-        lines = _lines_qs(company, start, end)
-
-        by_account = (
-            lines.values("account_id", "account__code", "account__name", "account__type", "account__normal_balance")
-            .annotate(debits=Coalesce(Sum("debit_cents"), 0), credits=Coalesce(Sum("credit_cents"), 0))
-            .order_by("account__type", "account__code", "account__name")
+        by_account = account_totals(
+            company, start, end, account_types=[AccountType.ASSET, AccountType.LIABILITY, AccountType.EQUITY]
         )
 
         assets = []
@@ -276,16 +258,7 @@ def revenue_by_client(request):
     form, start, end = _get_range(request)
 
     def _build():
-        lines = _lines_qs(company, start, end).filter(account__type=AccountType.INCOME)
-
-        rows = list(
-            lines.values("client_id", "client__company_name", "client__last_name", "client__first_name")
-            .annotate(
-                revenue_cents=Coalesce(Sum("credit_cents"), 0) - Coalesce(Sum("debit_cents"), 0),
-            )
-            .order_by("-revenue_cents")
-        )
-        return {"rows": rows}
+        return {"rows": list(client_revenue_totals(company, start, end))}
 
     data = _cached_report_context(request, "revenue_by_client", 300, _build)
     if request.GET.get("format") == "csv":
@@ -401,6 +374,37 @@ def accounts_aging(request):
 
     data = _cached_report_context(request, "accounts_aging", 300, _build)
 
+    if request.GET.get("format") == "csv":
+        def _rows():
+            # Resolve invoices a chunk of ids at a time while streaming, instead of all at once.
+            for key, ids in data["buckets_ids"].items():
+                for i in range(0, len(ids), EXPORT_CHUNK_SIZE):
+                    chunk_ids = ids[i : i + EXPORT_CHUNK_SIZE]
+                    found = (
+                        Document.objects.filter(company=company, id__in=chunk_ids, deleted_at__isnull=True)
+                        .select_related("client")
+                        .in_bulk()
+                    )
+                    for inv_id in chunk_ids:
+                        inv = found.get(inv_id)
+                        if inv is None:
+                            continue
+                        client_name = getattr(inv.client, "company_name", "") or getattr(inv.client, "full_name", "")
+                        yield [
+                            key,
+                            getattr(inv, "number", ""),
+                            str(getattr(inv, "issue_date", "")),
+                            str(getattr(inv, "due_date", "")),
+                            client_name,
+                            int(getattr(inv, "balance_due_cents", 0) or 0),
+                        ]
+
+        return csv_response(
+            "accounts_aging.csv",
+            ["Bucket", "Invoice", "Issue Date", "Due Date", "Client", "Balance Due (cents)"],
+            _rows(),
+        )
+
     # Resolve invoice objects in one query for template usage
     all_ids = []
     for _k, ids in data["buckets_ids"].items():
@@ -417,25 +421,6 @@ def accounts_aging(request):
     buckets = {k: [inv_map[i] for i in ids if i in inv_map] for k, ids in data["buckets_ids"].items()}
     totals = data["totals"]
 
-    if request.GET.get("format") == "csv":
-        rows = []
-        for key, invs in buckets.items():
-            for inv in invs:
-                client_name = getattr(inv.client, "company_name", "") or getattr(inv.client, "full_name", "")
-                rows.append([
-                    key,
-                    getattr(inv, "number", ""),
-                    str(getattr(inv, "issue_date", "")),
-                    str(getattr(inv, "due_date", "")),
-                    client_name,
-                    int(getattr(inv, "balance_due_cents", 0) or 0),
-                ])
-        return csv_response(
-            "accounts_aging.csv",
-            ["Bucket", "Invoice", "Issue Date", "Due Date", "Client", "Balance Due (cents)"],
-            rows,
-        )
-
     return render(
         request,
         "accounting/accounts_aging.html",
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import csv
 from datetime import datetime
 from typing import Optional
 
@@ -12,6 +11,7 @@ from django.utils import timezone
 
 from companies.decorators import require_min_role
 from companies.models import EmployeeRole
+from core.csv_utils import queryset_csv_response
 
 from .models import AuditEvent
 
@@ -120,16 +120,11 @@ def audit_event_export_csv(request: HttpRequest) -> HttpResponse:
     if dt_to:
         qs = qs.filter(created_at__lt=dt_to + timezone.timedelta(days=1))
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="audit_{company.id}_events.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(["created_at", "event_type", "object_type", "object_id", "actor", "summary", "ip_address"])
-    for ev in qs[:5000]:
+    def _row(ev: AuditEvent) -> list[str]:
         actor_label = ""
         if ev.actor_id:
             actor_label = ev.actor.display_name or ev.actor.username_public
-        writer.writerow([
+        return [
             ev.created_at.isoformat(),
             ev.event_type,
             ev.object_type,
@@ -137,5 +132,12 @@ def audit_event_export_csv(request: HttpRequest) -> HttpResponse:
             actor_label,
             ev.summary,
             ev.ip_address or "",
-        ])
-    return response
+        ]
+
+    # Streamed in chunks, so the full filtered history can be exported.
+    return queryset_csv_response(
+        f"audit_{company.id}_events.csv",
+        ["created_at", "event_type", "object_type", "object_id", "actor", "summary", "ip_address"],
+        qs,
+        _row,
+    )
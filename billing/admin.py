@@ -27,10 +27,24 @@ class CompanySubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(BillingWebhookEvent)
 class BillingWebhookEventAdmin(admin.ModelAdmin):
-    list_display = ("event_type", "stripe_event_id", "ok", "received_at", "processed_at")
-    list_filter = ("ok", "event_type")
-    search_fields = ("stripe_event_id", "event_type")
-    readonly_fields = ("stripe_event_id", "event_type", "received_at", "processed_at", "payload_json", "ok", "error")
+    list_display = ("event_type", "stripe_event_id", "status", "attempts", "received_at", "processed_at")
+    list_filter = ("status", "event_type")
+    search_fields = ("stripe_event_id", "event_type", "stripe_customer_id", "stripe_subscription_id")
+    readonly_fields = (
+        "stripe_event_id",
+        "event_type",
+        "received_at",
+        "processed_at",
+        "payload_json",
+        "ok",
+        "error",
+        "status",
+        "attempts",
+        "company",
+        "stripe_created_at",
+        "stripe_customer_id",
+        "stripe_subscription_id",
+    )
 
 
 @admin.register(PlanCatalog)
@@ -11,7 +11,7 @@ from companies.models import EmployeeRole
 from companies.services import get_active_company, get_active_employee_profile
 
 from .models import PlanCode
-from .services import build_subscription_summary, plan_allows_feature, plan_meets
+from .services import get_request_subscription_summary, plan_allows_feature, plan_meets
 
 
 def require_company_admin(view_func):
@@ -60,7 +60,7 @@ def tier_required(min_plan: str):
             if not company:
                 return redirect("companies:switch")
 
-            summary = build_subscription_summary(company)
+            summary = get_request_subscription_summary(request)
             if not summary.is_active_or_trial:
                 messages.error(request, "Your subscription is inactive. Please update billing to continue.")
                 return redirect("billing:overview")
@@ -93,7 +93,7 @@ def feature_required(feature_code: str, *, min_plan_hint: str | None = None):
             if not company:
                 return redirect("companies:switch")
 
-            summary = build_subscription_summary(company)
+            summary = get_request_subscription_summary(request)
             if not summary.is_active_or_trial:
                 messages.error(request, "Your subscription is inactive. Please update billing to continue.")
                 return redirect("billing:overview")
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from companies.models import Company
+from core.jobs import job_handler
+
+from .services_webhooks import drain_company_events
+from .stripe_service import fetch_and_sync_subscription_from_stripe
+
+
+@job_handler("billing.stripe_webhooks")
+def stripe_webhooks(*, company_id: str = "") -> dict | None:
+    """Process a company's stored Stripe events in order; see billing/services_webhooks.py."""
+    return drain_company_events(company_id or None)
+
+
+@job_handler("billing.stripe_subscription_refresh")
+def stripe_subscription_refresh(*, company_id: str) -> dict | None:
+    """Re-read a company's subscription from the Stripe API after checkout completes."""
+    company = Company.objects.filter(id=company_id).first()
+    if company is None:
+        return {"skipped": "company not found"}
+    fetch_and_sync_subscription_from_stripe(company=company)
+    return {"synced": True}
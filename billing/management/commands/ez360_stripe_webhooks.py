@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from billing.models import BillingWebhookEvent, WebhookEventStatus
+from billing.services_webhooks import requeue_stale_drains, retry_dead_events
+
+
+class Command(BaseCommand):
+    help = (
+        "Stripe webhook queue maintenance: re-queue drains for pending events older than --stale-seconds "
+        "(run from cron alongside ez360_worker) and optionally retry dead-letter events."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-seconds", type=int, default=300, help="Pending events older than this get a new drain.")
+        parser.add_argument("--retry-dead", action="store_true", help="Move dead-letter events back to pending.")
+        parser.add_argument("--event-id", action="append", default=[], help="Limit --retry-dead to these Stripe event ids.")
+
+    def handle(self, *args, **opts):
+        if opts.get("retry_dead"):
+            retried = retry_dead_events(event_ids=list(opts.get("event_id") or []) or None)
+            self.stdout.write(f"retried dead-letter events={retried}")
+
+        queued = requeue_stale_drains(older_than_seconds=max(0, int(opts.get("stale_seconds") or 0)))
+        counts = dict(
+            BillingWebhookEvent.objects.exclude(status=WebhookEventStatus.PROCESSED)
+            .values_list("status")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        waiting = [s for s in WebhookEventStatus.values if s != WebhookEventStatus.PROCESSED]
+        summary = " ".join(f"{s}={counts.get(s, 0)}" for s in waiting)
+        self.stdout.write(self.style.SUCCESS(f"[DONE] drains queued={queued} {summary}"))
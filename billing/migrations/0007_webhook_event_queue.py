@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:15
+
+import django.db.models.deletion
+import datetime
+
+from django.db import migrations, models
+
+
+def stripe_ids_from_payload(payload):
+    """(customer id, subscription id) referenced by a Stripe event payload (frozen copy of billing.models)."""
+    obj = ((payload or {}).get("data") or {}).get("object") or {}
+
+    def _id(value):
+        if isinstance(value, dict):  # expanded object
+            value = value.get("id")
+        return value if isinstance(value, str) else ""
+
+    kind = obj.get("object")
+    customer = _id(obj.get("customer")) or _id(obj.get("customer_id"))
+    subscription = _id(obj.get("subscription")) or _id(obj.get("subscription_id"))
+    if kind == "customer":
+        customer = customer or _id(obj.get("id"))
+    elif kind == "subscription":
+        subscription = subscription or _id(obj.get("id"))
+    return customer[:80], subscription[:80]
+
+
+def backfill_events(apps, schema_editor):
+    """Extract ids/company from stored payloads; events handled inline before this are not re-queued."""
+    Event = apps.get_model("billing", "BillingWebhookEvent")
+    Subscription = apps.get_model("billing", "CompanySubscription")
+    Company = apps.get_model("companies", "Company")
+    by_customer = dict(Subscription.objects.exclude(stripe_customer_id="").values_list("stripe_customer_id", "company_id"))
+    company_ids = {str(pk) for pk in Company.objects.values_list("id", flat=True)}
+
+    batch = []
+    for event in Event.objects.all().iterator(chunk_size=1000):
+        payload = event.payload_json or {}
+        metadata = (((payload.get("data") or {}).get("object") or {}).get("metadata") or {})
+        event.stripe_customer_id, event.stripe_subscription_id = stripe_ids_from_payload(payload)
+        company_id = str(metadata.get("company_id") or "")
+        event.company_id = company_id if company_id in company_ids else by_customer.get(event.stripe_customer_id)
+        created = payload.get("created")
+        if isinstance(created, int) and created:
+            event.stripe_created_at = datetime.datetime.fromtimestamp(created, tz=datetime.timezone.utc)
+        event.status = "processed" if (event.ok and event.processed_at) else "dead"
+        event.attempts = 1
+        batch.append(event)
+        if len(batch) >= 1000:
+            Event.objects.bulk_update(batch, _BACKFILL_FIELDS)
+            batch = []
+    if batch:
+        Event.objects.bulk_update(batch, _BACKFILL_FIELDS)
+
+
+_BACKFILL_FIELDS = ["stripe_customer_id", "stripe_subscription_id", "company", "stripe_created_at", "status", "attempts"]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_subscription_last_stripe_event_at'),
+        ('companies', '0003_company_onboarding_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='company',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='companies.company'),
+        ),
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processed', 'Processed'), ('failed', 'Failed (retrying)'), ('dead', 'Dead letter')], default='pending', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='stripe_created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='stripe_customer_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=80),
+        ),
+        migrations.AddField(
+            model_name='billingwebhookevent',
+            name='stripe_subscription_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=80),
+        ),
+        migrations.AlterField(
+            model_name='companysubscription',
+            name='stripe_customer_id',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=80),
+        ),
+        migrations.AddIndex(
+            model_name='billingwebhookevent',
+            index=models.Index(fields=['company', 'status', 'stripe_created_at'], name='bill_wh_co_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billingwebhookevent',
+            index=models.Index(fields=['status', 'received_at'], name='bill_wh_status_received_idx'),
+        ),
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -110,7 +110,7 @@ class CompanySubscription(SyncModel):
     current_period_start = models.DateTimeField(null=True, blank=True)
     current_period_end = models.DateTimeField(null=True, blank=True)
 
-    stripe_customer_id = models.CharField(max_length=80, blank=True, default="")
+    stripe_customer_id = models.CharField(max_length=80, blank=True, default="", db_index=True)
     stripe_subscription_id = models.CharField(max_length=80, blank=True, default="")
 
     # Stripe webhook freshness marker (authoritative mirror).
@@ -181,7 +181,38 @@ class CompanySubscription(SyncModel):
         )
 
 
+class WebhookEventStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    PROCESSED = "processed", "Processed"
+    FAILED = "failed", "Failed (retrying)"
+    DEAD = "dead", "Dead letter"
+
+
+WEBHOOK_FAILED_STATUSES = (WebhookEventStatus.FAILED, WebhookEventStatus.DEAD)
+
+
+def stripe_ids_from_payload(payload: dict) -> tuple[str, str]:
+    """(customer id, subscription id) referenced by a Stripe event payload."""
+    obj = ((payload or {}).get("data") or {}).get("object") or {}
+
+    def _id(value) -> str:
+        if isinstance(value, dict):  # expanded object
+            value = value.get("id")
+        return value if isinstance(value, str) else ""
+
+    kind = obj.get("object")
+    customer = _id(obj.get("customer")) or _id(obj.get("customer_id"))
+    subscription = _id(obj.get("subscription")) or _id(obj.get("subscription_id"))
+    if kind == "customer":
+        customer = customer or _id(obj.get("id"))
+    elif kind == "subscription":
+        subscription = subscription or _id(obj.get("id"))
+    return customer[:80], subscription[:80]
+
+
 class BillingWebhookEvent(models.Model):
+    """A received Stripe event; processed by the `billing.stripe_webhooks` job (see billing/services_webhooks.py)."""
+
     stripe_event_id = models.CharField(max_length=100, unique=True)
     event_type = models.CharField(max_length=200, blank=True, default="")
     received_at = models.DateTimeField(auto_now_add=True)
@@ -190,12 +221,26 @@ class BillingWebhookEvent(models.Model):
     error = models.TextField(blank=True, default="")
     payload_json = models.JSONField(default=dict, blank=True)
 
+    status = models.CharField(max_length=16, choices=WebhookEventStatus.choices, default=WebhookEventStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    stripe_created_at = models.DateTimeField(null=True, blank=True)
+    stripe_customer_id = models.CharField(max_length=80, blank=True, default="", db_index=True)
+    stripe_subscription_id = models.CharField(max_length=80, blank=True, default="", db_index=True)
+
     class Meta:
         ordering = ["-received_at"]
         indexes = [
             models.Index(fields=["event_type"]),
             models.Index(fields=["received_at"]),
+            models.Index(fields=["company", "status", "stripe_created_at"], name="bill_wh_co_status_created_idx"),
+            models.Index(fields=["status", "received_at"], name="bill_wh_status_received_idx"),
         ]
 
     def __str__(self) -> str:
         return f"{self.event_type or 'stripe.event'} ({self.stripe_event_id})"
+
+    def save(self, *args, **kwargs):
+        if not (self.stripe_customer_id or self.stripe_subscription_id):
+            self.stripe_customer_id, self.stripe_subscription_id = stripe_ids_from_payload(self.payload_json)
+        super().save(*args, **kwargs)
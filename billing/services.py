@@ -140,8 +140,10 @@ def seats_limit_for(subscription: CompanySubscription) -> int:
     return max(1, included + extra)
 
 
-def build_subscription_summary(company: Company) -> SubscriptionSummary:
-    sub = ensure_company_subscription(company)
+def build_subscription_summary(
+    company: Company, *, subscription: CompanySubscription | None = None
+) -> SubscriptionSummary:
+    sub = subscription or ensure_company_subscription(company)
     used = seats_used_for(company)
     included = included_seats_for(sub.plan)
     extra = int(sub.extra_seats or 0)
@@ -173,6 +175,37 @@ def company_is_locked(company: Company) -> bool:
     return not sub.is_active_or_trial()
 
 
+# -------------------------
+# Request-scoped accessors (memoized on the tenant context)
+# -------------------------
+
+def get_request_subscription(request) -> CompanySubscription | None:
+    from companies.services import get_tenant_context
+
+    ctx = get_tenant_context(request)
+    if not ctx or not ctx.company:
+        return None
+    return ctx.memo("subscription", lambda: ensure_company_subscription(ctx.company))
+
+
+def get_request_subscription_summary(request) -> SubscriptionSummary | None:
+    from companies.services import get_tenant_context
+
+    ctx = get_tenant_context(request)
+    if not ctx or not ctx.company:
+        return None
+    return ctx.memo(
+        "subscription_summary",
+        lambda: build_subscription_summary(ctx.company, subscription=get_request_subscription(request)),
+    )
+
+
+def request_company_is_locked(request) -> bool:
+    """company_is_locked() for the request's active company, reusing its memoized subscription."""
+    sub = get_request_subscription(request)
+    return bool(sub) and not sub.is_active_or_trial()
+
+
 def can_add_seat(company: Company) -> bool:
     """True if company has remaining seats under included + extra seats."""
     summary = build_subscription_summary(company)
@@ -0,0 +1,504 @@
+"""Stripe webhook processing (runs as the `billing.stripe_webhooks` background job).
+
+The webhook view only verifies the signature, stores a pending
+`BillingWebhookEvent` via `record_webhook_event()` and queues a drain for the
+event's company, so Stripe gets its 200 without waiting on our processing:
+
+- the Stripe customer/subscription ids and the owning company are resolved at
+  ingest into indexed columns (metadata `company_id`, the subscription mirror,
+  or an earlier event of the same customer);
+- `drain_company_events()` processes a company's pending events oldest Stripe
+  `created` first, one transaction per event, so an event's effects and its
+  `processed` status commit together and a retried drain never applies an
+  event twice;
+- a failing event is retried with the job's backoff and holds back the later
+  events of its company (subscription state depends on order). After
+  `EZ360_STRIPE_WEBHOOK_MAX_ATTEMPTS` it becomes a dead letter, ops is alerted
+  and the drain moves on;
+- best-effort side effects run in their own savepoint, and the Stripe API
+  re-read after checkout is a follow-up `billing.stripe_subscription_refresh`
+  job, so no HTTP call happens while the drain holds row locks;
+- `python manage.py ez360_stripe_webhooks` re-queues drains for stale pending
+  events and retries dead letters.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from typing import Any
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from companies.models import Company
+from core.jobs import enqueue, extend_lease
+from core.models import JobStatus
+
+from .models import BillingInterval, BillingWebhookEvent, PlanCode, WebhookEventStatus, stripe_ids_from_payload
+from .stripe_service import sync_subscription_from_stripe
+
+logger = logging.getLogger(__name__)
+
+DRAIN_JOB = "billing.stripe_webhooks"
+REFRESH_JOB = "billing.stripe_subscription_refresh"
+_DUE_STATUSES = (WebhookEventStatus.PENDING, WebhookEventStatus.FAILED)
+
+
+def max_attempts() -> int:
+    try:
+        return max(1, int(getattr(settings, "EZ360_STRIPE_WEBHOOK_MAX_ATTEMPTS", 5)))
+    except (TypeError, ValueError):
+        return 5
+
+
+def alert_webhook_failure(subject: str, message: str, *, extra: dict | None = None) -> None:
+    """Best-effort ops alert for webhook failures."""
+    try:
+        if not getattr(settings, "EZ360_ALERT_ON_WEBHOOK_FAILURE", False):
+            return
+        from core.ops_alerts import alert_admins
+        alert_admins(subject, message, extra=extra)
+    except Exception:
+        return
+
+
+def record_ops_alert(*, title: str, message: str, details: dict | None = None, company: Company | None = None) -> None:
+    """Best-effort DB alert for staff ops console."""
+    try:
+        from ops.services_alerts import create_ops_alert
+        from ops.models import OpsAlertLevel, OpsAlertSource
+
+        create_ops_alert(
+            title=title,
+            message=message,
+            level=OpsAlertLevel.ERROR,
+            source=OpsAlertSource.STRIPE_WEBHOOK,
+            company=company,
+            details=details or {},
+        )
+    except Exception:
+        return
+
+
+# -----------------------------------------------------------------------------
+# Ingest (webhook request)
+# -----------------------------------------------------------------------------
+
+
+def _data_object(payload: dict) -> dict:
+    return dict(((payload or {}).get("data") or {}).get("object") or {})
+
+
+def _metadata(data_object: dict) -> dict:
+    return dict(data_object.get("metadata") or {})
+
+
+def _created_at(payload: dict) -> datetime.datetime | None:
+    try:
+        created = int((payload or {}).get("created") or 0)
+    except (TypeError, ValueError):
+        return None
+    return datetime.datetime.fromtimestamp(created, tz=datetime.timezone.utc) if created else None
+
+
+def resolve_company(*, company_id: str = "", customer_id: str = "") -> Company | None:
+    """Owning company of an event, by metadata company id or Stripe customer id (indexed lookups only)."""
+    company = None
+    if company_id:
+        try:
+            company = Company.objects.filter(id=company_id).first()
+        except (ValueError, ValidationError):
+            company = None
+    if company is None and customer_id:
+        company = Company.objects.filter(subscription__stripe_customer_id=customer_id).first()
+    if company is None and customer_id:
+        # A checkout event may have named the company before the subscription mirror caught up.
+        earlier = (
+            BillingWebhookEvent.objects.filter(stripe_customer_id=customer_id, company__isnull=False)
+            .select_related("company")
+            .first()
+        )
+        company = earlier.company if earlier else None
+    return company
+
+
+def record_webhook_event(event: Any) -> tuple[BillingWebhookEvent, bool]:
+    """Store a verified Stripe event as pending (idempotent on the Stripe event id)."""
+    payload = dict(event)
+    customer_id, subscription_id = stripe_ids_from_payload(payload)
+    company = resolve_company(
+        company_id=str(_metadata(_data_object(payload)).get("company_id") or ""), customer_id=customer_id
+    )
+    return BillingWebhookEvent.objects.get_or_create(
+        stripe_event_id=str(payload.get("id") or ""),
+        defaults={
+            "event_type": str(payload.get("type") or ""),
+            "payload_json": payload,
+            "company": company,
+            "stripe_created_at": _created_at(payload),
+            "stripe_customer_id": customer_id,
+            "stripe_subscription_id": subscription_id,
+        },
+    )
+
+
+def queue_webhook_drain(company: Company | None) -> None:
+    """Queue (at most one) drain of a company's pending events; `None` drains events without a company."""
+    key = f"stripe_webhooks:{company.pk if company else 'none'}"
+    options = {
+        "company": company,
+        "payload": {"company_id": str(company.pk) if company else ""},
+        "max_attempts": max_attempts() + 1,  # the event turns dead letter before the job gives up
+    }
+    job = enqueue(DRAIN_JOB, dedupe_key=key, **options)
+    if job.status == JobStatus.RUNNING:
+        # The running drain may already have looked past this event: queue one follow-up.
+        enqueue(DRAIN_JOB, dedupe_key=f"{key}:next", **options)
+
+
+# -----------------------------------------------------------------------------
+# Processing (worker)
+# -----------------------------------------------------------------------------
+
+
+def _infer_from_subscription_object(data_object: dict) -> tuple[str | None, str | None, int | None]:
+    """
+    Best-effort inference for (plan, interval, extra_seats) from Stripe subscription payload.
+
+    Priority order:
+    1) subscription.metadata.plan / subscription.metadata.interval
+    2) subscription items price.lookup_key matching our recommended lookup keys
+    3) subscription items price.id matching STRIPE_PRICE_MAP (reverse lookup by price_id)
+    """
+    meta = dict(data_object.get("metadata") or {})
+    plan = meta.get("plan") or None
+    interval = meta.get("interval") or None
+
+    items = (data_object.get("items") or {}).get("data") or []
+    extra_seats = None
+
+    # Build reverse lookup by price_id (optional)
+    price_map: dict[str, str] = {}
+    try:
+        price_map = dict(getattr(settings, "STRIPE_PRICE_MAP", {}) or {})
+    except Exception:
+        price_map = {}
+    reverse_by_price_id = {v: k for k, v in price_map.items() if isinstance(v, str)}
+
+    def _consume_lookup_key(lk: str, qty: int):
+        nonlocal plan, interval, extra_seats
+        if lk.startswith("ez360pm_seat_"):
+            extra_seats = int(qty or 0)
+            # interval can be inferred from seat lookup too
+            if lk.endswith("_monthly"):
+                interval = interval or BillingInterval.MONTH
+            elif lk.endswith("_annual"):
+                interval = interval or BillingInterval.YEAR
+            return
+
+        if lk.startswith("ez360pm_starter_"):
+            plan = plan or PlanCode.STARTER
+        elif lk.startswith("ez360pm_pro_"):
+            plan = plan or PlanCode.PROFESSIONAL
+        elif lk.startswith("ez360pm_premium_"):
+            plan = plan or PlanCode.PREMIUM
+
+        if lk.endswith("_monthly"):
+            interval = interval or BillingInterval.MONTH
+        elif lk.endswith("_annual"):
+            interval = interval or BillingInterval.YEAR
+
+    for it in items:
+        qty = int(it.get("quantity") or 0)
+        price = it.get("price") or {}
+        lk = str(price.get("lookup_key") or "").strip()
+        if lk:
+            _consume_lookup_key(lk, qty)
+            continue
+
+        # fallback: map by price id -> lookup key
+        pid = str(price.get("id") or "").strip()
+        if pid and pid in reverse_by_price_id:
+            _consume_lookup_key(reverse_by_price_id[pid], qty)
+
+    # extra_seats default to 0 if we know there is no seat line item
+    if extra_seats is None:
+        extra_seats = 0
+
+    return plan, interval, extra_seats
+
+
+def _record_transition(company: Company, old_sub, event: BillingWebhookEvent) -> None:
+    """Lifecycle event recording (best-effort).
+
+    Runs inside the drain's event transaction: its own savepoint keeps a
+    swallowed DB error from aborting the event on PostgreSQL.
+    """
+    try:
+        from ops.services_lifecycle import record_subscription_transition
+
+        with transaction.atomic():
+            company.refresh_from_db()
+            record_subscription_transition(
+                company=company,
+                old_sub=old_sub,
+                new_sub=getattr(company, "subscription", None),
+                stripe_event_id=event.stripe_event_id,
+                occurred_at=event.stripe_created_at or timezone.now(),
+                details={"stripe_event_type": event.event_type},
+            )
+    except Exception:
+        pass
+
+
+def _current_subscription(company: Company):
+    try:
+        with transaction.atomic():
+            return getattr(company, "subscription", None)
+    except Exception:
+        return None
+
+
+def queue_subscription_refresh(company: Company) -> None:
+    """Fetch the company's subscription from Stripe in a follow-up job.
+
+    Queued with the event's transaction, so the Stripe HTTP call never runs
+    while the drain holds its row locks.
+    """
+    enqueue(
+        REFRESH_JOB,
+        company=company,
+        payload={"company_id": str(company.pk)},
+        dedupe_key=f"stripe_subscription_refresh:{company.pk}",
+        max_attempts=3,
+    )
+
+
+def _apply_invoice_checkout(company: Company, data_object: dict, invoice_id: str) -> None:
+    """Customer paid an invoice through Stripe Checkout."""
+    from documents.models import Document, DocumentType, DocumentStatus
+    from payments.models import Payment, PaymentStatus, PaymentMethod
+    from payments.services import apply_payment_and_recalc
+
+    inv = Document.objects.filter(id=invoice_id, company=company, doc_type=DocumentType.INVOICE).first()
+    if not inv or inv.deleted_at:
+        return
+    session_id = str(data_object.get("id") or "")
+    payment_intent = str(data_object.get("payment_intent") or "")
+    amount_total = int(data_object.get("amount_total") or 0)
+
+    # Idempotency: do not create duplicate Payment rows for the same checkout session.
+    existing = None
+    if session_id:
+        existing = Payment.objects.filter(company=company, stripe_checkout_session_id=session_id).first()
+
+    if not existing:
+        p = Payment.objects.create(
+            company=company,
+            client=inv.client,
+            invoice=inv,
+            payment_date=timezone.now().date(),
+            method=PaymentMethod.STRIPE,
+            amount_cents=amount_total,
+            status=PaymentStatus.SUCCEEDED,
+            stripe_checkout_session_id=session_id,
+            stripe_payment_intent_id=payment_intent,
+        )
+        apply_payment_and_recalc(p, actor=None)
+
+    # Defensive status update (apply_payment_and_recalc should set correctly)
+    if inv.status != DocumentStatus.PAID and int(inv.balance_due_cents or 0) <= 0:
+        inv.status = DocumentStatus.PAID
+        inv.save(update_fields=["status", "updated_at"])
+
+
+def process_event(event: BillingWebhookEvent) -> None:
+    """Apply one stored Stripe event. Raises on failure; callers own the transaction."""
+    payload = event.payload_json or {}
+    data_object = _data_object(payload)
+    metadata = _metadata(data_object)
+    event_type = event.event_type
+    stripe_event_created = int(payload.get("created") or 0) or None
+
+    company = event.company
+    if company is None:
+        # The mirror may have learned the customer since ingest.
+        company = resolve_company(company_id=str(metadata.get("company_id") or ""), customer_id=event.stripe_customer_id)
+        if company is None:
+            return
+        event.company = company
+
+    if event_type == "checkout.session.completed":
+        # Either: invoice payment checkout OR subscription checkout.
+        invoice_id = (metadata.get("invoice_id") or "").strip()
+        if invoice_id:
+            _apply_invoice_checkout(company, data_object, invoice_id)
+            return
+
+        # subscription created/confirmed via checkout
+        # First persist IDs (so subsequent fetch can work), then fetch actual status/trial dates.
+        sync_subscription_from_stripe(
+            company=company,
+            stripe_customer_id=str(data_object.get("customer") or ""),
+            stripe_subscription_id=str(data_object.get("subscription") or ""),
+            plan=(metadata.get("plan") or "").strip() or None,
+            interval=(metadata.get("interval") or "").strip() or None,
+            stripe_event_created=stripe_event_created,
+        )
+        # Not fatal if this fails — follow-up subscription.* webhooks will sync status/dates.
+        if data_object.get("subscription"):
+            queue_subscription_refresh(company)
+
+    elif event_type in {"customer.subscription.created", "customer.subscription.updated"}:
+        old_sub = _current_subscription(company)
+        plan, interval, extra_seats = _infer_from_subscription_object(data_object)
+        sync_subscription_from_stripe(
+            company=company,
+            stripe_customer_id=str(data_object.get("customer") or ""),
+            stripe_subscription_id=str(data_object.get("id") or ""),
+            plan=plan,
+            interval=interval,
+            extra_seats=extra_seats,
+            status=str(data_object.get("status") or "") or None,
+            current_period_start=data_object.get("current_period_start"),
+            current_period_end=data_object.get("current_period_end"),
+            trial_started_at=data_object.get("trial_start"),
+            trial_ends_at=data_object.get("trial_end"),
+            cancel_at_period_end=bool(data_object.get("cancel_at_period_end") or False),
+            cancel_at=data_object.get("cancel_at"),
+            canceled_at=data_object.get("canceled_at"),
+            stripe_event_created=stripe_event_created,
+        )
+        _record_transition(company, old_sub, event)
+
+    elif event_type == "customer.subscription.deleted":
+        old_sub = _current_subscription(company)
+        sync_subscription_from_stripe(
+            company=company,
+            stripe_customer_id=str(data_object.get("customer") or ""),
+            stripe_subscription_id=str(data_object.get("id") or ""),
+            status="canceled",
+            cancel_at_period_end=False,
+            canceled_at=data_object.get("canceled_at"),
+            stripe_event_created=stripe_event_created,
+        )
+        _record_transition(company, old_sub, event)
+
+    elif event_type in {"invoice.payment_failed", "invoice.payment_succeeded"}:
+        sync_subscription_from_stripe(
+            company=company,
+            stripe_customer_id=str(data_object.get("customer") or ""),
+            status="past_due" if event_type == "invoice.payment_failed" else "active",
+            stripe_event_created=stripe_event_created,
+        )
+
+
+def _due_events(company_id):
+    qs = BillingWebhookEvent.objects.filter(status__in=_DUE_STATUSES)
+    qs = qs.filter(company_id=company_id) if company_id else qs.filter(company__isnull=True)
+    return qs.order_by("stripe_created_at", "received_at", "id")
+
+
+def _report_failure(event: BillingWebhookEvent, exc: Exception) -> None:
+    logger.warning(
+        "stripe_webhook_processing_failed event_id=%s type=%s attempts=%s status=%s",
+        event.stripe_event_id,
+        event.event_type,
+        event.attempts,
+        event.status,
+        exc_info=exc,
+    )
+    if event.status != WebhookEventStatus.DEAD:
+        return
+    details = {"event_id": event.stripe_event_id, "event_type": event.event_type, "error": str(exc)[:500]}
+    record_ops_alert(
+        title="Stripe webhook dead-lettered",
+        message=f"A Stripe webhook failed {event.attempts} times and was moved to the dead-letter state.",
+        details=details,
+        company=event.company,
+    )
+    alert_webhook_failure(
+        "EZ360PM: Stripe webhook processing failed",
+        "A Stripe webhook failed repeatedly and was moved to the dead-letter state.",
+        extra=details,
+    )
+    try:
+        import sentry_sdk
+        sentry_sdk.capture_exception(exc)
+    except Exception:
+        pass
+
+
+def drain_company_events(company_id=None) -> dict:
+    """Process a company's due events in Stripe `created` order; see the module docstring."""
+    processed = dead = 0
+    limit = max_attempts()
+    while True:
+        failure: Exception | None = None
+        with transaction.atomic():
+            # Row lock: a concurrent drain of the same company waits here instead of overtaking.
+            event = _due_events(company_id).select_for_update().first()
+            if event is None:
+                break
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    process_event(event)
+            except Exception as exc:
+                failure = exc
+                event.ok = False
+                event.error = f"{exc.__class__.__name__}: {exc}"[:5000]
+                event.status = WebhookEventStatus.DEAD if event.attempts >= limit else WebhookEventStatus.FAILED
+            else:
+                event.ok = True
+                event.error = ""
+                event.status = WebhookEventStatus.PROCESSED
+                event.processed_at = timezone.now()
+            event.save(update_fields=["attempts", "ok", "error", "status", "processed_at", "company"])
+
+        extend_lease()
+        if failure is None:
+            processed += 1
+            continue
+        _report_failure(event, failure)
+        if event.status != WebhookEventStatus.DEAD:
+            # Retry with the job's backoff; later events of this company wait behind this one.
+            raise failure
+        dead += 1
+    return {"processed": processed, "dead": dead}
+
+
+# -----------------------------------------------------------------------------
+# Maintenance (ez360_stripe_webhooks)
+# -----------------------------------------------------------------------------
+
+
+def requeue_stale_drains(*, older_than_seconds: int = 300) -> int:
+    """Queue drains for companies with due events older than the cutoff (lost or crashed drains)."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=max(0, older_than_seconds))
+    company_ids = set(
+        BillingWebhookEvent.objects.filter(status__in=_DUE_STATUSES, received_at__lt=cutoff)
+        .values_list("company_id", flat=True)
+        .distinct()
+    )
+    companies = Company.objects.in_bulk([c for c in company_ids if c])
+    for company_id in company_ids:
+        queue_webhook_drain(companies.get(company_id) if company_id else None)
+    return len(company_ids)
+
+
+def retry_dead_events(*, event_ids: list[str] | None = None) -> int:
+    """Move dead-letter events back to pending and queue their drains."""
+    qs = BillingWebhookEvent.objects.filter(status=WebhookEventStatus.DEAD)
+    if event_ids:
+        qs = qs.filter(stripe_event_id__in=event_ids)
+    with transaction.atomic():
+        company_ids = set(qs.values_list("company_id", flat=True))
+        count = qs.update(status=WebhookEventStatus.PENDING, attempts=0)
+        companies = Company.objects.in_bulk([c for c in company_ids if c])
+        for company_id in company_ids:
+            queue_webhook_drain(companies.get(company_id) if company_id else None)
+    return count
@@ -4,7 +4,10 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from companies.models import Company
+from companies.signals import tenant_cache_active
+from core.cache_utils import bump_tenant_cache_version
 
+from .models import CompanySubscription
 from .services import ensure_company_subscription
 
 
@@ -14,3 +17,9 @@ def create_subscription_for_new_company(sender, instance: Company, created: bool
         return
     # Initialize a trial subscription record for the new company.
     ensure_company_subscription(instance)
+
+
+@receiver(post_save, sender=CompanySubscription)
+def invalidate_tenant_cache_for_subscription(sender, instance: CompanySubscription, **kwargs):
+    if tenant_cache_active() and instance.company_id:
+        bump_tenant_cache_version(str(instance.company_id))
@@ -1,3 +1,119 @@
-from django.test import TestCase
+from __future__ import annotations
 
-# Create your tests here.
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from companies.models import Company
+from core.models import BackgroundJob, JobStatus
+
+from .models import BillingWebhookEvent, CompanySubscription, SubscriptionStatus, WebhookEventStatus
+from .services_webhooks import drain_company_events
+
+
+def _event(event_id: str, event_type: str, *, created: int, customer: str = "cus_1", **obj) -> dict:
+    return {
+        "id": event_id,
+        "type": event_type,
+        "created": created,
+        "data": {"object": {"customer": customer, **obj}},
+    }
+
+
+class StripeWebhookQueueTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme")
+        CompanySubscription.objects.filter(company=self.company).update(
+            stripe_customer_id="cus_1", status=SubscriptionStatus.ACTIVE
+        )
+
+    def _post(self, event: dict):
+        with mock.patch("billing.webhooks.verify_and_construct_event", return_value=event):
+            return self.client.post(reverse("billing:stripe_webhook"), data=b"{}", content_type="application/json")
+
+    def test_webhook_stores_event_and_queues_drain_without_processing(self):
+        event = _event("evt_1", "invoice.payment_failed", created=100, subscription="sub_1")
+        resp = self._post(event)
+        self.assertEqual(resp.status_code, 200)
+
+        stored = BillingWebhookEvent.objects.get(stripe_event_id="evt_1")
+        self.assertEqual(stored.status, WebhookEventStatus.PENDING)
+        self.assertEqual(stored.company, self.company)
+        self.assertEqual((stored.stripe_customer_id, stored.stripe_subscription_id), ("cus_1", "sub_1"))
+        self.assertEqual(CompanySubscription.objects.get(company=self.company).status, SubscriptionStatus.ACTIVE)
+
+        job = BackgroundJob.objects.get(name="billing.stripe_webhooks")
+        self.assertEqual(job.dedupe_key, f"stripe_webhooks:{self.company.pk}")
+        self.assertEqual(job.payload, {"company_id": str(self.company.pk)})
+
+        # Redelivery: same row, same queued drain.
+        self.assertEqual(self._post(event).status_code, 200)
+        self.assertEqual(BillingWebhookEvent.objects.count(), 1)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+
+    def test_drain_applies_events_in_stripe_created_order(self):
+        # Stripe delivered the newer event first.
+        self._post(_event("evt_late", "invoice.payment_succeeded", created=200))
+        self._post(_event("evt_early", "invoice.payment_failed", created=100))
+
+        self.assertEqual(drain_company_events(self.company.pk), {"processed": 2, "dead": 0})
+        self.assertEqual(CompanySubscription.objects.get(company=self.company).status, SubscriptionStatus.ACTIVE)
+        self.assertFalse(BillingWebhookEvent.objects.exclude(status=WebhookEventStatus.PROCESSED).exists())
+
+    @override_settings(EZ360_JOBS_RUN_INLINE=True)
+    def test_inline_worker_processes_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._post(_event("evt_1", "invoice.payment_failed", created=100))
+        self.assertEqual(CompanySubscription.objects.get(company=self.company).status, SubscriptionStatus.PAST_DUE)
+        self.assertEqual(BackgroundJob.objects.get().status, JobStatus.SUCCEEDED)
+
+    @override_settings(EZ360_STRIPE_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failing_event_blocks_company_then_dead_letters(self):
+        self._post(_event("evt_bad", "invoice.payment_failed", created=100))
+        self._post(_event("evt_next", "invoice.payment_succeeded", created=200))
+
+        def _process(event):
+            if event.stripe_event_id == "evt_bad":
+                raise RuntimeError("boom")
+
+        with mock.patch("billing.services_webhooks.process_event", side_effect=_process):
+            with self.assertRaises(RuntimeError):
+                drain_company_events(self.company.pk)
+            bad = BillingWebhookEvent.objects.get(stripe_event_id="evt_bad")
+            self.assertEqual((bad.status, bad.attempts), (WebhookEventStatus.FAILED, 1))
+            self.assertEqual(BillingWebhookEvent.objects.get(stripe_event_id="evt_next").status, WebhookEventStatus.PENDING)
+
+            self.assertEqual(drain_company_events(self.company.pk), {"processed": 1, "dead": 1})
+
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts, bad.ok), (WebhookEventStatus.DEAD, 2, False))
+        self.assertIn("boom", bad.error)
+        nxt = BillingWebhookEvent.objects.get(stripe_event_id="evt_next")
+        self.assertEqual(nxt.status, WebhookEventStatus.PROCESSED)
+        self.assertTrue(nxt.ok)
+
+        # A processed event is never applied twice.
+        with mock.patch("billing.services_webhooks.process_event") as process:
+            drain_company_events(self.company.pk)
+        process.assert_not_called()
+
+    def test_running_drain_gets_one_follow_up(self):
+        self._post(_event("evt_1", "invoice.payment_failed", created=100))
+        BackgroundJob.objects.update(status=JobStatus.RUNNING)
+        self._post(_event("evt_2", "invoice.payment_failed", created=101))
+        self._post(_event("evt_3", "invoice.payment_failed", created=102))
+        keys = sorted(BackgroundJob.objects.values_list("dedupe_key", flat=True))
+        self.assertEqual(keys, [f"stripe_webhooks:{self.company.pk}", f"stripe_webhooks:{self.company.pk}:next"])
+
+    def test_checkout_queues_stripe_refresh_instead_of_calling_stripe_in_the_drain(self):
+        self._post(
+            _event("evt_co", "checkout.session.completed", created=100, subscription="sub_1", metadata={"company_id": str(self.company.pk)})
+        )
+        with mock.patch("billing.jobs.fetch_and_sync_subscription_from_stripe") as fetch:
+            self.assertEqual(drain_company_events(self.company.pk), {"processed": 1, "dead": 0})
+            fetch.assert_not_called()
+
+        refresh = BackgroundJob.objects.get(name="billing.stripe_subscription_refresh")
+        self.assertEqual(refresh.payload, {"company_id": str(self.company.pk)})
+        self.assertEqual(CompanySubscription.objects.get(company=self.company).stripe_subscription_id, "sub_1")
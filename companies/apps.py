@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CompaniesConfig(AppConfig):
     name = "companies"
+
+    def ready(self) -> None:  # pragma: no cover
+        from . import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_company_suspension_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='onboarding_flags',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -60,6 +60,10 @@ class Company(SyncModel):
     require_2fa_for_admins_managers = models.BooleanField(default=False)
     require_2fa_for_all = models.BooleanField(default=False)
 
+    # Onboarding steps already completed (bitmask, see core.onboarding.STEP_BITS).
+    # Bits only ever get set: a step stays done once its first object exists.
+    onboarding_flags = models.PositiveIntegerField(default=0)
+
     class Meta:
         indexes = [
             models.Index(fields=["name"]),
@@ -70,6 +74,16 @@ class Company(SyncModel):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        # onboarding_flags is only ever written by core.onboarding.latch_onboarding_steps
+        # (an atomic bit-or); a save from a stale instance must not clear latched bits.
+        if not self._state.adding and not kwargs.get("force_insert"):
+            update_fields = kwargs.get("update_fields")
+            if update_fields is None:
+                update_fields = [f.name for f in self._meta.concrete_fields if not f.primary_key]
+            kwargs["update_fields"] = [f for f in update_fields if f != "onboarding_flags"]
+        super().save(*args, **kwargs)
+
 
 class EmployeeRole(models.TextChoices):
     STAFF = "staff", "Staff"
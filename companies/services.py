@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Callable
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.http import HttpRequest
 
+from core.cache_utils import build_tenant_cache_key, tenant_cache_version
 from core.support_mode import get_support_mode
 
 from .models import Company, EmployeeProfile
@@ -47,6 +51,10 @@ def ensure_active_company_for_user(request: HttpRequest) -> bool:
         # In support mode, we don't require company membership.
         return True
 
+    # Valid session company: reuse the request's tenant context (no extra queries).
+    if get_active_company_id(request) and get_active_company(request) is not None:
+        return True
+
     companies = list(user_companies_qs(user)[:2])
     if not companies:
         return False
@@ -63,31 +71,119 @@ def ensure_active_company_for_user(request: HttpRequest) -> bool:
     return True
 
 
-def get_active_company(request: HttpRequest) -> Company | None:
-    user = getattr(request, "user", None)
-    if not user or not user.is_authenticated:
-        return None
-
-    support = get_support_mode(request)
-    cid = get_active_company_id(request)
-    if support.is_active and getattr(user, "is_staff", False):
-        # In support mode, the chosen company is forced to the support target.
-        target_id = support.company_id or cid
-        if not target_id:
-            return None
+def _resolve_active_company(request: HttpRequest, *, support_target: str | None) -> Company | None:
+    if support_target:
         try:
-            return Company.objects.filter(deleted_at__isnull=True).get(id=target_id)
+            return Company.objects.filter(deleted_at__isnull=True).get(id=support_target)
         except Exception:
             return None
 
+    cid = get_active_company_id(request)
     if not cid:
         return None
     try:
-        return user_companies_qs(user).get(id=cid)
+        return user_companies_qs(request.user).get(id=cid)
     except Exception:
         return None
 
 
+# -------------------------
+# Request-scoped tenant context
+# -------------------------
+
+TENANT_CONTEXT_ATTR = "_ez360_tenant_context"
+
+# Values worth sharing across requests of the same session (see EZ360_TENANT_CACHE_SECONDS).
+_CROSS_REQUEST_VALUES = {"company", "employee", "user_companies", "subscription", "subscription_summary"}
+
+
+@dataclass
+class TenantContext:
+    """Tenant lookups (company, employee, subscription, ...) memoized for one request.
+
+    Middleware, decorators and context processors all resolve the same objects;
+    this keeps it to one query each per request instead of one per caller.
+    The context is rebuilt whenever the user, active company or support target changes.
+    """
+
+    key: tuple
+    cache_key: str | None = None
+    values: dict = field(default_factory=dict)
+
+    @property
+    def company(self) -> Company | None:
+        return self.values.get("company")
+
+    def memo(self, name: str, builder: Callable[[], Any]) -> Any:
+        if name not in self.values:
+            self.values[name] = builder()
+            if self.cache_key and name in _CROSS_REQUEST_VALUES:
+                cache.set(self.cache_key, self.values, _tenant_cache_seconds())
+        return self.values[name]
+
+
+def _tenant_cache_seconds() -> int:
+    return max(0, int(getattr(settings, "EZ360_TENANT_CACHE_SECONDS", 0) or 0))
+
+
+def _tenant_context_key(request: HttpRequest) -> tuple:
+    user = request.user
+    cid = get_active_company_id(request)
+    support = get_support_mode(request)
+    support_target = None
+    if support.is_active and getattr(user, "is_staff", False):
+        # In support mode, the chosen company is forced to the support target.
+        support_target = support.company_id or cid or None
+    return (user.pk, cid, support_target)
+
+
+def get_tenant_context(request: HttpRequest) -> TenantContext | None:
+    """Return the memoized tenant context for an authenticated request (else None)."""
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return None
+
+    key = _tenant_context_key(request)
+    ctx = getattr(request, TENANT_CONTEXT_ATTR, None)
+    if ctx is not None and ctx.key == key:
+        return ctx
+
+    _user_id, cid, support_target = key
+    ctx = TenantContext(key=key)
+
+    # Optional short-TTL cache shared by requests of the same session. Support
+    # mode is never cached; a company's version bumps on Company/EmployeeProfile/
+    # subscription saves so edits show up on the next request.
+    session_key = getattr(getattr(request, "session", None), "session_key", None)
+    if cid and not support_target and session_key and _tenant_cache_seconds():
+        ctx.cache_key = build_tenant_cache_key(
+            company_id=cid,
+            session_key=session_key,
+            user_id=str(user.pk),
+            version=tenant_cache_version(cid),
+        )
+        cached = cache.get(ctx.cache_key)
+        if isinstance(cached, dict):
+            ctx.values = cached
+
+    ctx.memo("company", lambda: _resolve_active_company(request, support_target=support_target))
+    setattr(request, TENANT_CONTEXT_ATTR, ctx)
+    return ctx
+
+
+def get_active_company(request: HttpRequest) -> Company | None:
+    ctx = get_tenant_context(request)
+    return ctx.company if ctx else None
+
+
+def get_user_companies(request: HttpRequest) -> list[Company]:
+    """Companies the current user belongs to, ordered by name (memoized per request)."""
+    ctx = get_tenant_context(request)
+    if not ctx:
+        return []
+    return ctx.memo("user_companies", lambda: list(user_companies_qs(request.user).order_by("name")))
+
+
 class _SupportEmployee:
     """Lightweight EmployeeProfile-like object for staff support mode."""
     def __init__(self, *, company: Company, user):
@@ -102,16 +198,19 @@ class _SupportEmployee:
 
 
 def get_active_employee_profile(request: HttpRequest):
-    company = get_active_company(request)
-    user = getattr(request, "user", None)
-    if not company or not user or not user.is_authenticated:
+    ctx = get_tenant_context(request)
+    company = ctx.company if ctx else None
+    if not company:
         return None
 
-    support = get_support_mode(request)
-    if support.is_active and getattr(user, "is_staff", False):
-        return _SupportEmployee(company=company, user=user)
+    user = request.user
+    if ctx.key[2]:
+        return ctx.memo("employee", lambda: _SupportEmployee(company=company, user=user))
 
-    return EmployeeProfile.objects.filter(company=company, user=user, deleted_at__isnull=True).first()
+    return ctx.memo(
+        "employee",
+        lambda: EmployeeProfile.objects.filter(company=company, user=user, deleted_at__isnull=True).first(),
+    )
 
 
 # Backwards-compatible alias: some modules import `get_active_employee`.
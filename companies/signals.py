@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.cache_utils import bump_tenant_cache_version
+from core.signals import sync_rows_soft_deleted
+
+from .models import Company, EmployeeProfile
+
+
+def tenant_cache_active() -> bool:
+    return int(getattr(settings, "EZ360_TENANT_CACHE_SECONDS", 0) or 0) > 0
+
+
+@receiver(post_save, sender=Company)
+def invalidate_tenant_cache_for_company(sender, instance: Company, **kwargs):
+    if tenant_cache_active():
+        bump_tenant_cache_version(str(instance.pk))
+
+
+@receiver(post_save, sender=EmployeeProfile)
+def invalidate_tenant_cache_for_employee(sender, instance: EmployeeProfile, **kwargs):
+    if tenant_cache_active() and instance.company_id:
+        bump_tenant_cache_version(str(instance.company_id))
+
+
+@receiver(sync_rows_soft_deleted)
+def invalidate_tenant_cache_for_bulk_delete(sender, pks, **kwargs):
+    if not tenant_cache_active():
+        return
+    if sender is Company:
+        company_ids = pks
+    elif sender is EmployeeProfile:
+        company_ids = EmployeeProfile.all_objects.filter(pk__in=pks).values_list("company_id", flat=True).distinct()
+    else:
+        return
+    for company_id in company_ids:
+        bump_tenant_cache_version(str(company_id))
@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 
 from companies.models import Company, EmployeeProfile, EmployeeRole
-from companies.services import ACTIVE_COMPANY_SESSION_KEY
+from companies.services import (
+    ACTIVE_COMPANY_SESSION_KEY,
+    get_active_company,
+    get_active_employee_profile,
+    set_active_company_id,
+)
 
 
 class CompanyContextAutoSelectTests(TestCase):
@@ -50,3 +56,48 @@ class CompanyContextAutoSelectTests(TestCase):
         # After hitting a company-scoped page, session should be set.
         session = self.client.session
         self.assertEqual(str(session.get(ACTIVE_COMPANY_SESSION_KEY)), str(self.company.id))
+
+
+class TenantContextMemoTests(TestCase):
+    """Tenant lookups hit the database once per request, not once per caller."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            email="memo@example.com",
+            username="memouser",
+            password="pass12345",
+        )
+        self.company = Company.objects.create(name="Memo Co")
+        self.other = Company.objects.create(name="Second Co")
+        for company in (self.company, self.other):
+            EmployeeProfile.objects.create(
+                company=company,
+                user=self.user,
+                username_public="memouser",
+                role=EmployeeRole.OWNER,
+            )
+
+    def _request(self):
+        request = RequestFactory().get("/")
+        request.user = self.user
+        request.session = SessionStore()
+        set_active_company_id(request, str(self.company.id))
+        return request
+
+    def test_company_and_employee_resolve_once_per_request(self):
+        request = self._request()
+        self.assertEqual(get_active_company(request), self.company)
+        self.assertEqual(get_active_employee_profile(request).company_id, self.company.id)
+
+        with self.assertNumQueries(0):
+            get_active_company(request)
+            get_active_employee_profile(request)
+
+    def test_switching_company_rebuilds_context(self):
+        request = self._request()
+        self.assertEqual(get_active_company(request), self.company)
+
+        set_active_company_id(request, str(self.other.id))
+        self.assertEqual(get_active_company(request), self.other)
+        self.assertEqual(get_active_employee_profile(request).company_id, self.other.id)
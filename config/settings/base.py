@@ -275,6 +275,12 @@ else:
 # --------------------------------------------------------------------------------------
 
 EZ360_CACHE_ENABLED = _getenv_bool("EZ360_CACHE_ENABLED", False)
+
+# Share the resolved tenant context (active company, employee, subscription) across
+# requests of the same session for this many seconds. 0 = per-request memo only.
+EZ360_TENANT_CACHE_SECONDS = _getenv_int("EZ360_TENANT_CACHE_SECONDS", 0)
+# Dashboard KPI/trend/aging results (core.kpis); invalidated on writes, TTL is a backstop.
+EZ360_KPI_CACHE_SECONDS = _getenv_int("EZ360_KPI_CACHE_SECONDS", 300)
 REDIS_URL = _getenv("REDIS_URL", "").strip()
 
 if REDIS_URL:
@@ -495,6 +501,8 @@ RECAPTCHA_MIN_SCORE = float(os.getenv("RECAPTCHA_MIN_SCORE", "0.5"))
 DROPBOX_APP_KEY = _getenv("DROPBOX_APP_KEY", "").strip()
 DROPBOX_APP_SECRET = _getenv("DROPBOX_APP_SECRET", "").strip()
 DROPBOX_REDIRECT_URI = _getenv("DROPBOX_REDIRECT_URI", "").strip()
+# Concurrent uploads per project-file sync job (integrations.dropbox_transfer).
+DROPBOX_UPLOAD_WORKERS = _getenv_int("DROPBOX_UPLOAD_WORKERS", 4)
 
 # Bank feeds (Plaid) - scaffold
 PLAID_ENABLED = _getenv_bool("PLAID_ENABLED", False)
@@ -524,6 +532,22 @@ BACKUP_RESTORE_TEST_REQUIRED_DAYS = _getenv_int("BACKUP_RESTORE_TEST_REQUIRED_DA
 
 EZ360_AUDIT_RETENTION_DAYS = _getenv_int("EZ360_AUDIT_RETENTION_DAYS", 365)
 EZ360_STRIPE_WEBHOOK_RETENTION_DAYS = _getenv_int("EZ360_STRIPE_WEBHOOK_RETENTION_DAYS", 90)
+EZ360_JOB_RETENTION_DAYS = _getenv_int("EZ360_JOB_RETENTION_DAYS", 14)
+
+# Rendered invoice/statement PDFs are cached in private media (documents.services_pdf).
+EZ360_PDF_CACHE_ENABLED = _getenv_bool("EZ360_PDF_CACHE_ENABLED", True)
+
+# Background jobs (core.jobs; run `python manage.py ez360_worker`).
+# RUN_INLINE executes jobs in-process after commit (dev/tests without a worker).
+EZ360_JOBS_RUN_INLINE = _getenv_bool("EZ360_JOBS_RUN_INLINE", False)
+EZ360_JOBS_LEASE_SECONDS = _getenv_int("EZ360_JOBS_LEASE_SECONDS", 300)
+EZ360_JOBS_PER_COMPANY_CONCURRENCY = _getenv_int("EZ360_JOBS_PER_COMPANY_CONCURRENCY", 2)
+EZ360_JOBS_RETRY_BASE_SECONDS = _getenv_int("EZ360_JOBS_RETRY_BASE_SECONDS", 30)
+EZ360_JOBS_RETRY_MAX_SECONDS = _getenv_int("EZ360_JOBS_RETRY_MAX_SECONDS", 3600)
+
+# Stripe webhooks are stored by the view and processed by the `billing.stripe_webhooks` job.
+# An event that fails this many times is dead-lettered (retry: `ez360_stripe_webhooks --retry-dead`).
+EZ360_STRIPE_WEBHOOK_MAX_ATTEMPTS = _getenv_int("EZ360_STRIPE_WEBHOOK_MAX_ATTEMPTS", 5)
 
 OPS_ALERT_WEBHOOK_URL = _getenv("OPS_ALERT_WEBHOOK_URL", "").strip()
 OPS_ALERT_WEBHOOK_TIMEOUT_SECONDS = float(_getenv("OPS_ALERT_WEBHOOK_TIMEOUT_SECONDS", "2.5") or 2.5)
@@ -34,6 +34,9 @@ EMAIL_BACKEND = _getenv(
     "django.core.mail.backends.console.EmailBackend",
 )
 
+# No worker process locally by default: run background jobs in-process.
+EZ360_JOBS_RUN_INLINE = _getenv_bool("EZ360_JOBS_RUN_INLINE", True)
+
 # Relax cookies locally
 SESSION_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = False
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import DashboardLayout
+from .models import BackgroundJob, DashboardLayout
 
 
 @admin.register(DashboardLayout)
@@ -8,3 +8,11 @@ class DashboardLayoutAdmin(admin.ModelAdmin):
     list_display = ("company", "role", "updated_at", "updated_by_user")
     list_filter = ("role",)
     search_fields = ("company__name",)
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "company", "status", "priority", "attempts", "run_at", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "dedupe_key", "company__name")
+    readonly_fields = ("created_at", "started_at", "finished_at", "locked_by", "lease_expires_at", "last_error", "result")
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = "core"
+
+    def ready(self) -> None:  # pragma: no cover
+        from . import kpis, onboarding, search  # noqa: F401
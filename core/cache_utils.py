@@ -38,3 +38,34 @@ def get_or_set(key: str, ttl_seconds: int, builder: Callable[[], Any]) -> CacheR
     val = builder()
     cache.set(key, val, ttl_seconds)
     return CacheResult(hit=False, value=val)
+
+
+def _company_version_key(namespace: str, company_id: str) -> str:
+    return f"ez360:{namespace}v:c{company_id}"
+
+
+def company_cache_version(namespace: str, company_id: str) -> int:
+    return int(cache.get(_company_version_key(namespace, str(company_id))) or 0)
+
+
+def bump_company_cache_version(namespace: str, company_id: str) -> None:
+    """Invalidate every key built with the current version of (namespace, company)."""
+    key = _company_version_key(namespace, str(company_id))
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def tenant_cache_version(company_id: str) -> int:
+    return company_cache_version("tenant", company_id)
+
+
+def bump_tenant_cache_version(company_id: str) -> None:
+    """Invalidate every cached tenant context for a company (all sessions)."""
+    bump_company_cache_version("tenant", company_id)
+
+
+def build_tenant_cache_key(*, company_id: str, session_key: str, user_id: str, version: int) -> str:
+    """Cache key for a session's tenant context (company/employee/subscription)."""
+    return f"ez360:tenant:c{company_id}:v{version}:{_hash(f'{session_key}:{user_id}')}"
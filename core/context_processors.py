@@ -5,9 +5,9 @@ from urllib.parse import urlencode
 from django.conf import settings
 
 from companies.permissions import is_admin, is_manager, is_owner
-from companies.services import get_active_company, get_active_employee_profile, user_companies_qs
+from companies.services import get_active_company, get_active_employee_profile, get_user_companies
 
-from billing.services import build_subscription_summary
+from billing.services import get_request_subscription_summary
 from core.support_mode import get_support_mode
 from core.onboarding import build_onboarding_checklist_fast, onboarding_progress
 
@@ -15,6 +15,10 @@ from core.onboarding import build_onboarding_checklist_fast, onboarding_progress
 def _timer_context(request, active_company, active_employee):
     """Small, safe timer context used by the navbar dropdown.
 
+    Renders from the cached `timer_snapshot` (one query on a miss, none on a
+    hit). The project/service pickers are typeahead inputs that load options on
+    demand, so no project or catalog lists are queried here.
+
     This must never hard-fail template rendering. If we can't load timer state
     (migrations drifting, missing tables, etc.), we still render the form shell
     so the UI doesn't look "broken" – and we surface a short reason.
@@ -25,7 +29,7 @@ def _timer_context(request, active_company, active_employee):
             "timer_running": False,
             "timer_elapsed": "",
             "timer_total_seconds": 0,
-            "timer_form": None,
+            "timer_form_enabled": False,
             "can_manage_catalog": False,
             "timer_unavailable_reason": "Timer unavailable (missing company/employee context).",
         }
@@ -34,23 +38,21 @@ def _timer_context(request, active_company, active_employee):
     # companies.permissions helpers operate on EmployeeProfile (role hierarchy)
     can_manage_catalog = bool(is_owner(active_employee) or is_admin(active_employee) or is_manager(active_employee))
 
-    # Always try to render a valid form – even if state fetch fails.
     try:
         from django.utils import timezone
-        from timetracking.models import TimerState
-        from timetracking.forms import TimerStartForm
+        from timetracking.services_timer import timer_snapshot
 
-        timer_state, _ = TimerState.objects.get_or_create(company=active_company, employee=active_employee)
-        timer_running = bool(timer_state.is_running and (timer_state.started_at or timer_state.elapsed_seconds))
+        timer_state = timer_snapshot(active_company, active_employee)
+        timer_running = bool(timer_state["is_running"] and (timer_state["started_at"] or timer_state["elapsed_seconds"]))
 
         now = timezone.now()
         total_seconds = 0
         elapsed = ""
 
         if timer_running:
-            total_seconds = int(timer_state.elapsed_seconds or 0)
-            if timer_state.started_at and not getattr(timer_state, "is_paused", False):
-                delta = now - timer_state.started_at
+            total_seconds = int(timer_state["elapsed_seconds"] or 0)
+            if timer_state["started_at"] and not timer_state["is_paused"]:
+                delta = now - timer_state["started_at"]
                 total_seconds += max(0, int(delta.total_seconds()))
 
             mins = total_seconds // 60
@@ -58,41 +60,23 @@ def _timer_context(request, active_company, active_employee):
             rem = mins % 60
             elapsed = f"{hrs}h {rem:02d}m" if hrs else f"{rem}m"
 
-        timer_form = TimerStartForm(
-            company=active_company,
-            can_manage_catalog=can_manage_catalog,
-            initial={
-                "project": timer_state.project_id,
-                "service_catalog_item": timer_state.service_catalog_item_id,
-                "service_name": timer_state.service_name,
-                "note": timer_state.note,
-            },
-        )
-
         return {
             "timer_state": timer_state,
             "timer_running": timer_running,
             "timer_elapsed": elapsed,
             "timer_total_seconds": total_seconds,
-            "timer_form": timer_form,
+            "timer_form_enabled": True,
             "can_manage_catalog": can_manage_catalog,
             "timer_unavailable_reason": "",
         }
     except Exception:
         # Fall back to a blank form shell so navbar still shows Project/Service/Notes.
-        try:
-            from timetracking.forms import TimerStartForm
-
-            timer_form = TimerStartForm(company=active_company, can_manage_catalog=can_manage_catalog)
-        except Exception:
-            timer_form = None
-
         return {
             "timer_state": None,
             "timer_running": False,
             "timer_elapsed": "",
             "timer_total_seconds": 0,
-            "timer_form": timer_form,
+            "timer_form_enabled": True,
             "can_manage_catalog": can_manage_catalog,
             "timer_unavailable_reason": "Timer unavailable (timer state not ready).",
         }
@@ -122,7 +106,7 @@ def app_context(request):
     active_company = get_active_company(request)
     active_employee = get_active_employee_profile(request)
 
-    sub_summary = build_subscription_summary(active_company) if active_company else None
+    sub_summary = get_request_subscription_summary(request)
 
     onboarding = None
     if active_company:
@@ -136,7 +120,7 @@ def app_context(request):
         **public,
         "active_company": active_company,
         "active_employee": active_employee,
-        "user_companies": list(user_companies_qs(request.user).order_by("name")),
+        "user_companies": get_user_companies(request),
         "is_manager": is_manager(active_employee),
         "is_admin": is_admin(active_employee),
         "is_owner": is_owner(active_employee),
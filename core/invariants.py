@@ -0,0 +1,366 @@
+"""Set-based financial invariants engine (`python manage.py ez360_invariants_check`).
+
+Each check is one grouped SQL query over a whole table: the parent is LEFT
+JOINed to its child rows (payments, refunds, credit applications, ledger
+entries, journal lines, invoices), `GROUP BY` parent sums them, and the
+mismatch condition is the HAVING clause, so only violating rows ever reach
+Python. Posted credit notes, the one second child of an invoice, are a
+correlated subquery so two joins never multiply each other's rows:
+
+- companies are split into shards of `shard_size`; each shard runs every check
+  with `company_id IN (...)` on its own worker thread (own DB connection), and
+  rows are streamed with `.iterator()`;
+- `run_invariants()` yields `Violation`s shard by shard as they complete;
+- `classify` turns a mismatching row into (severity, message) pairs. "fail"
+  means the numbers cannot be right; "warn" means a stored rollup drifted from
+  its source rows (repairable by recalculation).
+
+The checks mirror the money rules in payments.services.recalc_invoice_financials.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from django.db import connection
+from django.db.models import BigIntegerField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+FAIL = "fail"
+WARN = "warn"
+
+
+@dataclass(frozen=True)
+class Violation:
+    check: str
+    severity: str
+    company_id: str
+    object_type: str
+    object_id: str
+    message: str
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    def __str__(self) -> str:
+        return f"[{self.object_type} {self.object_id}] {self.message}"
+
+
+@dataclass(frozen=True)
+class InvariantCheck:
+    name: str
+    object_type: str
+    rows: Callable[[Sequence], Any]  # shard company ids -> queryset of mismatching rows (dicts)
+    classify: Callable[[dict], Iterable[tuple[str, str]]]
+
+
+def _child_sum(rel: str, expr, *filters: Q, **lookups):
+    """`SUM(expr)` over live `rel` child rows of each grouped parent row, 0 when there are none."""
+    cond = Q(**{f"{rel}__deleted_at__isnull": True}, **{f"{rel}__{k}": v for k, v in lookups.items()})
+    for extra in filters:
+        cond &= extra
+    expr = F(f"{rel}__{expr}") if isinstance(expr, str) else expr
+    return Coalesce(Sum(expr, filter=cond), Value(0), output_field=BigIntegerField())
+
+
+def _sum(model, fk: str, expr, *filters: Q, **lookups):
+    """Correlated `SUM(expr)` of `model` rows pointing at the outer row, 0 when there are none."""
+    qs = model.objects.filter(*filters, **{fk: OuterRef("pk")}, **lookups).order_by().values(fk)
+    total = qs.annotate(t=Sum(expr)).values("t")[:1]
+    return Coalesce(Subquery(total, output_field=BigIntegerField()), Value(0), output_field=BigIntegerField())
+
+
+def _floor0(expr):
+    return Greatest(expr, Value(0), output_field=BigIntegerField())
+
+
+# -----------------------------------------------------------------------------
+# Checks
+# -----------------------------------------------------------------------------
+
+
+def _invoices(company_ids):
+    from documents.models import Document, DocumentType
+
+    return Document.objects.filter(company_id__in=company_ids, doc_type=DocumentType.INVOICE)
+
+
+def _invoice_totals_rows(company_ids):
+    return (
+        _invoices(company_ids)
+        .filter(
+            ~Q(total_cents=F("subtotal_cents") + F("tax_cents"))
+            | Q(amount_paid_cents__lt=0)
+            | Q(amount_paid_cents__gt=_floor0(F("total_cents")))
+            | Q(balance_due_cents__lt=0)
+        )
+        .values("id", "company_id", "subtotal_cents", "tax_cents", "total_cents", "amount_paid_cents", "balance_due_cents")
+    )
+
+
+def _invoice_totals_classify(r):
+    subtotal, tax, total = r["subtotal_cents"], r["tax_cents"], r["total_cents"]
+    paid, bal = r["amount_paid_cents"], r["balance_due_cents"]
+    if total != subtotal + tax:
+        yield FAIL, f"total mismatch: total={total} subtotal={subtotal} tax={tax} (expected {subtotal + tax})"
+    if paid < 0 or paid > max(0, total):
+        yield FAIL, f"amount_paid_cents out of range: paid={paid} total={total}"
+    if bal < 0:
+        yield FAIL, f"balance_due_cents negative: {bal}"
+
+
+def _invoice_payments_rows(company_ids):
+    from payments.models import PaymentStatus
+
+    net = _child_sum(
+        "payments",
+        F("payments__amount_cents") - F("payments__refunded_cents"),
+        status__in=[PaymentStatus.SUCCEEDED, PaymentStatus.REFUNDED],
+    )
+    return (
+        _invoices(company_ids)
+        .values("id", "company_id", "amount_paid_cents")
+        .annotate(net_payments=net)
+        .filter(~Q(amount_paid_cents=_floor0(F("net_payments"))) | Q(net_payments__lt=0))
+    )
+
+
+def _invoice_payments_classify(r):
+    net, paid = r["net_payments"], r["amount_paid_cents"]
+    if net < 0:
+        yield FAIL, f"net payments negative: {net}"
+    elif net > paid:
+        yield FAIL, f"net payments exceed invoice.amount_paid_cents: net={net} paid={paid}"
+    else:
+        yield WARN, f"amount_paid_cents differs from net payments: paid={paid} net={net}"
+
+
+def _invoice_balance_rows(company_ids):
+    from documents.models import CreditNote, CreditNoteStatus
+
+    return (
+        _invoices(company_ids)
+        .values("id", "company_id", "total_cents", "amount_paid_cents", "balance_due_cents")
+        .annotate(
+            credit_apps=_child_sum("credit_applications", "cents"),
+            cn_applied=_sum(CreditNote, "invoice", "ar_applied_cents", status=CreditNoteStatus.POSTED),
+        )
+        .annotate(expected_balance=_floor0(F("total_cents") - F("amount_paid_cents") - F("cn_applied") - F("credit_apps")))
+        .filter(
+            ~Q(balance_due_cents=F("expected_balance"))
+            | Q(cn_applied__lt=0)
+            | Q(credit_apps__lt=0)
+            | Q(total_cents__lt=F("cn_applied") + F("credit_apps"))
+        )
+    )
+
+
+def _invoice_balance_classify(r):
+    total, bal, cn, apps, expected = (
+        r["total_cents"],
+        r["balance_due_cents"],
+        r["cn_applied"],
+        r["credit_apps"],
+        r["expected_balance"],
+    )
+    if apps < 0:
+        yield FAIL, f"credit applications negative: {apps}"
+    if cn < 0:
+        yield FAIL, f"posted credit note applied negative: {cn}"
+    if cn + apps > max(0, total):
+        yield WARN, f"credits exceed invoice total: credit_apps={apps} credit_notes_applied={cn} total={total}"
+    if bal != expected:
+        yield WARN, f"balance_due_cents differs from total - paid - credits: bal={bal} expected={expected}"
+
+
+def _payment_refunds_rows(company_ids):
+    from payments.models import Payment, PaymentRefundStatus
+
+    return (
+        Payment.objects.filter(company_id__in=company_ids)
+        .values("id", "company_id", "amount_cents", "refunded_cents")
+        .annotate(refund_total=_child_sum("payment_refunds", "cents", status=PaymentRefundStatus.SUCCEEDED))
+        .filter(
+            ~Q(refunded_cents=F("refund_total"))
+            | Q(amount_cents__lt=0)
+            | Q(refunded_cents__lt=0)
+            | Q(refunded_cents__gt=_floor0(F("amount_cents")))
+            | Q(refund_total__gt=_floor0(F("amount_cents")))
+        )
+    )
+
+
+def _payment_refunds_classify(r):
+    amt, refunded, refunds = r["amount_cents"], r["refunded_cents"], r["refund_total"]
+    if amt < 0:
+        yield FAIL, f"amount_cents negative: {amt}"
+    if refunded < 0 or refunded > max(0, amt):
+        yield FAIL, f"refunded_cents out of range: refunded={refunded} amount={amt}"
+    if refunds < 0 or refunds > max(0, amt):
+        yield FAIL, f"succeeded refunds out of range: refunds={refunds} amount={amt}"
+    if refunds != refunded:
+        yield WARN, f"refunded_cents mismatch: field={refunded} succeeded_refunds={refunds}"
+
+
+def _clients(company_ids):
+    from crm.models import Client
+
+    return Client.objects.filter(company_id__in=company_ids)
+
+
+def _client_credit_rows(company_ids):
+    return (
+        _clients(company_ids)
+        .values("id", "company_id", "credit_cents")
+        .annotate(ledger=_child_sum("credit_entries", "cents_delta"))
+        .filter(~Q(credit_cents=F("ledger")) | Q(credit_cents__lt=0))
+    )
+
+
+def _client_credit_classify(r):
+    if r["credit_cents"] != r["ledger"]:
+        yield WARN, f"credit_cents mismatch: client.credit_cents={r['credit_cents']} ledger_sum={r['ledger']}"
+    if r["credit_cents"] < 0:
+        yield WARN, f"credit_cents is negative: {r['credit_cents']}"
+
+
+def _client_outstanding_rows(company_ids):
+    from documents.models import DocumentStatus, DocumentType
+
+    open_invoices = _child_sum(
+        "documents", "balance_due_cents", ~Q(documents__status=DocumentStatus.VOID), doc_type=DocumentType.INVOICE
+    )
+    return (
+        _clients(company_ids)
+        .values("id", "company_id", "outstanding_cents")
+        .annotate(open_balance=open_invoices)
+        .filter(~Q(outstanding_cents=F("open_balance")))
+    )
+
+
+def _client_outstanding_classify(r):
+    yield WARN, f"outstanding_cents mismatch: client.outstanding_cents={r['outstanding_cents']} open_invoices={r['open_balance']}"
+
+
+def _credit_applications_rows(company_ids):
+    from payments.models import ClientCreditApplication
+
+    return (
+        ClientCreditApplication.objects.filter(company_id__in=company_ids)
+        .filter(
+            Q(cents__lte=0)
+            | ~Q(invoice__company_id=F("client__company_id"))
+            | Q(invoice__client_id__isnull=True)
+            | ~Q(invoice__client_id=F("client_id"))
+        )
+        .values("id", "company_id", "cents", "client_id", "client__company_id", "invoice__company_id", "invoice__client_id")
+    )
+
+
+def _credit_applications_classify(r):
+    if r["cents"] <= 0:
+        yield FAIL, f"cents must be positive: {r['cents']}"
+    if r["invoice__company_id"] != r["client__company_id"]:
+        yield FAIL, "invoice company mismatch"
+    if r["invoice__client_id"] != r["client_id"]:
+        yield FAIL, f"invoice client mismatch (invoice.client_id={r['invoice__client_id']})"
+
+
+def _journal_rows(company_ids):
+    from accounting.models import JournalEntry
+
+    return (
+        JournalEntry.objects.filter(company_id__in=company_ids)
+        .values("id", "company_id", "source_type", "source_id", "memo")
+        .annotate(debits=_child_sum("lines", "debit_cents"), credits=_child_sum("lines", "credit_cents"))
+        .filter(~Q(debits=F("credits")) | (~Q(source_type="") & Q(source_id__isnull=True)))
+    )
+
+
+def _journal_classify(r):
+    if r["source_type"] and not r["source_id"]:
+        yield FAIL, f"source_type set but source_id missing: source_type={r['source_type']}"
+    if r["debits"] != r["credits"]:
+        yield FAIL, f"not balanced: debits={r['debits']} credits={r['credits']} memo='{r['memo']}'"
+
+
+CHECKS: tuple[InvariantCheck, ...] = (
+    InvariantCheck("invoice_totals", "INV", _invoice_totals_rows, _invoice_totals_classify),
+    InvariantCheck("invoice_payments", "INV", _invoice_payments_rows, _invoice_payments_classify),
+    InvariantCheck("invoice_balance", "INV", _invoice_balance_rows, _invoice_balance_classify),
+    InvariantCheck("payment_refunds", "PAY", _payment_refunds_rows, _payment_refunds_classify),
+    InvariantCheck("client_credit", "CLIENT", _client_credit_rows, _client_credit_classify),
+    InvariantCheck("client_outstanding", "CLIENT", _client_outstanding_rows, _client_outstanding_classify),
+    InvariantCheck("credit_applications", "CREDIT_APP", _credit_applications_rows, _credit_applications_classify),
+    InvariantCheck("journal_balance", "JE", _journal_rows, _journal_classify),
+)
+
+CHECK_NAMES = tuple(c.name for c in CHECKS)
+
+
+# -----------------------------------------------------------------------------
+# Engine
+# -----------------------------------------------------------------------------
+
+
+def company_shards(company_ids: Iterable | None = None, *, shard_size: int = 250) -> list[list]:
+    """All (or the given) company ids, in id order, split into shards."""
+    from companies.models import Company
+
+    if company_ids is None:
+        company_ids = Company.all_objects.order_by("id").values_list("id", flat=True)
+    ids = list(company_ids)
+    size = max(1, int(shard_size))
+    return [ids[i : i + size] for i in range(0, len(ids), size)]
+
+
+def check_shard(company_ids: Sequence, checks: Sequence[InvariantCheck] = CHECKS, *, chunk_size: int = 2000) -> list[Violation]:
+    """Run every check over one shard of companies."""
+    found: list[Violation] = []
+    for check in checks:
+        for row in check.rows(company_ids).order_by().iterator(chunk_size=chunk_size):
+            for severity, message in check.classify(row):
+                found.append(
+                    Violation(
+                        check=check.name,
+                        severity=severity,
+                        company_id=str(row["company_id"]),
+                        object_type=check.object_type,
+                        object_id=str(row["id"]),
+                        message=message,
+                    )
+                )
+    return found
+
+
+def _check_shard_in_thread(company_ids, checks) -> list[Violation]:
+    try:
+        return check_shard(company_ids, checks)
+    finally:
+        connection.close()  # per-thread connection
+
+
+def run_invariants(
+    *,
+    company_ids: Iterable | None = None,
+    checks: Sequence[InvariantCheck] = CHECKS,
+    shard_size: int = 250,
+    workers: int = 4,
+) -> Iterator[Violation]:
+    """Yield violations across all (or the given) companies, shard by shard as shards finish."""
+    shards = company_shards(company_ids, shard_size=shard_size)
+    if workers <= 1 or len(shards) <= 1 or connection.vendor == "sqlite":
+        for shard in shards:
+            yield from check_shard(shard, checks)
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(shards)), thread_name_prefix="invariants") as pool:
+        futures = [pool.submit(_check_shard_in_thread, shard, checks) for shard in shards]
+        try:
+            for fut in as_completed(futures):
+                yield from fut.result()
+        finally:
+            # The caller stopped early (--fail-fast closes the generator) or a shard
+            # raised: drop shards that have not started instead of running them all.
+            pool.shutdown(cancel_futures=True)
@@ -0,0 +1,305 @@
+"""DB-backed background job queue (no external broker).
+
+Usage:
+
+    # <app>/jobs.py  (autodiscovered by the worker)
+    from core.jobs import job_handler
+
+    @job_handler("integrations.bank_sync")
+    def bank_sync(*, company_id: str) -> dict | None:
+        ...
+
+    # in a view
+    from core.jobs import enqueue
+    enqueue("integrations.bank_sync", company=company, payload={"company_id": str(company.id)})
+
+Workers run `python manage.py ez360_worker`. Leasing uses
+`SELECT ... FOR UPDATE SKIP LOCKED`, so any number of workers can share the table.
+
+Leases last EZ360_JOBS_LEASE_SECONDS. Handlers that can run longer call
+`extend_lease()` once per chunk/page so the job is not handed to another worker
+while it is still running.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import traceback
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import BackgroundJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+_HANDLERS: dict[str, Callable[..., Any]] = {}
+
+# The job run_job() is executing in this thread/context (for extend_lease()).
+_CURRENT_JOB: ContextVar[BackgroundJob | None] = ContextVar("ez360_current_job", default=None)
+
+
+def job_handler(name: str):
+    """Register a function as the handler for jobs named `name` (called with **payload)."""
+
+    def _decorator(fn):
+        _HANDLERS[name] = fn
+        return fn
+
+    return _decorator
+
+
+def autodiscover_jobs() -> None:
+    autodiscover_modules("jobs")
+
+
+def get_handler(name: str) -> Callable[..., Any] | None:
+    if name not in _HANDLERS:
+        autodiscover_jobs()
+    return _HANDLERS.get(name)
+
+
+def _setting_int(name: str, default: int) -> int:
+    try:
+        return int(getattr(settings, name, default))
+    except Exception:
+        return default
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"[:120]
+
+
+def enqueue(
+    name: str,
+    *,
+    payload: dict | None = None,
+    company=None,
+    priority: int = 100,
+    run_at=None,
+    delay_seconds: int = 0,
+    max_attempts: int = 5,
+    dedupe_key: str = "",
+) -> BackgroundJob:
+    """Queue a job. The row commits with the caller's transaction.
+
+    With `dedupe_key`, an already queued/running job with the same key is
+    returned instead of creating a duplicate.
+    """
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=max(0, int(delay_seconds or 0)))
+
+    job = BackgroundJob(
+        name=name,
+        payload=payload or {},
+        company=company,
+        priority=int(priority),
+        run_at=run_at,
+        max_attempts=max(1, int(max_attempts)),
+        dedupe_key=(dedupe_key or "")[:160],
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        existing = BackgroundJob.objects.filter(
+            dedupe_key=job.dedupe_key, status__in=[JobStatus.QUEUED, JobStatus.RUNNING]
+        ).first()
+        if existing is None:
+            raise
+        return existing
+
+    if getattr(settings, "EZ360_JOBS_RUN_INLINE", False):
+        # Dev/tests without a worker: run right after the enqueueing transaction commits.
+        transaction.on_commit(lambda: run_inline(job.pk))
+    return job
+
+
+def requeue_expired_leases() -> int:
+    """Return RUNNING jobs whose worker died (lease expired) to the queue."""
+    now = timezone.now()
+    expired = BackgroundJob.objects.filter(status=JobStatus.RUNNING, lease_expires_at__lt=now)
+    requeued = expired.filter(attempts__lt=F("max_attempts")).update(
+        status=JobStatus.QUEUED, locked_by="", lease_expires_at=None, run_at=now, last_error="Lease expired"
+    )
+    expired.update(status=JobStatus.FAILED, finished_at=now, last_error="Lease expired (max attempts reached)")
+    return requeued
+
+
+def lease_jobs(*, worker_id: str, limit: int = 1) -> list[BackgroundJob]:
+    """Claim up to `limit` ready jobs for this worker.
+
+    Ready = QUEUED and run_at <= now, ordered by (priority, run_at). Jobs whose
+    company already has EZ360_JOBS_PER_COMPANY_CONCURRENCY jobs running are left
+    for later. Company rows are locked with SKIP LOCKED while leasing so two
+    workers never both take a company's last free slot.
+    """
+    now = timezone.now()
+    lease_seconds = _setting_int("EZ360_JOBS_LEASE_SECONDS", 300)
+    per_company = _setting_int("EZ360_JOBS_PER_COMPANY_CONCURRENCY", 2)
+
+    with transaction.atomic():
+        candidates = list(
+            BackgroundJob.objects.select_for_update(skip_locked=True)
+            .filter(status=JobStatus.QUEUED, run_at__lte=now)
+            .order_by("priority", "run_at", "id")[: max(limit * 5, 10)]
+        )
+        if not candidates:
+            return []
+
+        company_ids = {j.company_id for j in candidates if j.company_id}
+        lockable: set = set()
+        running: dict = {}
+        if company_ids:
+            from companies.models import Company
+
+            lockable = set(
+                Company.all_objects.select_for_update(skip_locked=True, no_key=True)
+                .filter(id__in=company_ids)
+                .values_list("id", flat=True)
+            )
+            running = dict(
+                BackgroundJob.objects.filter(status=JobStatus.RUNNING, company_id__in=lockable)
+                .values("company_id")
+                .annotate(n=Count("id"))
+                .values_list("company_id", "n")
+            )
+
+        picked: list[BackgroundJob] = []
+        for job in candidates:
+            if job.company_id:
+                if job.company_id not in lockable or running.get(job.company_id, 0) >= per_company:
+                    continue
+                running[job.company_id] = running.get(job.company_id, 0) + 1
+            picked.append(job)
+            if len(picked) >= limit:
+                break
+
+        if picked:
+            BackgroundJob.objects.filter(id__in=[j.id for j in picked]).update(
+                status=JobStatus.RUNNING,
+                locked_by=worker_id[:120],
+                lease_expires_at=now + timedelta(seconds=lease_seconds),
+                attempts=F("attempts") + 1,
+                started_at=now,
+            )
+            for job in picked:
+                job.status = JobStatus.RUNNING
+                job.locked_by = worker_id[:120]
+                job.attempts += 1
+                job.started_at = now
+    return picked
+
+
+def extend_lease(job: BackgroundJob | None = None, *, seconds: int | None = None) -> bool:
+    """Heartbeat: push the running job's lease out by another lease period.
+
+    Defaults to the job currently executing in run_job(); a no-op (True) outside
+    a job, so services can call it unconditionally. Returns False when this
+    worker no longer owns the lease (it expired and the job was requeued).
+    """
+    job = job or _CURRENT_JOB.get()
+    if job is None or not job.pk:
+        return True
+    lease_seconds = int(seconds or _setting_int("EZ360_JOBS_LEASE_SECONDS", 300))
+    expires = timezone.now() + timedelta(seconds=lease_seconds)
+    owned = BackgroundJob.objects.filter(id=job.pk, status=JobStatus.RUNNING, locked_by=job.locked_by).update(
+        lease_expires_at=expires
+    )
+    if not owned:
+        logger.warning("job_lease_lost id=%s name=%s worker=%s", job.id, job.name, job.locked_by)
+        return False
+    job.lease_expires_at = expires
+    return True
+
+
+def _finish(job: BackgroundJob, owner: str, fields: list[str]) -> bool:
+    """Write the job's outcome only if `owner` still holds the lease."""
+    updated = BackgroundJob.objects.filter(id=job.pk, status=JobStatus.RUNNING, locked_by=owner).update(
+        **{f: getattr(job, f) for f in fields}
+    )
+    if not updated:
+        logger.warning("job_outcome_dropped id=%s name=%s worker=%s (lease lost)", job.id, job.name, owner)
+    return bool(updated)
+
+
+def retry_delay_seconds(attempts: int) -> int:
+    """Exponential backoff with jitter: ~base * 2^(attempts-1), capped."""
+    base = _setting_int("EZ360_JOBS_RETRY_BASE_SECONDS", 30)
+    cap = _setting_int("EZ360_JOBS_RETRY_MAX_SECONDS", 3600)
+    delay = min(cap, base * (2 ** max(0, attempts - 1)))
+    return int(delay * random.uniform(0.8, 1.2))
+
+
+def run_job(job: BackgroundJob) -> bool:
+    """Execute a leased job and record the outcome. Returns True on success.
+
+    The outcome is written with `UPDATE ... WHERE locked_by=<this worker>`, so a
+    worker whose lease expired cannot overwrite the status/result of the run
+    that took the job over.
+    """
+    owner = job.locked_by
+    handler = get_handler(job.name)
+    token = _CURRENT_JOB.set(job)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job.name!r}")
+        result = handler(**(job.payload or {}))
+    except Exception as exc:
+        now = timezone.now()
+        error = f"{exc.__class__.__name__}: {exc}\n{traceback.format_exc(limit=5)}"[:4000]
+        if job.attempts < job.max_attempts and handler is not None:
+            job.status = JobStatus.QUEUED
+            job.run_at = now + timedelta(seconds=retry_delay_seconds(job.attempts))
+        else:
+            job.status = JobStatus.FAILED
+            job.finished_at = now
+        job.last_error = error
+        job.locked_by = ""
+        job.lease_expires_at = None
+        _finish(job, owner, ["status", "run_at", "finished_at", "last_error", "locked_by", "lease_expires_at"])
+        logger.warning("job_failed id=%s name=%s attempts=%s status=%s", job.id, job.name, job.attempts, job.status)
+        return False
+    finally:
+        _CURRENT_JOB.reset(token)
+
+    job.status = JobStatus.SUCCEEDED
+    job.finished_at = timezone.now()
+    job.result = result if isinstance(result, dict) else {}
+    job.last_error = ""
+    job.locked_by = ""
+    job.lease_expires_at = None
+    return _finish(job, owner, ["status", "finished_at", "result", "last_error", "locked_by", "lease_expires_at"])
+
+
+def run_inline(job_id: int) -> bool:
+    """Lease and run one specific job in-process (EZ360_JOBS_RUN_INLINE)."""
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(id=job_id, status=JobStatus.QUEUED).update(
+        status=JobStatus.RUNNING,
+        locked_by="inline",
+        lease_expires_at=now + timedelta(seconds=_setting_int("EZ360_JOBS_LEASE_SECONDS", 300)),
+        attempts=F("attempts") + 1,
+        started_at=now,
+    )
+    if not claimed:
+        return False
+    return run_job(BackgroundJob.objects.get(id=job_id))
+
+
+def run_ready_jobs(*, worker_id: str | None = None, limit: int = 1) -> int:
+    """One worker iteration: recover expired leases, lease up to `limit` jobs, run them."""
+    requeue_expired_leases()
+    jobs = lease_jobs(worker_id=worker_id or default_worker_id(), limit=limit)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
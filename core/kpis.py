@@ -0,0 +1,393 @@
+"""Dashboard KPI snapshot (core.DashboardKpiDaily).
+
+The dashboard KPIs, revenue trend and A/R aging read per-day buckets instead of
+scanning payments, expenses, invoices and time entries on every load:
+
+- a save/delete of a Payment, Expense, Document or TimeEntry recomputes the
+  (company, day) buckets it touches from source rows (signals below);
+- readers aggregate a handful of bucket rows, optionally through the cache
+  (`EZ360_CACHE_ENABLED`), keyed by a per-company version bumped on writes.
+
+QuerySet.update()/bulk_create() bypass signals; run
+`python manage.py ez360_dashboard_kpis --fix` after bulk data repairs.
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache_utils import bump_company_cache_version, cache_enabled, company_cache_version, get_or_set
+from .signals import sync_rows_soft_deleted
+
+logger = logging.getLogger(__name__)
+
+KPI_CACHE_NAMESPACE = "kpi"
+
+# Source status values (kept as literals so the backfill migration can reuse this module).
+PAYMENT_SUCCEEDED = "succeeded"
+INVOICE = "invoice"
+AR_OPEN_STATUSES = ("sent", "partially_paid")
+UNBILLED_TIME_STATUSES = ("approved", "submitted")
+
+
+def _day_bounds(day: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def _local_day(dt) -> datetime.date | None:
+    return timezone.localdate(dt) if dt else None
+
+
+def _sum(qs, field: str) -> int:
+    return int(qs.aggregate(total=Coalesce(Sum(field), 0))["total"] or 0)
+
+
+def _by_day(qs, day_expr, field: str) -> dict[datetime.date, int]:
+    rows = qs.annotate(kpi_day=day_expr).values("kpi_day").annotate(total=Sum(field)).order_by()
+    return {r["kpi_day"]: int(r["total"] or 0) for r in rows if r["kpi_day"]}
+
+
+def _created_day():
+    return TruncDate("created_at", tzinfo=timezone.get_current_timezone())
+
+
+@dataclass(frozen=True)
+class KpiMetric:
+    """One bucket column: which source rows feed it and which day they land on."""
+
+    field: str
+    model_label: str
+    # How a source row maps to a day: "created" (local created_at date), "date"
+    # (the row's `date`), or "due" (`due_date`, falling back to the created date).
+    day_basis: str
+    day_of: Callable[[object], datetime.date | None]
+    source: Callable[..., object]  # (model, company_id) -> live source queryset
+    amount_field: str
+    # Source field whose previous value must be remembered (the row can move to another day).
+    movable_attr: str = ""
+
+    def model(self, apps=None):
+        return (apps or django_apps).get_model(self.model_label)
+
+    def total_for_day(self, company_id, day: datetime.date, *, apps=None) -> int:
+        qs = self.source(self.model(apps), company_id)
+        start, end = _day_bounds(day)
+        if self.day_basis == "date":
+            qs = qs.filter(date=day)
+        elif self.day_basis == "due":
+            qs = qs.filter(Q(due_date=day) | Q(due_date__isnull=True, created_at__gte=start, created_at__lt=end))
+        else:
+            qs = qs.filter(created_at__gte=start, created_at__lt=end)
+        return _sum(qs, self.amount_field)
+
+    def totals_by_day(self, company_id, *, apps=None) -> dict[datetime.date, int]:
+        qs = self.source(self.model(apps), company_id)
+        if self.day_basis == "date":
+            return _by_day(qs.filter(date__isnull=False), F("date"), self.amount_field)
+        if self.day_basis == "due":
+            totals = _by_day(qs.filter(due_date__isnull=False), F("due_date"), self.amount_field)
+            for day, amount in _by_day(qs.filter(due_date__isnull=True), _created_day(), self.amount_field).items():
+                totals[day] = totals.get(day, 0) + amount
+            return totals
+        return _by_day(qs, _created_day(), self.amount_field)
+
+
+def _invoice_day(doc) -> datetime.date | None:
+    if doc.doc_type != INVOICE:
+        return None
+    return doc.due_date or _local_day(doc.created_at)
+
+
+METRICS: tuple[KpiMetric, ...] = (
+    KpiMetric(
+        field="payments_cents",
+        model_label="payments.Payment",
+        day_basis="created",
+        day_of=lambda p: _local_day(p.created_at),
+        source=lambda m, cid: m.objects.filter(company_id=cid, deleted_at__isnull=True, status=PAYMENT_SUCCEEDED),
+        amount_field="amount_cents",
+    ),
+    KpiMetric(
+        field="expenses_cents",
+        model_label="expenses.Expense",
+        day_basis="date",
+        day_of=lambda e: e.date,
+        source=lambda m, cid: m.objects.filter(company_id=cid, deleted_at__isnull=True),
+        amount_field="amount_cents",
+        movable_attr="date",
+    ),
+    KpiMetric(
+        field="ar_open_cents",
+        model_label="documents.Document",
+        day_basis="due",
+        day_of=_invoice_day,
+        source=lambda m, cid: m.objects.filter(
+            company_id=cid, deleted_at__isnull=True, doc_type=INVOICE, status__in=AR_OPEN_STATUSES
+        ),
+        amount_field="balance_due_cents",
+        movable_attr="due_date",
+    ),
+    KpiMetric(
+        field="unbilled_minutes",
+        model_label="timetracking.TimeEntry",
+        day_basis="created",
+        day_of=lambda t: _local_day(t.created_at),
+        source=lambda m, cid: m.objects.filter(
+            company_id=cid,
+            deleted_at__isnull=True,
+            billable=True,
+            billed_document__isnull=True,
+            status__in=UNBILLED_TIME_STATUSES,
+        ),
+        amount_field="duration_minutes",
+    ),
+)
+
+_METRICS_BY_LABEL = {m.model_label.lower(): m for m in METRICS}
+
+
+# -----------------------------------------------------------------------------
+# Writers
+# -----------------------------------------------------------------------------
+
+
+def _set_bucket(Bucket, company_id, day: datetime.date, field: str, value: int) -> None:
+    updated = Bucket.objects.filter(company_id=company_id, day=day).update(**{field: value})
+    if updated or not value:
+        return
+    try:
+        with transaction.atomic():
+            Bucket.objects.create(company_id=company_id, day=day, **{field: value})
+    except IntegrityError:
+        Bucket.objects.filter(company_id=company_id, day=day).update(**{field: value})
+
+
+def refresh_buckets(company_id, metric: KpiMetric, days: Iterable[datetime.date]) -> None:
+    """Recompute one metric's buckets for the given days from source rows."""
+    from .models import DashboardKpiDaily
+
+    days = {d for d in days if d}
+    if not company_id or not days:
+        return
+    for day in days:
+        _set_bucket(DashboardKpiDaily, company_id, day, metric.field, metric.total_for_day(company_id, day))
+    if cache_enabled():
+        bump_company_cache_version(KPI_CACHE_NAMESPACE, str(company_id))
+
+
+def _line_totals(company_id, *, apps=None) -> dict[datetime.date, dict[str, int]]:
+    totals: dict[datetime.date, dict[str, int]] = defaultdict(dict)
+    for metric in METRICS:
+        for day, amount in metric.totals_by_day(company_id, apps=apps).items():
+            if amount:
+                totals[day][metric.field] = amount
+    return totals
+
+
+def rebuild_company_kpis(company_id, *, apps=None) -> int:
+    """Recompute every bucket for a company from source rows. Returns rows written."""
+    Bucket = (apps or django_apps).get_model("core", "DashboardKpiDaily")
+    totals = _line_totals(company_id, apps=apps)
+    with transaction.atomic():
+        Bucket.objects.filter(company_id=company_id).delete()
+        Bucket.objects.bulk_create(
+            [Bucket(company_id=company_id, day=day, **values) for day, values in totals.items()],
+            batch_size=1000,
+        )
+    if apps is None and cache_enabled():
+        bump_company_cache_version(KPI_CACHE_NAMESPACE, str(company_id))
+    return len(totals)
+
+
+def verify_company_kpis(company_id) -> list[tuple[datetime.date, str, int, int]]:
+    """Buckets that disagree with source rows: (day, field, expected, actual)."""
+    from .models import DashboardKpiDaily
+
+    expected = _line_totals(company_id)
+    actual: dict[datetime.date, dict[str, int]] = {}
+    for row in DashboardKpiDaily.objects.filter(company_id=company_id).values("day", *[m.field for m in METRICS]):
+        actual[row.pop("day")] = row
+
+    drift = []
+    for day in sorted(set(expected) | set(actual)):
+        for metric in METRICS:
+            exp = int(expected.get(day, {}).get(metric.field, 0))
+            act = int(actual.get(day, {}).get(metric.field, 0))
+            if exp != act:
+                drift.append((day, metric.field, exp, act))
+    return drift
+
+
+# -----------------------------------------------------------------------------
+# Signals
+# -----------------------------------------------------------------------------
+
+
+def _remember_day(metric: KpiMetric, instance) -> None:
+    # Read from __dict__ so deferred fields (.only()) are not fetched on load.
+    if metric.movable_attr and metric.movable_attr in instance.__dict__:
+        try:
+            instance._kpi_prev_day = metric.day_of(instance)
+        except Exception:
+            instance._kpi_prev_day = None
+
+
+def _refresh_for_instance(metric: KpiMetric, instance) -> None:
+    days = {metric.day_of(instance), getattr(instance, "_kpi_prev_day", None)}
+    try:
+        with transaction.atomic():
+            refresh_buckets(instance.company_id, metric, days)
+    except Exception:
+        # Derived data: never block the write. `ez360_dashboard_kpis --fix` repairs drift.
+        logger.warning("kpi_refresh_failed model=%s pk=%s", metric.model_label, instance.pk, exc_info=True)
+
+
+def _metric_for(sender) -> KpiMetric | None:
+    return _METRICS_BY_LABEL.get(sender._meta.label_lower)
+
+
+def _on_init(sender, instance, **kwargs):
+    metric = _metric_for(sender)
+    if metric is not None:
+        _remember_day(metric, instance)
+
+
+def _on_save(sender, instance, raw: bool = False, **kwargs):
+    metric = _metric_for(sender)
+    if raw or metric is None:
+        return
+    _refresh_for_instance(metric, instance)
+    _remember_day(metric, instance)
+
+
+def _on_delete(sender, instance, **kwargs):
+    metric = _metric_for(sender)
+    if metric is not None:
+        _refresh_for_instance(metric, instance)
+
+
+for _metric in METRICS:
+    post_init.connect(_on_init, sender=_metric.model_label, dispatch_uid=f"kpi_init_{_metric.field}")
+    post_save.connect(_on_save, sender=_metric.model_label, dispatch_uid=f"kpi_save_{_metric.field}")
+    post_delete.connect(_on_delete, sender=_metric.model_label, dispatch_uid=f"kpi_delete_{_metric.field}")
+
+
+def refresh_kpis_for_rows(model, rows: Iterable) -> None:
+    """Refresh buckets for rows written without signals (bulk_create/bulk_update)."""
+    metric = _metric_for(model)
+    if metric is None:
+        return
+    days_by_company: dict[object, set] = defaultdict(set)
+    for obj in rows:
+        days_by_company[obj.company_id].add(metric.day_of(obj))
+    for company_id, days in days_by_company.items():
+        refresh_buckets(company_id, metric, days)
+
+
+@receiver(sync_rows_soft_deleted)
+def _on_bulk_soft_delete(sender, pks, **kwargs):
+    if _metric_for(sender) is not None:
+        refresh_kpis_for_rows(sender, sender.all_objects.filter(pk__in=pks))
+
+
+# -----------------------------------------------------------------------------
+# Readers
+# -----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class DashboardKpis:
+    revenue_cents: int
+    expenses_cents: int
+    ar_cents: int
+    unbilled_minutes: int
+
+    @property
+    def unbilled_hours(self) -> float:
+        return float(self.unbilled_minutes) / 60.0
+
+
+def _cached(company_id, suffix: str, builder):
+    version = company_cache_version(KPI_CACHE_NAMESPACE, str(company_id))
+    key = f"ez360:kpi:c{company_id}:v{version}:{suffix}"
+    ttl = int(getattr(settings, "EZ360_KPI_CACHE_SECONDS", 300) or 300)
+    return get_or_set(key, ttl, builder).value
+
+
+def dashboard_kpis(company, start_date: datetime.date, end_date: datetime.date) -> DashboardKpis:
+    """Revenue/expenses for [start_date, end_date] plus current A/R and unbilled time (one query)."""
+    from .models import DashboardKpiDaily
+
+    def _build() -> DashboardKpis:
+        in_range = Q(day__gte=start_date, day__lte=end_date)
+        agg = DashboardKpiDaily.objects.filter(company=company).aggregate(
+            revenue=Coalesce(Sum("payments_cents", filter=in_range), 0),
+            expenses=Coalesce(Sum("expenses_cents", filter=in_range), 0),
+            ar=Coalesce(Sum("ar_open_cents"), 0),
+            unbilled=Coalesce(Sum("unbilled_minutes"), 0),
+        )
+        return DashboardKpis(
+            revenue_cents=int(agg["revenue"]),
+            expenses_cents=int(agg["expenses"]),
+            ar_cents=int(agg["ar"]),
+            unbilled_minutes=int(agg["unbilled"]),
+        )
+
+    return _cached(company.id, f"kpis:{start_date}:{end_date}", _build)
+
+
+def monthly_payments(company, start_date: datetime.date, end_date: datetime.date) -> dict[tuple[int, int], int]:
+    """Succeeded payments per (year, month) between two dates."""
+    from .models import DashboardKpiDaily
+
+    def _build() -> dict[tuple[int, int], int]:
+        rows = (
+            DashboardKpiDaily.objects.filter(company=company, day__gte=start_date, day__lte=end_date)
+            .annotate(month=TruncMonth("day"))
+            .values("month")
+            .annotate(total=Sum("payments_cents"))
+            .order_by("month")
+        )
+        return {(r["month"].year, r["month"].month): int(r["total"] or 0) for r in rows if r["month"]}
+
+    return _cached(company.id, f"trend:{start_date}:{end_date}", _build)
+
+
+AGING_BUCKETS = ("Current", "1–30", "31–60", "61–90", "90+")
+
+
+def ar_aging(company, today: datetime.date) -> dict[str, int]:
+    """Open invoice balances by days past due (due date, or created date when undated)."""
+    from .models import DashboardKpiDaily
+
+    def _build() -> dict[str, int]:
+        def d(days: int) -> datetime.date:
+            return today - datetime.timedelta(days=days)
+
+        ranges = {
+            "Current": Q(day__gte=today),
+            "1–30": Q(day__lt=today, day__gte=d(30)),
+            "31–60": Q(day__lt=d(30), day__gte=d(60)),
+            "61–90": Q(day__lt=d(60), day__gte=d(90)),
+            "90+": Q(day__lt=d(90)),
+        }
+        agg = DashboardKpiDaily.objects.filter(company=company).aggregate(
+            **{f"b{i}": Coalesce(Sum("ar_open_cents", filter=q), 0) for i, q in enumerate(ranges.values())}
+        )
+        return {label: int(agg[f"b{i}"]) for i, label in enumerate(ranges)}
+
+    return _cached(company.id, f"aging:{today}", _build)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from companies.models import Company
+from core.kpis import rebuild_company_kpis, verify_company_kpis
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the dashboard KPI buckets (core.DashboardKpiDaily) against payments, expenses, invoices and time. "
+        "With --rebuild, recompute them (always, or only where drift is found with --fix)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default=None, help="Optional Company ID (UUID) to scope the run.")
+        parser.add_argument("--rebuild", action="store_true", help="Rebuild every selected company's buckets.")
+        parser.add_argument("--fix", action="store_true", help="Rebuild only companies whose buckets drifted.")
+        parser.add_argument("--fail-on-drift", action="store_true", help="Exit non-zero if drift is found.")
+
+    def handle(self, *args, **opts):
+        company_id = (str(opts.get("company_id") or "").strip() or None)
+        rebuild = bool(opts.get("rebuild"))
+        fix = bool(opts.get("fix"))
+
+        company_ids = list(Company.all_objects.values_list("id", flat=True).order_by("id"))
+        if company_id:
+            company_ids = [cid for cid in company_ids if str(cid) == company_id]
+
+        drifted = 0
+        for cid in company_ids:
+            if rebuild:
+                written = rebuild_company_kpis(cid)
+                self.stdout.write(f"company={cid} rebuilt days={written}")
+                continue
+
+            drift = verify_company_kpis(cid)
+            if not drift:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f"company={cid} drifted buckets={len(drift)}"))
+            for day, field, expected, actual in drift[:10]:
+                self.stdout.write(f"  day={day} {field} expected={expected} actual={actual}")
+            if fix:
+                written = rebuild_company_kpis(cid)
+                self.stdout.write(f"company={cid} rebuilt days={written}")
+
+        if rebuild:
+            self.stdout.write(self.style.SUCCESS(f"[DONE] rebuilt {len(company_ids)} company KPI snapshot(s)"))
+            return
+
+        summary = f"companies checked={len(company_ids)} drifted={drifted}"
+        if drifted and opts.get("fail_on_drift") and not fix:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(f"[OK] {summary}"))
@@ -6,7 +6,7 @@ from core.retention import run_prune_jobs
 
 
 class Command(BaseCommand):
-    help = "Prune old operational data (audit log + Stripe webhook events) per retention policy."
+    help = "Prune old operational data (audit log, Stripe webhook events, finished background jobs) per retention policy."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from companies.models import Company
+from core.models import SearchEntry
+from core.search import rebuild_company_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the global search index (core.SearchEntry) from clients, projects, documents, expenses and payments. "
+        "Run once after deploying the index, and after bulk data repairs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default=None, help="Optional Company ID (UUID) to scope the run.")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows read and written per batch.")
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Only index companies that have no index rows yet (cheap enough to run on every deploy).",
+        )
+
+    def handle(self, *args, **opts):
+        company_id = (str(opts.get("company_id") or "").strip() or None)
+        chunk_size = max(100, int(opts.get("chunk_size") or 1000))
+
+        company_ids = list(Company.all_objects.values_list("id", flat=True).order_by("id"))
+        if company_id:
+            company_ids = [cid for cid in company_ids if str(cid) == company_id]
+        if opts.get("missing_only"):
+            indexed = set(SearchEntry.objects.values_list("company_id", flat=True).distinct())
+            company_ids = [cid for cid in company_ids if cid not in indexed]
+
+        total = 0
+        for cid in company_ids:
+            written = rebuild_company_index(cid, chunk_size=chunk_size)
+            total += written
+            self.stdout.write(f"company={cid} indexed={written}")
+
+        self.stdout.write(self.style.SUCCESS(f"[DONE] indexed {total} record(s) across {len(company_ids)} company(ies)"))
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import autodiscover_jobs, default_worker_id, run_ready_jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue (core.BackgroundJob). Stops cleanly on SIGTERM/SIGINT."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=1, help="Jobs leased per poll (run sequentially).")
+        parser.add_argument("--sleep", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--max-jobs", type=int, default=0, help="Exit after this many jobs (0 = no limit).")
+        parser.add_argument("--once", action="store_true", help="Drain ready jobs, then exit.")
+        parser.add_argument("--worker-id", default="", help="Identifier recorded on leased jobs.")
+
+    def handle(self, *args, **opts):
+        batch = max(1, int(opts.get("batch") or 1))
+        sleep_s = max(0.1, float(opts.get("sleep") or 2.0))
+        max_jobs = max(0, int(opts.get("max_jobs") or 0))
+        once = bool(opts.get("once"))
+        worker_id = (opts.get("worker_id") or "").strip() or default_worker_id()
+
+        self._stop = False
+
+        def _request_stop(signum, frame):
+            self._stop = True
+
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
+
+        autodiscover_jobs()
+        self.stdout.write(f"ez360_worker started id={worker_id} batch={batch}")
+
+        processed = 0
+        while not self._stop:
+            close_old_connections()
+            ran = run_ready_jobs(worker_id=worker_id, limit=batch)
+            processed += ran
+            if max_jobs and processed >= max_jobs:
+                break
+            if not ran:
+                if once:
+                    break
+                time.sleep(sleep_s)
+
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(f"ez360_worker stopped id={worker_id} processed={processed}"))
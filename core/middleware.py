@@ -12,7 +12,7 @@ from django.shortcuts import redirect
 from django.utils.deprecation import MiddlewareMixin
 from django.db import connection
 
-from billing.services import company_is_locked
+from billing.services import request_company_is_locked
 from companies.services import get_active_company
 
 import uuid
@@ -59,11 +59,7 @@ class SubscriptionLockMiddleware(MiddlewareMixin):
             if path.startswith(item.prefix):
                 return None
 
-        company = get_active_company(request)
-        if not company:
-            return None
-
-        if not company_is_locked(company):
+        if not request_company_is_locked(request):
             return None
 
         messages.error(request, "Your trial has ended. Please update billing to continue using EZ360PM.")
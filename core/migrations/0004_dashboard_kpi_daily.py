@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_kpis(apps, schema_editor):
+    from core.kpis import rebuild_company_kpis
+
+    Company = apps.get_model("companies", "Company")
+    for company_id in Company.objects.values_list("id", flat=True).iterator():
+        rebuild_company_kpis(company_id, apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_company_suspension_fields'),
+        ('core', '0003_background_job'),
+        ('documents', '0005_alter_projectdocsequence_company'),
+        ('expenses', '0001_initial'),
+        ('payments', '0003_rename_payments_str_company_status_idx_payments_st_company_3455fd_idx_and_more'),
+        ('timetracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardKpiDaily',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('payments_cents', models.BigIntegerField(default=0)),
+                ('expenses_cents', models.BigIntegerField(default=0)),
+                ('ar_open_cents', models.BigIntegerField(default=0)),
+                ('unbilled_minutes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_daily', to='companies.company')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('company', 'day'), name='core_kpi_company_day_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_kpis, migrations.RunPython.noop),
+    ]
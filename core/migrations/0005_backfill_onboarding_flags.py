@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Mirrors core.onboarding.STEP_BITS at the time of writing.
+CLIENTS, PROJECTS, TIME, INVOICE, GET_PAID, PAYMENT = (1 << i for i in range(6))
+
+
+def backfill_onboarding_flags(apps, schema_editor):
+    Company = apps.get_model("companies", "Company")
+    checks = [
+        (CLIENTS, apps.get_model("crm", "Client"), {}),
+        (PROJECTS, apps.get_model("projects", "Project"), {}),
+        (TIME, apps.get_model("timetracking", "TimeEntry"), {}),
+        (INVOICE, apps.get_model("documents", "Document"), {"doc_type": "invoice"}),
+        (PAYMENT, apps.get_model("payments", "Payment"), {"status": "succeeded"}),
+        (
+            GET_PAID,
+            apps.get_model("payments", "StripeConnectAccount"),
+            {"charges_enabled": True, "payouts_enabled": True, "stripe_account_id__gt": ""},
+        ),
+    ]
+    flags: dict = {}
+    for bit, model, extra in checks:
+        company_ids = (
+            model.objects.filter(deleted_at__isnull=True, **extra).values_list("company_id", flat=True).distinct()
+        )
+        for company_id in company_ids:
+            flags[company_id] = flags.get(company_id, 0) | bit
+    for company_id, value in flags.items():
+        Company.objects.filter(id=company_id).update(onboarding_flags=value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_onboarding_flags"),
+        ("core", "0004_dashboard_kpi_daily"),
+        ("crm", "0001_initial"),
+        ("projects", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_onboarding_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:51
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "ALTER TABLE core_searchentry ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', search_text)) STORED",
+    "CREATE INDEX core_search_vector_gin ON core_searchentry USING gin (search_vector)",
+    "CREATE INDEX core_search_text_trgm ON core_searchentry USING gin (search_text gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_search_text_trgm",
+    "DROP INDEX IF EXISTS core_search_vector_gin",
+    "ALTER TABLE core_searchentry DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run_on_postgres(statements):
+    def _run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+
+    return _run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_company_onboarding_flags'),
+        ('core', '0005_backfill_onboarding_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_type', models.CharField(max_length=20)),
+                ('object_id', models.CharField(max_length=64)),
+                ('kind', models.CharField(blank=True, default='', max_length=20)),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('subtitle', models.CharField(blank=True, default='', max_length=255)),
+                ('search_text', models.TextField(blank=True, default='')),
+                ('sort_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_entries', to='companies.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'object_type', 'sort_at'], name='core_search_company_idx')],
+                'constraints': [models.UniqueConstraint(fields=('object_type', 'object_id'), name='core_search_object_uniq')],
+            },
+        ),
+        migrations.RunPython(_run_on_postgres(POSTGRES_FORWARD), _run_on_postgres(POSTGRES_BACKWARD)),
+    ]
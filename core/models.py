@@ -54,9 +54,18 @@ class SyncQuerySet(models.QuerySet):
 
     def delete(self):
         """Soft-delete in bulk (guardrail)."""
+        from core.signals import sync_rows_soft_deleted
+
         now = timezone.now()
+        pks = list(self.values_list("pk", flat=True))
+        if not pks:
+            return 0
         # Avoid triggering model delete() for each row (fast + sync-friendly).
-        return self.update(deleted_at=now, updated_at=now, revision=models.F("revision") + 1)
+        updated = self.model._base_manager.filter(pk__in=pks).update(
+            deleted_at=now, updated_at=now, revision=models.F("revision") + 1
+        )
+        sync_rows_soft_deleted.send(sender=self.model, pks=pks)
+        return updated
 
 
 class SyncManager(models.Manager):
@@ -126,3 +135,148 @@ class SyncModel(models.Model):
             return super().delete(using=using, keep_parents=keep_parents)
         self.soft_delete(save=True)
         return (1, {self.__class__.__name__: 1})
+
+
+# -----------------------------------------------------------------------------
+# Background jobs (DB-backed queue; see core/jobs.py)
+# -----------------------------------------------------------------------------
+
+
+class JobStatus(models.TextChoices):
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    SUCCEEDED = "succeeded", "Succeeded"
+    FAILED = "failed", "Failed"
+
+
+class BackgroundJob(models.Model):
+    """One unit of deferred work, leased by `manage.py ez360_worker`.
+
+    Lower `priority` runs first. A job is retried with backoff until
+    `max_attempts`, then left FAILED for ops to inspect.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    company = models.ForeignKey(
+        "companies.Company",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="background_jobs",
+    )
+
+    status = models.CharField(max_length=16, choices=JobStatus.choices, default=JobStatus.QUEUED)
+    priority = models.SmallIntegerField(default=100)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+
+    # Optional: at most one queued/running job per key (e.g. "bank_sync:<company>").
+    dedupe_key = models.CharField(max_length=160, blank=True, default="")
+
+    locked_by = models.CharField(max_length=120, blank=True, default="")
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    last_error = models.TextField(blank=True, default="")
+    result = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "priority", "run_at"], name="core_job_ready_idx"),
+            models.Index(fields=["company", "status"], name="core_job_company_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status__in=["queued", "running"]) & ~models.Q(dedupe_key=""),
+                name="core_job_active_dedupe_uniq",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"BackgroundJob({self.id}, {self.name}, {self.status})"
+
+
+# -----------------------------------------------------------------------------
+# Dashboard KPI snapshot (derived; see core.kpis)
+# -----------------------------------------------------------------------------
+
+
+class DashboardKpiDaily(models.Model):
+    """Per-company, per-day dashboard KPI buckets, kept current by core.kpis signals.
+
+    - payments_cents: succeeded payments by created date
+    - expenses_cents: expenses by expense date
+    - ar_open_cents: open invoice balances by due date (created date when undated)
+    - unbilled_minutes: billable, unbilled submitted/approved time by created date
+
+    Each bucket is recomputed from its source rows when one of them changes, so a
+    bucket is always the truth for its day. Verify/rebuild with
+    `python manage.py ez360_dashboard_kpis`.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey("companies.Company", on_delete=models.CASCADE, related_name="kpi_daily")
+    day = models.DateField()
+
+    payments_cents = models.BigIntegerField(default=0)
+    expenses_cents = models.BigIntegerField(default=0)
+    ar_open_cents = models.BigIntegerField(default=0)
+    unbilled_minutes = models.BigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["company", "day"], name="core_kpi_company_day_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.company_id} {self.day}"
+
+
+# -----------------------------------------------------------------------------
+# Global search index (see core/search.py)
+# -----------------------------------------------------------------------------
+
+
+class SearchEntry(models.Model):
+    """One row per searchable tenant record, kept current by core.search signals.
+
+    `search_text` is the lowercased, normalized text the record is found by. On
+    PostgreSQL the table also carries a generated `search_vector` (tsvector)
+    column with a GIN index, plus a trigram GIN index on `search_text`; both are
+    created by migration 0006 and are not Django fields.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey("companies.Company", on_delete=models.CASCADE, related_name="search_entries")
+    object_type = models.CharField(max_length=20)
+    object_id = models.CharField(max_length=64)
+    kind = models.CharField(max_length=20, blank=True, default="")
+
+    title = models.CharField(max_length=255, blank=True, default="")
+    subtitle = models.CharField(max_length=255, blank=True, default="")
+    search_text = models.TextField(blank=True, default="")
+
+    sort_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["object_type", "object_id"], name="core_search_object_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["company", "object_type", "sort_at"], name="core_search_company_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.object_type}:{self.object_id}"
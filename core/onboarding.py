@@ -3,6 +3,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional
 
+from django.db.models.signals import post_save
+
 from companies.models import Company
 
 
@@ -26,174 +28,194 @@ def _company_profile_done(company: Company) -> bool:
     )
 
 
-def build_onboarding_checklist(company: Company) -> List[OnboardingStep]:
-    """Compute a simple v1 onboarding checklist from live data.
+# Bit per latched step (stored in Company.onboarding_flags). The company profile
+# step is read from the company's own fields, so it needs no bit.
+STEP_BITS = {
+    "clients": 1 << 0,
+    "projects": 1 << 1,
+    "time": 1 << 2,
+    "invoice": 1 << 3,
+    "get_paid": 1 << 4,
+    "payment": 1 << 5,
+}
+ALL_STEPS_MASK = sum(STEP_BITS.values())
+
+_STEP_DEFS = [
+    ("company_profile", "Complete company profile", "Add your address, logo, and email-from details.", "companies:settings"),
+    ("clients", "Add your first client", "Create a client or import from CSV.", "crm:client_create"),
+    ("projects", "Create a project", "Projects organize time, documents, and billing.", "projects:project_create"),
+    ("time", "Log time", "Track time so you can bill accurately.", "timetracking:entry_create"),
+    ("invoice", "Create an invoice", "Use the wizard to generate a professional invoice.", "documents:invoice_wizard"),
+    ("get_paid", "Set up Get Paid", "Connect Stripe so customers can pay your invoices.", "payments:get_paid"),
+    ("payment", "Record a payment", "Enter a payment or accept one via Stripe Checkout.", "payments:payment_create"),
+]
+
+
+def _effective_flags(flags: int) -> int:
+    from payments.services import stripe_connect_enabled
 
-    This is intentionally *computed* rather than stored so it stays correct even if
-    customers import data in bulk.
-    """
+    # Without Stripe Connect configured there is nothing to set up.
+    if not stripe_connect_enabled():
+        flags |= STEP_BITS["get_paid"]
+    return flags
+
+
+def _steps_from_flags(company: Company, flags: int) -> List[OnboardingStep]:
+    flags = _effective_flags(flags)
+    return [
+        OnboardingStep(
+            key=key,
+            title=title,
+            description=description,
+            url_name=url_name,
+            done=_company_profile_done(company) if key == "company_profile" else bool(flags & STEP_BITS[key]),
+        )
+        for key, title, description, url_name in _STEP_DEFS
+    ]
 
+
+def _live_step_done(company: Company, key: str) -> bool:
     # Local imports to avoid app import cycles.
     from crm.models import Client
     from projects.models import Project
     from timetracking.models import TimeEntry
     from documents.models import Document, DocumentType
     from payments.models import Payment, PaymentStatus, StripeConnectAccount
-    from payments.services import stripe_connect_enabled
 
-    alive = {"deleted_at__isnull": True}
+    alive = {"company": company, "deleted_at__isnull": True}
+    if key == "clients":
+        return Client.objects.filter(**alive).exists()
+    if key == "projects":
+        return Project.objects.filter(**alive).exists()
+    if key == "time":
+        return TimeEntry.objects.filter(**alive).exists()
+    if key == "invoice":
+        return Document.objects.filter(doc_type=DocumentType.INVOICE, **alive).exists()
+    if key == "payment":
+        return Payment.objects.filter(status=PaymentStatus.SUCCEEDED, **alive).exists()
+    if key == "get_paid":
+        sca = StripeConnectAccount.objects.filter(**alive).first()
+        return bool(sca and sca.is_ready)
+    return False
+
+
+# company_id -> bits this process already latched (bulk imports fire a signal per row).
+_LATCHED: dict[str, int] = {}
+
+
+def latch_onboarding_steps(company_id, mask: int, *, force: bool = False) -> None:
+    """Mark steps done for a company (idempotent; bits are never cleared).
+
+    Issues one UPDATE the first time a bit is set; repeats in the same process
+    are skipped (once that UPDATE has committed) unless `force`. This is the
+    only writer of `onboarding_flags`; `Company.save()` leaves the column alone.
+    """
+    if not company_id or not mask:
+        return
+    memo_key = str(company_id)
+    if not force and _LATCHED.get(memo_key, 0) & mask == mask:
+        return
+
+    from django.db import transaction
+    from django.db.models import F
+
+    updated = (
+        Company.all_objects.filter(id=company_id)
+        .annotate(_has=F("onboarding_flags").bitand(mask))
+        .exclude(_has=mask)
+        .update(onboarding_flags=F("onboarding_flags").bitor(mask))
+    )
 
-    clients_count = Client.objects.filter(company=company, **alive).count()
-    projects_count = Project.objects.filter(company=company, **alive).count()
-    time_count = TimeEntry.objects.filter(company=company, **alive).count()
-    invoices_count = Document.objects.filter(
-        company=company, doc_type=DocumentType.INVOICE, **alive
-    ).count()
-    payments_count = Payment.objects.filter(
-        company=company, status=PaymentStatus.SUCCEEDED, **alive
-    ).count()
+    def _remember() -> None:
+        _LATCHED[memo_key] = _LATCHED.get(memo_key, 0) | mask
 
-    sca = StripeConnectAccount.objects.filter(company=company, **alive).first()
-    get_paid_done = True
-    if stripe_connect_enabled():
-        get_paid_done = bool(sca and sca.is_ready)
+    # Only once the bits are durable: a rolled-back latch must be retried.
+    transaction.on_commit(_remember)
+    if updated:
+        from companies.signals import tenant_cache_active
+        from core.cache_utils import bump_tenant_cache_version
 
-    steps: List[OnboardingStep] = [
-        OnboardingStep(
-            key="company_profile",
-            title="Complete company profile",
-            description="Add your address, logo, and email-from details.",
-            url_name="companies:settings",
-            done=_company_profile_done(company),
-        ),
-        OnboardingStep(
-            key="clients",
-            title="Add your first client",
-            description="Create a client or import from CSV.",
-            url_name="crm:client_create",
-            done=clients_count > 0,
-        ),
-        OnboardingStep(
-            key="projects",
-            title="Create a project",
-            description="Projects organize time, documents, and billing.",
-            url_name="projects:project_create",
-            done=projects_count > 0,
-        ),
-        OnboardingStep(
-            key="time",
-            title="Log time",
-            description="Track time so you can bill accurately.",
-            url_name="timetracking:entry_create",
-            done=time_count > 0,
-        ),
-        OnboardingStep(
-            key="invoice",
-            title="Create an invoice",
-            description="Use the wizard to generate a professional invoice.",
-            url_name="documents:invoice_wizard",
-            done=invoices_count > 0,
-        ),
-        OnboardingStep(
-            key="get_paid",
-            title="Set up Get Paid",
-            description="Connect Stripe so customers can pay your invoices.",
-            url_name="payments:get_paid",
-            done=get_paid_done,
-        ),
-        OnboardingStep(
-            key="payment",
-            title="Record a payment",
-            description="Enter a payment or accept one via Stripe Checkout.",
-            url_name="payments:payment_create",
-            done=payments_count > 0,
-        ),
-    ]
+        # The tenant context caches the Company row; let it pick up the new flags.
+        if tenant_cache_active():
+            bump_tenant_cache_version(memo_key)
 
-    return steps
 
+def build_onboarding_checklist(company: Company) -> List[OnboardingStep]:
+    """Onboarding checklist for the dashboard / onboarding page.
 
-def build_onboarding_checklist_fast(company: Company) -> List[OnboardingStep]:
-    """Like build_onboarding_checklist(), but optimized for global context.
+    Steps not latched yet are checked against live data (and latched when
+    found), so rows created without signals (bulk imports) are still picked up.
+    Companies that finished onboarding cost no queries.
+    """
+    flags = int(company.onboarding_flags or 0)
+    missing = ALL_STEPS_MASK & ~_effective_flags(flags)
+    found = 0
+    for key, bit in STEP_BITS.items():
+        if missing & bit and _live_step_done(company, key):
+            found |= bit
+    if found:
+        latch_onboarding_steps(company.id, found, force=True)
+        flags |= found
+        company.onboarding_flags = flags
+    return _steps_from_flags(company, flags)
 
-    This function is used by the app-wide context processor to power lightweight
-    onboarding UI in the sidebar/topbar.
 
-    It uses `.exists()` instead of `.count()` to avoid unnecessary work.
+def build_onboarding_checklist_fast(company: Company) -> List[OnboardingStep]:
+    """Like build_onboarding_checklist(), but O(1) for the app-wide context processor.
+
+    Reads the latched `Company.onboarding_flags` only (no queries).
     """
+    return _steps_from_flags(company, int(company.onboarding_flags or 0))
 
-    # Local imports to avoid app import cycles.
-    from crm.models import Client
-    from projects.models import Project
-    from timetracking.models import TimeEntry
-    from documents.models import Document, DocumentType
-    from payments.models import Payment, PaymentStatus, StripeConnectAccount
-    from payments.services import stripe_connect_enabled
 
-    alive = {"deleted_at__isnull": True}
+# -----------------------------------------------------------------------------
+# Latch signals: the first matching object of each kind marks its step done.
+# -----------------------------------------------------------------------------
 
-    has_client = Client.objects.filter(company=company, **alive).exists()
-    has_project = Project.objects.filter(company=company, **alive).exists()
-    has_time = TimeEntry.objects.filter(company=company, **alive).exists()
-    has_invoice = Document.objects.filter(company=company, doc_type=DocumentType.INVOICE, **alive).exists()
-    has_payment = Payment.objects.filter(company=company, status=PaymentStatus.SUCCEEDED, **alive).exists()
 
-    sca = StripeConnectAccount.objects.filter(company=company, **alive).first()
-    get_paid_done = True
-    if stripe_connect_enabled():
-        get_paid_done = bool(sca and sca.is_ready)
+def _latch_on_create(bit: int):
+    def _handler(sender, instance, created: bool = False, raw: bool = False, **kwargs):
+        if created and not raw:
+            latch_onboarding_steps(instance.company_id, bit)
 
-    return [
-        OnboardingStep(
-            key="company_profile",
-            title="Complete company profile",
-            description="Add your address, logo, and email-from details.",
-            url_name="companies:settings",
-            done=_company_profile_done(company),
-        ),
-        OnboardingStep(
-            key="clients",
-            title="Add your first client",
-            description="Create a client or import from CSV.",
-            url_name="crm:client_create",
-            done=has_client,
-        ),
-        OnboardingStep(
-            key="projects",
-            title="Create a project",
-            description="Projects organize time, documents, and billing.",
-            url_name="projects:project_create",
-            done=has_project,
-        ),
-        OnboardingStep(
-            key="time",
-            title="Log time",
-            description="Track time so you can bill accurately.",
-            url_name="timetracking:entry_create",
-            done=has_time,
-        ),
-        OnboardingStep(
-            key="invoice",
-            title="Create an invoice",
-            description="Use the wizard to generate a professional invoice.",
-            url_name="documents:invoice_wizard",
-            done=has_invoice,
-        ),
-        OnboardingStep(
-            key="get_paid",
-            title="Set up Get Paid",
-            description="Connect Stripe so customers can pay your invoices.",
-            url_name="payments:get_paid",
-            done=get_paid_done,
-        ),
-        OnboardingStep(
-            key="payment",
-            title="Record a payment",
-            description="Enter a payment or accept one via Stripe Checkout.",
-            url_name="payments:payment_create",
-            done=has_payment,
-        ),
-    ]
+    return _handler
+
+
+def _latch_invoice(sender, instance, raw: bool = False, **kwargs):
+    from documents.models import DocumentType
+
+    if not raw and instance.doc_type == DocumentType.INVOICE:
+        latch_onboarding_steps(instance.company_id, STEP_BITS["invoice"])
+
+
+def _latch_payment(sender, instance, raw: bool = False, **kwargs):
+    from payments.models import PaymentStatus
+
+    if not raw and instance.status == PaymentStatus.SUCCEEDED:
+        latch_onboarding_steps(instance.company_id, STEP_BITS["payment"])
+
+
+def _latch_get_paid(sender, instance, raw: bool = False, **kwargs):
+    if not raw and instance.is_ready:
+        latch_onboarding_steps(instance.company_id, STEP_BITS["get_paid"])
+
+
+# Models whose first created row marks a step done (bulk writers latch these explicitly).
+CREATE_LATCH_STEPS = {
+    "crm.Client": "clients",
+    "projects.Project": "projects",
+    "timetracking.TimeEntry": "time",
+}
+
+_LATCH_RECEIVERS = {
+    **{label: _latch_on_create(STEP_BITS[step]) for label, step in CREATE_LATCH_STEPS.items()},
+    "documents.Document": _latch_invoice,
+    "payments.Payment": _latch_payment,
+    "payments.StripeConnectAccount": _latch_get_paid,
+}
+
+for _label, _handler in _LATCH_RECEIVERS.items():
+    post_save.connect(_handler, sender=_label, dispatch_uid=f"onboarding_latch_{_label}")
 
 
 def onboarding_progress(steps: List[OnboardingStep]) -> dict:
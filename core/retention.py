@@ -24,6 +24,7 @@ def get_retention_days() -> dict[str, int]:
     return {
         "audit": int(getattr(settings, "EZ360_AUDIT_RETENTION_DAYS", 365)),
         "stripe_webhooks": int(getattr(settings, "EZ360_STRIPE_WEBHOOK_RETENTION_DAYS", 90)),
+        "background_jobs": int(getattr(settings, "EZ360_JOB_RETENTION_DAYS", 14)),
     }
 
 
@@ -70,6 +71,30 @@ def prune_stripe_webhook_events(*, dry_run: bool = True, retention_days: int | N
     )
 
 
+def prune_background_jobs(*, dry_run: bool = True, retention_days: int | None = None) -> PruneResult:
+    from core.models import BackgroundJob, JobStatus
+
+    days = int(retention_days if retention_days is not None else get_retention_days()["background_jobs"])
+    cutoff = _cutoff(days)
+
+    qs = BackgroundJob.objects.filter(
+        status__in=[JobStatus.SUCCEEDED, JobStatus.FAILED],
+        finished_at__lt=cutoff,
+    )
+    eligible = qs.count()
+    deleted = 0
+    if not dry_run and eligible:
+        deleted, _ = qs.delete()
+
+    return PruneResult(
+        label="background_jobs",
+        retention_days=days,
+        cutoff=cutoff,
+        eligible_count=eligible,
+        deleted_count=deleted,
+    )
+
+
 def run_prune_jobs(*, dry_run: bool = True) -> list[PruneResult]:
     """Run all retention prune jobs.
 
@@ -78,4 +103,5 @@ def run_prune_jobs(*, dry_run: bool = True) -> list[PruneResult]:
     return [
         prune_audit_events(dry_run=dry_run),
         prune_stripe_webhook_events(dry_run=dry_run),
+        prune_background_jobs(dry_run=dry_run),
     ]
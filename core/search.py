@@ -0,0 +1,327 @@
+"""Global search index (core.SearchEntry).
+
+Clients, projects, documents, expenses and payments each keep one index row
+with a display title/subtitle and a normalized `search_text`:
+
+- a save of a searchable record (or of a client phone) rewrites its row, and a
+  delete or soft delete removes it (signals below);
+- `search()` answers the global search page with one query: on PostgreSQL it
+  matches the generated `search_vector` against a prefix tsquery (typeahead:
+  "acm" finds "Acme") or the trigram-indexed `search_text` by substring, ranks
+  with `ts_rank`, and caps each type with a window function. Other databases
+  fall back to substring matching on `search_text`.
+
+QuerySet.update()/bulk_create() bypass signals; call `index_rows()` after bulk
+writes, and run `python manage.py ez360_search_index` to backfill or repair.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from django.apps import apps as django_apps
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL, Window
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import SearchEntry
+from .signals import sync_rows_soft_deleted
+from .templatetags.money import money_cents
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TYPES = ("client", "project", "document", "expense", "payment")
+
+_TERM_RE = re.compile(r"\w+")
+_MAX_TERMS = 8
+
+
+@dataclass(frozen=True)
+class SearchDoc:
+    title: str
+    subtitle: str
+    parts: tuple[str, ...]
+    kind: str = ""
+
+
+def _client_label(client) -> str:
+    if client is None:
+        return ""
+    return client.display_label() or client.email or ""
+
+
+def _client_doc(c) -> SearchDoc:
+    phones = [p.number for p in c.phones.all() if p.deleted_at is None]
+    digits = ["".join(ch for ch in n if ch.isdigit()) for n in phones]
+    return SearchDoc(
+        title=_client_label(c) or "(unnamed client)",
+        subtitle=c.email,
+        parts=(c.company_name, c.first_name, c.last_name, c.email, *phones, *digits),
+    )
+
+
+def _project_doc(p) -> SearchDoc:
+    return SearchDoc(title=str(p), subtitle=_client_label(p.client), parts=(p.project_number, p.name))
+
+
+def _document_doc(d) -> SearchDoc:
+    client = _client_label(d.client)
+    subtitle = " · ".join(x for x in [d.get_doc_type_display(), client] if x)
+    return SearchDoc(
+        title=d.number or "(unassigned)",
+        subtitle=subtitle,
+        parts=(d.number, d.title, client),
+        kind=d.doc_type,
+    )
+
+
+def _expense_doc(e) -> SearchDoc:
+    merchant = e.merchant.name if e.merchant_id and e.merchant else ""
+    subtitle = " · ".join(x for x in [merchant, e.date.isoformat() if e.date else ""] if x)
+    return SearchDoc(title=e.description or "Expense", subtitle=subtitle, parts=(e.description, merchant))
+
+
+def _payment_doc(p) -> SearchDoc:
+    client = _client_label(p.client)
+    subtitle = " · ".join(x for x in [p.status, client] if x)
+    return SearchDoc(title=money_cents(p.amount_cents), subtitle=subtitle, parts=(p.notes, client))
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    object_type: str
+    model_label: str
+    build: Callable[[Any], SearchDoc]
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str, ...] = ()
+
+    @property
+    def model(self):
+        return django_apps.get_model(self.model_label)
+
+
+SPECS: tuple[SearchSpec, ...] = (
+    SearchSpec("client", "crm.Client", _client_doc, prefetch_related=("phones",)),
+    SearchSpec("project", "projects.Project", _project_doc, select_related=("client",)),
+    SearchSpec("document", "documents.Document", _document_doc, select_related=("client",)),
+    SearchSpec("expense", "expenses.Expense", _expense_doc, select_related=("merchant",)),
+    SearchSpec("payment", "payments.Payment", _payment_doc, select_related=("client",)),
+)
+
+_SPECS_BY_LABEL = {s.model_label.lower(): s for s in SPECS}
+
+_URL_NAMES = {
+    "client": "crm:client_edit",
+    "project": "projects:project_edit",
+    "expense": "expenses:expense_edit",
+    "payment": "payments:payment_edit",
+}
+
+
+def entry_url(entry: SearchEntry) -> str:
+    if entry.object_type == "document":
+        name = f"documents:{entry.kind or 'invoice'}_edit"
+    else:
+        name = _URL_NAMES.get(entry.object_type, "")
+    return reverse(name, args=[entry.object_id]) if name else ""
+
+
+def normalize_search_text(parts: Iterable[str]) -> str:
+    return " ".join(" ".join(str(p or "") for p in parts).lower().split())
+
+
+# -----------------------------------------------------------------------------
+# Writers
+# -----------------------------------------------------------------------------
+
+
+def _spec_for(model) -> SearchSpec | None:
+    return _SPECS_BY_LABEL.get(model._meta.label_lower)
+
+
+def _entry_for(spec: SearchSpec, obj) -> SearchEntry | None:
+    if getattr(obj, "deleted_at", None) is not None:
+        return None
+    doc = spec.build(obj)
+    return SearchEntry(
+        company_id=obj.company_id,
+        object_type=spec.object_type,
+        object_id=str(obj.pk),
+        kind=doc.kind,
+        title=doc.title[:255],
+        subtitle=doc.subtitle[:255],
+        search_text=normalize_search_text(doc.parts),
+        sort_at=getattr(obj, "updated_at", None) or timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def index_rows(model, rows: Iterable, *, batch_size: int = 1000) -> int:
+    """Upsert index rows for `rows` (and drop soft-deleted ones). Returns rows written."""
+    spec = _spec_for(model)
+    if spec is None:
+        return 0
+    entries: list[SearchEntry] = []
+    dead: list[str] = []
+    for obj in rows:
+        entry = _entry_for(spec, obj)
+        if entry is None:
+            dead.append(str(obj.pk))
+        else:
+            entries.append(entry)
+    if dead:
+        SearchEntry.objects.filter(object_type=spec.object_type, object_id__in=dead).delete()
+    if entries:
+        SearchEntry.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["object_type", "object_id"],
+            update_fields=["company", "kind", "title", "subtitle", "search_text", "sort_at", "updated_at"],
+        )
+    return len(entries)
+
+
+def index_pks(model, pks: Iterable) -> int:
+    """Re-read `pks` with their related rows and index them (for bulk writers).
+
+    Soft-deleted rows are read too, so their entries are dropped.
+    """
+    spec = _spec_for(model)
+    pks = list(pks)
+    if spec is None or not pks:
+        return 0
+    qs = spec.model._base_manager.filter(pk__in=pks)
+    if spec.select_related:
+        qs = qs.select_related(*spec.select_related)
+    if spec.prefetch_related:
+        qs = qs.prefetch_related(*spec.prefetch_related)
+    return index_rows(spec.model, qs)
+
+
+def remove_rows(model, pks: Iterable) -> None:
+    spec = _spec_for(model)
+    if spec is not None:
+        SearchEntry.objects.filter(object_type=spec.object_type, object_id__in=[str(pk) for pk in pks]).delete()
+
+
+def rebuild_company_index(company_id, *, chunk_size: int = 1000) -> int:
+    """Rewrite every index row for one company from source records."""
+    written = 0
+    with transaction.atomic():
+        SearchEntry.objects.filter(company_id=company_id).delete()
+        for spec in SPECS:
+            qs = spec.model.objects.filter(company_id=company_id).order_by("pk")
+            if spec.select_related:
+                qs = qs.select_related(*spec.select_related)
+            if spec.prefetch_related:
+                qs = qs.prefetch_related(*spec.prefetch_related)
+            batch: list = []
+            for obj in qs.iterator(chunk_size=chunk_size):
+                batch.append(obj)
+                if len(batch) >= chunk_size:
+                    written += index_rows(spec.model, batch)
+                    batch = []
+            if batch:
+                written += index_rows(spec.model, batch)
+    return written
+
+
+def _safe_index(model, rows) -> None:
+    try:
+        with transaction.atomic():
+            index_rows(model, rows)
+    except Exception:
+        # Derived data: never block the write. `ez360_search_index` repairs drift.
+        logger.warning("search_index_failed model=%s", model._meta.label_lower, exc_info=True)
+
+
+def _on_save(sender, instance, raw: bool = False, **kwargs):
+    if raw:
+        return
+    if sender._meta.label_lower == "crm.clientphone":
+        client = instance.client
+        _safe_index(type(client), [client])
+        return
+    _safe_index(sender, [instance])
+
+
+def _on_delete(sender, instance, **kwargs):
+    if sender._meta.label_lower == "crm.clientphone":
+        client = type(instance.client).all_objects.filter(pk=instance.client_id).first()
+        if client is not None:
+            _safe_index(type(client), [client])
+        return
+    remove_rows(sender, [instance.pk])
+
+
+for _spec in SPECS:
+    post_save.connect(_on_save, sender=_spec.model_label, dispatch_uid=f"search_save_{_spec.object_type}")
+    post_delete.connect(_on_delete, sender=_spec.model_label, dispatch_uid=f"search_delete_{_spec.object_type}")
+post_save.connect(_on_save, sender="crm.ClientPhone", dispatch_uid="search_save_client_phone")
+post_delete.connect(_on_delete, sender="crm.ClientPhone", dispatch_uid="search_delete_client_phone")
+
+
+@receiver(sync_rows_soft_deleted)
+def _on_bulk_soft_delete(sender, pks, **kwargs):
+    remove_rows(sender, pks)
+
+
+# -----------------------------------------------------------------------------
+# Readers
+# -----------------------------------------------------------------------------
+
+
+def _matching(company, q: str):
+    """Entries matching `q`, plus the ordering to rank them by."""
+    needle = " ".join(q.lower().split())
+    terms = _TERM_RE.findall(needle)[:_MAX_TERMS]
+    qs = SearchEntry.objects.filter(company=company)
+
+    if connection.vendor == "postgresql" and terms:
+        tsquery = " & ".join(f"{t}:*" for t in terms)
+        qs = qs.annotate(
+            fts_hit=RawSQL("search_vector @@ to_tsquery('simple', %s)", (tsquery,), output_field=BooleanField()),
+            rank=RawSQL("ts_rank(search_vector, to_tsquery('simple', %s))", (tsquery,), output_field=FloatField()),
+        ).filter(Q(fts_hit=True) | Q(search_text__contains=needle))
+        return qs, [F("rank").desc(), F("sort_at").desc()]
+
+    for term in terms or [needle]:
+        qs = qs.filter(search_text__contains=term)
+    return qs, [F("sort_at").desc()]
+
+
+def search(company, q: str, *, per_type: int = 10) -> dict[str, list[SearchEntry]]:
+    """Top `per_type` matches for each searchable type, in one query."""
+    results: dict[str, list[SearchEntry]] = {t: [] for t in SEARCH_TYPES}
+    if not (q or "").strip():
+        return results
+    qs, order = _matching(company, q)
+    qs = (
+        qs.annotate(type_rank=Window(RowNumber(), partition_by=[F("object_type")], order_by=order))
+        .filter(type_rank__lte=per_type)
+        .order_by("object_type", "type_rank")
+    )
+    for entry in qs:
+        entry.url = entry_url(entry)
+        results.setdefault(entry.object_type, []).append(entry)
+    return results
+
+
+def suggest(company, q: str, *, limit: int = 8) -> list[SearchEntry]:
+    """Best matches across all types (typeahead)."""
+    if not (q or "").strip():
+        return []
+    qs, order = _matching(company, q)
+    entries = list(qs.order_by(*order)[:limit])
+    for entry in entries:
+        entry.url = entry_url(entry)
+    return entries
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from django.dispatch import Signal
+
+
+# Sent by SyncQuerySet.delete() after a bulk soft-delete.
+# QuerySet.update() bypasses post_save, so listeners (e.g. the sync change log)
+# receive the affected primary keys explicitly.
+#
+# kwargs: sender=<model class>, pks=<list of primary keys>
+sync_rows_soft_deleted = Signal()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+from datetime import date
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from accounting.models import JournalLine
+from companies.models import Company
+from core.invariants import FAIL, WARN, Violation, run_invariants
+from crm.models import Client
+from documents.models import Document, DocumentStatus, DocumentType
+from expenses.models import Expense, ExpenseStatus
+from payments.models import Payment, PaymentStatus
+
+
+class FinancialInvariantsTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Ledger Co")
+        self.other = Company.objects.create(name="Other Co")
+        self.client_row = Client.objects.create(company=self.company, company_name="Acme")
+
+    def _invoice(self, company=None, **corrupt) -> Document:
+        doc = Document.objects.create(
+            company=company or self.company,
+            client=self.client_row if company is None else None,
+            doc_type=DocumentType.INVOICE,
+            status=DocumentStatus.SENT,
+            subtotal_cents=10_000,
+            tax_cents=800,
+            total_cents=10_800,
+            balance_due_cents=10_800,
+        )
+        if corrupt:
+            # Bypass save(): simulate drift written by a bulk update or a bad migration.
+            Document.objects.filter(pk=doc.pk).update(**corrupt)
+        return doc
+
+    def _found(self, **kwargs) -> set[tuple[str, str, str]]:
+        return {(v.check, v.severity, v.object_id) for v in run_invariants(**kwargs)}
+
+    def test_consistent_books_have_no_violations(self):
+        Client.objects.filter(pk=self.client_row.pk).update(outstanding_cents=10_800)
+        self._invoice()
+        Expense.objects.create(company=self.company, date=date(2026, 1, 5), amount_cents=500, total_cents=500, status=ExpenseStatus.APPROVED)
+        self.assertEqual(self._found(), set())
+
+    def test_mismatches_are_found_in_every_shard(self):
+        bad_total = self._invoice(total_cents=9_999, balance_due_cents=9_999)
+        paid = self._invoice(amount_paid_cents=0)
+        Payment.objects.create(company=self.company, invoice=paid, amount_cents=5_000, status=PaymentStatus.SUCCEEDED)
+        elsewhere = self._invoice(company=self.other, balance_due_cents=1)
+
+        Expense.objects.create(company=self.company, date=date(2026, 1, 5), amount_cents=500, total_cents=500, status=ExpenseStatus.APPROVED)
+        line = JournalLine.objects.filter(entry__company=self.company, debit_cents__gt=0).first()
+        JournalLine.objects.filter(pk=line.pk).update(debit_cents=501)
+
+        found = self._found(shard_size=1)
+        self.assertIn(("invoice_totals", FAIL, str(bad_total.pk)), found)
+        self.assertIn(("invoice_payments", FAIL, str(paid.pk)), found)
+        self.assertIn(("invoice_balance", WARN, str(elsewhere.pk)), found)
+        self.assertIn(("client_outstanding", WARN, str(self.client_row.pk)), found)
+        self.assertIn(("journal_balance", FAIL, str(line.entry_id)), found)
+
+        scoped = self._found(company_ids=[self.other.pk])
+        self.assertEqual({check for check, _sev, _id in scoped}, {"invoice_balance"})
+
+    def test_command_writes_jsonl_report_and_exits_nonzero(self):
+        self._invoice(total_cents=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.jsonl")
+            with self.assertRaises(SystemExit) as exit_:
+                call_command("ez360_invariants_check", report=path, quiet=True, stdout=open(os.devnull, "w"))
+            with open(path, encoding="utf-8") as fh:
+                lines = [json.loads(line) for line in fh]
+        self.assertEqual(exit_.exception.code, 2)
+        summary = lines[-1]
+        self.assertEqual(summary["type"], "summary")
+        self.assertFalse(summary["ok"])
+        self.assertEqual(summary["checks"]["invoice_totals"][FAIL], 1)
+        self.assertEqual(sum(1 for line in lines if line["type"] == "violation"), summary["failures"] + summary["warnings"])
+
+
+class ThreadedInvariantsTests(TransactionTestCase):
+    """The worker pool only runs off SQLite, so these tests pretend to be another vendor."""
+
+    def test_threaded_run_matches_serial_run(self):
+        for i in range(3):
+            company = Company.objects.create(name=f"Shard {i}")
+            doc = Document.objects.create(
+                company=company, doc_type=DocumentType.INVOICE, status=DocumentStatus.SENT, subtotal_cents=100, total_cents=100
+            )
+            Document.objects.filter(pk=doc.pk).update(total_cents=99, balance_due_cents=i)
+
+        serial = sorted(tuple(v.as_dict().values()) for v in run_invariants(shard_size=1, workers=1))
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            threaded = sorted(tuple(v.as_dict().values()) for v in run_invariants(shard_size=1, workers=3))
+        self.assertEqual(len(serial), 6)
+        self.assertEqual(threaded, serial)
+
+    def test_closing_early_cancels_pending_shards(self):
+        started = []
+
+        def fake_shard(company_ids, checks):
+            started.append(company_ids)
+            time.sleep(0.05)
+            return [Violation("invoice_totals", FAIL, str(company_ids[0]), "invoice", "1", "drift")]
+
+        with mock.patch.object(connection, "vendor", "postgresql"), mock.patch(
+            "core.invariants._check_shard_in_thread", side_effect=fake_shard
+        ):
+            violations = run_invariants(company_ids=range(20), shard_size=1, workers=2)
+            next(violations)
+            violations.close()
+        self.assertLess(len(started), 20)
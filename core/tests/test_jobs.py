@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from companies.models import Company
+from core.jobs import _HANDLERS, enqueue, extend_lease, job_handler, lease_jobs, run_job, run_ready_jobs
+from core.models import BackgroundJob, JobStatus
+
+CALLS: list[dict] = []
+
+
+@job_handler("tests.record")
+def _record(**payload):
+    CALLS.append(payload)
+    return {"ok": True}
+
+
+@job_handler("tests.boom")
+def _boom(**payload):
+    raise RuntimeError("boom")
+
+
+@job_handler("tests.heartbeat")
+def _heartbeat(**payload):
+    return {"extended": extend_lease()}
+
+
+@job_handler("tests.taken_over")
+def _taken_over(*, job_id: int):
+    # Simulate the lease expiring mid-run and another worker taking the job.
+    BackgroundJob.objects.filter(id=job_id).update(locked_by="w2")
+    return {"extended": extend_lease()}
+
+
+@override_settings(EZ360_JOBS_RUN_INLINE=False, EZ360_JOBS_PER_COMPANY_CONCURRENCY=1)
+class BackgroundJobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+        self.company = Company.objects.create(name="Acme Co")
+
+    def test_enqueue_lease_and_run(self):
+        job = enqueue("tests.record", company=self.company, payload={"n": 1})
+        self.assertEqual(run_ready_jobs(worker_id="w1"), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.result, {"ok": True})
+        self.assertEqual(CALLS, [{"n": 1}])
+        self.assertEqual(run_ready_jobs(worker_id="w1"), 0)
+
+    def test_failure_is_retried_with_backoff_then_fails(self):
+        job = enqueue("tests.boom", company=self.company, max_attempts=2)
+
+        run_ready_jobs(worker_id="w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError", job.last_error)
+
+        BackgroundJob.objects.filter(id=job.id).update(run_at=timezone.now() - timedelta(seconds=1))
+        run_ready_jobs(worker_id="w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_dedupe_key_returns_active_job(self):
+        first = enqueue("tests.record", company=self.company, dedupe_key="k1")
+        second = enqueue("tests.record", company=self.company, dedupe_key="k1")
+        self.assertEqual(first.id, second.id)
+
+        run_ready_jobs(worker_id="w1")
+        third = enqueue("tests.record", company=self.company, dedupe_key="k1")
+        self.assertNotEqual(first.id, third.id)
+
+    def test_per_company_concurrency_and_priority(self):
+        other = Company.objects.create(name="Other Co")
+        enqueue("tests.record", company=self.company, payload={"n": 1}, priority=10)
+        enqueue("tests.record", company=self.company, payload={"n": 2}, priority=10)
+        enqueue("tests.record", company=other, payload={"n": 3}, priority=90)
+
+        leased = lease_jobs(worker_id="w1", limit=3)
+        self.assertEqual([j.payload["n"] for j in leased], [1, 3])
+
+    def test_expired_lease_is_requeued(self):
+        job = enqueue("tests.record", company=self.company)
+        lease_jobs(worker_id="dead", limit=1)
+        BackgroundJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(run_ready_jobs(worker_id="w2"), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_unknown_handler_fails_without_retry(self):
+        self.assertNotIn("tests.missing", _HANDLERS)
+        job = enqueue("tests.missing", company=self.company)
+        run_ready_jobs(worker_id="w1")
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+
+    def test_extend_lease_pushes_expiry(self):
+        job = enqueue("tests.heartbeat", company=self.company)
+        lease_jobs(worker_id="w1", limit=1)
+        BackgroundJob.objects.filter(id=job.id).update(lease_expires_at=timezone.now() + timedelta(seconds=5))
+
+        self.assertTrue(run_job(BackgroundJob.objects.get(id=job.id)))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(job.result, {"extended": True})
+        self.assertTrue(extend_lease())  # no-op outside a job
+
+    def test_lost_lease_does_not_overwrite_new_owner(self):
+        job = enqueue("tests.taken_over", company=self.company)
+        BackgroundJob.objects.filter(id=job.id).update(payload={"job_id": job.id})
+        leased = lease_jobs(worker_id="w1", limit=1)
+
+        self.assertFalse(run_job(leased[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.RUNNING)
+        self.assertEqual(job.locked_by, "w2")
+        self.assertEqual(job.result, {})
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from companies.models import Company
+from core.kpis import ar_aging, dashboard_kpis, rebuild_company_kpis, verify_company_kpis
+from core.models import DashboardKpiDaily
+from documents.models import Document, DocumentStatus, DocumentType
+from expenses.models import Expense
+from payments.models import Payment, PaymentStatus
+from timetracking.models import TimeEntry, TimeStatus
+
+
+class DashboardKpiSnapshotTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.today = timezone.localdate()
+
+    def _kpis(self):
+        return dashboard_kpis(self.company, self.today - datetime.timedelta(days=29), self.today)
+
+    def test_writes_update_buckets_and_match_source(self):
+        Payment.objects.create(company=self.company, amount_cents=12_000, status=PaymentStatus.SUCCEEDED)
+        Payment.objects.create(company=self.company, amount_cents=999, status=PaymentStatus.PENDING)
+        expense = Expense.objects.create(company=self.company, date=self.today, amount_cents=3_000)
+        Document.objects.create(
+            company=self.company,
+            doc_type=DocumentType.INVOICE,
+            status=DocumentStatus.SENT,
+            subtotal_cents=5_000,
+            total_cents=5_000,
+            balance_due_cents=5_000,
+            due_date=self.today - datetime.timedelta(days=45),
+        )
+        TimeEntry.objects.create(company=self.company, duration_minutes=90, status=TimeStatus.APPROVED)
+
+        kpis = self._kpis()
+        self.assertEqual(kpis.revenue_cents, 12_000)
+        self.assertEqual(kpis.expenses_cents, 3_000)
+        self.assertEqual(kpis.ar_cents, 5_000)
+        self.assertEqual(kpis.unbilled_hours, 1.5)
+        self.assertEqual(ar_aging(self.company, self.today)["31–60"], 5_000)
+        self.assertEqual(verify_company_kpis(self.company.id), [])
+
+        # Moving an expense out of the range empties its old bucket.
+        expense.date = self.today - datetime.timedelta(days=200)
+        expense.save()
+        self.assertEqual(self._kpis().expenses_cents, 0)
+        self.assertEqual(verify_company_kpis(self.company.id), [])
+
+        expense.soft_delete()
+        self.assertEqual(verify_company_kpis(self.company.id), [])
+
+    def test_rebuild_repairs_bulk_updates(self):
+        Expense.objects.create(company=self.company, date=self.today, amount_cents=3_000)
+        Expense.objects.filter(company=self.company).update(amount_cents=4_000)
+        self.assertEqual(len(verify_company_kpis(self.company.id)), 1)
+
+        rebuild_company_kpis(self.company.id)
+        self.assertEqual(verify_company_kpis(self.company.id), [])
+        self.assertEqual(DashboardKpiDaily.objects.get(company=self.company).expenses_cents, 4_000)
+
+    def test_dashboard_kpis_is_one_query(self):
+        with self.assertNumQueries(1):
+            self._kpis()
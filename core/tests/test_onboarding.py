@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from companies.models import Company
+from core.onboarding import (
+    ALL_STEPS_MASK,
+    STEP_BITS,
+    build_onboarding_checklist,
+    build_onboarding_checklist_fast,
+    latch_onboarding_steps,
+)
+from crm.models import Client
+
+
+@override_settings(STRIPE_SECRET_KEY="")
+class OnboardingLatchTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+
+    def _done(self, steps):
+        return {s.key for s in steps if s.done}
+
+    def test_first_client_latches_step(self):
+        Client.objects.create(company=self.company, company_name="Globex")
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.onboarding_flags & STEP_BITS["clients"])
+
+        with self.assertNumQueries(0):
+            steps = build_onboarding_checklist_fast(self.company)
+        self.assertEqual(self._done(steps), {"clients", "get_paid"})
+
+    def test_full_checklist_latches_rows_created_without_signals(self):
+        Client.objects.bulk_create([Client(company=self.company, company_name="Imported")])
+        self.assertNotIn("clients", self._done(build_onboarding_checklist_fast(self.company)))
+
+        self.assertIn("clients", self._done(build_onboarding_checklist(self.company)))
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.onboarding_flags & STEP_BITS["clients"])
+
+    def test_completed_company_costs_no_queries(self):
+        Company.objects.filter(id=self.company.id).update(onboarding_flags=ALL_STEPS_MASK)
+        self.company.refresh_from_db()
+        with self.assertNumQueries(0):
+            steps = build_onboarding_checklist(self.company)
+        self.assertEqual(self._done(steps), {s.key for s in steps} - {"company_profile"})
+
+    def test_stale_company_save_keeps_latched_bits(self):
+        stale = Company.objects.get(id=self.company.id)
+        Client.objects.create(company=self.company, company_name="Globex")
+
+        stale.name = "Acme Renamed"
+        stale.save()
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.name, "Acme Renamed")
+        self.assertTrue(self.company.onboarding_flags & STEP_BITS["clients"])
+
+    def test_rolled_back_latch_is_retried(self):
+        bit = STEP_BITS["projects"]
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    latch_onboarding_steps(self.company.id, bit)
+                    raise RuntimeError("rollback")
+            except RuntimeError:
+                pass
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.onboarding_flags & bit)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            latch_onboarding_steps(self.company.id, bit)
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.onboarding_flags & bit)
+
+        # Committed: repeats are skipped without a query.
+        with self.assertNumQueries(0):
+            latch_onboarding_steps(self.company.id, bit)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from companies.models import Company
+from core.models import SearchEntry
+from core.search import rebuild_company_index, search, suggest
+from crm.models import Client, ClientPhone
+from documents.models import Document, DocumentType
+from expenses.models import Expense, Merchant
+from projects.models import Project
+
+
+class GlobalSearchIndexTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.other = Company.objects.create(name="Other Co")
+        self.client_row = Client.objects.create(company=self.company, company_name="Acme Plumbing", email="ops@acme.test")
+        ClientPhone.objects.create(client=self.client_row, number="(555) 123-4567")
+        self.project = Project.objects.create(company=self.company, client=self.client_row, project_number="P-100", name="Kitchen remodel")
+        self.doc = Document.objects.create(company=self.company, client=self.client_row, doc_type=DocumentType.ESTIMATE, number="EST-0042")
+        merchant = Merchant.objects.create(company=self.company, name="Home Depot")
+        self.expense = Expense.objects.create(company=self.company, merchant=merchant, description="Lumber for kitchen")
+        Client.objects.create(company=self.other, company_name="Acme Elsewhere")
+
+    def test_saves_maintain_index_and_search_is_one_query(self):
+        with self.assertNumQueries(1):
+            results = search(self.company, "kitchen")
+        self.assertEqual([e.title for e in results["project"]], ["P-100 · Kitchen remodel"])
+        self.assertEqual([e.title for e in results["expense"]], ["Lumber for kitchen"])
+        self.assertEqual(results["expense"][0].subtitle, "Home Depot")
+
+        # Prefix (typeahead), phone digits, document numbers; never another tenant's rows.
+        hits = suggest(self.company, "acm")
+        self.assertEqual({e.object_type for e in hits}, {"client", "document"})
+        self.assertNotIn("Acme Elsewhere", [e.title for e in hits])
+        self.assertEqual(search(self.company, "5551234")["client"][0].url, f"/clients/{self.client_row.id}/edit/")
+        doc_hit = search(self.company, "est-0042")["document"][0]
+        self.assertEqual((doc_hit.kind, doc_hit.subtitle), ("estimate", "Estimate · Acme Plumbing"))
+
+        self.client_row.company_name = "Apex Plumbing"
+        self.client_row.save()
+        self.assertEqual(search(self.company, "apex")["client"][0].title, "Apex Plumbing")
+
+        self.expense.soft_delete()
+        Project.objects.filter(pk=self.project.pk).delete()
+        self.assertEqual(search(self.company, "kitchen"), {t: [] for t in ("client", "project", "document", "expense", "payment")})
+
+    def test_rebuild_backfills_rows_written_without_signals(self):
+        SearchEntry.objects.all().delete()
+        Client.objects.bulk_create([Client(company=self.company, first_name="Bulk", last_name=f"Row{i}") for i in range(3)])
+
+        self.assertEqual(rebuild_company_index(self.company.id), 7)
+        self.assertEqual(len(search(self.company, "bulk row")["client"]), 3)
+
+        call_command("ez360_search_index", company_id=str(self.other.id), stdout=open("/dev/null", "w"))
+        self.assertEqual(SearchEntry.objects.filter(company=self.other).count(), 1)
+
+    def test_missing_only_indexes_companies_without_rows(self):
+        SearchEntry.objects.filter(company=self.other).delete()
+        SearchEntry.objects.filter(object_id=str(self.expense.id)).delete()
+
+        call_command("ez360_search_index", missing_only=True, stdout=open("/dev/null", "w"))
+        self.assertEqual(SearchEntry.objects.filter(company=self.other).count(), 1)
+        # Companies that already have rows are left alone.
+        self.assertFalse(SearchEntry.objects.filter(object_id=str(self.expense.id)).exists())
@@ -17,6 +17,7 @@ urlpatterns = [
     path("getting-started/", views.getting_started, name="getting_started"),
     path("health/", views.health, name="health"),
     path("search/", views.global_search, name="search"),
+    path("search/suggest/", views.global_search_suggest, name="search_suggest"),
 
     path("support/mode/", views_support.support_mode_status, name="support_mode_status"),
     path("support/mode/enter/", views_support.support_mode_enter, name="support_mode_enter"),
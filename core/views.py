@@ -4,21 +4,18 @@ import datetime
 
 from django.contrib.auth.decorators import login_required
 from django.conf import settings
-from django.db.models import Sum, Q
-from django.db.models.functions import TruncMonth
 from django.http import HttpRequest, JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
 
 from companies.services import ensure_active_company_for_user, get_active_company, get_active_employee_profile
-from crm.models import Client
+from core.kpis import ar_aging, dashboard_kpis, monthly_payments
 from core.onboarding import build_onboarding_checklist, onboarding_progress
+from core.search import search as search_index, suggest as search_suggest
 from documents.models import Document, DocumentStatus, DocumentType
 from expenses.models import Expense, ExpenseStatus
-from payments.models import Payment, PaymentStatus
 from payables.models import Bill, BillStatus
 from projects.models import Project
-from timetracking.models import TimeEntry, TimeStatus
 
 from billing.models import PlanCode, PlanCatalog, SeatAddonConfig
 from billing.services import build_subscription_summary, plan_meets
@@ -166,56 +163,14 @@ def app_dashboard(request: HttpRequest):
         end_date = today
         kpi_period_label = "Year to date"
 
-    start_dt = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
-    end_dt = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time.max))
-
     # ------------------------------------------------------------------
-    # KPIs + lists
+    # KPIs (daily snapshot buckets, see core.kpis) + lists
     # ------------------------------------------------------------------
-    from payments.models import Payment
     from expenses.models import Expense
-    from timetracking.models import TimeEntry
     from documents.models import Document
     from projects.models import Project
 
-    revenue_cents = (
-        Payment.objects.filter(
-            company=company,
-            status=PaymentStatus.SUCCEEDED,
-            created_at__gte=start_dt,
-            created_at__lte=end_dt,
-        ).aggregate(total=Sum("amount_cents"))["total"]
-        or 0
-    )
-
-    expenses_cents = (
-        Expense.objects.filter(
-            company=company,
-            date__gte=start_date,
-            date__lte=end_date,
-        ).aggregate(total=Sum("amount_cents"))["total"]
-        or 0
-    )
-
-    ar_cents = (
-        Document.objects.filter(
-            company=company,
-            doc_type=DocumentType.INVOICE,
-            status__in=[DocumentStatus.SENT, DocumentStatus.PARTIALLY_PAID],
-        ).aggregate(total=Sum("balance_due_cents"))["total"]
-        or 0
-    )
-
-    unbilled_minutes = (
-        TimeEntry.objects.filter(
-            company=company,
-            billable=True,
-            billed_document__isnull=True,
-            status__in=[TimeStatus.APPROVED, TimeStatus.SUBMITTED],
-        ).aggregate(total=Sum("duration_minutes"))["total"]
-        or 0
-    )
-    unbilled_hours = float(unbilled_minutes) / 60.0
+    kpis = dashboard_kpis(company, start_date, end_date)
 
     # Outstanding invoices: earliest due first. Include undated at bottom.
     outstanding_base = (
@@ -280,10 +235,10 @@ def app_dashboard(request: HttpRequest):
         "kpi_period_key": range_key,
         "kpi_period_label": kpi_period_label,
         "kpis": {
-            "revenue_cents": revenue_cents,
-            "expenses_cents": expenses_cents,
-            "ar_cents": ar_cents,
-            "unbilled_hours": unbilled_hours,
+            "revenue_cents": kpis.revenue_cents,
+            "expenses_cents": kpis.expenses_cents,
+            "ar_cents": kpis.ar_cents,
+            "unbilled_hours": kpis.unbilled_hours,
             "ar_as_of": today,
             "unbilled_as_of": today,
         },
@@ -328,28 +283,7 @@ def dashboard_revenue_trend_api(request: HttpRequest) -> JsonResponse:
         next_month = datetime.date(months[-1][0], months[-1][1] + 1, 1)
     end_date = next_month - datetime.timedelta(days=1)
 
-    start_dt = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
-    end_dt = timezone.make_aware(datetime.datetime.combine(end_date, datetime.time.max))
-
-    rows = (
-        Payment.objects.filter(
-            company=company,
-            status=PaymentStatus.SUCCEEDED,
-            created_at__gte=start_dt,
-            created_at__lte=end_dt,
-        )
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(total=Sum("amount_cents"))
-        .order_by("month")
-    )
-
-    by_month: dict[tuple[int, int], int] = {}
-    for r in rows:
-        dt = r.get("month")
-        if not dt:
-            continue
-        by_month[(dt.year, dt.month)] = int(r.get("total") or 0)
+    by_month = monthly_payments(company, start_date, end_date)
 
     labels: list[str] = []
     series: list[int] = []
@@ -373,36 +307,7 @@ def dashboard_ar_aging_api(request: HttpRequest) -> JsonResponse:
 
     today = timezone.localdate()
 
-    invoices = Document.objects.filter(
-        company=company,
-        doc_type=DocumentType.INVOICE,
-        status__in=[DocumentStatus.SENT, DocumentStatus.PARTIALLY_PAID],
-        balance_due_cents__gt=0,
-    ).only("due_date", "created_at", "balance_due_cents")
-
-    buckets = {
-        "Current": 0,
-        "1–30": 0,
-        "31–60": 0,
-        "61–90": 0,
-        "90+": 0,
-    }
-
-    for inv in invoices:
-        ref_date = inv.due_date or timezone.localdate(inv.created_at)
-        age_days = (today - ref_date).days
-        amt = int(inv.balance_due_cents or 0)
-
-        if age_days <= 0:
-            buckets["Current"] += amt
-        elif age_days <= 30:
-            buckets["1–30"] += amt
-        elif age_days <= 60:
-            buckets["31–60"] += amt
-        elif age_days <= 90:
-            buckets["61–90"] += amt
-        else:
-            buckets["90+"] += amt
+    buckets = ar_aging(company, today)
 
     labels = list(buckets.keys())
     series = [buckets[k] for k in labels]
@@ -587,8 +492,8 @@ def health(request: HttpRequest) -> JsonResponse:
 def global_search(request: HttpRequest):
     """Global search across the active company.
 
-    This is intentionally lightweight (v1): it provides a single place to search and jump
-    to the right record, without overbuilding a full-text system.
+    Reads the per-company search index (core.search) in one ranked query,
+    capped at 10 matches per record type.
     """
     if not ensure_active_company_for_user(request):
         return redirect("companies:switch")
@@ -598,93 +503,33 @@ def global_search(request: HttpRequest):
     if not q:
         return redirect("core:app_dashboard")
 
-    # Helpers
-    def _safe(filter_fn, default):
-        try:
-            return filter_fn()
-        except Exception:
-            return default
-
-    # Clients
-    clients = _safe(
-        lambda: list(
-            Client.objects.filter(company=company, deleted_at__isnull=True)
-            .filter(
-                Q(company_name__icontains=q)
-                | Q(first_name__icontains=q)
-                | Q(last_name__icontains=q)
-                | Q(email__icontains=q)
-                | Q(phones__number__icontains=q)
-            )
-            .distinct()
-            .order_by("company_name", "last_name", "first_name")[:10]
-        ),
-        [],
-    )
-
-    # Projects
-    projects = _safe(
-        lambda: list(
-            Project.objects.filter(company=company).filter(
-                # project_number often used by contractors
-                # name/title varies; Project has name in this codebase
-                name__icontains=q
-            ).order_by("-updated_at")[:10]
-        ),
-        [],
-    )
-    if not projects:
-        projects = _safe(
-            lambda: list(
-                Project.objects.filter(company=company).filter(project_number__icontains=q).order_by("-updated_at")[:10]
-            ),
-            [],
-        )
-
-    # Documents (Invoices/Estimates/Proposals)
-    documents = _safe(
-        lambda: list(
-            Document.objects.filter(company=company).filter(
-                number__icontains=q
-            ).select_related("client").order_by("-updated_at")[:10]
-        ),
-        [],
-    )
-    if not documents:
-        documents = _safe(
-            lambda: list(
-                Document.objects.filter(company=company).filter(title__icontains=q).select_related("client").order_by("-updated_at")[:10]
-            ),
-            [],
-        )
-
-    # Expenses
-    expenses = _safe(
-        lambda: list(
-            Expense.objects.filter(company=company).select_related("vendor").filter(
-                description__icontains=q
-            ).order_by("-date", "-created_at")[:10]
-        ),
-        [],
-    )
-
-    # Payments
-    payments = _safe(
-        lambda: list(
-            Payment.objects.filter(company=company).select_related("client").filter(
-                notes__icontains=q
-            ).order_by("-created_at")[:10]
-        ),
-        [],
-    )
+    results = search_index(company, q[:200], per_type=10)
 
     ctx = {
         "company": company,
         "q": q,
-        "clients": clients,
-        "projects": projects,
-        "documents": documents,
-        "expenses": expenses,
-        "payments": payments,
+        "clients": results["client"],
+        "projects": results["project"],
+        "documents": results["document"],
+        "expenses": results["expense"],
+        "payments": results["payment"],
     }
     return render(request, "core/search_results.html", ctx)
+
+
+@login_required
+def global_search_suggest(request: HttpRequest) -> JsonResponse:
+    """Typeahead for the global search box: best prefix matches across all types."""
+    company = get_active_company(request)
+    q = (request.GET.get("q") or "").strip()[:200]
+    if not company or len(q) < 2:
+        return JsonResponse({"results": []})
+    entries = search_suggest(company, q, limit=8)
+    return JsonResponse(
+        {
+            "results": [
+                {"type": e.object_type, "title": e.title, "subtitle": e.subtitle, "url": e.url}
+                for e in entries
+            ]
+        }
+    )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+
+from audit.services import log_event
+from companies.models import EmployeeProfile
+from core.jobs import job_handler
+
+from .models import ClientImportBatch, ClientImportStatus
+from .services_import import run_client_import
+
+
+@job_handler("crm.client_import")
+def client_import(
+    *,
+    batch_id: str,
+    actor_employee_id: str | None = None,
+    actor_user_id: int | None = None,
+) -> dict | None:
+    """Run (or resume) a client CSV import batch; see crm/services_import.py."""
+    batch = ClientImportBatch.objects.select_related("company").filter(id=batch_id).first()
+    if batch is None:
+        return {"skipped": "batch not found"}
+    if batch.status == ClientImportStatus.DONE:
+        return {"skipped": "already imported"}
+
+    user = get_user_model().objects.filter(pk=actor_user_id).first() if actor_user_id else None
+    try:
+        summary = run_client_import(batch, user=user)
+    except Exception as exc:
+        ClientImportBatch.objects.filter(id=batch.id).update(
+            status=ClientImportStatus.FAILED, last_error=f"{exc.__class__.__name__}: {exc}"[:2000]
+        )
+        raise
+
+    counts = {k: int(summary.get(k) or 0) for k in ("created", "updated", "skipped", "errors")}
+    log_event(
+        company=batch.company,
+        actor=EmployeeProfile.objects.filter(id=actor_employee_id).first() if actor_employee_id else None,
+        event_type="client.import",
+        object_type="Client",
+        summary=(
+            f"Imported clients (created={counts['created']}, updated={counts['updated']}, "
+            f"skipped={counts['skipped']}, errors={counts['errors']})"
+        ),
+        payload=counts,
+    )
+    return counts
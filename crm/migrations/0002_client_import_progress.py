@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:43
+
+from django.db import migrations, models
+
+
+def mark_imported_batches_done(apps, schema_editor):
+    ClientImportBatch = apps.get_model("crm", "ClientImportBatch")
+    ClientImportBatch.objects.filter(imported_at__isnull=False).update(status="done")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='duplicate_policy',
+            field=models.CharField(blank=True, default='skip', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='last_error',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='mapping',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='rows_processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='rows_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='clientimportbatch',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16),
+        ),
+        migrations.RunPython(mark_imported_batches_done, migrations.RunPython.noop),
+    ]
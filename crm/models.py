@@ -63,12 +63,23 @@ class ClientPhone(SyncModel):
 
 
 
+class ClientImportStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    QUEUED = "queued", "Queued"
+    RUNNING = "running", "Running"
+    DONE = "done", "Done"
+    FAILED = "failed", "Failed"
+
+
 class ClientImportBatch(models.Model):
     """Temporary storage for client CSV imports.
 
     We store the raw CSV content so we can support a 2-step wizard:
     1) Upload + preview
     2) Map columns + import
+
+    The import itself runs as the `crm.client_import` background job, in
+    chunks; `rows_processed` is the resume cursor (see crm/services_import.py).
     """
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -84,7 +95,18 @@ class ClientImportBatch(models.Model):
     original_filename = models.CharField(max_length=260, blank=True, default="")
     csv_content = models.TextField(blank=True, default="")
 
-    # Import results (stored after running the import so the user can download a report)
+    # Import settings chosen in step 2
+    mapping = models.JSONField(blank=True, default=dict)
+    duplicate_policy = models.CharField(max_length=16, blank=True, default="skip")
+
+    # Progress (updated once per committed chunk)
+    status = models.CharField(max_length=16, choices=ClientImportStatus.choices, default=ClientImportStatus.PENDING)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    # Import results (the report grows chunk by chunk so the user can download it)
     imported_at = models.DateTimeField(null=True, blank=True)
     last_summary = models.JSONField(blank=True, default=dict)
     last_report_csv = models.TextField(blank=True, default="")
@@ -0,0 +1,355 @@
+"""Chunked client CSV import (runs as the `crm.client_import` background job).
+
+The wizard stores the upload and the chosen mapping/duplicate policy on a
+`ClientImportBatch`; this module streams the CSV through `csv.DictReader` and
+imports it `chunk_size` rows at a time:
+
+- existing emails for the company are preloaded once into a dict, so duplicate
+  detection is a lookup instead of a query per row;
+- each chunk is one transaction: clients are written with `bulk_create` /
+  `bulk_update`, phones with one lookup plus `bulk_create`, and the chunk's
+  report lines are appended to `last_report_csv`. Bulk writes skip post_save,
+  so the chunk also records its sync change-log rows, latches the onboarding
+  "clients" step and updates the search index;
+- `rows_processed` advances in the same transaction, so a retried job resumes
+  after the last committed chunk instead of starting over.
+"""
+
+from __future__ import annotations
+
+import csv
+from io import StringIO
+from itertools import islice
+from typing import Iterator
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from core.jobs import extend_lease
+from core.onboarding import STEP_BITS, latch_onboarding_steps
+from core.search import index_rows
+from sync.changelog import record_changes
+
+from .forms import (
+    normalize_email,
+    normalize_phone,
+    normalize_phone_type,
+    normalize_state,
+    normalize_text,
+    normalize_zip,
+)
+from .models import Client, ClientImportBatch, ClientImportStatus, ClientPhone
+
+IMPORT_CHUNK_SIZE = 1000
+
+REPORT_FIELDS = ["row", "action", "client_id", "label", "email", "message"]
+
+_COUNTERS = ("created", "updated", "skipped", "errors")
+
+_UPDATE_FIELDS = [
+    "company_name",
+    "first_name",
+    "last_name",
+    "email",
+    "internal_note",
+    "address1",
+    "address2",
+    "city",
+    "state",
+    "zip_code",
+    "updated_by_user",
+    "updated_at",
+    "revision",
+]
+
+
+def _report_header() -> str:
+    out = StringIO()
+    csv.DictWriter(out, fieldnames=REPORT_FIELDS).writeheader()
+    return out.getvalue()
+
+
+def _canonical_row(raw: dict, mapping: dict) -> dict[str, str]:
+    row: dict[str, str] = {}
+    for dest, src in mapping.items():
+        row[dest] = normalize_text(str(raw.get(src, "") or ""))
+
+    row["email"] = normalize_email(row.get("email", ""))
+    row["state"] = normalize_state(row.get("state", ""))
+    row["zip_code"] = normalize_zip(row.get("zip_code", ""))
+    row["phone1"] = normalize_phone(row.get("phone1", ""))
+    row["phone2"] = normalize_phone(row.get("phone2", ""))
+    return row
+
+
+def _iter_rows(batch: ClientImportBatch, start: int) -> Iterator[tuple[int, dict | Exception]]:
+    """Yield (csv row number, canonical row or parse error), skipping `start` data rows."""
+    reader = csv.DictReader(StringIO(batch.csv_content))
+    mapping = batch.mapping or {}
+    for idx, raw in islice(enumerate(reader, start=2), start, None):  # header is row 1
+        try:
+            yield idx, _canonical_row(raw or {}, mapping)
+        except Exception as e:
+            yield idx, e
+
+
+def count_import_rows(csv_content: str) -> int:
+    return sum(1 for _ in csv.DictReader(StringIO(csv_content)))
+
+
+def existing_email_index(company) -> dict[str, object]:
+    """Lowercased email -> id of the oldest live client with that email."""
+    index: dict[str, object] = {}
+    rows = (
+        Client.objects.filter(company=company)
+        .exclude(email="")
+        .order_by("created_at", "id")
+        .values_list("email", "id")
+    )
+    for email, client_id in rows.iterator(chunk_size=5000):
+        index.setdefault(email.strip().lower(), client_id)
+    return index
+
+
+def _apply_update(client: Client, row: dict[str, str], email: str, *, user, now) -> None:
+    client.company_name = row.get("company_name") or client.company_name
+    client.first_name = row.get("first_name") or client.first_name
+    client.last_name = row.get("last_name") or client.last_name
+    client.email = email or client.email
+    client.internal_note = row.get("internal_note") or client.internal_note
+    client.address1 = row.get("address1") or client.address1
+    client.address2 = row.get("address2") or client.address2
+    client.city = row.get("city") or client.city
+    if row.get("state"):
+        client.state = (row.get("state") or "")[:2]
+    if row.get("zip_code"):
+        client.zip_code = row.get("zip_code") or client.zip_code
+    client.updated_by_user = user
+    client.updated_at = now
+    client.revision = (client.revision or 0) + 1
+
+
+def _import_chunk(
+    batch: ClientImportBatch,
+    chunk: list[tuple[int, dict | Exception]],
+    *,
+    emails: dict[str, object],
+    user,
+) -> None:
+    """Import one chunk and advance the batch cursor in the same transaction."""
+    company = batch.company
+    policy = batch.duplicate_policy or "skip"
+    dedupe = policy in ("skip", "update")
+    now = timezone.now()
+
+    counts = dict.fromkeys(_COUNTERS, 0)
+    report_out = StringIO()
+    report = csv.DictWriter(report_out, fieldnames=REPORT_FIELDS)
+
+    # One query for every existing client this chunk refers to.
+    wanted = set()
+    if dedupe:
+        for _idx, row in chunk:
+            if isinstance(row, dict) and row.get("email"):
+                client_id = emails.get(row["email"].lower())
+                if client_id is not None:
+                    wanted.add(client_id)
+    clients: dict = Client.objects.filter(company=company).in_bulk(list(wanted)) if wanted else {}
+
+    to_create: dict = {}
+    to_update: dict = {}
+    phone_rows: list[tuple[Client, str, str]] = []
+
+    for idx, row in chunk:
+        if isinstance(row, Exception):
+            counts["errors"] += 1
+            report.writerow({"row": idx, "action": "error", "client_id": "", "label": "", "email": "", "message": f"Parse error: {row}"})
+            continue
+
+        # Minimal emptiness check
+        if not any(v for v in row.values()):
+            continue
+
+        email = row.get("email") or ""
+        existing = clients.get(emails.get(email.lower())) if dedupe and email else None
+
+        if existing is not None and policy == "skip":
+            counts["skipped"] += 1
+            report.writerow(
+                {
+                    "row": idx,
+                    "action": "skipped",
+                    "client_id": str(existing.id),
+                    "label": existing.display_label(),
+                    "email": existing.email,
+                    "message": "Email already exists",
+                }
+            )
+            continue
+
+        if existing is not None:
+            client = existing
+            _apply_update(client, row, email, user=user, now=now)
+            if client.id not in to_create:
+                to_update[client.id] = client
+            counts["updated"] += 1
+            report.writerow(
+                {
+                    "row": idx,
+                    "action": "updated",
+                    "client_id": str(client.id),
+                    "label": client.display_label(),
+                    "email": client.email,
+                    "message": "Updated existing by email",
+                }
+            )
+        else:
+            client = Client(
+                company=company,
+                company_name=row.get("company_name", ""),
+                first_name=row.get("first_name", ""),
+                last_name=row.get("last_name", ""),
+                email=email,
+                internal_note=row.get("internal_note", ""),
+                address1=row.get("address1", ""),
+                address2=row.get("address2", ""),
+                city=row.get("city", ""),
+                state=(row.get("state", "") or "")[:2],
+                zip_code=(row.get("zip_code", "") or ""),
+                updated_by_user=user,
+                revision=1,
+            )
+            to_create[client.id] = client
+            if dedupe and email:
+                # Later rows with the same email (in this or a later chunk) match this client.
+                emails.setdefault(email.lower(), client.id)
+                clients[client.id] = client
+            counts["created"] += 1
+            report.writerow(
+                {
+                    "row": idx,
+                    "action": "created",
+                    "client_id": str(client.id),
+                    "label": client.display_label(),
+                    "email": client.email,
+                    "message": "Created new",
+                }
+            )
+
+        for num_key, type_key in (("phone1", "phone1_type"), ("phone2", "phone2_type")):
+            number = (row.get(num_key) or "").strip()
+            if number:
+                phone_rows.append((client, number, row.get(type_key) or ""))
+
+    existing_phones: set = set()
+    if phone_rows and to_update:
+        existing_phones = set(
+            ClientPhone.objects.filter(client_id__in=list(to_update), number__in={n for _c, n, _t in phone_rows}).values_list(
+                "client_id", "number"
+            )
+        )
+    phones: list[ClientPhone] = []
+    for client, number, phone_type in phone_rows:
+        key = (client.id, number)
+        if key in existing_phones:
+            continue
+        existing_phones.add(key)
+        phones.append(
+            ClientPhone(
+                client=client,
+                number=number,
+                phone_type=normalize_phone_type(phone_type),
+                revision=1,
+                updated_by_user=user,
+            )
+        )
+
+    with transaction.atomic():
+        locked = ClientImportBatch.objects.select_for_update().only("rows_processed", "last_summary").get(pk=batch.pk)
+        if locked.rows_processed != batch.rows_processed:
+            raise RuntimeError("Client import batch advanced concurrently; retrying from the stored cursor.")
+
+        if to_create:
+            Client.objects.bulk_create(list(to_create.values()), batch_size=500)
+        if to_update:
+            Client.objects.bulk_update(list(to_update.values()), _UPDATE_FIELDS, batch_size=500)
+        if phones:
+            ClientPhone.objects.bulk_create(phones, batch_size=500)
+        # bulk writes skip post_save: log the chunk for desktop sync, latch the onboarding
+        # "clients" step and index the chunk's clients (with their phones) explicitly.
+        record_changes([*to_create.values(), *to_update.values(), *phones], company_id=company.id)
+        if to_create:
+            latch_onboarding_steps(company.id, STEP_BITS["clients"])
+        touched = [*to_create, *to_update]
+        if touched:
+            index_rows(Client, Client.objects.filter(pk__in=touched).prefetch_related("phones"))
+
+        summary = dict(locked.last_summary or {})
+        for key, n in counts.items():
+            summary[key] = int(summary.get(key) or 0) + n
+        batch.rows_processed += len(chunk)
+        batch.last_summary = summary
+        ClientImportBatch.objects.filter(pk=batch.pk).update(
+            rows_processed=batch.rows_processed,
+            last_summary=summary,
+            last_report_csv=Concat(F("last_report_csv"), Value(report_out.getvalue())),
+        )
+
+
+def start_client_import(batch: ClientImportBatch, *, mapping: dict, duplicate_policy: str) -> None:
+    """Record the wizard's choices and reset progress before the job is queued."""
+    batch.mapping = mapping
+    batch.duplicate_policy = duplicate_policy or "skip"
+    batch.status = ClientImportStatus.QUEUED
+    batch.rows_total = count_import_rows(batch.csv_content)
+    batch.rows_processed = 0
+    batch.started_at = None
+    batch.imported_at = None
+    batch.last_error = ""
+    batch.last_summary = dict.fromkeys(_COUNTERS, 0)
+    batch.last_report_csv = _report_header()
+    batch.save(
+        update_fields=[
+            "mapping",
+            "duplicate_policy",
+            "status",
+            "rows_total",
+            "rows_processed",
+            "started_at",
+            "imported_at",
+            "last_error",
+            "last_summary",
+            "last_report_csv",
+        ]
+    )
+
+
+def run_client_import(batch: ClientImportBatch, *, user=None, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """Import (or resume importing) a queued batch. Returns the final summary."""
+    if batch.status == ClientImportStatus.DONE:
+        return dict(batch.last_summary or {})
+
+    batch.status = ClientImportStatus.RUNNING
+    batch.started_at = batch.started_at or timezone.now()
+    batch.last_error = ""
+    batch.save(update_fields=["status", "started_at", "last_error"])
+
+    emails = existing_email_index(batch.company) if batch.duplicate_policy in ("skip", "update") else {}
+    rows = _iter_rows(batch, batch.rows_processed)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _import_chunk(batch, chunk, emails=emails, user=user)
+        extend_lease()
+
+    summary = dict(batch.last_summary or {})
+    summary["duplicate_policy"] = batch.duplicate_policy
+    summary["mapping"] = batch.mapping
+    batch.last_summary = summary
+    batch.status = ClientImportStatus.DONE
+    batch.imported_at = timezone.now()
+    batch.save(update_fields=["last_summary", "status", "imported_at"])
+    return summary
@@ -1,3 +1,147 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from audit.models import AuditEvent
+from companies.models import Company, EmployeeProfile, EmployeeRole
+from companies.services import ACTIVE_COMPANY_SESSION_KEY
+from core.onboarding import STEP_BITS
+from crm import services_import
+from crm.forms import normalize_phone
+from crm.models import Client, ClientImportBatch, ClientImportStatus, ClientPhone
+from crm.services_import import run_client_import, start_client_import
+from sync.models import SyncChange
+
+MAPPING = {"first_name": "First", "last_name": "Last", "email": "Email", "phone1": "Phone"}
+
+
+def _csv(rows: list[tuple[str, str, str, str]]) -> str:
+    lines = ["First,Last,Email,Phone"] + [",".join(r) for r in rows]
+    return "\n".join(lines) + "\n"
+
+
+class ClientImportEngineTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.existing = Client.objects.create(company=self.company, first_name="Old", email="ada@example.com")
+        ClientPhone.objects.create(client=self.existing, number=normalize_phone("5551110000"))
+
+    def _batch(self, rows, policy="update"):
+        batch = ClientImportBatch.objects.create(company=self.company, csv_content=_csv(rows))
+        start_client_import(batch, mapping=MAPPING, duplicate_policy=policy)
+        return batch
+
+    def test_chunks_dedupe_against_preloaded_and_in_file_emails(self):
+        rows = [(f"P{i}", "Smith", f"p{i}@example.com", f"555200{i:04d}") for i in range(40)]
+        rows += [
+            ("Ada", "Lovelace", "ADA@example.com", "555-111-0000"),
+            ("Dup", "Row", "p3@example.com", "5553330000"),
+            ("", "", "", ""),
+        ]
+        batch = self._batch(rows)
+        self.assertEqual(batch.rows_total, 43)
+
+        with CaptureQueriesContext(connection) as ctx:
+            summary = run_client_import(batch, chunk_size=10)
+        # Five chunks of about a dozen statements each (incl. search indexing) — not one lookup per row.
+        self.assertLess(len(ctx.captured_queries), 70)
+        self.assertEqual((summary["created"], summary["updated"], summary["skipped"]), (40, 2, 0))
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.rows_processed), (ClientImportStatus.DONE, 43))
+        self.existing.refresh_from_db()
+        self.assertEqual((self.existing.first_name, self.existing.revision), ("Ada", 1))
+        self.assertEqual(self.existing.phones.count(), 1)
+        p3 = Client.objects.get(company=self.company, email="p3@example.com")
+        self.assertEqual(p3.first_name, "Dup")
+        self.assertEqual(p3.phones.count(), 2)
+        self.assertEqual(batch.last_report_csv.count("\n"), 43)  # header + 42 reported rows
+
+    def test_failed_chunk_resumes_from_cursor(self):
+        rows = [(f"P{i}", "Smith", f"p{i}@example.com", "") for i in range(25)]
+        batch = self._batch(rows, policy="skip")
+
+        real = services_import._import_chunk
+        calls = {"n": 0}
+
+        def flaky(*args, **kwargs):
+            calls["n"] += 1
+            if calls["n"] == 2:
+                raise RuntimeError("db went away")
+            return real(*args, **kwargs)
+
+        with mock.patch.object(services_import, "_import_chunk", side_effect=flaky):
+            with self.assertRaises(RuntimeError):
+                run_client_import(batch, chunk_size=10)
+        batch.refresh_from_db()
+        self.assertEqual(batch.rows_processed, 10)
+
+        summary = run_client_import(batch, chunk_size=10)
+        self.assertEqual((summary["created"], summary["skipped"]), (25, 0))
+        self.assertEqual(Client.objects.filter(company=self.company).count(), 26)
+        batch.refresh_from_db()
+        self.assertEqual(batch.last_report_csv.count("created"), 25)
+
+    def test_imported_rows_are_logged_for_sync_and_latch_onboarding(self):
+        fresh = Company.objects.create(name="Fresh Co")
+        batch = ClientImportBatch.objects.create(
+            company=fresh, csv_content=_csv([("Ann", "A", "ann@example.com", "5550001111"), ("Bob", "B", "ann@example.com", "")])
+        )
+        start_client_import(batch, mapping=MAPPING, duplicate_policy="update")
+        run_client_import(batch, chunk_size=1)
+
+        client = Client.objects.get(company=fresh)
+        logged = SyncChange.objects.filter(company=fresh)
+        # Created in the first chunk, updated in the second.
+        self.assertEqual(list(logged.filter(model_key="crm.Client").values_list("object_id", flat=True)), [client.id, client.id])
+        self.assertEqual(logged.filter(model_key="crm.ClientPhone").count(), 1)
+        fresh.refresh_from_db()
+        self.assertTrue(fresh.onboarding_flags & STEP_BITS["clients"])
+
+    def _login(self):
+        user = get_user_model().objects.create_user(email="imp@example.com", username="imp", password="pass12345")
+        user.email_verified = True
+        user.save(update_fields=["email_verified"])
+        EmployeeProfile.objects.create(company=self.company, user=user, username_public="imp", role=EmployeeRole.OWNER)
+        self.client.force_login(user)
+        session = self.client.session
+        session[ACTIVE_COMPANY_SESSION_KEY] = str(self.company.id)
+        session.save()
+
+    def test_wizard_queues_job_and_blocks_reimport(self):
+        self._login()
+        batch = ClientImportBatch.objects.create(company=self.company, csv_content=_csv([("Bo", "Lee", "bo@example.com", "")]))
+        url = reverse("crm:client_import_map", args=[batch.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(url, {**MAPPING, "duplicate_policy": "skip"})
+        self.assertRedirects(resp, reverse("crm:client_import_done", args=[batch.id]))
+
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.last_summary["created"]), (ClientImportStatus.DONE, 1))
+        self.assertTrue(AuditEvent.objects.filter(company=self.company, event_type="client.import").exists())
+
+        # The finished batch cannot be imported a second time.
+        self.client.post(url, {**MAPPING, "duplicate_policy": "skip"})
+        self.assertEqual(Client.objects.filter(company=self.company, email="bo@example.com").count(), 1)
+
+    def test_client_export_streams_with_prefetched_phones(self):
+        self._login()
+        for i in range(30):
+            c = Client.objects.create(company=self.company, company_name=f"Co {i:02d}")
+            ClientPhone.objects.create(client=c, number=normalize_phone(f"55500000{i:02d}"))
 
-# Create your tests here.
+        resp = self.client.get(reverse("crm:client_export"))
+        self.assertTrue(resp.streaming)
+        with CaptureQueriesContext(connection) as ctx:
+            lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 32)  # header + 31 clients
+        self.assertTrue(lines[2].startswith("Co 00,"))
+        self.assertIn("(555) 000-0000", lines[2])
+        # One client chunk plus one phone prefetch, however many clients there are.
+        self.assertLessEqual(len(ctx.captured_queries), 2)
@@ -18,6 +18,8 @@ from projects.models import Project
 
 from documents.models import ClientStatementActivity
 
+from core.csv_utils import queryset_csv_response
+from core.jobs import enqueue
 from core.pagination import paginate
 
 from .forms import (
@@ -26,15 +28,11 @@ from .forms import (
     ClientImportUploadWizardForm,
     ClientImportMapWizardForm,
     ClientPhoneFormSet,
-    normalize_email,
-    normalize_phone,
-    normalize_state,
     normalize_text,
-    normalize_zip,
-    normalize_phone_type,
     suggest_client_mapping,
 )
-from .models import Client, ClientPhone, ClientImportBatch, ClientImportMapping
+from .models import Client, ClientImportBatch, ClientImportMapping, ClientImportStatus
+from .services_import import start_client_import
 
 
 def _cents_to_dollars(cents: int) -> str:
@@ -327,6 +325,9 @@ def client_import_map(request: HttpRequest, batch_id) -> HttpResponse:
 
     company = request.active_company
     batch = get_object_or_404(ClientImportBatch, id=batch_id, company=company)
+    if batch.status != ClientImportStatus.PENDING:
+        # Already queued/imported: never import the same upload twice.
+        return redirect("crm:client_import_done", batch_id=batch.id)
 
     def _extract_headers_and_preview(csv_content: str, preview_rows: int = 10):
         reader = csv.DictReader(StringIO(csv_content))
@@ -388,179 +389,20 @@ def client_import_map(request: HttpRequest, batch_id) -> HttpResponse:
                 if created:
                     messages.success(request, f"Saved mapping: {obj.name}")
 
-            created_count = 0
-            updated_count = 0
-            skipped_count = 0
-            error_count = 0
-
-            report_out = StringIO()
-            report_writer = csv.DictWriter(
-                report_out,
-                fieldnames=["row", "action", "client_id", "label", "email", "message"],
-            )
-            report_writer.writeheader()
-
-            reader = csv.DictReader(StringIO(batch.csv_content))
-
+            # Rows are imported by the `crm.client_import` job in resumable chunks.
             with transaction.atomic():
-                for idx, raw in enumerate(reader, start=2):  # header is row 1
-                    if not raw:
-                        continue
-
-                    try:
-                        # Build canonical row dict using mapping
-                        row: dict[str, str] = {}
-                        for dest, src in mapping.items():
-                            row[dest] = normalize_text(str(raw.get(src, "") or ""))
-
-                        # Normalization pass
-                        row["email"] = normalize_email(row.get("email", ""))
-                        row["state"] = normalize_state(row.get("state", ""))
-                        row["zip_code"] = normalize_zip(row.get("zip_code", ""))
-                        row["phone1"] = normalize_phone(row.get("phone1", ""))
-                        row["phone2"] = normalize_phone(row.get("phone2", ""))
-                    except Exception as e:
-                        error_count += 1
-                        report_writer.writerow(
-                            {
-                                "row": idx,
-                                "action": "error",
-                                "client_id": "",
-                                "label": "",
-                                "email": "",
-                                "message": f"Parse error: {e}",
-                            }
-                        )
-                        continue
-
-                    # Minimal emptiness check
-                    if not any(v for v in row.values()):
-                        continue
-
-                    email = normalize_email(row.get("email") or "")
-                    existing = None
-                    if email:
-                        existing = Client.objects.filter(company=company, deleted_at__isnull=True, email__iexact=email).first()
-
-                    if existing and duplicate_policy == "skip":
-                        skipped_count += 1
-                        report_writer.writerow(
-                            {
-                                "row": idx,
-                                "action": "skipped",
-                                "client_id": str(existing.id),
-                                "label": existing.display_label(),
-                                "email": existing.email,
-                                "message": "Email already exists",
-                            }
-                        )
-                        continue
-
-                    if existing and duplicate_policy == "update":
-                        client = existing
-                        client.company_name = row.get("company_name") or client.company_name
-                        client.first_name = row.get("first_name") or client.first_name
-                        client.last_name = row.get("last_name") or client.last_name
-                        client.email = email or client.email
-                        client.internal_note = row.get("internal_note") or client.internal_note
-                        client.address1 = row.get("address1") or client.address1
-                        client.address2 = row.get("address2") or client.address2
-                        client.city = row.get("city") or client.city
-                        if row.get("state"):
-                            client.state = (row.get("state") or "")[:2]
-                        if row.get("zip_code"):
-                            client.zip_code = row.get("zip_code") or client.zip_code
-                        client.updated_by_user = request.user
-                        client.updated_at = timezone.now()
-                        client.revision = (client.revision or 0) + 1
-                        client.save()
-                        updated_count += 1
-                        report_writer.writerow(
-                            {
-                                "row": idx,
-                                "action": "updated",
-                                "client_id": str(client.id),
-                                "label": client.display_label(),
-                                "email": client.email,
-                                "message": "Updated existing by email",
-                            }
-                        )
-                    else:
-                        client = Client(
-                            company=company,
-                            company_name=row.get("company_name", ""),
-                            first_name=row.get("first_name", ""),
-                            last_name=row.get("last_name", ""),
-                            email=email,
-                            internal_note=row.get("internal_note", ""),
-                            address1=row.get("address1", ""),
-                            address2=row.get("address2", ""),
-                            city=row.get("city", ""),
-                            state=(row.get("state", "") or "")[:2],
-                            zip_code=(row.get("zip_code", "") or ""),
-                            updated_by_user=request.user,
-                            revision=1,
-                        )
-                        client.save()
-                        created_count += 1
-                        report_writer.writerow(
-                            {
-                                "row": idx,
-                                "action": "created",
-                                "client_id": str(client.id),
-                                "label": client.display_label(),
-                                "email": client.email,
-                                "message": "Created new",
-                            }
-                        )
-
-                    # Phones
-                    phone1 = (row.get("phone1") or "").strip()
-                    if phone1:
-                        ClientPhone.objects.get_or_create(
-                            client=client,
-                            number=phone1,
-                            defaults={
-                                "phone_type": normalize_phone_type(row.get("phone1_type") or ""),
-                                "revision": 1,
-                                "updated_by_user": request.user,
-                            },
-                        )
-                    phone2 = (row.get("phone2") or "").strip()
-                    if phone2:
-                        ClientPhone.objects.get_or_create(
-                            client=client,
-                            number=phone2,
-                            defaults={
-                                "phone_type": normalize_phone_type(row.get("phone2_type") or ""),
-                                "revision": 1,
-                                "updated_by_user": request.user,
-                            },
-                        )
-
-                log_event(
+                start_client_import(batch, mapping=mapping, duplicate_policy=duplicate_policy)
+                enqueue(
+                    "crm.client_import",
                     company=company,
-                    actor=request.active_employee,
-                    event_type="client.import",
-                    object_type="Client",
-                    summary=f"Imported clients (created={created_count}, updated={updated_count}, skipped={skipped_count}, errors={error_count})",
-                    payload={"created": created_count, "updated": updated_count, "skipped": skipped_count, "errors": error_count},
-                    request=request,
+                    payload={
+                        "batch_id": str(batch.id),
+                        "actor_employee_id": str(request.active_employee.id) if request.active_employee else None,
+                        "actor_user_id": request.user.pk,
+                    },
+                    dedupe_key=f"crm_client_import:{batch.id}",
                 )
 
-                # Persist results and report on batch (do not delete so report can be downloaded)
-                batch.imported_at = timezone.now()
-                batch.last_summary = {
-                    "created": created_count,
-                    "updated": updated_count,
-                    "skipped": skipped_count,
-                    "errors": error_count,
-                    "duplicate_policy": duplicate_policy,
-                    "mapping": mapping,
-                }
-                batch.last_report_csv = report_out.getvalue()
-                batch.save(update_fields=["imported_at", "last_summary", "last_report_csv"])
-
             return redirect("crm:client_import_done", batch_id=batch.id)
     else:
         form = ClientImportMapWizardForm(csv_headers=headers, initial_mapping=initial_mapping)
@@ -585,12 +427,18 @@ def client_import_done(request: HttpRequest, batch_id) -> HttpResponse:
     company = request.active_company
     batch = get_object_or_404(ClientImportBatch, id=batch_id, company=company)
     summary = batch.last_summary or {}
+    in_progress = batch.status in (ClientImportStatus.QUEUED, ClientImportStatus.RUNNING)
+    progress_pct = 100
+    if batch.status != ClientImportStatus.DONE and batch.rows_total:
+        progress_pct = min(100, int(batch.rows_processed * 100 / batch.rows_total))
     return render(
         request,
         "crm/client_import_done.html",
         {
             "batch": batch,
             "summary": summary,
+            "in_progress": in_progress,
+            "progress_pct": progress_pct,
         },
     )
 
@@ -616,34 +464,26 @@ def client_export(request: HttpRequest) -> HttpResponse:
 
     qs = _visible_clients_qs(request).order_by("company_name", "last_name", "first_name")
 
-    # Build CSV in memory
-    output = StringIO()
-    writer = csv.DictWriter(output, fieldnames=CLIENT_EXPORT_FIELDS)
-    writer.writeheader()
-
-    for c in qs:
+    def _row(c: Client) -> list[str]:
         phones = [p for p in c.phones.all() if p.deleted_at is None]
         phone1 = phones[0] if len(phones) >= 1 else None
         phone2 = phones[1] if len(phones) >= 2 else None
-
-        writer.writerow(
-            {
-                "company_name": c.company_name,
-                "first_name": c.first_name,
-                "last_name": c.last_name,
-                "email": c.email,
-                "internal_note": c.internal_note,
-                "address1": c.address1,
-                "address2": c.address2,
-                "city": c.city,
-                "state": c.state,
-                "zip_code": c.zip_code,
-                "phone1": phone1.number if phone1 else "",
-                "phone1_type": phone1.phone_type if phone1 else "",
-                "phone2": phone2.number if phone2 else "",
-                "phone2_type": phone2.phone_type if phone2 else "",
-            }
-        )
+        return [
+            c.company_name,
+            c.first_name,
+            c.last_name,
+            c.email,
+            c.internal_note,
+            c.address1,
+            c.address2,
+            c.city,
+            c.state,
+            c.zip_code,
+            phone1.number if phone1 else "",
+            phone1.phone_type if phone1 else "",
+            phone2.number if phone2 else "",
+            phone2.phone_type if phone2 else "",
+        ]
 
     log_event(
         company=company,
@@ -655,9 +495,8 @@ def client_export(request: HttpRequest) -> HttpResponse:
         request=request,
     )
 
-    resp = HttpResponse(output.getvalue(), content_type="text/csv")
-    resp["Content-Disposition"] = 'attachment; filename="clients.csv"'
-    return resp
+    # Streamed: phones are prefetched per chunk, so memory stays flat for large books.
+    return queryset_csv_response("clients.csv", CLIENT_EXPORT_FIELDS, qs, _row)
 
 
 @company_context_required
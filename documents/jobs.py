@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from companies.models import Company, EmployeeProfile
+from core.jobs import job_handler
+from crm.models import Client
+
+from .models import ClientStatementRecipientPreference
+from .services_statements import send_statement_copy_to_actor, send_statement_to_client
+
+
+def _date(value: str | None) -> date | None:
+    return date.fromisoformat(value) if value else None
+
+
+@job_handler("documents.send_statement_email")
+def send_statement_email(
+    *,
+    company_id: str,
+    client_id: str,
+    actor_employee_id: str | None = None,
+    actor_user_id: int | None = None,
+    to_email: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    attach_pdf: bool = False,
+    template_variant: str = "sent",
+    copy_to_email: str = "",
+    remember_recipient: bool = False,
+) -> dict:
+    """Send a client statement (plus optional copy to the actor) off the request path."""
+    company = Company.objects.get(id=company_id)
+    client = Client.objects.get(id=client_id, company=company)
+    actor = EmployeeProfile.objects.filter(id=actor_employee_id).first() if actor_employee_id else None
+
+    res = send_statement_to_client(
+        company=company,
+        client=client,
+        actor=actor,
+        to_email=to_email or None,
+        date_from=_date(date_from),
+        date_to=_date(date_to),
+        attach_pdf=attach_pdf,
+        template_variant=template_variant or "sent",
+    )
+    if not res.sent:
+        return {"sent": False, "message": res.message}
+
+    # Optional: email the acting user a copy (best-effort; never blocks primary send).
+    if copy_to_email and copy_to_email.strip().lower() != (res.to or "").strip().lower():
+        try:
+            send_statement_copy_to_actor(
+                company=company,
+                client=client,
+                actor=actor,
+                to_email=copy_to_email,
+                date_from=_date(date_from),
+                date_to=_date(date_to),
+                attach_pdf=attach_pdf,
+            )
+        except Exception:
+            pass
+
+    # Persist last-used recipient per client (per company) for faster collections workflows.
+    if remember_recipient and (res.to or "").strip():
+        try:
+            ClientStatementRecipientPreference.objects.update_or_create(
+                company=company,
+                client=client,
+                defaults={
+                    "last_to_email": (res.to or "").strip(),
+                    "updated_at": timezone.now(),
+                    "updated_by": get_user_model().objects.filter(pk=actor_user_id).first() if actor_user_id else None,
+                },
+            )
+        except Exception:
+            pass
+
+    return {"sent": True, "to": res.to}
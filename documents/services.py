@@ -173,7 +173,11 @@ def recalc_document_totals(doc: Document) -> None:
                 changed.append(li)
 
         if changed:
+            from sync.changelog import record_changes
+
             DocumentLineItem.objects.bulk_update(changed, ["tax_cents", "line_total_cents", "updated_at"])
+            # bulk_update bypasses post_save; log for desktop sync explicitly.
+            record_changes(changed)
 
         # Roll up totals
         for li in items:
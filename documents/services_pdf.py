@@ -0,0 +1,173 @@
+"""Rendered PDF artifact cache.
+
+WeasyPrint costs seconds of CPU per render, while most downloads are repeats
+of an unchanged invoice or statement. Rendered PDFs are stored in private
+media under a content hash of everything the template reads (document, line
+items, client/project, company branding, template source), so any edit yields
+a new key and stale artifacts are simply never looked up again. Cached PDFs
+are stamped with the render date (not time), which is part of the key, so the
+"Generated" line stays true.
+
+Layout: `pdf-cache/<company_id>/<kind>/<object_id>/<fingerprint>.pdf`
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from typing import Iterable
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.template.loader import get_template
+
+from core.s3_presign import presign_private_download
+from core.services.private_media import _normalize_key
+from core.storages import PrivateMediaStorage
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "pdf-cache"
+
+# Bump to invalidate every cached PDF (e.g. after a WeasyPrint upgrade).
+FORMAT_VERSION = 1
+
+
+def pdf_cache_enabled() -> bool:
+    return bool(getattr(settings, "EZ360_PDF_CACHE_ENABLED", True))
+
+
+def _storage():
+    # PrivateMediaStorage subclasses S3Boto3Storage whenever django-storages is
+    # importable, even with USE_S3=0; use plain local storage in that case.
+    if getattr(settings, "USE_S3", False):
+        return PrivateMediaStorage()
+    return FileSystemStorage()
+
+
+@lru_cache(maxsize=16)
+def template_hash(template_name: str) -> str:
+    """Hash of a template's source, so template/branding edits invalidate cached PDFs."""
+    try:
+        source = get_template(template_name).template.source
+    except Exception:
+        source = template_name
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def _digest(parts: dict) -> str:
+    raw = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def _row_part(obj) -> list:
+    """Every concrete field value of a row.
+
+    `revision` is only bumped by desktop sync writes, so web edits are detected
+    from the field values themselves.
+    """
+    if obj is None:
+        return []
+    return [field.value_from_object(obj) for field in obj._meta.concrete_fields]
+
+
+def document_pdf_fingerprint(doc, items: Iterable, *, company, template_name: str, generated_on) -> str:
+    """Fingerprint of everything `documents/document_pdf.html` renders for `doc`."""
+    return _digest(
+        {
+            "v": FORMAT_VERSION,
+            "tpl": template_hash(template_name),
+            "on": generated_on,
+            "doc": _row_part(doc),
+            "items": [_row_part(i) for i in items],
+            "client": _row_part(doc.client),
+            "project": _row_part(doc.project),
+            "company": _row_part(company),
+        }
+    )
+
+
+def statement_pdf_fingerprint(company, client, rows: list, *, date_from, date_to, template_name: str, generated_on) -> str:
+    """Fingerprint of a client statement: the open invoices and their balances plus the range."""
+    return _digest(
+        {
+            "v": FORMAT_VERSION,
+            "tpl": template_hash(template_name),
+            "on": generated_on,
+            "client": _row_part(client),
+            "company": _row_part(company),
+            "range": [date_from, date_to],
+            "rows": [_row_part(r.invoice) + [r.paid, r.credit_notes, r.credit_apps, r.balance] for r in rows],
+            "site": getattr(settings, "SITE_BASE_URL", ""),
+        }
+    )
+
+
+def _object_dir(company_id, kind: str, object_id) -> str:
+    return f"{CACHE_PREFIX}/{company_id}/{kind}/{object_id}"
+
+
+def cached_pdf_name(company_id, kind: str, object_id, fingerprint: str) -> str:
+    return f"{_object_dir(company_id, kind, object_id)}/{fingerprint}.pdf"
+
+
+def has_cached_pdf(name: str) -> bool:
+    try:
+        return _storage().exists(name)
+    except Exception:
+        logger.warning("pdf_cache_lookup_failed name=%s", name, exc_info=True)
+        return False
+
+
+def read_cached_pdf(name: str) -> bytes | None:
+    try:
+        with _storage().open(name, "rb") as fh:
+            return fh.read()
+    except Exception:
+        return None
+
+
+def store_cached_pdf(name: str, pdf_bytes: bytes) -> bool:
+    """Save a rendered PDF and drop older renders of the same object. Best-effort."""
+    storage = _storage()
+    try:
+        if storage.exists(name):
+            return True
+        saved = storage.save(name, ContentFile(pdf_bytes))
+    except Exception:
+        logger.warning("pdf_cache_store_failed name=%s", name, exc_info=True)
+        return False
+
+    directory, _, current = saved.rpartition("/")
+    try:
+        _dirs, files = storage.listdir(directory)
+        for fname in files:
+            if fname != current:
+                storage.delete(f"{directory}/{fname}")
+    except Exception:
+        pass
+    return saved == name
+
+
+def cached_pdf_response(name: str, *, filename: str) -> HttpResponse | None:
+    """Serve a cached PDF: a presigned redirect on S3, a streamed file locally."""
+    storage = _storage()
+    if getattr(settings, "USE_S3", False):
+        key = _normalize_key(storage=storage, name=name)
+        try:
+            url = presign_private_download(key=key, filename=filename, content_type="application/pdf")
+        except Exception:
+            logger.warning("pdf_cache_presign_failed name=%s", name, exc_info=True)
+            return None
+        return HttpResponseRedirect(url)
+
+    try:
+        fh = storage.open(name, "rb")
+    except Exception:
+        return None
+    return FileResponse(fh, as_attachment=True, filename=filename, content_type="application/pdf")
+
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from typing import Any
 
 from django.conf import settings
+from django.db.models import Q, Sum
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
@@ -14,7 +15,119 @@ from core.email_utils import EmailSpec, send_templated_email
 from crm.models import Client
 from companies.models import Company, EmployeeProfile
 
-from .models import ClientStatementActivity
+from .models import ClientStatementActivity, CreditNote, CreditNoteStatus, Document, DocumentStatus, DocumentType
+
+
+def format_money(cents: int) -> str:
+    try:
+        return f"{(int(cents or 0) / 100):,.2f}"
+    except Exception:
+        return "0.00"
+
+
+@dataclass(frozen=True)
+class StatementRow:
+    """One open invoice on a client statement (amounts in cents)."""
+
+    invoice: Document
+    total: int
+    paid: int
+    credit_notes: int
+    credit_apps: int
+    balance: int
+
+    @property
+    def credits(self) -> int:
+        return self.credit_notes + self.credit_apps
+
+    @property
+    def total_display(self) -> str:
+        return format_money(self.total)
+
+    @property
+    def paid_display(self) -> str:
+        return format_money(self.paid)
+
+    @property
+    def credits_display(self) -> str:
+        return format_money(self.credits)
+
+    @property
+    def balance_display(self) -> str:
+        return format_money(self.balance)
+
+
+@dataclass(frozen=True)
+class Statement:
+    rows: list[StatementRow]
+    total_due: int
+
+    @property
+    def total_due_display(self) -> str:
+        return format_money(self.total_due)
+
+
+def statement_invoices(company: Company, client: Client, *, date_from=None, date_to=None):
+    """Open (not paid/void) invoices for a client statement, oldest first."""
+    qs = (
+        Document.objects.filter(
+            company=company,
+            doc_type=DocumentType.INVOICE,
+            client=client,
+            deleted_at__isnull=True,
+        )
+        .exclude(status__in=[DocumentStatus.PAID, DocumentStatus.VOID])
+        .order_by("issue_date", "created_at")
+    )
+
+    # Optional date-range filtering (applies to issue_date when present; falls back to created_at date)
+    if date_from:
+        qs = qs.filter(Q(issue_date__gte=date_from) | Q(issue_date__isnull=True, created_at__date__gte=date_from))
+    if date_to:
+        qs = qs.filter(Q(issue_date__lte=date_to) | Q(issue_date__isnull=True, created_at__date__lte=date_to))
+    return qs
+
+
+def _sum_by_invoice(qs, field: str) -> dict:
+    return dict(qs.values("invoice_id").annotate(total=Sum(field)).order_by().values_list("invoice_id", "total"))
+
+
+def build_statement(company: Company, client: Client, *, date_from=None, date_to=None) -> Statement:
+    """Statement rows for the HTML, CSV, PDF and email renderers.
+
+    Three queries regardless of invoice count: the invoices, then posted
+    credit notes and client credit applications summed per invoice. Balances
+    match `Document.balance_due_effective_cents()`.
+    """
+    from payments.models import ClientCreditApplication  # local import (payments imports documents)
+
+    invoices = list(statement_invoices(company, client, date_from=date_from, date_to=date_to))
+    if not invoices:
+        return Statement(rows=[], total_due=0)
+
+    ids = [inv.id for inv in invoices]
+    credit_notes = _sum_by_invoice(
+        CreditNote.objects.filter(invoice_id__in=ids, status=CreditNoteStatus.POSTED, deleted_at__isnull=True),
+        "ar_applied_cents",
+    )
+    credit_apps = _sum_by_invoice(
+        ClientCreditApplication.objects.filter(invoice_id__in=ids, deleted_at__isnull=True),
+        "cents",
+    )
+
+    rows: list[StatementRow] = []
+    total_due = 0
+    for inv in invoices:
+        total = int(inv.total_cents or 0)
+        paid = int(inv.amount_paid_cents or 0)
+        notes = int(credit_notes.get(inv.id) or 0)
+        apps = int(credit_apps.get(inv.id) or 0)
+        balance = max(0, total - paid - notes - apps)
+        total_due += balance
+        rows.append(
+            StatementRow(invoice=inv, total=total, paid=paid, credit_notes=notes, credit_apps=apps, balance=balance)
+        )
+    return Statement(rows=rows, total_due=total_due)
 
 
 @dataclass(frozen=True)
@@ -315,10 +428,32 @@ def _render_statement_pdf_for_email(*, company: Company, client: Client, date_fr
     except Exception:
         return None
 
-    # Import lazily to avoid heavy imports at module load.
-    from .views import _money, _statement_rows  # local import; safe for this use
+    from .services_pdf import (
+        cached_pdf_name,
+        pdf_cache_enabled,
+        read_cached_pdf,
+        statement_pdf_fingerprint,
+        store_cached_pdf,
+    )
 
-    rows, total_due = _statement_rows(company, client, date_from=date_from, date_to=date_to)
+    statement = build_statement(company, client, date_from=date_from, date_to=date_to)
+
+    generated_on = timezone.localdate()
+    cache_name = None
+    if pdf_cache_enabled():
+        fingerprint = statement_pdf_fingerprint(
+            company,
+            client,
+            statement.rows,
+            date_from=date_from,
+            date_to=date_to,
+            template_name="documents/client_statement_pdf.html",
+            generated_on=generated_on,
+        )
+        cache_name = cached_pdf_name(company.id, "statement", client.id, fingerprint)
+        cached = read_cached_pdf(cache_name)
+        if cached:
+            return cached
 
     site_base_url = (getattr(settings, "SITE_BASE_URL", "") or "").strip()
     statement_path = reverse("documents:client_statement", kwargs={"client_pk": client.id})
@@ -328,18 +463,21 @@ def _render_statement_pdf_for_email(*, company: Company, client: Client, date_fr
         {
             "client": client,
             "company": company,
-            "rows": rows,
-            "total_due_cents": total_due,
-            "total_due": _money(total_due),
+            "rows": statement.rows,
+            "total_due_cents": statement.total_due,
+            "total_due": statement.total_due_display,
             "date_from": date_from,
             "date_to": date_to,
-            "generated_at": timezone.now(),
+            "generated_on": generated_on,
             "site_base_url": site_base_url,
             "statement_path": statement_path,
         },
     )
 
     try:
-        return HTML(string=html).write_pdf()
+        pdf_bytes = HTML(string=html).write_pdf()
     except Exception:
         return None
+    if cache_name:
+        store_cached_pdf(cache_name, pdf_bytes)
+    return pdf_bytes
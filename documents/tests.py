@@ -91,3 +91,116 @@ class DocumentTaxRecalcTests(TestCase):
         self.assertEqual(li.line_total_cents, 21000)
         self.assertEqual(doc.tax_cents, 1000)
         self.assertEqual(doc.total_cents, 21000)
+
+
+import datetime
+import tempfile
+from unittest import mock
+
+from django.test import override_settings
+
+
+class DocumentPdfCacheTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(email="pdf@example.com", username="pdfuser", password="pass12345")
+        self.user.email_verified = True
+        self.user.save(update_fields=["email_verified"])
+        self.company = Company.objects.create(name="Acme Co")
+        EmployeeProfile.objects.create(
+            company=self.company, user=self.user, username_public="pdfuser", role=EmployeeRole.OWNER
+        )
+        self.doc = Document.objects.create(company=self.company, doc_type=DocumentType.INVOICE, number="INV-1")
+
+        self.client.force_login(self.user)
+        session = self.client.session
+        session[ACTIVE_COMPANY_SESSION_KEY] = str(self.company.id)
+        session.save()
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name, USE_S3=False, EZ360_PDF_CACHE_ENABLED=True)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def _download(self):
+        resp = self.client.get(reverse("documents:invoice_pdf", kwargs={"pk": self.doc.id}))
+        self.assertEqual(resp.status_code, 200)
+        return b"".join(resp.streaming_content) if resp.streaming else resp.content
+
+    def test_repeat_download_is_served_from_cache_until_revision_changes(self):
+        renders = []
+
+        def fake_render(request, html):
+            renders.append(html)
+            return f"%PDF-{len(renders)}".encode(), None
+
+        with mock.patch("documents.views._render_document_pdf_bytes", side_effect=fake_render):
+            self.assertEqual(self._download(), b"%PDF-1")
+            self.assertEqual(self._download(), b"%PDF-1")
+            self.assertEqual(len(renders), 1)
+
+            self.doc.title = "Changed"
+            self.doc.save()
+            self.assertEqual(self._download(), b"%PDF-2")
+            self.assertEqual(len(renders), 2)
+
+    def test_cached_pdf_is_rerendered_with_a_current_stamp_the_next_day(self):
+        renders = []
+
+        def fake_render(request, html):
+            renders.append(html)
+            return f"%PDF-{len(renders)}".encode(), None
+
+        with mock.patch("documents.views._render_document_pdf_bytes", side_effect=fake_render):
+            with mock.patch("documents.views.timezone.localdate", return_value=datetime.date(2026, 10, 1)):
+                self._download()
+                self._download()
+            with mock.patch("documents.views.timezone.localdate", return_value=datetime.date(2026, 10, 20)):
+                self.assertEqual(self._download(), b"%PDF-2")
+        self.assertEqual(len(renders), 2)
+        self.assertIn("Generated 2026-10-01", renders[0])
+        self.assertIn("Generated 2026-10-20", renders[1])
+
+
+from crm.models import Client
+from documents.models import CreditNote, CreditNoteStatus, DocumentStatus
+from documents.services_statements import build_statement
+from payments.models import ClientCreditApplication
+
+
+class StatementBuilderTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.client_obj = Client.objects.create(company=self.company, company_name="Globex")
+
+    def _invoice(self, total, paid=0, status=DocumentStatus.SENT):
+        return Document.objects.create(
+            company=self.company,
+            client=self.client_obj,
+            doc_type=DocumentType.INVOICE,
+            status=status,
+            subtotal_cents=total,
+            total_cents=total,
+            amount_paid_cents=paid,
+        )
+
+    def test_rows_match_effective_balances_in_constant_queries(self):
+        a = self._invoice(10_000, paid=2_000)
+        b = self._invoice(5_000)
+        self._invoice(7_000, paid=7_000, status=DocumentStatus.PAID)
+        CreditNote.objects.create(company=self.company, invoice=a, status=CreditNoteStatus.POSTED, ar_applied_cents=1_500)
+        CreditNote.objects.create(company=self.company, invoice=a, status=CreditNoteStatus.DRAFT, ar_applied_cents=900)
+        ClientCreditApplication.objects.create(company=self.company, client=self.client_obj, invoice=b, cents=6_000)
+
+        with self.assertNumQueries(3):
+            statement = build_statement(self.company, self.client_obj)
+
+        by_id = {r.invoice.id: r for r in statement.rows}
+        self.assertEqual(set(by_id), {a.id, b.id})
+        for inv in (a, b):
+            self.assertEqual(by_id[inv.id].balance, inv.balance_due_effective_cents())
+        self.assertEqual(by_id[a.id].credit_notes, 1_500)
+        self.assertEqual(by_id[b.id].balance, 0)
+        self.assertEqual(statement.total_due, 6_500)
+        self.assertEqual(statement.total_due_display, "65.00")
@@ -21,12 +21,14 @@ from audit.services import log_event
 from audit.models import AuditEvent
 from companies.decorators import company_context_required, require_min_role
 require_active_company = company_context_required
-from companies.models import EmployeeRole
+from companies.models import EmployeeProfile, EmployeeRole
 from projects.models import Project
 from crm.models import Client
 from documents.models import ClientStatementActivity
 from documents.models import ClientStatementRecipientPreference
+from sync.changelog import record_changes_for_pks
 from timetracking.models import TimeEntry, TimeStatus
+from timetracking.services_rollup import refresh_rollup_for_rows
 
 from decimal import Decimal
 
@@ -48,7 +50,19 @@ from .models import (
 )
 from .services import allocate_document_number, ensure_numbering_scheme, recalc_document_totals
 from .services_email import send_document_to_client_from_request
+from .services_statements import build_statement, format_money
+from .services_pdf import (
+    cached_pdf_name,
+    cached_pdf_response,
+    document_pdf_fingerprint,
+    has_cached_pdf,
+    pdf_cache_enabled,
+    statement_pdf_fingerprint,
+    store_cached_pdf,
+)
 
+from core.jobs import enqueue
+from core.kpis import refresh_kpis_for_rows
 from core.pagination import paginate
 
 
@@ -559,7 +573,15 @@ def document_edit(request, doc_type: str, pk):
 
                 # Mark time as billed and tie back to invoice.
                 billed_at = timezone.now()
-                qs.update(status=TimeStatus.BILLED, billed_document=doc, billed_at=billed_at)
+                billed_ids = list(qs.values_list("id", flat=True))
+                TimeEntry.objects.filter(id__in=billed_ids).update(
+                    status=TimeStatus.BILLED, billed_document=doc, billed_at=billed_at, updated_at=billed_at
+                )
+                record_changes_for_pks(TimeEntry, billed_ids)
+                # QuerySet.update() skips signals: refresh the time rollup and KPI buckets explicitly.
+                billed_rows = list(TimeEntry.objects.filter(id__in=billed_ids))
+                refresh_rollup_for_rows(billed_rows)
+                refresh_kpis_for_rows(TimeEntry, billed_rows)
 
                 recalc_document_totals(doc)
 
@@ -789,7 +811,21 @@ def document_pdf(request, doc_type: str, pk):
     doc = get_object_or_404(Document, id=pk, company=company, doc_type=doc_type, deleted_at__isnull=True)
     doc = _staff_scoped_queryset(employee, Document.objects.filter(id=doc.id)).select_related("client", "project").first() or doc
 
-    items = DocumentLineItem.objects.filter(document=doc, deleted_at__isnull=True).order_by("sort_order", "created_at")
+    items = list(DocumentLineItem.objects.filter(document=doc, deleted_at__isnull=True).order_by("sort_order", "created_at"))
+    safe_num = (doc.number or "draft").replace("/", "-")
+    filename = f"{doc_type}_{safe_num}.pdf"
+
+    generated_on = timezone.localdate()
+    cache_name = None
+    if pdf_cache_enabled():
+        fingerprint = document_pdf_fingerprint(
+            doc, items, company=company, template_name="documents/document_pdf.html", generated_on=generated_on
+        )
+        cache_name = cached_pdf_name(company.id, doc_type, doc.id, fingerprint)
+        if has_cached_pdf(cache_name):
+            cached = cached_pdf_response(cache_name, filename=filename)
+            if cached is not None:
+                return cached
 
     html = render_to_string(
         "documents/document_pdf.html",
@@ -802,7 +838,7 @@ def document_pdf(request, doc_type: str, pk):
             "project": doc.project,
             "items": items,
             "is_pdf": True,
-            "generated_at": timezone.now(),
+            "generated_on": generated_on,
         },
         request=request,
     )
@@ -821,9 +857,11 @@ def document_pdf(request, doc_type: str, pk):
             )
         return redirect(reverse(f"documents:{doc_type}_print", kwargs={"pk": doc.id}))
 
+    if cache_name:
+        store_cached_pdf(cache_name, pdf_bytes)
+
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-    safe_num = (doc.number or "draft").replace("/", "-")
-    resp["Content-Disposition"] = f'attachment; filename="{doc_type}_{safe_num}.pdf"'
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
     return resp
 from companies.services import get_active_company, get_active_employee_profile
 
@@ -1044,10 +1082,7 @@ from django.template.loader import render_to_string
 
 
 def _money(cents: int) -> str:
-    try:
-        return f"{(int(cents or 0) / 100):,.2f}"
-    except Exception:
-        return "0.00"
+    return format_money(cents)
 
 
 def _parse_iso_date(val: str | None):
@@ -1065,48 +1100,8 @@ def _parse_iso_date(val: str | None):
 
 
 def _statement_rows(company, client, *, date_from=None, date_to=None):
-    qs = (
-        Document.objects.filter(
-            company=company,
-            doc_type=DocumentType.INVOICE,
-            client=client,
-            deleted_at__isnull=True,
-        )
-        .exclude(status__in=[DocumentStatus.PAID, DocumentStatus.VOID])
-        .order_by("issue_date", "created_at")
-    )
-
-    # Optional date-range filtering (applies to issue_date when present; falls back to created_at date)
-    if date_from:
-        qs = qs.filter(
-            Q(issue_date__gte=date_from) | Q(issue_date__isnull=True, created_at__date__gte=date_from)
-        )
-    if date_to:
-        qs = qs.filter(
-            Q(issue_date__lte=date_to) | Q(issue_date__isnull=True, created_at__date__lte=date_to)
-        )
-
-
-    rows = []
-    total_due = 0
-    for inv in qs:
-        balance_eff = inv.balance_due_effective_cents()
-        total_due += balance_eff
-        rows.append(
-            {
-                "invoice": inv,
-                "total": int(inv.total_cents or 0),
-                "paid": int(inv.amount_paid_cents or 0),
-                "credit_notes": int(inv.credit_applied_cents() or 0),
-                "credit_apps": int(inv.credit_applications_cents() or 0),
-                "balance": int(balance_eff),
-                "total_display": _money(int(inv.total_cents or 0)),
-                "paid_display": _money(int(inv.amount_paid_cents or 0)),
-                "credits_display": _money(int((inv.credit_applied_cents() or 0) + (inv.credit_applications_cents() or 0))),
-                "balance_display": _money(int(balance_eff)),
-            }
-        )
-    return rows, total_due
+    statement = build_statement(company, client, date_from=date_from, date_to=date_to)
+    return statement.rows, statement.total_due
 
 
 @company_context_required
@@ -1303,18 +1298,18 @@ def client_statement_csv(request, client_pk):
     w = csv.writer(buf)
     w.writerow(["Invoice #", "Issue date", "Due date", "Status", "Total", "Paid", "Credit notes", "Credit applied", "Balance due"])
     for r in rows:
-        inv = r["invoice"]
+        inv = r.invoice
         w.writerow(
             [
                 inv.number,
                 inv.issue_date.isoformat() if inv.issue_date else "",
                 inv.due_date.isoformat() if inv.due_date else "",
                 inv.status,
-                _money(r["total"]),
-                _money(r["paid"]),
-                _money(r["credit_notes"]),
-                _money(r["credit_apps"]),
-                _money(r["balance"]),
+                r.total_display,
+                r.paid_display,
+                _money(r.credit_notes),
+                _money(r.credit_apps),
+                r.balance_display,
             ]
         )
     w.writerow([])
@@ -1376,6 +1371,25 @@ def client_statement_pdf(request, client_pk):
         qs_params.append(f"date_to={date_to.isoformat()}")
     querystring = ("?" + "&".join(qs_params)) if qs_params else ""
 
+    filename = f"statement_{client.id}.pdf"
+    generated_on = timezone.localdate()
+    cache_name = None
+    if pdf_cache_enabled():
+        fingerprint = statement_pdf_fingerprint(
+            company,
+            client,
+            rows,
+            date_from=date_from,
+            date_to=date_to,
+            template_name="documents/client_statement_pdf.html",
+            generated_on=generated_on,
+        )
+        cache_name = cached_pdf_name(company.id, "statement", client.id, fingerprint)
+        if has_cached_pdf(cache_name):
+            cached = cached_pdf_response(cache_name, filename=filename)
+            if cached is not None:
+                return cached
+
     html = render_to_string(
         "documents/client_statement_pdf.html",
         {
@@ -1391,7 +1405,7 @@ def client_statement_pdf(request, client_pk):
             "date_to": date_to,
             "querystring": querystring,
             "initial_to_email": initial_to_email,
-            "generated_at": timezone.now(),
+            "generated_on": generated_on,
             "date_from": date_from,
             "date_to": date_to,
             "site_base_url": getattr(settings, "SITE_BASE_URL", "").strip(),
@@ -1412,8 +1426,11 @@ def client_statement_pdf(request, client_pk):
             )
         return redirect(f"{reverse('documents:client_statement', kwargs={'client_pk': client.id})}{querystring}")
 
+    if cache_name:
+        store_cached_pdf(cache_name, pdf_bytes)
+
     resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-    resp["Content-Disposition"] = f'attachment; filename="statement_{client.id}.pdf"'
+    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
     return resp
 
 
@@ -1436,7 +1453,6 @@ def client_statement_email(request, client_pk):
 
 
     from .forms import StatementEmailForm
-    from .services_statements import send_statement_to_client_from_request
 
     if request.method != "POST":
         base_url = reverse('documents:client_statement', kwargs={'client_pk': client.id})
@@ -1459,54 +1475,33 @@ def client_statement_email(request, client_pk):
         base_url = reverse('documents:client_statement', kwargs={'client_pk': client.id})
         return redirect(f"{base_url}{querystring}")
 
-    res = send_statement_to_client_from_request(
-        request,
-        company=company,
-        client=client,
-        to_email=form.cleaned_data.get("to_email") or None,
-        date_from=form.cleaned_data.get('date_from'),
-        date_to=form.cleaned_data.get('date_to'),
-        attach_pdf=bool(form.cleaned_data.get('attach_pdf')),
-        template_variant=form.cleaned_data.get('tone') or 'sent',
-    )
-
-    # Optional: email the acting user a copy (best-effort; never blocks primary send).
-    if res.sent and bool(form.cleaned_data.get("email_me_copy")) and not test_myself:
-        try:
-            from .services_statements import send_statement_copy_to_actor
-
-            actor_email = (getattr(request.user, "email", "") or "").strip()
-            if actor_email and actor_email.lower() != (res.to or "").strip().lower():
-                send_statement_copy_to_actor(
-                    company=company,
-                    client=client,
-                    actor=getattr(request, "active_employee", None),
-                    to_email=actor_email,
-                    date_from=form.cleaned_data.get('date_from'),
-                    date_to=form.cleaned_data.get('date_to'),
-                    attach_pdf=bool(form.cleaned_data.get('attach_pdf')),
-                )
-        except Exception:
-            pass
-    if res.sent:
-        messages.success(request, f"Statement emailed to {res.to}.")
+    to_addr = (form.cleaned_data.get("to_email") or client.email or "").strip()
+    if not to_addr:
+        messages.error(request, "Client has no email address")
     else:
-        messages.error(request, res.message)
-
-    # Persist last-used recipient per client (per company) for faster collections workflows.
-    if res.sent and not test_myself and (res.to or '').strip():
-        try:
-            ClientStatementRecipientPreference.objects.update_or_create(
-                company=company,
-                client=client,
-                defaults={
-                    'last_to_email': (res.to or '').strip(),
-                    'updated_at': timezone.now(),
-                    'updated_by': request.user if getattr(request, 'user', None) and getattr(request.user, 'is_authenticated', False) else None,
-                },
-            )
-        except Exception:
-            pass
+        date_from = form.cleaned_data.get('date_from')
+        date_to = form.cleaned_data.get('date_to')
+        actor_email = (getattr(request.user, "email", "") or "").strip()
+        enqueue(
+            "documents.send_statement_email",
+            company=company,
+            priority=20,
+            max_attempts=3,
+            payload={
+                "company_id": str(company.id),
+                "client_id": str(client.id),
+                "actor_employee_id": str(employee.id) if isinstance(employee, EmployeeProfile) else None,
+                "actor_user_id": request.user.pk,
+                "to_email": form.cleaned_data.get("to_email") or None,
+                "date_from": date_from.isoformat() if date_from else None,
+                "date_to": date_to.isoformat() if date_to else None,
+                "attach_pdf": bool(form.cleaned_data.get('attach_pdf')),
+                "template_variant": form.cleaned_data.get('tone') or 'sent',
+                "copy_to_email": actor_email if (bool(form.cleaned_data.get("email_me_copy")) and not test_myself) else "",
+                "remember_recipient": not test_myself,
+            },
+        )
+        messages.success(request, f"Statement email to {to_addr} is being sent.")
 
     qs_params = []
     if form.cleaned_data.get('date_from'):
@@ -8,7 +8,12 @@ from app.utils.paths import get_db_path
 
 def connect(db_path: Path | None = None) -> sqlite3.Connection:
     path = db_path or get_db_path()
-    conn = sqlite3.connect(str(path))
+    # Each thread opens its own connection (UI thread + sync worker).
+    conn = sqlite3.connect(str(path), timeout=30)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    # WAL: the UI can keep reading while the sync worker writes.
+    # synchronous=NORMAL is durable across app crashes under WAL and avoids an fsync per commit.
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
     return conn
@@ -1,23 +1,141 @@
 from __future__ import annotations
 
 import json
-import uuid
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any
+from functools import lru_cache
+from typing import Any, Callable, Iterator
 
 from app.db.connection import connect
-from app.sync.http import ApiClient
+from app.sync.http import ApiClient, ApiError
+
+
+# Rows buffered per table before one executemany() call.
+APPLY_BATCH_SIZE = 1000
+
+# Outbox rows sent per push request.
+PUSH_BATCH_SIZE = 200
+
+# Server page size for streamed pulls.
+PULL_PAGE_LIMIT = 50000
+
+# Safety valve: never loop forever on a misbehaving server.
+MAX_ROUNDS = 10000
+
+# progress(phase, pulled_so_far, pushed_so_far)
+ProgressCallback = Callable[[str, int, int], None]
+
+
+# Minimal mapping for core tables (model label -> local table, columns).
+# Extend as we add modules. Columns must exist in schema.sql.
+ENTITY_TABLES: dict[str, tuple[str, list[str]]] = {
+    "companies.Company": (
+        "companies",
+        [
+            "id","name","created_at","updated_at","revision","deleted_at","is_active",
+            "email_from_name","email_from_address","address1","address2","city","state","zip_code"
+        ],
+    ),
+    "companies.EmployeeProfile": (
+        "employee_profiles",
+        [
+            "id","company_id","user_id","display_name","username_public","role","is_active",
+            "hired_at","terminated_at","hourly_rate","can_view_company_financials","can_approve_time",
+            "created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+    "crm.Client": (
+        "clients",
+        [
+            "id","company_id","first_name","last_name","company_name","email","internal_note",
+            "address1","address2","city","state","zip_code",
+            "credit_cents","outstanding_cents",
+            "created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+    "projects.Project": (
+        "projects",
+        [
+            "id","company_id","client_id","project_number","name","description","date_received","due_date",
+            "billing_type","flat_fee_cents","hourly_rate_cents","estimated_minutes","assigned_to_employee_id",
+            "is_active","created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+    "documents.Document": (
+        "documents",
+        [
+            "id","company_id","doc_type","client_id","created_by_employee_id","number","title","description",
+            "issue_date","due_date","valid_until","status",
+            "subtotal_cents","tax_cents","total_cents","amount_paid_cents","balance_due_cents",
+            "notes","created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+    "documents.DocumentLineItem": (
+        "document_line_items",
+        [
+            "id","document_id","sort_order","catalog_item_id","name","description","qty","unit_price_cents",
+            "line_subtotal_cents","tax_cents","line_total_cents","is_taxable",
+            "created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+    "timetracking.TimeEntry": (
+        "time_entries",
+        [
+            "id","company_id","employee_id","client_id","project_id","started_at","ended_at","duration_minutes",
+            "billable","note","status","approved_by_employee_id","approved_at",
+            "created_at","updated_at","revision","deleted_at"
+        ],
+    ),
+}
 
 
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
+@lru_cache(maxsize=None)
+def _upsert_sql(model_label: str) -> str | None:
+    """Build (once) the UPSERT statement for a mapped model."""
+    if model_label not in ENTITY_TABLES:
+        return None
+    table, cols = ENTITY_TABLES[model_label]
+    placeholders = ",".join(["?"] * len(cols))
+    collist = ",".join(cols)
+    update_set = ",".join([f"{c}=excluded.{c}" for c in cols if c not in {"id", "created_at"}])
+    return f"INSERT INTO {table} ({collist}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {update_set}"
+
+
+@lru_cache(maxsize=None)
+def _tombstone_sql(model_label: str) -> str | None:
+    """Build (once) the statement that marks an existing local row deleted."""
+    if model_label not in ENTITY_TABLES:
+        return None
+    table, _cols = ENTITY_TABLES[model_label]
+    return f"UPDATE {table} SET deleted_at=?, updated_at=?, revision=? WHERE id=?"
+
+
+def _flatten_entity(row: dict[str, Any]) -> dict[str, Any]:
+    """Server rows are {"id", "revision", "updated_at", "deleted_at", "fields": {...}}.
+
+    Local tables are flat and name FK columns `<field>_id`, so each field is
+    exposed under both its name and `<name>_id`.
+    """
+    flat: dict[str, Any] = {}
+    for name, value in (row.get("fields") or {}).items():
+        flat[name] = value
+        flat.setdefault(f"{name}_id", value)
+    for key in ("id", "revision", "updated_at", "deleted_at"):
+        flat[key] = row.get(key)
+    # created_at is server-owned and not synced; first-seen time is close enough locally.
+    flat.setdefault("created_at", row.get("updated_at"))
+    return flat
+
+
 @dataclass
 class SyncResult:
     pulled: int = 0
     pushed: int = 0
+    rounds: int = 0
     errors: list[str] | None = None
 
     def __post_init__(self):
@@ -27,12 +145,14 @@ class SyncResult:
 
 class SyncEngine:
     """
-    Minimal v1 skeleton:
+    v1 sync engine:
     - license_check(company_id)
     - register_device(company_id, device_id)
-    - pull since cursor
-    - push outbox_changes
-    - apply pulled entities locally (core models only)
+    - pull change-log pages (streamed NDJSON) until the server reports has_more=false
+    - push outbox_changes in batches until the outbox is drained
+    - apply pulled entities locally with one executemany per table per batch
+
+    Blocking: run it off the UI thread (see app.sync.worker.SyncWorker).
     """
 
     def __init__(self, api: ApiClient):
@@ -45,150 +165,146 @@ class SyncEngine:
         payload = {"company_id": company_id, "device_id": device_id, "platform": "windows", "name": name}
         return self.api.post("/api/v1/sync/devices/register/", payload)
 
-    def pull(self, company_id: str, since_iso: str) -> dict[str, Any]:
-        return self.api.get("/api/v1/sync/pull/", {"company_id": company_id, "since": since_iso, "limit": 5000})
+    def pull(self, company_id: str, cursor: str) -> Iterator[dict[str, Any]]:
+        params = {"company_id": company_id, "cursor": cursor, "limit": PULL_PAGE_LIMIT}
+        return self.api.get_ndjson("/api/v1/sync/pull/", params)
 
     def push(self, company_id: str, device_id: str, changes: dict[str, list[dict[str, Any]]]) -> dict[str, Any]:
         payload = {"company_id": company_id, "device_id": device_id, "client_time": _utc_now_iso(), "changes": changes}
         return self.api.post("/api/v1/sync/push/", payload)
 
-    def run_once(self, company_id: str, device_id: str) -> SyncResult:
+    def run_once(self, company_id: str, device_id: str, progress: ProgressCallback | None = None) -> SyncResult:
         res = SyncResult()
         conn = connect()
         try:
-            conn.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('last_sync_since','1970-01-01T00:00:00Z')")
+            conn.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('last_sync_cursor','0')")
             conn.execute("INSERT OR IGNORE INTO meta(key,value) VALUES('last_sync_at','')")
             conn.commit()
 
-            since = conn.execute("SELECT value FROM meta WHERE key='last_sync_since'").fetchone()["value"] or "1970-01-01T00:00:00Z"
+            self._pull_all(conn, company_id, res, progress)
+            self._push_all(conn, company_id, device_id, res, progress)
+            return res
+        finally:
+            conn.close()
+
+    def _pull_all(self, conn, company_id: str, res: SyncResult, progress: ProgressCallback | None) -> None:
+        """Pull pages until has_more is false. Each page commits atomically with its cursor."""
+        while res.rounds < MAX_ROUNDS:
+            res.rounds += 1
+            cursor = conn.execute("SELECT value FROM meta WHERE key='last_sync_cursor'").fetchone()["value"] or "0"
+
+            server_time = _utc_now_iso()
+            end: dict[str, Any] | None = None
+            buffers: dict[str, list[dict[str, Any]]] = {}
+
+            # Parents and children may arrive in any order within a page.
+            conn.execute("PRAGMA defer_foreign_keys = ON;")
+            try:
+                for msg in self.pull(company_id, cursor):
+                    kind = msg.get("type")
+                    if kind == "meta":
+                        server_time = str(msg.get("server_time") or server_time)
+                    elif kind == "entity":
+                        label = str(msg.get("model") or "")
+                        buf = buffers.setdefault(label, [])
+                        buf.append(msg)
+                        if len(buf) >= APPLY_BATCH_SIZE:
+                            res.pulled += self._apply_entities(conn, label, buf)
+                            buffers[label] = []
+                            if progress:
+                                progress("pull", res.pulled, res.pushed)
+                    elif kind == "end":
+                        end = msg
+
+                if end is None:
+                    # Stream cut short: discard the partial page, keep the old cursor.
+                    raise ApiError("Sync pull ended before the server finished the page.")
 
-            # 1) Pull
-            pulled_payload = self.pull(company_id, since)
-            server_time = str(pulled_payload.get("server_time") or _utc_now_iso())
-            next_since = str(pulled_payload.get("next_since") or server_time)
+                for label, rows in buffers.items():
+                    res.pulled += self._apply_entities(conn, label, rows)
 
-            entities = pulled_payload.get("entities") or {}
-            pulled_count = 0
-            for model_label, rows in entities.items():
-                pulled_count += self._apply_entities(conn, model_label, rows or [])
-            res.pulled = pulled_count
+                conn.execute("UPDATE meta SET value=? WHERE key='last_sync_cursor'", [str(end.get("next_cursor") or cursor)])
+                conn.execute("UPDATE meta SET value=? WHERE key='last_sync_at'", [server_time])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
-            # 2) Push outbox
+            if progress:
+                progress("pull", res.pulled, res.pushed)
+            if not end.get("has_more"):
+                return
+
+    def _push_all(
+        self, conn, company_id: str, device_id: str, res: SyncResult, progress: ProgressCallback | None
+    ) -> None:
+        """Push the outbox in batches until it is empty (or stops making progress)."""
+        while res.rounds < MAX_ROUNDS:
+            res.rounds += 1
             outbox = conn.execute(
-                "SELECT id, model, object_id, payload_json FROM outbox_changes WHERE company_id=? ORDER BY created_at ASC LIMIT 200",
-                [company_id],
+                "SELECT id, model, object_id, payload_json FROM outbox_changes WHERE company_id=? ORDER BY created_at ASC LIMIT ?",
+                [company_id, PUSH_BATCH_SIZE],
             ).fetchall()
+            if not outbox:
+                return
 
-            if outbox:
-                changes: dict[str, list[dict[str, Any]]] = {}
-                for row in outbox:
-                    model = row["model"]
-                    payload = json.loads(row["payload_json"])
-                    changes.setdefault(model, []).append(payload)
+            changes: dict[str, list[dict[str, Any]]] = {}
+            outbox_ids_by_object: dict[str, list[str]] = {}
+            for row in outbox:
+                payload = json.loads(row["payload_json"])
+                changes.setdefault(row["model"], []).append(payload)
+                outbox_ids_by_object.setdefault(str(row["object_id"]), []).append(row["id"])
 
-                push_result = self.push(company_id, device_id, changes)
-                results = push_result.get("results") or {}
+            push_result = self.push(company_id, device_id, changes)
+            results = push_result.get("results") or {}
 
-                applied_ids: set[str] = set()
-                for model_label, model_results in results.items():
-                    for item in model_results or []:
-                        if item.get("status") in {"applied", "conflict_overwritten"}:
-                            applied_ids.add(str(item.get("id") or ""))
+            done: list[str] = []
+            for model_results in results.values():
+                for item in model_results or []:
+                    if item.get("status") in {"applied", "conflict_overwritten"}:
+                        done.extend(outbox_ids_by_object.get(str(item.get("id") or ""), []))
 
-                if applied_ids:
-                    conn.executemany("DELETE FROM outbox_changes WHERE object_id=?", [(i,) for i in applied_ids if i])
+            # Delete only the rows we sent: edits queued meanwhile stay in the outbox.
+            if done:
+                conn.executemany("DELETE FROM outbox_changes WHERE id=?", [(i,) for i in done])
+                conn.commit()
 
-                res.pushed = sum(len(v or []) for v in results.values())
+            res.pushed += sum(len(v or []) for v in results.values())
+            if progress:
+                progress("push", res.pulled, res.pushed)
 
-            # 3) Update cursors
-            conn.execute("UPDATE meta SET value=? WHERE key='last_sync_since'", [next_since])
-            conn.execute("UPDATE meta SET value=? WHERE key='last_sync_at'", [server_time])
-            conn.commit()
-            return res
-        finally:
-            conn.close()
+            if not done:
+                # Everything left was rejected; retrying now would loop forever.
+                res.errors.append(f"{len(outbox)} outbox change(s) were not accepted by the server.")
+                return
 
     def _apply_entities(self, conn, model_label: str, rows: list[dict[str, Any]]) -> int:
         """
-        Minimal mapping for core tables. Extend as we add modules.
-        Expects server payload to include fields compatible with table columns.
+        Upsert one batch of pulled rows for a mapped model with a single executemany().
+        Does not commit: the caller commits once per pulled page.
+
+        Tombstones (deleted rows, which may arrive without fields) only mark an
+        existing local row deleted; ids never seen locally are skipped.
         """
         if not rows:
             return 0
-
-        mapping = {
-            "companies.Company": (
-                "companies",
-                [
-                    "id","name","created_at","updated_at","revision","deleted_at","is_active",
-                    "email_from_name","email_from_address","address1","address2","city","state","zip_code"
-                ],
-            ),
-            "companies.EmployeeProfile": (
-                "employee_profiles",
-                [
-                    "id","company_id","user_id","display_name","username_public","role","is_active",
-                    "hired_at","terminated_at","hourly_rate","can_view_company_financials","can_approve_time",
-                    "created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-            "crm.Client": (
-                "clients",
-                [
-                    "id","company_id","first_name","last_name","company_name","email","internal_note",
-                    "address1","address2","city","state","zip_code",
-                    "credit_cents","outstanding_cents",
-                    "created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-            "projects.Project": (
-                "projects",
-                [
-                    "id","company_id","client_id","project_number","name","description","date_received","due_date",
-                    "billing_type","flat_fee_cents","hourly_rate_cents","estimated_minutes","assigned_to_employee_id",
-                    "is_active","created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-            "documents.Document": (
-                "documents",
-                [
-                    "id","company_id","doc_type","client_id","created_by_employee_id","number","title","description",
-                    "issue_date","due_date","valid_until","status",
-                    "subtotal_cents","tax_cents","total_cents","amount_paid_cents","balance_due_cents",
-                    "notes","created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-            "documents.DocumentLineItem": (
-                "document_line_items",
-                [
-                    "id","document_id","sort_order","catalog_item_id","name","description","qty","unit_price_cents",
-                    "line_subtotal_cents","tax_cents","line_total_cents","is_taxable",
-                    "created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-            "timetracking.TimeEntry": (
-                "time_entries",
-                [
-                    "id","company_id","employee_id","client_id","project_id","started_at","ended_at","duration_minutes",
-                    "billable","note","status","approved_by_employee_id","approved_at",
-                    "created_at","updated_at","revision","deleted_at"
-                ],
-            ),
-        }
-
-        if model_label not in mapping:
+        sql = _upsert_sql(model_label)
+        if sql is None:
             return 0
 
-        table, cols = mapping[model_label]
-        placeholders = ",".join(["?"] * len(cols))
-        collist = ",".join(cols)
-        update_set = ",".join([f"{c}=excluded.{c}" for c in cols if c != "id"])
-
-        count = 0
+        _table, cols = ENTITY_TABLES[model_label]
+        params = []
+        tombstones = []
         for r in rows:
-            values = [r.get(c) for c in cols]
-            sql = f"INSERT INTO {table} ({collist}) VALUES ({placeholders}) ON CONFLICT(id) DO UPDATE SET {update_set}"
-            conn.execute(sql, values)
-            count += 1
-        conn.commit()
-        return count
+            if r.get("deleted_at"):
+                tombstones.append([r.get("deleted_at"), r.get("updated_at"), r.get("revision"), r.get("id")])
+                continue
+            flat = _flatten_entity(r)
+            params.append([flat.get(c) for c in cols])
+        applied = 0
+        if params:
+            conn.executemany(sql, params)
+            applied += len(params)
+        if tombstones:
+            applied += conn.executemany(_tombstone_sql(model_label), tombstones).rowcount
+        return applied
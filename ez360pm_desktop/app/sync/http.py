@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterator
 
 import requests
 
@@ -12,10 +13,15 @@ class ApiError(Exception):
     pass
 
 
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
 @dataclass
 class ApiClient:
     base_url: str
     tokens: TokenBundle
+    # Keep-alive: reuse one TLS connection across the pull/push loop.
+    session: requests.Session = field(default_factory=requests.Session, repr=False)
 
     def _headers(self) -> dict[str, str]:
         h = {"Accept": "application/json"}
@@ -25,18 +31,34 @@ class ApiClient:
 
     def post(self, path: str, json_data: dict[str, Any] | None = None, timeout: int = 30) -> dict[str, Any]:
         url = f"{self.base_url.rstrip('/')}{path}"
-        r = requests.post(url, json=json_data or {}, headers=self._headers(), timeout=timeout)
+        r = self.session.post(url, json=json_data or {}, headers=self._headers(), timeout=timeout)
         if r.status_code >= 400:
             raise ApiError(f"{r.status_code}: {r.text}")
         return r.json()
 
     def get(self, path: str, params: dict[str, Any] | None = None, timeout: int = 30) -> dict[str, Any]:
         url = f"{self.base_url.rstrip('/')}{path}"
-        r = requests.get(url, params=params or {}, headers=self._headers(), timeout=timeout)
+        r = self.session.get(url, params=params or {}, headers=self._headers(), timeout=timeout)
         if r.status_code >= 400:
             raise ApiError(f"{r.status_code}: {r.text}")
         return r.json()
 
+    def get_ndjson(self, path: str, params: dict[str, Any] | None = None, timeout: int = 60) -> Iterator[dict[str, Any]]:
+        """Stream a newline-delimited JSON response, one decoded object per line.
+
+        Requests gzip-compressed transfer; `requests` decompresses transparently.
+        """
+        url = f"{self.base_url.rstrip('/')}{path}"
+        headers = self._headers()
+        headers["Accept"] = NDJSON_CONTENT_TYPE
+        headers["Accept-Encoding"] = "gzip"
+        with self.session.get(url, params=params or {}, headers=headers, timeout=timeout, stream=True) as r:
+            if r.status_code >= 400:
+                raise ApiError(f"{r.status_code}: {r.text}")
+            for line in r.iter_lines(chunk_size=64 * 1024):
+                if line:
+                    yield json.loads(line)
+
     def refresh_access_token(self) -> None:
         if not self.tokens.refresh:
             raise ApiError("Missing refresh token.")
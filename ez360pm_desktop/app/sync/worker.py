@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+
+from app.sync.client import SyncEngine, SyncResult
+
+
+class SyncWorker(QObject):
+    """
+    Runs SyncEngine.run_once off the UI thread.
+
+    Signals are delivered to the UI thread via queued connections, so slots can
+    touch widgets directly.
+    """
+
+    progress = Signal(str, int, int)  # phase ("license" | "pull" | "push"), pulled, pushed
+    locked = Signal()  # subscription/trial not active
+    finished = Signal(object)  # SyncResult
+    failed = Signal(str)
+
+    def __init__(self, engine: SyncEngine, company_id: str, device_id: str):
+        super().__init__()
+        self.engine = engine
+        self.company_id = company_id
+        self.device_id = device_id
+
+    @Slot()
+    def run(self) -> None:
+        try:
+            self.progress.emit("license", 0, 0)
+            lic = self.engine.license_check(self.company_id)
+            if not bool(lic.get("ok", True)):
+                self.locked.emit()
+                return
+
+            result: SyncResult = self.engine.run_once(
+                self.company_id,
+                self.device_id,
+                progress=lambda phase, pulled, pushed: self.progress.emit(phase, pulled, pushed),
+            )
+            self.finished.emit(result)
+        except Exception as exc:
+            self.failed.emit(str(exc))
+
+
+def start_sync_thread(parent: QObject, worker: SyncWorker) -> QThread:
+    """Move worker to a new QThread, start it, and clean both up when done."""
+    thread = QThread(parent)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    for sig in (worker.finished, worker.failed, worker.locked):
+        sig.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.finished.connect(thread.deleteLater)
+    thread.start()
+    return thread
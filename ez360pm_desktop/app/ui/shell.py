@@ -19,6 +19,7 @@ from app.auth.token_store import load_tokens
 from app.settings.local_settings import load_settings
 from app.sync.http import ApiClient
 from app.sync.client import SyncEngine
+from app.sync.worker import SyncWorker, start_sync_thread
 from app.db.schema import apply_schema
 from app.utils.paths import get_db_path
 from app.db.connection import connect
@@ -34,6 +35,8 @@ class AppShell(QMainWindow):
         self.tokens = load_tokens()
         self.api = ApiClient(self.settings.base_url, self.tokens)
         self.sync = SyncEngine(self.api)
+        self._sync_thread = None
+        self._sync_worker = None
 
         # Ensure DB schema exists
         apply_schema(schema_sql, get_db_path())
@@ -134,11 +137,8 @@ class AppShell(QMainWindow):
         company_id = (self.settings.active_company_id or "").strip()
         if not company_id:
             return
-        try:
-            self._run_sync(company_id)
-        except Exception:
-            # periodic sync is best-effort
-            pass
+        # periodic sync is best-effort; failures surface in the status label
+        self._run_sync(company_id)
 
     def on_sync_clicked(self):
         company_id = (self.settings.active_company_id or "").strip()
@@ -148,14 +148,42 @@ class AppShell(QMainWindow):
         self._run_sync(company_id)
 
     def _run_sync(self, company_id: str):
-        self.lbl_status.setText("Syncing...")
-        self.repaint()
-
-        lic = self.sync.license_check(company_id)
-        if not bool(lic.get("ok", True)):
-            self.lbl_status.setText("Locked (license)")
-            QMessageBox.critical(self, "License", "Subscription/trial not active. Desktop is locked.")
+        # One sync at a time; the periodic tick simply skips while one is running.
+        if self._sync_thread is not None:
             return
 
-        result = self.sync.run_once(company_id, self.device_id)
-        self.lbl_status.setText(f"Synced. Pulled {result.pulled}, pushed {result.pushed}.")
+        self.lbl_status.setText("Syncing...")
+        self.btn_sync.setEnabled(False)
+
+        self._sync_worker = SyncWorker(self.sync, company_id, self.device_id)
+        self._sync_worker.progress.connect(self._on_sync_progress)
+        self._sync_worker.finished.connect(self._on_sync_finished)
+        self._sync_worker.failed.connect(self._on_sync_failed)
+        self._sync_worker.locked.connect(self._on_sync_locked)
+        self._sync_thread = start_sync_thread(self, self._sync_worker)
+        self._sync_thread.finished.connect(self._on_sync_thread_done)
+
+    def _on_sync_progress(self, phase: str, pulled: int, pushed: int):
+        if phase == "license":
+            self.lbl_status.setText("Syncing... (checking license)")
+        else:
+            self.lbl_status.setText(f"Syncing... pulled {pulled}, pushed {pushed}")
+
+    def _on_sync_finished(self, result):
+        msg = f"Synced. Pulled {result.pulled}, pushed {result.pushed}."
+        if result.errors:
+            msg += f" ({len(result.errors)} warning(s))"
+        self.lbl_status.setText(msg)
+
+    def _on_sync_failed(self, error: str):
+        self.lbl_status.setText("Sync failed")
+        self.lbl_status.setToolTip(error)
+
+    def _on_sync_locked(self):
+        self.lbl_status.setText("Locked (license)")
+        QMessageBox.critical(self, "License", "Subscription/trial not active. Desktop is locked.")
+
+    def _on_sync_thread_done(self):
+        self._sync_thread = None
+        self._sync_worker = None
+        self.btn_sync.setEnabled(True)
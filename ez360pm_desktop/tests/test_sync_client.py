@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import sqlite3
+import unittest
+from pathlib import Path
+
+from app.sync.client import SyncEngine, SyncResult
+
+SCHEMA_SQL = (Path(__file__).resolve().parents[1] / "schema.sql").read_text(encoding="utf-8")
+
+
+class _FakeApi:
+    def __init__(self, pages):
+        self.pages = list(pages)
+
+    def get_ndjson(self, path, params):
+        return iter(self.pages.pop(0))
+
+
+class PullTombstoneTests(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA_SQL)
+        self.conn.execute("INSERT INTO meta(key,value) VALUES('last_sync_cursor','0')")
+        self.conn.execute("INSERT INTO meta(key,value) VALUES('last_sync_at','')")
+        self.conn.execute(
+            "INSERT INTO companies (id,name,created_at,updated_at,revision) VALUES ('c1','Acme','2026-01-01','2026-01-01',1)"
+        )
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_tombstones_mark_known_rows_and_skip_unknown_ids(self):
+        page = [
+            {"type": "entity", "model": "companies.Company", "id": "c1", "revision": 2, "updated_at": "2026-02-01", "deleted_at": "2026-02-01", "fields": {}},
+            {"type": "entity", "model": "crm.Client", "id": "gone", "revision": 3, "updated_at": "2026-02-01", "deleted_at": "2026-02-01", "fields": {}},
+            {"type": "end", "next_cursor": "7", "has_more": False},
+        ]
+        res = SyncResult()
+        SyncEngine(_FakeApi([page]))._pull_all(self.conn, "c1", res, None)
+
+        row = self.conn.execute("SELECT name, deleted_at, revision FROM companies WHERE id='c1'").fetchone()
+        self.assertEqual(tuple(row), ("Acme", "2026-02-01", 2))
+        self.assertIsNone(self.conn.execute("SELECT id FROM clients WHERE id='gone'").fetchone())
+        self.assertEqual(self.conn.execute("SELECT value FROM meta WHERE key='last_sync_cursor'").fetchone()["value"], "7")
+        self.assertEqual(res.pulled, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from expenses.models import Expense, Merchant
+from sync.changelog import record_changes
+
+from .models import BankTransaction
+
+REVIEW_ACTIONS = {"ignore", "transfer", "create_expense", "link_existing"}
+
+# Suggestions at or above this score block automatic expense creation (possible duplicate).
+DUPLICATE_BLOCK_SCORE = 90
+
+
+@dataclass
+class BulkReviewResult:
+    updated: int = 0
+    created: int = 0
+    linked: int = 0
+    skipped: int = 0
+
+
+def review_queue_queryset(conn, *, status: str = "", account_id: str = ""):
+    """Transactions shown by the review queue for a filter (also used for select-all bulk actions)."""
+    qs = BankTransaction.objects.filter(account__connection=conn)
+    if status:
+        qs = qs.filter(status=status)
+    if account_id:
+        qs = qs.filter(account__account_id=account_id)
+    return qs
+
+
+def _resolve_merchants(company, names: set[str]) -> dict[str, Merchant]:
+    """Live merchants by name, creating (or restoring soft-deleted) missing ones in bulk.
+
+    Bulk writes skip post_save, so the created/restored merchants are logged
+    for desktop sync here.
+    """
+    found = {m.name: m for m in Merchant.objects.filter(company=company, name__in=names)}
+    missing = names - set(found)
+    if missing:
+        # A soft-deleted merchant still owns its (company, name) slot: restore it.
+        now = timezone.now()
+        Merchant.all_objects.filter(company=company, name__in=missing, deleted_at__isnull=False).update(
+            deleted_at=None, updated_at=now, revision=F("revision") + 1
+        )
+        Merchant.objects.bulk_create([Merchant(company=company, name=n) for n in missing], ignore_conflicts=True)
+        resolved = list(Merchant.objects.filter(company=company, name__in=missing))
+        record_changes(resolved, company_id=company.id)
+        found.update({m.name: m for m in resolved})
+    return found
+
+
+def _merchant_name(tx: BankTransaction) -> str:
+    return (tx.suggested_merchant_name or tx.name or "").strip()[:160] or "Bank transaction"
+
+
+def _create_expenses(qs, *, company, employee, user, reviewed_at, chunk_size: int) -> tuple[int, list[Expense]]:
+    eligible = (
+        qs.filter(linked_expense__isnull=True, amount_cents__gt=0)
+        .exclude(status__in=[BankTransaction.Status.IGNORED, BankTransaction.Status.TRANSFER])
+        .exclude(suggested_existing_expense__isnull=False, suggested_existing_expense_score__gte=DUPLICATE_BLOCK_SCORE)
+    )
+    created_expenses: list[Expense] = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            txs = list(eligible.filter(id__gt=last_id).select_for_update().order_by("id")[:chunk_size])
+            if not txs:
+                break
+            last_id = txs[-1].id
+            merchants = _resolve_merchants(company, {_merchant_name(tx) for tx in txs})
+            expenses = []
+            for tx in txs:
+                exp = Expense(
+                    company=company,
+                    created_by=employee,
+                    merchant=merchants[_merchant_name(tx)],
+                    date=tx.posted_date,
+                    category=(tx.suggested_category or tx.category or "")[:120],
+                    description=f"Imported from bank feed: {tx.transaction_id}",
+                    amount_cents=int(tx.amount_cents),
+                    tax_cents=0,
+                    total_cents=int(tx.amount_cents),
+                    status="draft",
+                )
+                expenses.append(exp)
+                tx.linked_expense_id = exp.id
+                tx.status = BankTransaction.Status.EXPENSE_CREATED
+                tx.reviewed_at = reviewed_at
+                tx.reviewed_by = user
+            Expense.objects.bulk_create(expenses, batch_size=500)
+            record_changes(expenses, company_id=company.id)
+            BankTransaction.objects.bulk_update(txs, ["linked_expense", "status", "reviewed_at", "reviewed_by"], batch_size=500)
+        created_expenses.extend(expenses)
+        if len(txs) < chunk_size:
+            break
+    return len(created_expenses), created_expenses
+
+
+def bulk_review(conn, action: str, qs, *, user=None, employee=None, chunk_size: int = 500) -> BulkReviewResult:
+    """Apply a review-queue action to every transaction in `qs` with set-based writes.
+
+    ignore/transfer/link_existing are one `UPDATE ... WHERE` each; create_expense
+    resolves merchants per chunk, `bulk_create`s the draft expenses and links
+    them with one `bulk_update`. Counts match the per-row implementation:
+    rows that don't qualify are reported as skipped.
+    """
+    if action not in REVIEW_ACTIONS:
+        raise ValueError(f"Unknown review action: {action}")
+
+    qs = qs.filter(account__connection=conn)
+    total = qs.count()
+    result = BulkReviewResult()
+    reviewed_at = timezone.now()
+    reviewed = {"reviewed_at": reviewed_at, "reviewed_by": user}
+
+    if action in {"ignore", "transfer"}:
+        target = BankTransaction.Status.IGNORED if action == "ignore" else BankTransaction.Status.TRANSFER
+        result.updated = qs.exclude(status=target).update(status=target, **reviewed)
+        result.skipped = total - result.updated
+        return result
+
+    if action == "link_existing":
+        result.linked = qs.filter(linked_expense__isnull=True, suggested_existing_expense__isnull=False).update(
+            linked_expense=F("suggested_existing_expense"), status=BankTransaction.Status.EXPENSE_CREATED, **reviewed
+        )
+        result.skipped = total - result.linked
+        return result
+
+    company = conn.company
+    result.created, expenses = _create_expenses(
+        qs, company=company, employee=employee, user=user, reviewed_at=reviewed_at, chunk_size=chunk_size
+    )
+    result.skipped = total - result.created
+
+    # bulk_create skips post_save: keep dashboard KPI buckets and the search index in step.
+    from core.kpis import refresh_kpis_for_rows
+    from core.search import index_rows
+
+    try:
+        refresh_kpis_for_rows(Expense, expenses)
+    except Exception:
+        pass
+    try:
+        index_rows(Expense, expenses)
+    except Exception:
+        pass
+    return result
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass, field
 
+from django.db import transaction
+
+from core.jobs import extend_lease
 from expenses.models import Expense, Merchant
 
 from .models import BankRule, BankTransaction
@@ -36,7 +40,174 @@ def rule_matches(rule: BankRule, tx: BankTransaction) -> bool:
     return False
 
 
-def apply_rules_to_transaction(*, tx: BankTransaction, rules: list[BankRule]) -> bool:
+class _Automaton:
+    """Aho-Corasick automaton over rule needles (also serves as a plain prefix trie).
+
+    Node 0 is the root; `out[node]` lists the rule positions whose needle ends
+    at that node (after `build()`, including needles reachable via fail links).
+    """
+
+    def __init__(self) -> None:
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.out: list[list[int]] = [[]]
+
+    def add(self, needle: str, pos: int) -> None:
+        node = 0
+        for ch in needle:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            node = nxt
+        self.out[node].append(pos)
+
+    def build(self) -> None:
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def search(self, hay: str) -> set[int]:
+        """Rule positions whose needle occurs anywhere in `hay`."""
+        found: set[int] = set()
+        node = 0
+        for ch in hay:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.out[node]:
+                found.update(self.out[node])
+        return found
+
+    def prefixes(self, hay: str) -> set[int]:
+        """Rule positions whose needle is a prefix of `hay` (trie walk, no fail links)."""
+        found: set[int] = set()
+        node = 0
+        for ch in hay:
+            node = self.goto[node].get(ch)
+            if node is None:
+                break
+            found.update(self.out[node])
+        return found
+
+
+class CompiledRuleSet:
+    """A company's active rules compiled into one matcher.
+
+    `equals` needles live in a hash map, `contains` needles in an Aho-Corasick
+    automaton and `starts_with` needles in a trie (one set per match field).
+    Every candidate found is then checked against its amount guardrails in
+    priority order, so `match()` returns the same rule as running
+    `rule_matches` over the ordered list, without scanning every rule.
+    """
+
+    def __init__(self, rules: list[BankRule]) -> None:
+        self.rules = [r for r in rules if r.is_active and _norm(r.match_text)]
+        self._equals: dict[str, dict[str, list[int]]] = {}
+        self._contains: dict[str, _Automaton] = {}
+        self._starts: dict[str, _Automaton] = {}
+        for pos, rule in enumerate(self.rules):
+            needle = _norm(rule.match_text)
+            match_field = rule.match_field
+            if rule.match_type == BankRule.MatchType.EQUALS:
+                self._equals.setdefault(match_field, {}).setdefault(needle, []).append(pos)
+            elif rule.match_type == BankRule.MatchType.CONTAINS:
+                self._contains.setdefault(match_field, _Automaton()).add(needle, pos)
+            elif rule.match_type == BankRule.MatchType.STARTS_WITH:
+                self._starts.setdefault(match_field, _Automaton()).add(needle, pos)
+        for auto in self._contains.values():
+            auto.build()
+        self._fields = set(self._equals) | set(self._contains) | set(self._starts)
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def _candidates(self, tx: BankTransaction) -> set[int]:
+        found: set[int] = set()
+        for match_field in self._fields:
+            hay = _norm(tx.name if match_field == BankRule.MatchField.NAME else tx.category)
+            found.update(self._equals.get(match_field, {}).get(hay, ()))
+            if match_field in self._contains:
+                found.update(self._contains[match_field].search(hay))
+            if match_field in self._starts:
+                found.update(self._starts[match_field].prefixes(hay))
+        return found
+
+    def match(self, tx: BankTransaction) -> BankRule | None:
+        amt = int(tx.amount_cents or 0)
+        for pos in sorted(self._candidates(tx)):
+            rule = self.rules[pos]
+            if rule.min_amount_cents is not None and amt < int(rule.min_amount_cents):
+                continue
+            if rule.max_amount_cents is not None and amt > int(rule.max_amount_cents):
+                continue
+            return rule
+        return None
+
+
+_RULE_FIELDS = ["status", "suggested_merchant_name", "suggested_category", "applied_rule", "linked_expense"]
+
+
+def _rule_state(tx: BankTransaction) -> tuple:
+    return (tx.status, tx.suggested_merchant_name, tx.suggested_category, tx.applied_rule_id, tx.linked_expense_id)
+
+
+def _apply_rule(tx: BankTransaction, rule: BankRule, *, company=None, merchants: dict | None = None) -> None:
+    """Set a matched rule's suggestions/status on `tx` (creates the draft expense for auto-create rules)."""
+    tx.applied_rule = rule
+
+    # Always set suggestions when provided
+    if rule.merchant_name:
+        tx.suggested_merchant_name = rule.merchant_name
+    if rule.expense_category:
+        tx.suggested_category = rule.expense_category
+
+    if rule.action == BankRule.Action.IGNORE:
+        tx.status = BankTransaction.Status.IGNORED
+    elif rule.action == BankRule.Action.TRANSFER:
+        tx.status = BankTransaction.Status.TRANSFER
+    elif rule.action == BankRule.Action.AUTO_CREATE_EXPENSE:
+        # Only create expenses for debits (positive amounts)
+        if int(tx.amount_cents) > 0 and tx.linked_expense_id is None:
+            company = company or tx.account.connection.company
+            employee = None
+            merchant_name = (tx.suggested_merchant_name or tx.name or "").strip()[:160] or "Bank transaction"
+            merchant = (merchants or {}).get(merchant_name)
+            if merchant is None:
+                merchant, _ = Merchant.objects.get_or_create(company=company, name=merchant_name)
+                if merchants is not None:
+                    merchants[merchant_name] = merchant
+            exp = Expense.objects.create(
+                company=company,
+                created_by=employee,
+                merchant=merchant,
+                date=tx.posted_date,
+                category=(tx.suggested_category or tx.category or "")[:120],
+                description=f"Imported from bank feed: {tx.transaction_id}",
+                amount_cents=int(tx.amount_cents),
+                tax_cents=0,
+                total_cents=int(tx.amount_cents),
+                status="draft",
+            )
+            tx.linked_expense = exp
+            tx.status = BankTransaction.Status.EXPENSE_CREATED
+        else:
+            tx.status = BankTransaction.Status.NEW
+    else:
+        # Suggest only
+        tx.status = BankTransaction.Status.NEW
+
+
+def apply_rules_to_transaction(*, tx: BankTransaction, rules: list[BankRule] | CompiledRuleSet) -> bool:
     """Apply the first matching rule to a transaction.
 
     Returns True if a rule was applied.
@@ -45,78 +216,77 @@ def apply_rules_to_transaction(*, tx: BankTransaction, rules: list[BankRule]) ->
     if tx.status in {BankTransaction.Status.EXPENSE_CREATED}:
         return False
 
-    for rule in rules:
-        if not rule_matches(rule, tx):
-            continue
-
-        tx.applied_rule = rule
-
-        # Always set suggestions when provided
-        if rule.merchant_name:
-            tx.suggested_merchant_name = rule.merchant_name
-        if rule.expense_category:
-            tx.suggested_category = rule.expense_category
-
-        if rule.action == BankRule.Action.IGNORE:
-            tx.status = BankTransaction.Status.IGNORED
-        elif rule.action == BankRule.Action.TRANSFER:
-            tx.status = BankTransaction.Status.TRANSFER
-        elif rule.action == BankRule.Action.AUTO_CREATE_EXPENSE:
-            # Only create expenses for debits (positive amounts)
-            if int(tx.amount_cents) > 0 and tx.linked_expense_id is None:
-                company = tx.account.connection.company
-                employee = None
-                merchant_name = (tx.suggested_merchant_name or tx.name or "").strip()[:160] or "Bank transaction"
-                merchant, _ = Merchant.objects.get_or_create(company=company, name=merchant_name)
-                exp = Expense.objects.create(
-                    company=company,
-                    created_by=employee,
-                    merchant=merchant,
-                    date=tx.posted_date,
-                    category=(tx.suggested_category or tx.category or "")[:120],
-                    description=f"Imported from bank feed: {tx.transaction_id}",
-                    amount_cents=int(tx.amount_cents),
-                    tax_cents=0,
-                    total_cents=int(tx.amount_cents),
-                    status="draft",
-                )
-                tx.linked_expense = exp
-                tx.status = BankTransaction.Status.EXPENSE_CREATED
-            else:
-                tx.status = BankTransaction.Status.NEW
-        else:
-            # Suggest only
-            tx.status = BankTransaction.Status.NEW
+    compiled = rules if isinstance(rules, CompiledRuleSet) else CompiledRuleSet(list(rules))
+    rule = compiled.match(tx)
+    if rule is None:
+        return False
+    with transaction.atomic():
+        _apply_rule(tx, rule)
+        tx.save(update_fields=_RULE_FIELDS)
+    return True
 
-        tx.save(
-            update_fields=[
-                "status",
-                "suggested_merchant_name",
-                "suggested_category",
-                "applied_rule",
-                "linked_expense",
-            ]
-        )
-        return True
 
-    return False
+@dataclass
+class BankRuleRunResult:
+    scanned: int = 0
+    matched: int = 0
+    updated: int = 0
+    hits: dict[int, int] = field(default_factory=dict)
 
 
-def apply_rules_for_company(company, *, qs=None) -> int:
-    """Apply active rules to NEW transactions for a company.
+def run_bank_rules(company, *, qs=None, chunk_size: int = 2000) -> BankRuleRunResult:
+    """Apply active rules to every NEW transaction of a company.
 
-    Returns number of transactions updated.
+    The backlog is read in id-ordered chunks, matched with one
+    `CompiledRuleSet`, and only rows whose rule fields changed are written,
+    with one `bulk_update` per chunk. Each chunk is one transaction (with its
+    rows locked), including any expenses created by auto-create rules. `hits`
+    counts matches per rule id.
     """
-
-    rules = list(company.bank_rules.filter(is_active=True).order_by("priority", "id"))
-    if not rules:
-        return 0
+    result = BankRuleRunResult()
+    compiled = CompiledRuleSet(list(company.bank_rules.filter(is_active=True).order_by("priority", "id")))
+    if not compiled:
+        return result
 
     txs = qs if qs is not None else BankTransaction.objects.filter(account__connection__company=company)
-    txs = txs.select_related("account__connection").filter(status=BankTransaction.Status.NEW)
+    txs = txs.filter(status=BankTransaction.Status.NEW).only(
+        "id", "account_id", "transaction_id", "posted_date", "name", "amount_cents", "category", *_RULE_FIELDS
+    )
+    merchants: dict = {}
+    last_id = 0
+    while True:
+        # One transaction per chunk: auto-created expenses commit together with the
+        # bulk_update that links them, so a failure never leaves unlinked expenses
+        # for the next run to duplicate.
+        with transaction.atomic():
+            chunk = list(txs.filter(id__gt=last_id).select_for_update().order_by("id")[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            result.scanned += len(chunk)
+
+            dirty: list[BankTransaction] = []
+            for tx in chunk:
+                rule = compiled.match(tx)
+                if rule is None:
+                    continue
+                result.matched += 1
+                result.hits[rule.id] = result.hits.get(rule.id, 0) + 1
+                before = _rule_state(tx)
+                _apply_rule(tx, rule, company=company, merchants=merchants)
+                if _rule_state(tx) != before:
+                    dirty.append(tx)
+
+            if dirty:
+                BankTransaction.objects.bulk_update(dirty, _RULE_FIELDS, batch_size=500)
+                result.updated += len(dirty)
+        extend_lease()
+    return result
 
-    updated = 0
-    for tx in txs[:500]:
-        if apply_rules_to_transaction(tx=tx, rules=rules):
-            updated += 1
-    return updated
+
+def apply_rules_for_company(company, *, qs=None) -> int:
+    """Apply active rules to NEW transactions for a company.
+
+    Returns number of transactions updated (see `run_bank_rules` for hit counts).
+    """
+    return run_bank_rules(company, qs=qs).updated
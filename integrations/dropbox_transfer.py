@@ -0,0 +1,249 @@
+"""Dropbox transfer engine (project file sync).
+
+- `DropboxClient` keeps one `requests.Session` per connection, so calls reuse
+  pooled keep-alive connections instead of paying a TLS handshake each;
+- files up to `DROPBOX_CHUNK_SIZE` go up in one `files/upload` call; larger ones
+  are streamed from storage through an upload session (start/append_v2/finish)
+  one chunk at a time, so memory stays at about one chunk per worker;
+- `ensure_folder` remembers folders it has created or found, so a folder costs
+  one API call per client, not one per file;
+- `transfer_files` runs uploads on a bounded thread pool and yields results as
+  they finish. Workers only touch storage and HTTP; callers do DB writes on
+  their own thread;
+- 429/5xx responses and connection errors are retried, honouring `Retry-After`
+  (Dropbox rate limits) or backing off exponentially.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Iterable, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .services import (
+    DROPBOX_CREATE_FOLDER_URL,
+    DROPBOX_LIST_SHARED_LINKS_URL,
+    DROPBOX_SHARED_LINK_URL,
+    DROPBOX_UPLOAD_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+DROPBOX_SESSION_START_URL = "https://content.dropboxapi.com/2/files/upload_session/start"
+DROPBOX_SESSION_APPEND_URL = "https://content.dropboxapi.com/2/files/upload_session/append_v2"
+DROPBOX_SESSION_FINISH_URL = "https://content.dropboxapi.com/2/files/upload_session/finish"
+
+# Dropbox wants session chunks in multiples of 4 MiB (max 150 MiB per call).
+DROPBOX_CHUNK_SIZE = 8 * 1024 * 1024
+DROPBOX_MAX_RETRIES = 5
+DROPBOX_RETRY_MAX_SECONDS = 60
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DropboxTransferError(Exception):
+    pass
+
+
+def _new_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    return session
+
+
+def _retry_after(resp) -> float | None:
+    try:
+        return float(resp.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return float(resp.json().get("error", {}).get("retry_after"))
+    except Exception:
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    return min(DROPBOX_RETRY_MAX_SECONDS, 2**attempt) * random.uniform(0.8, 1.2)
+
+
+def _error_tag(resp) -> tuple[str, dict]:
+    try:
+        error = resp.json().get("error") or {}
+    except Exception:
+        return "", {}
+    return str(error.get(".tag") or ""), error
+
+
+class DropboxClient:
+    """Dropbox API calls over one pooled session. Safe to share across upload threads."""
+
+    def __init__(self, access_token: str, *, pool_size: int = 4, session=None, sleep: Callable[[float], None] = time.sleep):
+        self.session = session or _new_session(pool_size)
+        self._auth = {"Authorization": f"Bearer {access_token}"}
+        self._sleep = sleep
+        self._folders: set[str] = set()
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "DropboxClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _post(self, url: str, *, json_body: Any = None, arg: dict | None = None, data: bytes = b"", timeout: int = 20):
+        headers = dict(self._auth)
+        if arg is not None:
+            headers["Dropbox-API-Arg"] = json.dumps(arg)
+            headers["Content-Type"] = "application/octet-stream"
+            kwargs = {"data": data}
+        else:
+            kwargs = {"json": json_body}
+        for attempt in range(DROPBOX_MAX_RETRIES + 1):
+            try:
+                resp = self.session.post(url, headers=headers, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= DROPBOX_MAX_RETRIES:
+                    raise
+                self._sleep(_backoff(attempt))
+                continue
+            if resp.status_code in _RETRY_STATUSES and attempt < DROPBOX_MAX_RETRIES:
+                wait = _retry_after(resp)
+                logger.info("dropbox_retry status=%s attempt=%s wait=%s", resp.status_code, attempt + 1, wait)
+                self._sleep(wait if wait is not None else _backoff(attempt))
+                continue
+            return resp
+        raise DropboxTransferError("unreachable")  # pragma: no cover
+
+    def ensure_folder(self, folder_path: str) -> None:
+        """Create `folder_path` unless this client already created or found it."""
+        with self._lock:
+            if folder_path in self._folders:
+                return
+        resp = self._post(DROPBOX_CREATE_FOLDER_URL, json_body={"path": folder_path, "autorename": False})
+        if resp.status_code != 409:  # 409: already exists
+            resp.raise_for_status()
+        with self._lock:
+            self._folders.add(folder_path)
+
+    def upload(self, dropbox_path: str, f: IO[bytes], *, chunk_size: int = DROPBOX_CHUNK_SIZE) -> dict[str, Any]:
+        """Upload a readable binary file object; returns Dropbox file metadata."""
+        commit = {"path": dropbox_path, "mode": "add", "autorename": True, "mute": False, "strict_conflict": False}
+        chunk = f.read(chunk_size)
+        if len(chunk) < chunk_size:
+            resp = self._post(DROPBOX_UPLOAD_URL, arg=commit, data=chunk, timeout=120)
+            resp.raise_for_status()
+            return resp.json()
+
+        resp = self._post(DROPBOX_SESSION_START_URL, arg={"close": False}, data=chunk, timeout=120)
+        resp.raise_for_status()
+        session_id = resp.json()["session_id"]
+        offset = len(chunk)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            self._append(session_id, offset, chunk)
+            offset += len(chunk)
+
+        resp = self._post(
+            DROPBOX_SESSION_FINISH_URL,
+            arg={"cursor": {"session_id": session_id, "offset": offset}, "commit": commit},
+            timeout=120,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def _append(self, session_id: str, offset: int, chunk: bytes) -> None:
+        resp = self._post(
+            DROPBOX_SESSION_APPEND_URL,
+            arg={"cursor": {"session_id": session_id, "offset": offset}, "close": False},
+            data=chunk,
+            timeout=120,
+        )
+        if resp.status_code == 409:
+            tag, error = _error_tag(resp)
+            # A retried append whose first attempt actually landed: Dropbox is already past this chunk.
+            if tag == "incorrect_offset" and int(error.get("correct_offset") or -1) == offset + len(chunk):
+                return
+            raise DropboxTransferError(f"upload session append failed: {tag or resp.status_code}")
+        resp.raise_for_status()
+
+    def shared_link(self, dropbox_path: str) -> str:
+        """Create (or reuse) a public viewer link for `dropbox_path`."""
+        resp = self._post(
+            DROPBOX_SHARED_LINK_URL,
+            json_body={
+                "path": dropbox_path,
+                "settings": {"requested_visibility": "public", "audience": "public", "access": "viewer"},
+            },
+        )
+        if resp.status_code == 409:
+            _tag, error = _error_tag(resp)
+            url = ((error.get("shared_link_already_exists") or {}).get("metadata") or {}).get("url")
+            if url:
+                return str(url)
+            listed = self._post(DROPBOX_LIST_SHARED_LINKS_URL, json_body={"path": dropbox_path, "direct_only": True})
+            listed.raise_for_status()
+            links = listed.json().get("links") or []
+            if links:
+                return str(links[0].get("url", ""))
+        resp.raise_for_status()
+        return str(resp.json().get("url", ""))
+
+
+@dataclass(frozen=True)
+class TransferItem:
+    key: Any
+    dropbox_path: str
+    open: Callable[[], IO[bytes]]  # called on the worker thread
+
+
+@dataclass(frozen=True)
+class TransferResult:
+    key: Any
+    dropbox_path: str = ""
+    shared_url: str = ""
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def _transfer_one(client: DropboxClient, item: TransferItem, chunk_size: int) -> TransferResult:
+    try:
+        with item.open() as f:
+            meta = client.upload(item.dropbox_path, f, chunk_size=chunk_size)
+        path = str(meta.get("path_display") or meta.get("path_lower") or item.dropbox_path)
+        return TransferResult(key=item.key, dropbox_path=path, shared_url=client.shared_link(path))
+    except Exception as exc:
+        logger.warning("dropbox_transfer_failed path=%s", item.dropbox_path, exc_info=True)
+        return TransferResult(key=item.key, error=f"{exc.__class__.__name__}: {exc}"[:255])
+
+
+def transfer_files(
+    client: DropboxClient,
+    items: Iterable[TransferItem],
+    *,
+    max_workers: int = 4,
+    chunk_size: int = DROPBOX_CHUNK_SIZE,
+) -> Iterator[TransferResult]:
+    """Upload `items` on at most `max_workers` threads; yield each result as it completes."""
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items))), thread_name_prefix="dropbox") as pool:
+        futures = [pool.submit(_transfer_one, client, item, chunk_size) for item in items]
+        for fut in as_completed(futures):
+            yield fut.result()
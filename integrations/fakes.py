@@ -0,0 +1,40 @@
+"""Test doubles shared by the integrations and projects test suites."""
+
+from __future__ import annotations
+
+import json
+
+import requests
+
+
+class FakeDropboxSession:
+    """Records calls; replies from `responses` (url suffix -> list of (status, body, headers))."""
+
+    def __init__(self, responses=None):
+        self.responses = {k: list(v) for k, v in (responses or {}).items()}
+        self.calls = []
+        self.closed = False
+
+    def post(self, url, *, headers, timeout, **kwargs):
+        endpoint = url.split("/2/", 1)[1]
+        arg = headers.get("Dropbox-API-Arg")
+        self.calls.append((endpoint, kwargs.get("json") if arg is None else json.loads(arg), kwargs.get("data")))
+        queued = self.responses.get(endpoint)
+        status, body, extra = queued.pop(0) if queued else (200, self._default(endpoint), {})
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(body).encode()
+        resp.headers.update(extra)
+        return resp
+
+    def _default(self, endpoint):
+        if endpoint == "files/upload_session/start":
+            return {"session_id": "sess"}
+        if endpoint in ("files/upload", "files/upload_session/finish"):
+            return {"path_display": "/Uploaded/file.bin"}
+        if endpoint == "sharing/create_shared_link_with_settings":
+            return {"url": "https://dropbox.test/s/abc"}
+        return {}
+
+    def close(self):
+        self.closed = True
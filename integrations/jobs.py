@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from core.jobs import job_handler
+
+from .bank_rules import run_bank_rules
+from .models import BankConnection
+from .services import refresh_duplicate_suggestions, sync_bank_transactions
+
+
+@job_handler("integrations.bank_sync")
+def bank_sync(*, company_id: str) -> dict | None:
+    conn = BankConnection.objects.select_related("company").filter(company_id=company_id).first()
+    if not conn or not conn.is_active or not conn.access_token:
+        return {"skipped": "not connected"}
+
+    conn.last_sync_status = "running"
+    conn.save(update_fields=["last_sync_status", "updated_at"])
+    res = sync_bank_transactions(conn)
+    return {
+        "added": res.added,
+        "modified": res.modified,
+        "removed": res.removed,
+        "pages": res.pages,
+        "rules_applied": res.rules_applied,
+        "duplicates_suggested": res.duplicates_suggested,
+    }
+
+
+@job_handler("integrations.bank_suggest_duplicates")
+def bank_suggest_duplicates(*, company_id: str) -> dict | None:
+    conn = BankConnection.objects.select_related("company").filter(company_id=company_id).first()
+    if not conn:
+        return {"skipped": "not connected"}
+    return {"suggested": refresh_duplicate_suggestions(conn.company)}
+
+
+@job_handler("integrations.bank_apply_rules")
+def bank_apply_rules(*, company_id: str) -> dict | None:
+    conn = BankConnection.objects.select_related("company").filter(company_id=company_id).first()
+    if not conn:
+        return {"skipped": "not connected"}
+    res = run_bank_rules(conn.company)
+    return {"scanned": res.scanned, "matched": res.matched, "updated": res.updated, "rules_hit": len(res.hits)}
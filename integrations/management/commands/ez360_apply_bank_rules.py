@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from companies.models import Company
+from integrations.bank_rules import run_bank_rules
+from integrations.models import BankRule
+
+
+class Command(BaseCommand):
+    help = "Apply active bank rules to every NEW bank transaction and report hits per rule."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default="", help="Only run for this company.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Transactions matched per write batch.")
+
+    def handle(self, *args, **options):
+        company_ids = BankRule.objects.filter(is_active=True).values_list("company_id", flat=True).distinct()
+        companies = Company.objects.filter(id__in=company_ids)
+        company_id = (options.get("company_id") or "").strip()
+        if company_id:
+            companies = companies.filter(id=company_id)
+
+        chunk_size = max(100, int(options.get("chunk_size") or 2000))
+        for company in companies.order_by("name"):
+            res = run_bank_rules(company, chunk_size=chunk_size)
+            self.stdout.write(
+                f"company={company.id} scanned={res.scanned} matched={res.matched} updated={res.updated}"
+            )
+            for rule_id, hits in sorted(res.hits.items(), key=lambda kv: -kv[1]):
+                self.stdout.write(f"  rule={rule_id} hits={hits}")
+        self.stdout.write(self.style.SUCCESS("Bank rules applied."))
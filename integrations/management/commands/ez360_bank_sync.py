@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import enqueue
+from integrations.models import BankConnection
+from integrations.services import bank_feeds_is_configured, bank_feeds_is_enabled, sync_bank_transactions
+
+
+class Command(BaseCommand):
+    help = "Sync Plaid transactions for every active bank connection (resumes from each saved cursor)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default="", help="Only sync this company.")
+        parser.add_argument("--queue", action="store_true", help="Enqueue integrations.bank_sync jobs instead of syncing inline.")
+
+    def handle(self, *args, **options):
+        if not (bank_feeds_is_enabled() and bank_feeds_is_configured()):
+            self.stdout.write(self.style.WARNING("Bank feeds are not enabled/configured; nothing to do."))
+            return
+
+        conns = BankConnection.objects.select_related("company").filter(is_active=True).exclude(access_token="")
+        company_id = (options.get("company_id") or "").strip()
+        if company_id:
+            conns = conns.filter(company_id=company_id)
+
+        ok = failed = 0
+        for conn in conns.order_by("company_id"):
+            if options.get("queue"):
+                enqueue(
+                    "integrations.bank_sync",
+                    company=conn.company,
+                    payload={"company_id": str(conn.company_id)},
+                    priority=50,
+                    max_attempts=3,
+                    dedupe_key=f"bank_sync:{conn.company_id}",
+                )
+                ok += 1
+                continue
+            try:
+                res = sync_bank_transactions(conn)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"company={conn.company_id} error={e}")
+                continue
+            ok += 1
+            self.stdout.write(
+                f"company={conn.company_id} pages={res.pages} added={res.added} modified={res.modified} "
+                f"removed={res.removed} rules_applied={res.rules_applied}"
+            )
+
+        verb = "Queued" if options.get("queue") else "Synced"
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(f"{verb} {ok} bank connection(s); {failed} failed."))
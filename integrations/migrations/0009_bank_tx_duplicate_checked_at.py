@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0008_rename_intg_co_s_e_idx_integration_company_82e4d9_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banktransaction',
+            name='duplicate_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
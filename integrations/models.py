@@ -149,6 +149,9 @@ class BankTransaction(models.Model):
         help_text="Potential existing expense match suggested by heuristics (non-binding).",
     )
     suggested_existing_expense_score = models.PositiveSmallIntegerField(default=0)
+    # Set once the duplicate matcher has looked at the row (match or not), so the
+    # review queue can tell "no duplicate" from "not checked yet".
+    duplicate_checked_at = models.DateTimeField(null=True, blank=True)
 
     reviewed_at = models.DateTimeField(null=True, blank=True)
     reviewed_by = models.ForeignKey(
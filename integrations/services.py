@@ -300,7 +300,17 @@ def plaid_fetch_accounts(*, access_token: str) -> dict[str, Any]:
     return resp.json()
 
 
-def plaid_transactions_sync(*, access_token: str, cursor: str | None = None) -> dict[str, Any]:
+# Largest page /transactions/sync accepts; fewer round trips on initial history pulls.
+PLAID_SYNC_PAGE_SIZE = 500
+
+PLAID_SYNC_MUTATION_ERROR = "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+
+# Feed-owned columns refreshed when Plaid re-sends a transaction. Review state
+# (status, suggestions, linked expense, applied rule) is never overwritten.
+BANK_TX_FEED_FIELDS = ["posted_date", "name", "amount_cents", "is_pending", "category", "raw"]
+
+
+def plaid_transactions_sync(*, access_token: str, cursor: str | None = None, count: int | None = None) -> dict[str, Any]:
     """Incremental sync of transactions.
 
     Returns a dict containing added/modified/removed plus next_cursor + has_more.
@@ -309,76 +319,360 @@ def plaid_transactions_sync(*, access_token: str, cursor: str | None = None) ->
     payload: dict[str, Any] = {**_plaid_auth_payload(), "access_token": access_token}
     if cursor:
         payload["cursor"] = cursor
+    if count:
+        payload["count"] = int(count)
     resp = requests.post(url, headers=_plaid_headers(), json=payload, timeout=60)
     resp.raise_for_status()
     return resp.json()
 
 
-def suggest_existing_expense_for_tx(*, company, tx):
-    """Return (expense, score) for a potential duplicate match.
+def _plaid_error_code(exc: Exception) -> str:
+    resp = getattr(exc, "response", None)
+    try:
+        return str((resp.json() or {}).get("error_code") or "")
+    except Exception:
+        return ""
 
-    This is intentionally conservative so we do not auto-link incorrectly.
-    The suggestion is used only in the Bank Review Queue UI.
 
-    Heuristic:
-    - same company
-    - same total cents
-    - expense date within +/- 1 day of posted_date
-    - merchant name matches (case-insensitive equals or containment)
+@dataclass
+class BankSyncResult:
+    added: int = 0
+    modified: int = 0
+    removed: int = 0
+    rules_applied: int = 0
+    duplicates_suggested: int = 0
+    pages: int = 0
+
+
+def normalize_plaid_transaction(t: dict[str, Any], acct_map: dict):
+    """Build an unsaved BankTransaction from a Plaid transaction, or None if it can't be stored."""
+    from .models import BankTransaction
+
+    bank_acct = acct_map.get(str(t.get("account_id") or ""))
+    tx_id = str(t.get("transaction_id") or "")
+    if not bank_acct or not tx_id:
+        return None
+
+    posted = None
+    date_str = t.get("date")
+    if date_str:
+        try:
+            posted = timezone.datetime.fromisoformat(str(date_str)).date()
+        except Exception:
+            posted = None
+    try:
+        amt_cents = int(round(float(t.get("amount")) * 100))
+    except Exception:
+        amt_cents = 0
+    cats = t.get("category") or []
+    if isinstance(cats, list):
+        cat = " > ".join([str(x) for x in cats if x])
+    else:
+        cat = str(cats)
+
+    return BankTransaction(
+        account=bank_acct,
+        transaction_id=tx_id,
+        posted_date=posted,
+        name=str(t.get("name") or t.get("merchant_name") or "")[:255],
+        amount_cents=amt_cents,
+        is_pending=bool(t.get("pending")),
+        category=cat[:255],
+        raw=t,
+    )
 
-    Score is 0..100. 0 means no suggestion.
+
+def apply_plaid_sync_page(conn, page: dict[str, Any], acct_map: dict) -> tuple[int, int, int]:
+    """Write one /transactions/sync page and checkpoint the cursor, atomically.
+
+    Added and modified transactions go through one upsert on
+    (account, transaction_id); a modification that changes the amount, date or
+    name drops the row's duplicate suggestion so it is matched again. Removed
+    ones are deleted unless already turned into an expense. Returns
+    (upserted, removed, skipped).
     """
+    from django.db import transaction
 
+    from .models import BankTransaction
+
+    rows: dict[tuple[int, str], BankTransaction] = {}
+    skipped = 0
+    for t in list(page.get("added") or []) + list(page.get("modified") or []):
+        row = normalize_plaid_transaction(t, acct_map)
+        if row is None:
+            skipped += 1
+            continue
+        # Postgres rejects an upsert that touches the same row twice.
+        rows[(row.account.id, row.transaction_id)] = row
+
+    removed_ids = [
+        str(r.get("transaction_id") or "")
+        for r in (page.get("removed") or [])
+        if isinstance(r, dict) and r.get("transaction_id")
+    ]
+
+    with transaction.atomic():
+        if rows:
+            # Rows whose matching inputs change must be re-checked for duplicate expenses.
+            before = {
+                (account_id, tx_id): (amount, posted, name)
+                for account_id, tx_id, amount, posted, name in BankTransaction.objects.filter(
+                    account__connection=conn, transaction_id__in={tx_id for _a, tx_id in rows}
+                ).values_list("account_id", "transaction_id", "amount_cents", "posted_date", "name")
+            }
+            rematch = [
+                key
+                for key, row in rows.items()
+                if key in before and before[key] != (row.amount_cents, row.posted_date, row.name)
+            ]
+            BankTransaction.objects.bulk_create(
+                list(rows.values()),
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["account", "transaction_id"],
+                update_fields=BANK_TX_FEED_FIELDS,
+            )
+            if rematch:
+                BankTransaction.objects.filter(
+                    account_id__in={a for a, _t in rematch}, transaction_id__in={t for _a, t in rematch}
+                ).update(duplicate_checked_at=None, suggested_existing_expense=None, suggested_existing_expense_score=0)
+        removed = 0
+        if removed_ids:
+            removed, _ = BankTransaction.objects.filter(
+                account__connection=conn,
+                transaction_id__in=removed_ids,
+                linked_expense__isnull=True,
+            ).delete()
+        conn.sync_cursor = str(page.get("next_cursor") or conn.sync_cursor or "")
+        conn.save(update_fields=["sync_cursor", "updated_at"])
+    return len(rows), removed, skipped
+
+
+def sync_bank_transactions(conn, *, max_restarts: int = 2) -> BankSyncResult:
+    """Pull new Plaid transactions for a BankConnection and apply bank rules.
+
+    Each page is written in bulk and its `next_cursor` saved in the same
+    transaction, so an interrupted sync resumes from the last finished page.
+    Records ok/error on the connection; errors are re-raised so a background
+    job can retry.
+    """
+    from core.jobs import extend_lease
+
+    from .bank_rules import apply_rules_for_company
+
+    result = BankSyncResult()
     try:
-        from expenses.models import Expense
+        acct_map = {a.account_id: a for a in conn.accounts.all()}
+        start_cursor = conn.sync_cursor or ""
+        restarts = 0
+        has_more = True
+        while has_more:
+            try:
+                page = plaid_transactions_sync(
+                    access_token=conn.access_token, cursor=conn.sync_cursor or None, count=PLAID_SYNC_PAGE_SIZE
+                )
+            except requests.HTTPError as e:
+                # Plaid asks clients to restart pagination when data changes mid-loop;
+                # upserts make replaying already-written pages harmless.
+                if _plaid_error_code(e) != PLAID_SYNC_MUTATION_ERROR or restarts >= max_restarts:
+                    raise
+                restarts += 1
+                conn.sync_cursor = start_cursor
+                conn.save(update_fields=["sync_cursor", "updated_at"])
+                continue
+
+            _upserted, removed, _skipped = apply_plaid_sync_page(conn, page, acct_map)
+            has_more = bool(page.get("has_more"))
+            result.pages += 1
+            result.added += len(page.get("added") or [])
+            result.modified += len(page.get("modified") or [])
+            result.removed += removed
+            extend_lease()
+
+        conn.last_sync_at = timezone.now()
+        conn.last_sync_status = "ok"
+        conn.last_sync_error = ""
+        conn.save(update_fields=["last_sync_at", "last_sync_status", "last_sync_error", "updated_at"])
+    except Exception as e:
+        conn.last_sync_at = timezone.now()
+        conn.last_sync_status = "error"
+        conn.last_sync_error = str(e)
+        conn.save(update_fields=["last_sync_at", "last_sync_status", "last_sync_error", "updated_at"])
+        raise
+
+    # Apply rules to new transactions after each sync.
+    try:
+        result.rules_applied = apply_rules_for_company(conn.company)
     except Exception:
-        return (None, 0)
+        result.rules_applied = 0
 
-    if not company or not tx:
-        return (None, 0)
+    # Precompute duplicate-expense suggestions so the review queue only reads them.
+    try:
+        result.duplicates_suggested = refresh_duplicate_suggestions(conn.company)
+    except Exception:
+        result.duplicates_suggested = 0
+    return result
 
-    if getattr(tx, "linked_expense_id", None):
-        return (None, 0)
-    if int(getattr(tx, "amount_cents", 0) or 0) <= 0:
-        return (None, 0)
 
-    posted = getattr(tx, "posted_date", None)
-    if not posted:
-        return (None, 0)
+def _merchant_key(value: str) -> str:
+    return re.sub(r"\s+", " ", (value or "").strip()).lower()
 
-    tx_name = (getattr(tx, "suggested_merchant_name", "") or getattr(tx, "name", "") or "").strip().lower()
-    if not tx_name:
-        return (None, 0)
 
-    date_min = posted - timedelta(days=1)
-    date_max = posted + timedelta(days=1)
+def _duplicate_score(tx_name: str, posted, merchant_key: str, exp_date) -> int:
+    if not merchant_key:
+        return 0
+    if merchant_key == tx_name:
+        score = 95
+    elif merchant_key in tx_name or tx_name in merchant_key:
+        score = 75
+    else:
+        return 0
+    if exp_date == posted:
+        score = min(100, score + 5)
+    return score
+
+
+def suggest_existing_expenses(*, company, txs) -> dict:
+    """Return {tx.id: (expense, score)} of likely duplicate expenses for many transactions.
+
+    Set-based version of the Bank Review Queue heuristic: one Expense query
+    fetches every candidate for the batch, indexed by (total_cents, date);
+    merchant names are normalized once per merchant and compared in memory.
+
+    Heuristic (conservative, so we do not auto-link incorrectly):
+    - same company
+    - same total cents
+    - expense date within +/- 1 day of posted_date
+    - merchant name matches (case-insensitive equals or containment)
 
-    qs = (
-        Expense.objects.filter(company=company, total_cents=int(tx.amount_cents), date__gte=date_min, date__lte=date_max)
+    Score is 0..100; transactions without a match are omitted.
+    """
+    from expenses.models import Expense
+
+    wanted = {}
+    for tx in txs:
+        if getattr(tx, "linked_expense_id", None):
+            continue
+        amount = int(getattr(tx, "amount_cents", 0) or 0)
+        posted = getattr(tx, "posted_date", None)
+        tx_name = _merchant_key(getattr(tx, "suggested_merchant_name", "") or getattr(tx, "name", ""))
+        if amount <= 0 or not posted or not tx_name:
+            continue
+        wanted[tx.id] = (tx, amount, posted, tx_name)
+    if not company or not wanted:
+        return {}
+
+    amounts = {w[1] for w in wanted.values()}
+    dates = [w[2] for w in wanted.values()]
+    candidates = (
+        Expense.objects.filter(
+            company=company,
+            total_cents__in=amounts,
+            date__gte=min(dates) - timedelta(days=1),
+            date__lte=max(dates) + timedelta(days=1),
+        )
         .select_related("merchant")
+        .only("id", "date", "total_cents", "merchant__name")
         .order_by("-id")
     )
+    by_key: dict[tuple[int, Any], list] = {}
+    merchant_keys: dict[int, str] = {}
+    for exp in candidates:
+        by_key.setdefault((int(exp.total_cents), exp.date), []).append(exp)
+        if exp.merchant_id not in merchant_keys:
+            merchant_keys[exp.merchant_id] = _merchant_key(getattr(exp.merchant, "name", ""))
+
+    results = {}
+    for tx_id, (_tx, amount, posted, tx_name) in wanted.items():
+        pool = []
+        for offset in (-1, 0, 1):
+            pool.extend(by_key.get((amount, posted + timedelta(days=offset)), ()))
+        pool.sort(key=lambda e: e.id, reverse=True)
+
+        best, best_score = None, 0
+        for exp in pool[:25]:
+            score = _duplicate_score(tx_name, posted, merchant_keys.get(exp.merchant_id, ""), exp.date)
+            if score > best_score:
+                best, best_score = exp, score
+                if best_score >= 95:
+                    break
+        if best is not None:
+            results[tx_id] = (best, best_score)
+    return results
+
+
+def suggest_existing_expense_for_tx(*, company, tx):
+    """Return (expense, score) for a potential duplicate match (see `suggest_existing_expenses`)."""
+    if not company or not tx:
+        return (None, 0)
+    return suggest_existing_expenses(company=company, txs=[tx]).get(tx.id, (None, 0))
 
-    best = None
-    best_score = 0
-    for exp in qs[:25]:
-        m = (getattr(getattr(exp, "merchant", None), "name", "") or "").strip().lower()
-        if not m:
-            continue
-        if m == tx_name:
-            score = 95
-        elif m in tx_name or tx_name in m:
-            score = 75
-        else:
-            continue
 
-        if exp.date == posted:
-            score = min(100, score + 5)
+def clear_duplicate_checks_for_expense(expense) -> int:
+    """Queue unsuggested NEW transactions this expense could match for re-checking.
 
-        if score > best_score:
-            best = exp
-            best_score = score
-            if best_score >= 95:
-                break
+    Uses the same amount / +-1 day window as `suggest_existing_expenses`.
+    """
+    from .models import BankTransaction
+
+    if not expense.company_id or not expense.date or int(expense.total_cents or 0) <= 0:
+        return 0
+    return BankTransaction.objects.filter(
+        account__connection__company_id=expense.company_id,
+        status=BankTransaction.Status.NEW,
+        linked_expense__isnull=True,
+        suggested_existing_expense__isnull=True,
+        duplicate_checked_at__isnull=False,
+        amount_cents=int(expense.total_cents),
+        posted_date__gte=expense.date - timedelta(days=1),
+        posted_date__lte=expense.date + timedelta(days=1),
+    ).update(duplicate_checked_at=None)
+
+
+def refresh_duplicate_suggestions(company, *, qs=None, chunk_size: int = 500) -> int:
+    """Precompute duplicate-expense suggestions for unchecked NEW transactions.
+
+    Works through the backlog in id-keyed chunks, one candidate query and one
+    `bulk_update` per chunk, and stamps `duplicate_checked_at` so the review
+    queue never re-runs matching. The stamp is cleared again when the feed
+    changes a row's amount/date/name (`apply_plaid_sync_page`) or a matching
+    expense is saved (`clear_duplicate_checks_for_expense`). Returns the number
+    of suggestions stored.
+    """
+    from .models import BankTransaction
+
+    txs = qs if qs is not None else BankTransaction.objects.filter(account__connection__company=company)
+    txs = txs.filter(
+        status=BankTransaction.Status.NEW, linked_expense__isnull=True, duplicate_checked_at__isnull=True
+    ).only(
+        "id", "amount_cents", "posted_date", "name", "suggested_merchant_name", "linked_expense_id",
+        "suggested_existing_expense_id", "suggested_existing_expense_score", "duplicate_checked_at",
+    )
 
-    return (best, best_score)
+    stored = 0
+    last_id = 0
+    now = timezone.now()
+    while True:
+        chunk = list(txs.filter(id__gt=last_id).order_by("id")[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        matches = suggest_existing_expenses(
+            company=company,
+            txs=[tx for tx in chunk if not tx.suggested_existing_expense_id],
+        )
+        for tx in chunk:
+            tx.duplicate_checked_at = now
+            match = matches.get(tx.id)
+            if match:
+                tx.suggested_existing_expense_id = match[0].id
+                tx.suggested_existing_expense_score = int(match[1])
+                stored += 1
+        BankTransaction.objects.bulk_update(
+            chunk,
+            ["suggested_existing_expense", "suggested_existing_expense_score", "duplicate_checked_at"],
+            batch_size=500,
+        )
+        if len(chunk) < chunk_size:
+            break
+    return stored
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import logging
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from expenses.models import Expense
+
+from .services import clear_duplicate_checks_for_expense
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=Expense)
+def _recheck_bank_duplicates(sender, instance: Expense, raw: bool = False, **kwargs):
+    if raw or instance.deleted_at:
+        return
+    try:
+        clear_duplicate_checks_for_expense(instance)
+    except Exception:
+        # Derived data: never block the write.
+        logger.warning("bank_duplicate_recheck_failed expense=%s", instance.pk, exc_info=True)
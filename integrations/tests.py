@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import datetime
+import io
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from billing.models import CompanySubscription, PlanCode, SubscriptionStatus
+from companies.models import Company, EmployeeProfile, EmployeeRole
+from companies.services import ACTIVE_COMPANY_SESSION_KEY
+from core.jobs import run_ready_jobs
+from core.models import BackgroundJob
+from expenses.models import Expense, Merchant
+from integrations.bank_review import bulk_review, review_queue_queryset
+from integrations.bank_rules import CompiledRuleSet, rule_matches, run_bank_rules
+from integrations.dropbox_transfer import DropboxClient, TransferItem, transfer_files
+from integrations.fakes import FakeDropboxSession
+from integrations.models import BankAccount, BankConnection, BankRule, BankTransaction
+from integrations.services import refresh_duplicate_suggestions, suggest_existing_expense_for_tx, sync_bank_transactions
+from sync.models import SyncChange
+
+
+def _tx(tx_id: str, amount: float, *, name: str = "Coffee", pending: bool = False) -> dict:
+    return {
+        "transaction_id": tx_id,
+        "account_id": "acc_1",
+        "amount": amount,
+        "date": "2026-10-01",
+        "name": name,
+        "pending": pending,
+        "category": ["Food", "Coffee"],
+    }
+
+
+class PlaidBulkSyncTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.conn = BankConnection.objects.create(company=self.company, access_token="tok", is_active=True)
+        self.account = BankAccount.objects.create(connection=self.conn, account_id="acc_1", name="Checking")
+
+    def _sync(self, pages):
+        with mock.patch("integrations.services.plaid_transactions_sync", side_effect=pages) as fake:
+            res = sync_bank_transactions(self.conn)
+        return res, fake
+
+    def test_pages_upsert_modify_remove_and_checkpoint(self):
+        res, fake = self._sync(
+            [
+                {"added": [_tx("t1", 4.5, pending=True), _tx("t2", 12)], "modified": [], "removed": [], "next_cursor": "c1", "has_more": True},
+                {"added": [_tx("t3", 7)], "modified": [_tx("t1", 5.25)], "removed": [{"transaction_id": "t2"}], "next_cursor": "c2", "has_more": False},
+            ]
+        )
+        self.assertEqual((res.pages, res.added, res.modified, res.removed), (2, 3, 1, 1))
+        self.assertEqual(fake.call_args_list[1].kwargs["cursor"], "c1")
+
+        self.conn.refresh_from_db()
+        self.assertEqual(self.conn.sync_cursor, "c2")
+        self.assertEqual(self.conn.last_sync_status, "ok")
+        self.assertEqual(sorted(BankTransaction.objects.values_list("transaction_id", flat=True)), ["t1", "t3"])
+        t1 = BankTransaction.objects.get(transaction_id="t1")
+        self.assertEqual(t1.amount_cents, 525)
+        self.assertEqual(t1.category, "Food > Coffee")
+
+    def test_modifications_keep_review_state(self):
+        BankTransaction.objects.create(account=self.account, transaction_id="t1", amount_cents=100, status=BankTransaction.Status.IGNORED)
+        self._sync([{"added": [], "modified": [_tx("t1", 2)], "removed": [], "next_cursor": "c1", "has_more": False}])
+        t1 = BankTransaction.objects.get(transaction_id="t1")
+        self.assertEqual((t1.amount_cents, t1.status), (200, BankTransaction.Status.IGNORED))
+
+    def test_interrupted_sync_resumes_from_last_page(self):
+        with self.assertRaises(requests.ConnectionError):
+            self._sync(
+                [
+                    {"added": [_tx("t1", 1)], "modified": [], "removed": [], "next_cursor": "c1", "has_more": True},
+                    requests.ConnectionError("reset"),
+                ]
+            )
+        self.conn.refresh_from_db()
+        self.assertEqual((self.conn.sync_cursor, self.conn.last_sync_status), ("c1", "error"))
+        self.assertTrue(BankTransaction.objects.filter(transaction_id="t1").exists())
+
+        _res, fake = self._sync([{"added": [_tx("t2", 2)], "modified": [], "removed": [], "next_cursor": "c2", "has_more": False}])
+        self.assertEqual(fake.call_args.kwargs["cursor"], "c1")
+        self.assertEqual(BankTransaction.objects.count(), 2)
+
+
+class CompiledBankRuleTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        conn = BankConnection.objects.create(company=self.company, access_token="tok", is_active=True)
+        self.account = BankAccount.objects.create(connection=conn, account_id="acc_1")
+
+    def _rule(self, text, match_type=BankRule.MatchType.CONTAINS, **kwargs):
+        return BankRule.objects.create(company=self.company, match_text=text, match_type=match_type, **kwargs)
+
+    def test_first_match_agrees_with_rule_by_rule_evaluation(self):
+        rules = [
+            self._rule("coffee", priority=50, max_amount_cents=1000),
+            self._rule("star", BankRule.MatchType.STARTS_WITH, priority=60),
+            self._rule("starbucks coffee", BankRule.MatchType.EQUALS, priority=70),
+            self._rule("bucks", priority=80),
+            self._rule("travel", match_field=BankRule.MatchField.CATEGORY, priority=90, action=BankRule.Action.TRANSFER),
+            self._rule("shers", priority=95),
+        ]
+        compiled = CompiledRuleSet(rules)
+        cases = [
+            ("Starbucks  Coffee", "", 500),
+            ("Starbucks Coffee", "", 5000),
+            ("Big Bucks", "", 1),
+            ("Airline", "Travel > Air", 1),
+            ("ushers", "", 1),
+            ("Nothing", "", 1),
+        ]
+        for name, category, amount in cases:
+            tx = BankTransaction(account=self.account, name=name, category=category, amount_cents=amount)
+            expected = next((r for r in rules if rule_matches(r, tx)), None)
+            self.assertEqual(compiled.match(tx), expected, name)
+
+    def test_run_covers_whole_backlog_in_chunks_with_hit_counts(self):
+        ignore = self._rule("fee", action=BankRule.Action.IGNORE, priority=10)
+        suggest = self._rule("uber", expense_category="Travel", priority=20)
+        BankTransaction.objects.bulk_create(
+            [BankTransaction(account=self.account, transaction_id=f"f{i}", name="Monthly fee", amount_cents=100) for i in range(700)]
+            + [BankTransaction(account=self.account, transaction_id=f"u{i}", name="UBER TRIP", amount_cents=900) for i in range(5)]
+            + [BankTransaction(account=self.account, transaction_id="x", name="Other", amount_cents=900)]
+        )
+
+        res = run_bank_rules(self.company, chunk_size=200)
+        self.assertEqual((res.scanned, res.matched, res.updated), (706, 705, 705))
+        self.assertEqual(res.hits, {ignore.id: 700, suggest.id: 5})
+        self.assertEqual(BankTransaction.objects.filter(status=BankTransaction.Status.IGNORED).count(), 700)
+        self.assertEqual(BankTransaction.objects.get(transaction_id="u0").suggested_category, "Travel")
+
+        # Re-running only rescans the remaining NEW rows and writes nothing unchanged.
+        res = run_bank_rules(self.company)
+        self.assertEqual((res.scanned, res.matched, res.updated), (6, 5, 0))
+
+
+    def test_auto_create_failure_rolls_back_the_whole_chunk(self):
+        self._rule("office", action=BankRule.Action.AUTO_CREATE_EXPENSE)
+        BankTransaction.objects.bulk_create(
+            [BankTransaction(account=self.account, transaction_id=f"o{i}", name="Office Depot", amount_cents=2_500) for i in range(5)]
+        )
+        real_create = Expense.objects.create
+        calls = {"n": 0}
+
+        def flaky_create(**kwargs):
+            calls["n"] += 1
+            if calls["n"] == 3:
+                raise RuntimeError("db went away")
+            return real_create(**kwargs)
+
+        with mock.patch.object(Expense.objects, "create", side_effect=flaky_create):
+            with self.assertRaises(RuntimeError):
+                run_bank_rules(self.company)
+        self.assertEqual(Expense.objects.filter(company=self.company).count(), 0)
+
+        self.assertEqual(run_bank_rules(self.company).updated, 5)
+        self.assertEqual(Expense.objects.filter(company=self.company).count(), 5)
+        self.assertFalse(BankTransaction.objects.filter(linked_expense__isnull=True).exists())
+
+    @override_settings(EZ360_JOBS_RUN_INLINE=False)
+    def test_apply_rules_view_queues_one_job_per_company(self):
+        self._rule("fee", action=BankRule.Action.IGNORE)
+        BankTransaction.objects.create(account=self.account, transaction_id="f1", name="Monthly fee", amount_cents=100)
+        CompanySubscription.objects.filter(company=self.company).update(plan=PlanCode.PROFESSIONAL, status=SubscriptionStatus.ACTIVE)
+        user = get_user_model().objects.create_user(email="rules@example.com", username="rules", password="pass12345")
+        user.email_verified = True
+        user.save(update_fields=["email_verified"])
+        EmployeeProfile.objects.create(company=self.company, user=user, username_public="rules", role=EmployeeRole.OWNER)
+        self.client.force_login(user)
+        session = self.client.session
+        session[ACTIVE_COMPANY_SESSION_KEY] = str(self.company.id)
+        session.save()
+
+        for _ in range(2):
+            resp = self.client.post(reverse("integrations:banking_apply_rules"))
+            self.assertRedirects(resp, reverse("integrations:banking_settings"), fetch_redirect_response=False)
+        self.assertEqual(BankTransaction.objects.get(transaction_id="f1").status, BankTransaction.Status.NEW)
+        self.assertEqual(BackgroundJob.objects.filter(name="integrations.bank_apply_rules").count(), 1)
+
+        run_ready_jobs(worker_id="w1")
+        self.assertEqual(BankTransaction.objects.get(transaction_id="f1").status, BankTransaction.Status.IGNORED)
+
+
+class DuplicateSuggestionTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.conn = BankConnection.objects.create(company=self.company, access_token="tok", is_active=True)
+        self.account = BankAccount.objects.create(connection=self.conn, account_id="acc_1")
+        self.day = datetime.date(2026, 10, 1)
+
+    def _expense(self, merchant, total, day):
+        m, _ = Merchant.objects.get_or_create(company=self.company, name=merchant)
+        return Expense.objects.create(company=self.company, merchant=m, date=day, amount_cents=total, total_cents=total)
+
+    def _tx(self, tx_id, name, amount, day):
+        return BankTransaction.objects.create(account=self.account, transaction_id=tx_id, name=name, amount_cents=amount, posted_date=day)
+
+    def test_backlog_is_matched_in_one_pass_and_marked_checked(self):
+        exact = self._expense("Staples", 4_200, self.day)
+        near = self._expense("Shell Oil", 6_000, self.day + datetime.timedelta(days=1))
+        self._expense("Staples", 4_200, self.day + datetime.timedelta(days=3))
+        t1 = self._tx("t1", "STAPLES", 4_200, self.day)
+        t2 = self._tx("t2", "Shell", 6_000, self.day)
+        t3 = self._tx("t3", "Unrelated", 4_200, self.day)
+
+        with self.assertNumQueries(3):
+            self.assertEqual(refresh_duplicate_suggestions(self.company), 2)
+
+        t1.refresh_from_db()
+        t2.refresh_from_db()
+        t3.refresh_from_db()
+        self.assertEqual((t1.suggested_existing_expense_id, t1.suggested_existing_expense_score), (exact.id, 100))
+        self.assertEqual((t2.suggested_existing_expense_id, t2.suggested_existing_expense_score), (near.id, 75))
+        self.assertIsNone(t3.suggested_existing_expense_id)
+        self.assertIsNotNone(t3.duplicate_checked_at)
+        self.assertEqual(suggest_existing_expense_for_tx(company=self.company, tx=t1), (exact, 100))
+
+        # Checked rows are not matched again.
+        self.assertEqual(refresh_duplicate_suggestions(self.company), 0)
+
+    def test_expense_entered_after_the_check_is_suggested(self):
+        tx = self._tx("t1", "Staples", 4_200, self.day)
+        refresh_duplicate_suggestions(self.company)
+        tx.refresh_from_db()
+        self.assertIsNotNone(tx.duplicate_checked_at)
+
+        exp = self._expense("Staples", 4_200, self.day)
+        self.assertEqual(refresh_duplicate_suggestions(self.company), 1)
+        tx.refresh_from_db()
+        self.assertEqual(tx.suggested_existing_expense_id, exp.id)
+
+    def test_plaid_amount_change_drops_the_stale_suggestion(self):
+        self._expense("Coffee", 450, self.day)
+        tx = self._tx("t1", "Coffee", 450, self.day)
+        self.assertEqual(refresh_duplicate_suggestions(self.company), 1)
+
+        page = {"added": [], "modified": [_tx("t1", 5.25)], "removed": [], "next_cursor": "c1", "has_more": False}
+        with mock.patch("integrations.services.plaid_transactions_sync", side_effect=[page]):
+            res = sync_bank_transactions(self.conn)
+        # The sync re-matched the modified row and found nothing at the new amount.
+        tx.refresh_from_db()
+        self.assertEqual((res.duplicates_suggested, tx.amount_cents, tx.suggested_existing_expense_id), (0, 525, None))
+
+        match = self._expense("Coffee", 525, self.day)
+        self.assertEqual(refresh_duplicate_suggestions(self.company), 1)
+        tx.refresh_from_db()
+        self.assertEqual(tx.suggested_existing_expense_id, match.id)
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        self.conn = BankConnection.objects.create(company=self.company, access_token="tok", is_active=True)
+        self.account = BankAccount.objects.create(connection=self.conn, account_id="acc_1")
+        Merchant.objects.create(company=self.company, name="Staples")
+        day = datetime.date(2026, 10, 1)
+        rows = [BankTransaction(account=self.account, transaction_id=f"s{i}", name="Staples", amount_cents=1_000, posted_date=day) for i in range(30)]
+        rows += [BankTransaction(account=self.account, transaction_id=f"n{i}", name=f"Vendor {i % 3}", amount_cents=500, posted_date=day) for i in range(30)]
+        rows += [
+            BankTransaction(account=self.account, transaction_id="refund", name="Refund", amount_cents=-200, posted_date=day),
+            BankTransaction(account=self.account, transaction_id="ign", name="Fee", amount_cents=100, status=BankTransaction.Status.IGNORED),
+        ]
+        BankTransaction.objects.bulk_create(rows)
+
+    def test_create_expense_over_filter_is_set_based(self):
+        qs = review_queue_queryset(self.conn)
+        with CaptureQueriesContext(connection) as ctx:
+            res = bulk_review(self.conn, "create_expense", qs, chunk_size=100)
+        # Independent of row count: one chunk of selects/inserts plus the KPI refresh.
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertEqual((res.created, res.skipped), (60, 2))
+        self.assertEqual(Merchant.objects.filter(company=self.company).count(), 4)
+        self.assertEqual(Expense.objects.filter(company=self.company, status="draft").count(), 60)
+        tx = BankTransaction.objects.get(transaction_id="n4")
+        self.assertEqual(tx.status, BankTransaction.Status.EXPENSE_CREATED)
+        self.assertEqual(tx.linked_expense.merchant.name, "Vendor 1")
+
+        # Re-running creates nothing new.
+        self.assertEqual(bulk_review(self.conn, "create_expense", qs).created, 0)
+
+    def test_created_rows_reach_the_sync_log_and_deleted_merchants_are_restored(self):
+        Merchant.objects.filter(company=self.company, name="Staples").delete()
+        SyncChange.objects.all().delete()
+
+        bulk_review(self.conn, "create_expense", review_queue_queryset(self.conn))
+        staples = Merchant.objects.get(company=self.company, name="Staples")
+        self.assertIsNone(staples.deleted_at)
+        self.assertEqual(Expense.objects.filter(merchant=staples).count(), 30)
+
+        logged = SyncChange.objects.filter(company=self.company)
+        self.assertEqual(logged.filter(model_key="expenses.Expense").count(), 60)
+        self.assertEqual(set(logged.filter(model_key="expenses.Merchant").values_list("object_id", flat=True)), set(Merchant.objects.filter(company=self.company).values_list("id", flat=True)))
+
+    def test_status_and_link_actions_are_single_updates(self):
+        exp = Expense.objects.create(company=self.company, amount_cents=1_000, total_cents=1_000)
+        BankTransaction.objects.filter(transaction_id__in=["s0", "s1"]).update(suggested_existing_expense=exp, suggested_existing_expense_score=95)
+
+        res = bulk_review(self.conn, "link_existing", review_queue_queryset(self.conn, status=BankTransaction.Status.NEW))
+        self.assertEqual((res.linked, res.skipped), (2, 59))
+        self.assertEqual(BankTransaction.objects.filter(linked_expense=exp).count(), 2)
+
+        with self.assertNumQueries(2):
+            res = bulk_review(self.conn, "ignore", review_queue_queryset(self.conn))
+        self.assertEqual((res.updated, res.skipped), (61, 1))
+
+
+class DropboxTransferTests(TestCase):
+    def _client(self, session):
+        self.sleeps = []
+        return DropboxClient("tok", session=session, sleep=self.sleeps.append)
+
+    def test_large_files_stream_through_an_upload_session(self):
+        session = FakeDropboxSession()
+        meta = self._client(session).upload("/F/big.bin", io.BytesIO(b"0123456789"), chunk_size=4)
+        self.assertEqual(meta["path_display"], "/Uploaded/file.bin")
+        self.assertEqual(
+            [(endpoint, len(data)) for endpoint, _arg, data in session.calls],
+            [
+                ("files/upload_session/start", 4),
+                ("files/upload_session/append_v2", 4),
+                ("files/upload_session/append_v2", 2),
+                ("files/upload_session/finish", 0),
+            ],
+        )
+        self.assertEqual([c[1]["cursor"]["offset"] for c in session.calls[1:]], [4, 8, 10])
+
+        # Small files are a single upload call.
+        session.calls.clear()
+        self._client(session).upload("/F/small.bin", io.BytesIO(b"abc"), chunk_size=4)
+        self.assertEqual([c[0] for c in session.calls], ["files/upload"])
+
+    def test_rate_limits_are_retried_and_landed_appends_are_not_resent(self):
+        session = FakeDropboxSession(
+            {
+                "files/upload_session/start": [(429, {"error": {"retry_after": 3}}, {"Retry-After": "2"})],
+                "files/upload_session/append_v2": [(409, {"error": {".tag": "incorrect_offset", "correct_offset": 8}}, {})],
+            }
+        )
+        client = self._client(session)
+        client.upload("/F/big.bin", io.BytesIO(b"01234567"), chunk_size=4)
+        self.assertEqual(self.sleeps, [2.0])
+        self.assertEqual([c[0] for c in session.calls].count("files/upload_session/start"), 2)
+        self.assertEqual(session.calls[-1][1]["cursor"]["offset"], 8)
+
+    def test_folder_is_created_once_and_pool_reports_each_file(self):
+        session = FakeDropboxSession({"files/upload": [(200, {"path_display": "/F/a.txt"}, {}), (400, {}, {})]})
+        client = self._client(session)
+        client.ensure_folder("/F")
+        client.ensure_folder("/F")
+        items = [TransferItem(key=k, dropbox_path=f"/F/{k}.txt", open=lambda: io.BytesIO(b"x")) for k in ("a", "b")]
+        results = {r.key: r for r in transfer_files(client, items, max_workers=2)}
+
+        self.assertEqual([c[0] for c in session.calls].count("files/create_folder_v2"), 1)
+        self.assertEqual(sum(r.ok for r in results.values()), 1)
+        self.assertEqual(sum(bool(r.error) for r in results.values()), 1)
+        self.assertTrue(all(r.shared_url == "https://dropbox.test/s/abc" for r in results.values() if r.ok))
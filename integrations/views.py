@@ -5,12 +5,15 @@ from django.contrib.auth.decorators import login_required
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.core.paginator import Paginator
+from django.db.models import Count
 from django.views.decorators.http import require_POST
 from django.utils import timezone
 
 from datetime import timedelta
 
 from companies.decorators import require_min_role
+from core.csv_utils import queryset_csv_response
+from core.jobs import enqueue
 from companies.models import EmployeeRole
 from companies.services import get_active_company, get_active_employee
 
@@ -21,7 +24,7 @@ from expenses.models import Expense, Merchant
 
 from .models import BankAccount, BankConnection, BankRule, BankTransaction, BankReconciliationPeriod, DropboxConnection, IntegrationConfig
 from .forms import BankReconciliationPeriodForm, BankRuleForm
-from .bank_rules import apply_rules_for_company
+from .bank_review import REVIEW_ACTIONS, bulk_review, review_queue_queryset
 from .services import (
     dropbox_is_configured,
     build_authorize_url,
@@ -35,8 +38,6 @@ from .services import (
     plaid_create_link_token,
     plaid_exchange_public_token,
     plaid_fetch_accounts,
-    plaid_transactions_sync,
-    suggest_existing_expense_for_tx,
 )
 
 
@@ -325,90 +326,18 @@ def banking_sync(request: HttpRequest) -> HttpResponse:
         messages.error(request, "Connect a bank account first.")
         return redirect("integrations:banking_settings")
 
-    try:
-        cursor = conn.sync_cursor or None
-        added_total = 0
-        modified_total = 0
-        removed_total = 0
-
-        has_more = True
-        next_cursor = cursor
-        while has_more:
-            payload = plaid_transactions_sync(access_token=conn.access_token, cursor=next_cursor)
-            added = payload.get("added") or []
-            modified = payload.get("modified") or []
-            removed = payload.get("removed") or []
-            has_more = bool(payload.get("has_more"))
-            next_cursor = str(payload.get("next_cursor") or next_cursor or "")
-
-            # Map account_id -> BankAccount
-            acct_map = {a.account_id: a for a in conn.accounts.all()}
-            for t in added:
-                account_id = str(t.get("account_id") or "")
-                bank_acct = acct_map.get(account_id)
-                if not bank_acct:
-                    continue
-                tx_id = str(t.get("transaction_id") or "")
-                if not tx_id:
-                    continue
-                name = str(t.get("name") or t.get("merchant_name") or "")
-                date_str = t.get("date")
-                posted = None
-                if date_str:
-                    try:
-                        posted = timezone.datetime.fromisoformat(str(date_str)).date()
-                    except Exception:
-                        posted = None
-                amt = t.get("amount")
-                try:
-                    amt_cents = int(round(float(amt) * 100))
-                except Exception:
-                    amt_cents = 0
-                pending = bool(t.get("pending"))
-                cats = t.get("category") or []
-                cat = ""
-                if isinstance(cats, list):
-                    cat = " > ".join([str(x) for x in cats if x])
-                else:
-                    cat = str(cats)
-
-                BankTransaction.objects.update_or_create(
-                    account=bank_acct,
-                    transaction_id=tx_id,
-                    defaults={
-                        "posted_date": posted,
-                        "name": name,
-                        "amount_cents": amt_cents,
-                        "is_pending": pending,
-                        "category": cat,
-                        "raw": t,
-                    },
-                )
-            added_total += len(added)
-            modified_total += len(modified)
-            removed_total += len(removed)
-
-        conn.sync_cursor = next_cursor or ""
-        conn.last_sync_at = timezone.now()
-        conn.last_sync_status = "ok"
-        conn.last_sync_error = ""
-        conn.save(update_fields=["sync_cursor", "last_sync_at", "last_sync_status", "last_sync_error", "updated_at"])
-
-        # Apply rules to new transactions after each sync.
-        try:
-            updated = apply_rules_for_company(company)
-        except Exception:
-            updated = 0
-        if updated:
-            messages.success(request, f"Bank sync complete. Added {added_total} transactions. Rules applied to {updated} transactions.")
-        else:
-            messages.success(request, f"Bank sync complete. Added {added_total} transactions.")
-    except Exception as e:
-        conn.last_sync_at = timezone.now()
-        conn.last_sync_status = "error"
-        conn.last_sync_error = str(e)
-        conn.save(update_fields=["last_sync_at", "last_sync_status", "last_sync_error", "updated_at"])
-        messages.error(request, f"Bank sync failed: {e}")
+    conn.last_sync_status = "queued"
+    conn.last_sync_error = ""
+    conn.save(update_fields=["last_sync_status", "last_sync_error", "updated_at"])
+    enqueue(
+        "integrations.bank_sync",
+        company=company,
+        payload={"company_id": str(company.id)},
+        priority=50,
+        max_attempts=3,
+        dedupe_key=f"bank_sync:{company.id}",
+    )
+    messages.success(request, "Bank sync started. New transactions will appear here in a moment.")
 
     return redirect("integrations:banking_settings")
 
@@ -503,7 +432,7 @@ def banking_rules(request: HttpRequest) -> HttpResponse:
     if not company:
         messages.error(request, "Select a company first.")
         return redirect("core:app_dashboard")
-    rules = company.bank_rules.order_by("priority", "id")
+    rules = company.bank_rules.annotate(match_count=Count("matched_transactions")).order_by("priority", "id")
     return render(request, "integrations/banking_rules_list.html", {"company": company, "rules": rules})
 
 
@@ -574,11 +503,15 @@ def banking_apply_rules(request: HttpRequest) -> HttpResponse:
     if not company:
         messages.error(request, "Select a company first.")
         return redirect("core:app_dashboard")
-    updated = apply_rules_for_company(company)
-    if updated:
-        messages.success(request, f"Rules applied to {updated} transactions.")
-    else:
-        messages.info(request, "No transactions updated (no rules or no matches).")
+    # The unreviewed backlog can be large: run it on the worker, not in the request.
+    enqueue(
+        "integrations.bank_apply_rules",
+        company=company,
+        payload={"company_id": str(company.id)},
+        priority=50,
+        dedupe_key=f"bank_apply_rules:{company.id}",
+    )
+    messages.success(request, "Applying rules is queued. Matching transactions will update in a moment.")
     return redirect("integrations:banking_settings")
 
 
@@ -630,11 +563,7 @@ def banking_review_queue(request: HttpRequest) -> HttpResponse:
         status = BankTransaction.Status.NEW
 
     account_id = (request.GET.get("account") or "").strip()
-    qs = BankTransaction.objects.filter(account__connection=conn)
-    if status:
-        qs = qs.filter(status=status)
-    if account_id:
-        qs = qs.filter(account__account_id=account_id)
+    qs = review_queue_queryset(conn, status=status, account_id=account_id)
 
     # Default to newest first.
     qs = qs.select_related("account", "linked_expense", "applied_rule", "suggested_existing_expense").order_by("-posted_date", "-id")
@@ -642,19 +571,19 @@ def banking_review_queue(request: HttpRequest) -> HttpResponse:
     paginator = Paginator(qs, 50)
     page_obj = paginator.get_page(request.GET.get("page") or 1)
 
-    # Opportunistically compute/store suggestions for visible transactions.
-    # This keeps the page fast on subsequent loads.
-    txs = list(page_obj.object_list)
-    for tx in txs:
-        if tx.linked_expense_id:
-            continue
-        if tx.suggested_existing_expense_id and tx.suggested_existing_expense_score:
-            continue
-        exp, score = suggest_existing_expense_for_tx(company=company, tx=tx)
-        if exp and score:
-            tx.suggested_existing_expense = exp
-            tx.suggested_existing_expense_score = int(score)
-            tx.save(update_fields=["suggested_existing_expense", "suggested_existing_expense_score"])
+    # Duplicate suggestions are precomputed after each sync; rows imported
+    # before that (or by other paths) are queued instead of matched here.
+    if any(
+        tx.status == BankTransaction.Status.NEW and not tx.linked_expense_id and tx.duplicate_checked_at is None
+        for tx in page_obj.object_list
+    ):
+        enqueue(
+            "integrations.bank_suggest_duplicates",
+            company=company,
+            payload={"company_id": str(company.id)},
+            priority=80,
+            dedupe_key=f"bank_suggest_duplicates:{company.id}",
+        )
 
     accounts = list(conn.accounts.filter(is_active=True).order_by("name", "id"))
     return render(
@@ -688,104 +617,29 @@ def banking_review_bulk_action(request: HttpRequest) -> HttpResponse:
         return redirect("integrations:banking_settings")
 
     action = (request.POST.get("action") or "").strip()
-    tx_ids = request.POST.getlist("tx_ids")
-    tx_ids = [int(x) for x in tx_ids if str(x).isdigit()]
-    if not tx_ids:
-        messages.info(request, "Select at least one transaction.")
-        return redirect("integrations:banking_review_queue")
-
-    allowed_actions = {"ignore", "transfer", "create_expense", "link_existing"}
-    if action not in allowed_actions:
+    if action not in REVIEW_ACTIONS:
         messages.error(request, "Invalid action.")
         return redirect("integrations:banking_review_queue")
 
-    txs = list(
-        BankTransaction.objects.filter(pk__in=tx_ids, account__connection=conn)
-        .select_related("account", "linked_expense", "suggested_existing_expense")
-        .order_by("id")
-    )
-    if not txs:
+    if (request.POST.get("select_all") or "") == "1":
+        # Apply to the whole filtered queue without posting every id.
+        status = (request.POST.get("status") or "").strip()
+        if status not in {c for c, _ in BankTransaction.Status.choices}:
+            status = BankTransaction.Status.NEW
+        qs = review_queue_queryset(conn, status=status, account_id=(request.POST.get("account") or "").strip())
+    else:
+        tx_ids = [int(x) for x in request.POST.getlist("tx_ids") if str(x).isdigit()]
+        if not tx_ids:
+            messages.info(request, "Select at least one transaction.")
+            return redirect("integrations:banking_review_queue")
+        qs = BankTransaction.objects.filter(pk__in=tx_ids, account__connection=conn)
+
+    if not qs.exists():
         messages.info(request, "No matching transactions.")
         return redirect("integrations:banking_review_queue")
 
-    employee = get_active_employee(request)
-    reviewed_at = timezone.now()
-
-    updated = 0
-    created = 0
-    linked = 0
-    skipped = 0
-
-    for tx in txs:
-        tx.reviewed_at = reviewed_at
-        tx.reviewed_by = request.user
-
-        if action == "ignore":
-            if tx.status != BankTransaction.Status.IGNORED:
-                tx.status = BankTransaction.Status.IGNORED
-                tx.save(update_fields=["status", "reviewed_at", "reviewed_by"])
-                updated += 1
-            else:
-                skipped += 1
-            continue
-
-        if action == "transfer":
-            if tx.status != BankTransaction.Status.TRANSFER:
-                tx.status = BankTransaction.Status.TRANSFER
-                tx.save(update_fields=["status", "reviewed_at", "reviewed_by"])
-                updated += 1
-            else:
-                skipped += 1
-            continue
-
-        if action == "link_existing":
-            if tx.linked_expense_id:
-                skipped += 1
-                continue
-            if not tx.suggested_existing_expense_id:
-                skipped += 1
-                continue
-            tx.linked_expense_id = tx.suggested_existing_expense_id
-            tx.status = BankTransaction.Status.EXPENSE_CREATED
-            tx.save(update_fields=["linked_expense", "status", "reviewed_at", "reviewed_by"])
-            linked += 1
-            continue
-
-        # create_expense
-        if tx.linked_expense_id:
-            skipped += 1
-            continue
-        if tx.status in {BankTransaction.Status.IGNORED, BankTransaction.Status.TRANSFER}:
-            skipped += 1
-            continue
-        if tx.amount_cents <= 0:
-            skipped += 1
-            continue
-
-        # If we have a strong duplicate suggestion, do not create automatically.
-        if tx.suggested_existing_expense_id and tx.suggested_existing_expense_score >= 90:
-            skipped += 1
-            continue
-
-        merchant_name = (tx.suggested_merchant_name or tx.name or "").strip()[:160] or "Bank transaction"
-        merchant, _ = Merchant.objects.get_or_create(company=company, name=merchant_name)
-
-        exp = Expense.objects.create(
-            company=company,
-            created_by=employee,
-            merchant=merchant,
-            date=tx.posted_date,
-            category=(tx.suggested_category or tx.category or "")[:120],
-            description=f"Imported from bank feed: {tx.transaction_id}",
-            amount_cents=int(tx.amount_cents),
-            tax_cents=0,
-            total_cents=int(tx.amount_cents),
-            status="draft",
-        )
-        tx.linked_expense = exp
-        tx.status = BankTransaction.Status.EXPENSE_CREATED
-        tx.save(update_fields=["linked_expense", "status", "reviewed_at", "reviewed_by"])
-        created += 1
+    res = bulk_review(conn, action, qs, user=request.user, employee=get_active_employee(request))
+    updated, created, linked, skipped = res.updated, res.created, res.linked, res.skipped
 
     if action in {"ignore", "transfer"}:
         messages.success(request, f"Updated {updated} transactions. Skipped {skipped}.")
@@ -1054,8 +908,6 @@ def banking_reconciliation_unlock(request: HttpRequest, pk: int) -> HttpResponse
 @tier_required(PlanCode.PROFESSIONAL)
 @require_min_role(EmployeeRole.STAFF)
 def banking_reconciliation_export_csv(request: HttpRequest, pk: int) -> HttpResponse:
-    import csv
-
     company = get_active_company(request)
     if not company:
         messages.error(request, "Select a company first.")
@@ -1069,20 +921,20 @@ def banking_reconciliation_export_csv(request: HttpRequest, pk: int) -> HttpResp
             posted_date__gte=period.start_date,
             posted_date__lte=period.end_date,
         )
-        .select_related("account", "linked_expense")
+        .select_related("account")
         .order_by("posted_date", "id")
     )
 
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f"attachment; filename=reconciliation_{period.start_date}_{period.end_date}.csv"
-
-    w = csv.writer(response)
-    w.writerow(["posted_date", "account", "name", "amount_cents", "status", "linked_expense_id"])
-    for t in txs:
+    def _row(t: BankTransaction) -> list:
         acct_label = t.account.name or (t.account.mask and f"••••{t.account.mask}") or t.account.account_id
-        w.writerow([t.posted_date, acct_label, t.name, t.amount_cents, t.status, t.linked_expense_id or ""])
+        return [t.posted_date, acct_label, t.name, t.amount_cents, t.status, t.linked_expense_id or ""]
 
-    return response
+    return queryset_csv_response(
+        f"reconciliation_{period.start_date}_{period.end_date}.csv",
+        ["posted_date", "account", "name", "amount_cents", "status", "linked_expense_id"],
+        txs,
+        _row,
+    )
 
 @login_required
 @tier_required(PlanCode.PROFESSIONAL)
@@ -1104,6 +956,6 @@ def banking_disconnect(request: HttpRequest) -> HttpResponse:
     conn.item_id = ""
     conn.sync_cursor = ""
     conn.last_sync_error = ""
-    conn.save(update_fields=["is_active", "access_token", "item_id", "last_sync_error", "updated_at"])
+    conn.save(update_fields=["is_active", "access_token", "item_id", "sync_cursor", "last_sync_error", "updated_at"])
     messages.success(request, "Bank connection removed.")
     return redirect("integrations:banking_settings")
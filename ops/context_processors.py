@@ -120,11 +120,11 @@ def ops_status(request):
         start_7d = now - timedelta(days=7)
 
         # Webhook health
-        from billing.models import BillingWebhookEvent
+        from billing.models import WEBHOOK_FAILED_STATUSES, BillingWebhookEvent
 
-        wh_failed_24h = BillingWebhookEvent.objects.filter(received_at__gte=start_24h, ok=False).count()
-        wh_failed_7d = BillingWebhookEvent.objects.filter(received_at__gte=start_7d, ok=False).count()
-        last_wh_fail = BillingWebhookEvent.objects.filter(ok=False).order_by("-received_at").first()
+        wh_failed_24h = BillingWebhookEvent.objects.filter(received_at__gte=start_24h, status__in=WEBHOOK_FAILED_STATUSES).count()
+        wh_failed_7d = BillingWebhookEvent.objects.filter(received_at__gte=start_7d, status__in=WEBHOOK_FAILED_STATUSES).count()
+        last_wh_fail = BillingWebhookEvent.objects.filter(status__in=WEBHOOK_FAILED_STATUSES).order_by("-received_at").first()
         webhook.update(
             {
                 "failed_24h": wh_failed_24h,
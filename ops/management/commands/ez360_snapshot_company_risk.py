@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ops.services_risk import snapshot_company_risk
+
+
+class Command(BaseCommand):
+    help = "Score every tenant and store the result as today's CompanyRiskSnapshot (read by the Ops Companies directory)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", type=str, default="", help="Snapshot date YYYY-MM-DD (default: today)")
+
+    def handle(self, *args, **options):
+        date_str = (options.get("date") or "").strip()
+        if date_str:
+            snap_date = timezone.datetime.fromisoformat(date_str).date()
+        else:
+            snap_date = timezone.localdate()
+
+        written = snapshot_company_risk(snap_date)
+        self.stdout.write(self.style.SUCCESS(f"Stored {written} company risk snapshots for {snap_date}"))
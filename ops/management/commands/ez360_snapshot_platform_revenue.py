@@ -7,9 +7,9 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
-from billing.models import BillingInterval, CompanySubscription, PlanCatalog, SeatAddonConfig, SubscriptionStatus, BillingWebhookEvent
-from ops.models import CompanyLifecycleEvent, LifecycleEventType, PlatformRevenueSnapshot, CompanyRiskSnapshot, SiteConfig
-from ops.services_risk import compute_tenant_risk
+from billing.models import BillingInterval, CompanySubscription, PlanCatalog, SeatAddonConfig, SubscriptionStatus
+from ops.models import CompanyLifecycleEvent, LifecycleEventType, PlatformRevenueSnapshot
+from ops.services_risk import snapshot_company_risk
 
 
 def _to_cents(amount: Decimal) -> int:
@@ -119,26 +119,6 @@ class Command(BaseCommand):
 
         subs = CompanySubscription.objects.select_related("company").all()
 
-        # Risk scoring inputs (shared with ops companies directory)
-        cfg = SiteConfig.get_solo()
-        payment_fail_types = ["invoice.payment_failed", "payment_intent.payment_failed", "charge.failed"]
-        risk_payment_days = int(getattr(cfg, "risk_payment_failed_window_days", 14) or 14)
-        risk_payment_days = max(1, min(90, risk_payment_days))
-        start_fail_window = now - timedelta(days=risk_payment_days)
-        failed_customer_ids_14d: set[str] = set()
-        failed_sub_ids_14d: set[str] = set()
-        for e in BillingWebhookEvent.objects.filter(received_at__gte=start_fail_window, event_type__in=payment_fail_types).only("payload_json", "event_type"):
-            try:
-                obj = (e.payload_json or {}).get("data", {}).get("object", {}) or {}
-                cust = obj.get("customer") or obj.get("customer_id") or ""
-                subid = obj.get("subscription") or obj.get("subscription_id") or ""
-                if isinstance(cust, str) and cust:
-                    failed_customer_ids_14d.add(cust)
-                if isinstance(subid, str) and subid:
-                    failed_sub_ids_14d.add(subid)
-            except Exception:
-                continue
-
         active = subs.filter(status=SubscriptionStatus.ACTIVE).count()
         trialing = subs.filter(status=SubscriptionStatus.TRIALING).count()
         past_due = subs.filter(status=SubscriptionStatus.PAST_DUE).count()
@@ -209,32 +189,11 @@ class Command(BaseCommand):
             revenue_at_risk_cents=revenue_at_risk_cents,
         )
 
-        # Company risk snapshots (best-effort). This supports risk trend charts in Ops.
+        # Company risk snapshots (best-effort). This supports risk trend charts in Ops
+        # and the Companies directory; ez360_snapshot_company_risk refreshes them alone.
         try:
-            CompanyRiskSnapshot.objects.filter(date=snap_date).delete()
-            batch = []
-            for sub in subs:
-                company = sub.company
-                risk = compute_tenant_risk(
-                    company,
-                    sub,
-                    cfg=cfg,
-                    now=now,
-                    failed_customer_ids=failed_customer_ids_14d,
-                    failed_subscription_ids=failed_sub_ids_14d,
-                )
-                batch.append(
-                    CompanyRiskSnapshot(
-                        date=snap_date,
-                        company=company,
-                        risk_score=int(risk.get("score") or 0),
-                        risk_level=str(risk.get("level") or ""),
-                        flags=list(risk.get("flags") or []),
-                        breakdown=list(risk.get("breakdown") or []),
-                    )
-                )
-            if batch:
-                CompanyRiskSnapshot.objects.bulk_create(batch, batch_size=500)
+            with transaction.atomic():
+                snapshot_company_risk(snap_date, now=now)
         except Exception:
             pass
 
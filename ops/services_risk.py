@@ -0,0 +1,203 @@
+"""Tenant risk scoring (ops triage).
+
+Scores are explainable (every point comes with a breakdown item) and use the
+operator-tunable weights/thresholds on `SiteConfig`. Scoring is per tenant and
+cheap, but its payment-failure input scans webhook payloads, so the Companies
+directory reads the materialized `CompanyRiskSnapshot` rows written by
+`ez360_snapshot_company_risk` instead of scoring on every request.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from billing.models import BillingWebhookEvent, CompanySubscription, SubscriptionStatus
+from companies.models import Company
+
+from .models import CompanyRiskSnapshot, SiteConfig
+
+PAYMENT_FAIL_EVENT_TYPES = ["invoice.payment_failed", "payment_intent.payment_failed", "charge.failed"]
+
+_LIVE_STATUSES = {SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING, SubscriptionStatus.PAST_DUE}
+
+
+def _clamp(value, lo: int, hi: int, default: int) -> int:
+    try:
+        v = int(value if value is not None else default)
+    except (TypeError, ValueError):
+        v = default
+    return max(lo, min(hi, v))
+
+
+def risk_payment_window_days(cfg: SiteConfig) -> int:
+    return _clamp(getattr(cfg, "risk_payment_failed_window_days", 14) or 14, 1, 90, 14)
+
+
+def failed_payment_ids(cfg: SiteConfig, now: datetime) -> tuple[set[str], set[str]]:
+    """Stripe customer/subscription ids with a payment failure inside the risk window.
+
+    Reads the indexed id columns extracted at ingest, not the event payloads.
+    """
+    start = now - timedelta(days=risk_payment_window_days(cfg))
+    failed_customer_ids: set[str] = set()
+    failed_subscription_ids: set[str] = set()
+    rows = BillingWebhookEvent.objects.filter(
+        received_at__gte=start, event_type__in=PAYMENT_FAIL_EVENT_TYPES
+    ).values_list("stripe_customer_id", "stripe_subscription_id")
+    for cust, subid in rows.iterator(chunk_size=2000):
+        if cust:
+            failed_customer_ids.add(cust)
+        if subid:
+            failed_subscription_ids.add(subid)
+    return failed_customer_ids, failed_subscription_ids
+
+
+def compute_tenant_risk(
+    company: Company,
+    sub: CompanySubscription | None,
+    *,
+    cfg: SiteConfig,
+    now: datetime,
+    failed_customer_ids: set[str],
+    failed_subscription_ids: set[str],
+) -> dict:
+    """Score one tenant (0–100) and return score, level, flags, breakdown and thresholds."""
+    stale_hours = max(1, int(getattr(cfg, "stripe_mirror_stale_after_hours", 48) or 48))
+    stale_cutoff = now - timedelta(hours=stale_hours)
+    payment_days = risk_payment_window_days(cfg)
+    trial_days = _clamp(getattr(cfg, "risk_trial_ends_within_days", 7) or 7, 1, 30, 7)
+
+    w_past_due = _clamp(getattr(cfg, "risk_weight_past_due", 60), 0, 100, 60)
+    w_mirror_stale = _clamp(getattr(cfg, "risk_weight_mirror_stale", 25), 0, 100, 25)
+    w_payment_failed = _clamp(getattr(cfg, "risk_weight_payment_failed", 25), 0, 100, 25)
+    w_payment_failed_sub_only = _clamp(getattr(cfg, "risk_weight_payment_failed_sub_only", 10), 0, 100, 10)
+    w_canceling = _clamp(getattr(cfg, "risk_weight_canceling", 15), 0, 100, 15)
+    w_trial_ends_soon = _clamp(getattr(cfg, "risk_weight_trial_ends_soon", 15), 0, 100, 15)
+
+    medium_threshold = _clamp(getattr(cfg, "risk_level_medium_threshold", 40) or 40, 0, 100, 40)
+    high_threshold = _clamp(getattr(cfg, "risk_level_high_threshold", 80) or 80, 0, 100, 80)
+    if high_threshold < medium_threshold:
+        high_threshold = min(100, medium_threshold + 1)
+
+    flags: list[str] = []
+    breakdown: list[dict] = []
+
+    def _add(flag: str, label: str, points: int) -> None:
+        flags.append(flag)
+        if points:
+            breakdown.append({"flag": flag, "label": label, "points": points})
+
+    if getattr(company, "is_suspended", False):
+        _add("suspended", "Company is suspended", 0)
+
+    status = (getattr(sub, "status", "") or "") if sub else ""
+    if sub is not None:
+        if status == SubscriptionStatus.PAST_DUE:
+            _add("past_due", "Subscription is past due", w_past_due)
+
+        if status in _LIVE_STATUSES:
+            last = getattr(sub, "last_stripe_event_at", None)
+            if not last or last < stale_cutoff:
+                _add("mirror_stale", f"No Stripe event in the last {stale_hours}h", w_mirror_stale)
+
+        cust = sub.stripe_customer_id or ""
+        subid = sub.stripe_subscription_id or ""
+        if cust and cust in failed_customer_ids:
+            _add(f"payment_failed_{payment_days}d", f"Payment failed in the last {payment_days} days", w_payment_failed)
+        elif subid and subid in failed_subscription_ids:
+            _add(
+                f"payment_failed_{payment_days}d",
+                f"Payment failed in the last {payment_days} days (subscription match)",
+                w_payment_failed + w_payment_failed_sub_only,
+            )
+
+        if sub.stripe_cancel_at_period_end and status in _LIVE_STATUSES:
+            _add("canceling", "Set to cancel at period end", w_canceling)
+
+        trial_ends_at = getattr(sub, "trial_ends_at", None)
+        if status == SubscriptionStatus.TRIALING and trial_ends_at and now <= trial_ends_at <= now + timedelta(days=trial_days):
+            _add(f"trial_ends_{trial_days}d", f"Trial ends within {trial_days} days", w_trial_ends_soon)
+
+    score = max(0, min(100, sum(int(b["points"]) for b in breakdown)))
+    if score >= high_threshold:
+        level = "high"
+    elif score >= medium_threshold:
+        level = "medium"
+    elif score > 0:
+        level = "low"
+    else:
+        level = ""
+
+    return {
+        "score": score,
+        "level": level,
+        "flags": flags,
+        "breakdown": breakdown,
+        "medium_threshold": medium_threshold,
+        "high_threshold": high_threshold,
+    }
+
+
+def snapshot_company_risk(snap_date: date | None = None, *, now: datetime | None = None, batch_size: int = 500) -> int:
+    """Materialize today's risk score for every tenant into `CompanyRiskSnapshot`.
+
+    Replaces any rows already written for `snap_date`, so reruns are idempotent.
+    Returns the number of snapshots written.
+    """
+    now = now or timezone.now()
+    snap_date = snap_date or timezone.localdate(now)
+    cfg = SiteConfig.get_solo()
+    failed_customer_ids, failed_subscription_ids = failed_payment_ids(cfg, now)
+
+    companies = (
+        Company.objects.all()
+        .select_related("subscription")
+        .only(
+            "id",
+            "is_suspended",
+            "subscription__status",
+            "subscription__last_stripe_event_at",
+            "subscription__stripe_customer_id",
+            "subscription__stripe_subscription_id",
+            "subscription__stripe_cancel_at_period_end",
+            "subscription__trial_ends_at",
+        )
+        .order_by("id")
+    )
+
+    written = 0
+    with transaction.atomic():
+        CompanyRiskSnapshot.objects.filter(date=snap_date).delete()
+        batch: list[CompanyRiskSnapshot] = []
+        for company in companies.iterator(chunk_size=batch_size):
+            sub = getattr(company, "subscription", None)
+            risk = compute_tenant_risk(
+                company,
+                sub,
+                cfg=cfg,
+                now=now,
+                failed_customer_ids=failed_customer_ids,
+                failed_subscription_ids=failed_subscription_ids,
+            )
+            batch.append(
+                CompanyRiskSnapshot(
+                    date=snap_date,
+                    company_id=company.id,
+                    risk_score=int(risk["score"]),
+                    risk_level=risk["level"],
+                    flags=list(risk["flags"]),
+                    breakdown=list(risk["breakdown"]),
+                    created_at=now,
+                )
+            )
+            if len(batch) >= batch_size:
+                CompanyRiskSnapshot.objects.bulk_create(batch, batch_size=batch_size)
+                written += len(batch)
+                batch = []
+        if batch:
+            CompanyRiskSnapshot.objects.bulk_create(batch, batch_size=batch_size)
+            written += len(batch)
+    return written
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from billing.models import BillingWebhookEvent, CompanySubscription, SubscriptionStatus
+from companies.models import Company
+from ops.models import CompanyRiskSnapshot
+from ops.services_risk import snapshot_company_risk
+from ops.views import _ops_company_directory_qs
+
+
+class OpsCompanyDirectoryTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.at_risk = Company.objects.create(name="Beta Co")
+        self.healthy = Company.objects.create(name="Alpha Co")
+        self.trial = Company.objects.create(name="Gamma Co")
+        CompanySubscription.objects.filter(company=self.at_risk).update(
+            status=SubscriptionStatus.PAST_DUE, stripe_customer_id="cus_beta", last_stripe_event_at=now
+        )
+        CompanySubscription.objects.filter(company=self.healthy).update(
+            status=SubscriptionStatus.ACTIVE, last_stripe_event_at=now, is_comped=True
+        )
+        BillingWebhookEvent.objects.create(
+            stripe_event_id="evt_1",
+            event_type="invoice.payment_failed",
+            payload_json={"data": {"object": {"customer": "cus_beta"}}},
+        )
+
+    def _names(self, **kwargs):
+        params = {"q": "", "segment": "all", "status": "all", "comped": "", "sort": "name"}
+        params.update(kwargs)
+        return [c.name for c in _ops_company_directory_qs(**params)]
+
+    def test_snapshot_scores_every_company(self):
+        self.assertEqual(snapshot_company_risk(), 3)
+        snap = CompanyRiskSnapshot.objects.get(company=self.at_risk)
+        self.assertEqual(snap.risk_score, 85)
+        self.assertEqual(snap.risk_level, "high")
+        self.assertEqual(snap.flags, ["past_due", "payment_failed_14d"])
+
+        # Reruns replace the day's rows.
+        self.assertEqual(snapshot_company_risk(), 3)
+        self.assertEqual(CompanyRiskSnapshot.objects.count(), 3)
+
+    def test_filters_and_risk_ordering_run_in_sql(self):
+        snapshot_company_risk()
+        self.assertEqual(self._names(status="active"), ["Alpha Co", "Beta Co"])
+        self.assertEqual(self._names(status="trialing"), ["Gamma Co"])
+        self.assertEqual(self._names(comped="1"), ["Alpha Co"])
+        self.assertEqual(self._names(sort="risk")[0], "Beta Co")
+        self.assertEqual(_ops_company_directory_qs(q="beta", segment="all", status="all", comped="", sort="name").get().risk_level, "high")
+
+    def test_directory_page_and_streamed_csv(self):
+        snapshot_company_risk()
+        admin = get_user_model().objects.create_superuser(email="ops@example.com", username="ops", password="pass12345")
+        if hasattr(admin, "email_verified"):
+            admin.email_verified = True
+            admin.save(update_fields=["email_verified"])
+        self.client.force_login(admin)
+
+        resp = self.client.get(reverse("ops:companies"), {"segment": "all", "sort": "risk"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context["page_obj"].paginator.count, 3)
+        self.assertEqual(resp.context["page_obj"].object_list[0]["risk_level"], "high")
+
+        resp = self.client.get(reverse("ops:companies"), {"segment": "past_due", "export": "csv"})
+        self.assertTrue(resp.streaming)
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Beta Co", lines[1])
@@ -25,10 +25,12 @@ from django.core.paginator import Paginator
 from django.core.mail import EmailMultiAlternatives
 from django.core.mail import get_connection
 
+from core.csv_utils import queryset_csv_response
 from core.email_utils import format_email_subject
 
 from audit.services import log_event
 from billing.models import (
+    WEBHOOK_FAILED_STATUSES,
     BillingWebhookEvent,
     CompanySubscription,
     PlanCode,
@@ -37,7 +39,7 @@ from billing.models import (
     SeatAddonConfig,
 )
 from billing.services import seats_limit_for
-from companies.models import Company, EmployeeProfile
+from companies.models import Company, EmployeeProfile, EmployeeRole
 from accounts.models import AccountLockout
 from companies.services import set_active_company_id
 from companies.services import get_active_company
@@ -153,9 +155,21 @@ def _money_to_decimal(value, default="0"):
         return Decimal(str(default))
 
 
-def _subscription_monthly_equivalent(sub: CompanySubscription | None) -> tuple[object, object]:
+def _load_pricing() -> tuple[dict, SeatAddonConfig | None]:
+    """Plan catalog + seat add-on config, loaded once for list views and exports."""
+    return {p.code: p for p in PlanCatalog.objects.all()}, SeatAddonConfig.objects.filter(pk=1).first()
+
+
+def _subscription_monthly_equivalent(
+    sub: CompanySubscription | None,
+    *,
+    pricing: tuple[dict, SeatAddonConfig | None] | None = None,
+) -> tuple[object, object]:
     """Return (mrr, arr) as Decimal for a CompanySubscription.
 
+    Pass `pricing` (from `_load_pricing`) when valuing many subscriptions to
+    avoid two catalog queries per row.
+
     Rules (v1):
     - Comped subscriptions contribute 0 revenue.
     - Trialing contributes 0 revenue.
@@ -177,8 +191,12 @@ def _subscription_monthly_equivalent(sub: CompanySubscription | None) -> tuple[o
     if sub.status not in {SubscriptionStatus.ACTIVE, SubscriptionStatus.PAST_DUE}:
         return Decimal("0"), Decimal("0")
 
-    plan = PlanCatalog.objects.filter(code=sub.plan).first()
-    seat_cfg = SeatAddonConfig.objects.filter(pk=1).first()
+    if pricing is not None:
+        plans_by_code, seat_cfg = pricing
+        plan = plans_by_code.get(sub.plan)
+    else:
+        plan = PlanCatalog.objects.filter(code=sub.plan).first()
+        seat_cfg = SeatAddonConfig.objects.filter(pk=1).first()
 
     if not plan:
         return Decimal("0"), Decimal("0")
@@ -275,28 +293,18 @@ def staff_only(view_func):
 
 
 def _recent_webhooks_for_company(company: Company, limit: int = 50):
-    """Best-effort: find recent Stripe webhook events tied to a company by matching stripe customer/subscription ids in payload."""
+    """Recent Stripe webhook events tied to a company (by company or its Stripe customer/subscription id)."""
     try:
         sub = CompanySubscription.objects.filter(company=company).first()
     except Exception:
         sub = None
 
-    if not sub:
-        return []
-
-    # Pull a small window and filter in Python; JSON querying differs across DBs.
-    events = list(BillingWebhookEvent.objects.all()[:300])
-    out = []
-    for e in events:
-        payload = e.payload_json or {}
-        obj = (payload.get("data") or {}).get("object") or {}
-        customer = str(obj.get("customer") or "")
-        sid = str(obj.get("id") or obj.get("subscription") or "")
-        if (sub.stripe_customer_id and customer == sub.stripe_customer_id) or (sub.stripe_subscription_id and sid == sub.stripe_subscription_id):
-            out.append(e)
-        if len(out) >= limit:
-            break
-    return out
+    match = Q(company=company)
+    if sub and sub.stripe_customer_id:
+        match |= Q(stripe_customer_id=sub.stripe_customer_id)
+    if sub and sub.stripe_subscription_id:
+        match |= Q(stripe_subscription_id=sub.stripe_subscription_id)
+    return list(BillingWebhookEvent.objects.filter(match).order_by("-received_at")[:limit])
 
 
 def version(request: HttpRequest) -> HttpResponse:
@@ -575,14 +583,14 @@ def ops_reports(request: HttpRequest) -> HttpResponse:
 
     # Stripe webhook processing health (system reliability)
     wh_total_24h = BillingWebhookEvent.objects.filter(received_at__gte=start_1).count()
-    wh_failed_24h = BillingWebhookEvent.objects.filter(received_at__gte=start_1, ok=False).count()
+    wh_failed_24h = BillingWebhookEvent.objects.filter(received_at__gte=start_1, status__in=WEBHOOK_FAILED_STATUSES).count()
 
     last_wh = BillingWebhookEvent.objects.order_by('-received_at').first()
     last_wh_received_at = last_wh.received_at if last_wh else None
     last_wh_ok = bool(last_wh.ok) if last_wh else None
 
     wh_total_7d = BillingWebhookEvent.objects.filter(received_at__gte=start_7).count()
-    wh_failed_7d = BillingWebhookEvent.objects.filter(received_at__gte=start_7, ok=False).count()
+    wh_failed_7d = BillingWebhookEvent.objects.filter(received_at__gte=start_7, status__in=WEBHOOK_FAILED_STATUSES).count()
 
     # Payment failure signals (business health) from Stripe event types
     payment_fail_types = [
@@ -687,9 +695,9 @@ def ops_webhook_health(request: HttpRequest) -> HttpResponse:
 
     wh_qs = BillingWebhookEvent.objects.all()
     wh_total_24h = wh_qs.filter(received_at__gte=start_24h).count()
-    wh_failed_24h = wh_qs.filter(received_at__gte=start_24h, ok=False).count()
+    wh_failed_24h = wh_qs.filter(received_at__gte=start_24h, status__in=WEBHOOK_FAILED_STATUSES).count()
     wh_total_7d = wh_qs.filter(received_at__gte=start_7d).count()
-    wh_failed_7d = wh_qs.filter(received_at__gte=start_7d, ok=False).count()
+    wh_failed_7d = wh_qs.filter(received_at__gte=start_7d, status__in=WEBHOOK_FAILED_STATUSES).count()
 
     last_wh = wh_qs.order_by("-received_at").first()
 
@@ -701,7 +709,7 @@ def ops_webhook_health(request: HttpRequest) -> HttpResponse:
         .order_by("-count")[:15]
     )
 
-    recent_failures = list(wh_qs.filter(ok=False).order_by("-received_at")[:50])
+    recent_failures = list(wh_qs.filter(status__in=WEBHOOK_FAILED_STATUSES).order_by("-received_at")[:50])
 
     subs_qs = CompanySubscription.objects.select_related("company")
     stale_subs = subs_qs.filter(status__in=[SubscriptionStatus.ACTIVE, SubscriptionStatus.TRIALING, SubscriptionStatus.PAST_DUE]).filter(
@@ -753,6 +761,152 @@ def _compute_tenant_risk(
     )
 
 
+_COMPANY_STATUS_FILTERS = {
+    "active": Q(subscription__status__in=[SubscriptionStatus.ACTIVE, SubscriptionStatus.PAST_DUE]),
+    "trialing": Q(subscription__status=SubscriptionStatus.TRIALING),
+    "past_due": Q(subscription__status=SubscriptionStatus.PAST_DUE),
+    "canceled": Q(subscription__status=SubscriptionStatus.CANCELED),
+    "ended": Q(subscription__status=SubscriptionStatus.ENDED),
+}
+
+
+def _ops_company_directory_qs(*, q: str, segment: str, status: str, comped: str, sort: str):
+    """Companies directory as one SQL query: filters join `subscription`, risk comes from the latest snapshot.
+
+    Mirrors `CompanySubscription.is_comped_active` / `discount_is_active` in SQL so
+    filtering, ordering and pagination never load the full tenant list.
+    """
+    from django.db.models import Exists, F, IntegerField, JSONField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
+
+    from .models import CompanyRiskSnapshot
+
+    now = timezone.now()
+    employees = EmployeeProfile.objects.filter(company=OuterRef("pk"))
+    latest_risk = CompanyRiskSnapshot.objects.filter(company=OuterRef("pk")).order_by("-date")
+
+    companies = (
+        Company.objects.all()
+        .select_related("subscription")
+        .annotate(
+            owner_email=Subquery(
+                employees.filter(role=EmployeeRole.OWNER, deleted_at__isnull=True)
+                .order_by("created_at")
+                .values("user__email")[:1]
+            ),
+            employee_count=Coalesce(
+                Subquery(
+                    employees.filter(deleted_at__isnull=True)
+                    .order_by()
+                    .values("company")
+                    .annotate(n=Count("id"))
+                    .values("n")[:1],
+                    output_field=IntegerField(),
+                ),
+                0,
+            ),
+            last_login=Subquery(
+                employees.exclude(user__last_login__isnull=True)
+                .order_by("-user__last_login")
+                .values("user__last_login")[:1]
+            ),
+            risk_score=Subquery(latest_risk.values("risk_score")[:1]),
+            risk_level=Subquery(latest_risk.values("risk_level")[:1]),
+            risk_flags=Subquery(latest_risk.values("flags")[:1], output_field=JSONField()),
+            risk_date=Subquery(latest_risk.values("date")[:1]),
+        )
+    )
+
+    if q:
+        companies = companies.filter(Q(name__icontains=q) | Exists(employees.filter(user__email__icontains=q)))
+
+    if segment == "suspended":
+        companies = companies.filter(is_suspended=True)
+    elif segment == "discounted":
+        companies = companies.filter(subscription__discount_percent__gt=0).filter(
+            Q(subscription__discount_ends_at__isnull=True) | Q(subscription__discount_ends_at__gt=now)
+        )
+
+    if status in _COMPANY_STATUS_FILTERS:
+        companies = companies.filter(_COMPANY_STATUS_FILTERS[status])
+
+    if comped == "1":
+        companies = companies.filter(subscription__is_comped=True).filter(
+            Q(subscription__comped_until__isnull=True) | Q(subscription__comped_until__gt=now)
+        )
+
+    if sort == "risk":
+        return companies.order_by(F("risk_score").desc(nulls_last=True), "name", "id")
+    return companies.order_by("name", "id")
+
+
+def _ops_company_row(c: Company, *, pricing) -> dict:
+    sub = getattr(c, "subscription", None)
+    mrr, arr = _subscription_monthly_equivalent(sub, pricing=pricing)
+    return {
+        "company": c,
+        "subscription": sub,
+        "owner_email": c.owner_email or "",
+        "employee_count": c.employee_count or 0,
+        "last_login": c.last_login,
+        "mrr": mrr,
+        "arr": arr,
+        "seats_limit": seats_limit_for(sub) if sub else 1,
+        "risk_score": c.risk_score or 0,
+        "risk_level": c.risk_level or "",
+        "risk_flags": c.risk_flags or [],
+        "risk_date": c.risk_date,
+    }
+
+
+_COMPANIES_CSV_HEADER = [
+    "company_id",
+    "company_name",
+    "owner_email",
+    "is_suspended",
+    "subscription_status",
+    "plan",
+    "interval",
+    "extra_seats",
+    "comped",
+    "discount_percent",
+    "mrr",
+    "arr",
+    "users",
+    "last_login",
+    "risk_score",
+    "risk_level",
+]
+
+
+def _ops_companies_csv_response(companies, *, pricing) -> HttpResponse:
+    """Stream the filtered directory as CSV without materializing every row."""
+
+    def _row(c) -> list[str]:
+        r = _ops_company_row(c, pricing=pricing)
+        sub = r["subscription"]
+        return [
+            str(c.id),
+            c.name,
+            r["owner_email"],
+            "1" if c.is_suspended else "0",
+            getattr(sub, "status", "") if sub else "",
+            getattr(sub, "plan", "") if sub else "",
+            getattr(sub, "billing_interval", "") if sub else "",
+            str(getattr(sub, "extra_seats", "") if sub else ""),
+            "1" if (sub and sub.is_comped_active()) else "0",
+            str(getattr(sub, "discount_percent", "") if sub else ""),
+            str(r["mrr"]),
+            str(r["arr"]),
+            str(r["employee_count"]),
+            r["last_login"].isoformat() if r["last_login"] else "",
+            str(r["risk_score"]),
+            r["risk_level"],
+        ]
+
+    return queryset_csv_response("ez360pm_companies.csv", _COMPANIES_CSV_HEADER, companies, _row, chunk_size=500)
+
+
 def ops_companies(request: HttpRequest) -> HttpResponse:
     if not require_ops_role(request, OpsRole.VIEWER):
         return redirect('core:dashboard')
@@ -762,7 +916,10 @@ def ops_companies(request: HttpRequest) -> HttpResponse:
     - status: active|trialing|past_due|canceled|ended|all
     - comped: 1
     - q: name/email search
+    - sort: name|risk (risk = latest CompanyRiskSnapshot, see ez360_snapshot_company_risk)
     """
+    from .models import OpsCompanyViewPreset
+
     # Saved presets (per-operator)
     presets_qs = OpsCompanyViewPreset.objects.filter(is_active=True).filter(Q(owner=request.user) | Q(owner__isnull=True)).order_by("name")
     preset_id = (request.GET.get("preset") or "").strip()
@@ -786,7 +943,7 @@ def ops_companies(request: HttpRequest) -> HttpResponse:
             return redirect(request.path)
 
         qp_source = params if params else request.POST
-        qp = {k: qp_source.get(k) for k in {"segment", "status", "comped", "q"} if qp_source.get(k)}
+        qp = {k: qp_source.get(k) for k in {"segment", "status", "comped", "q", "sort"} if qp_source.get(k)}
         preset, _created = OpsCompanyViewPreset.objects.update_or_create(
             owner=request.user,
             name=name,
@@ -803,209 +960,35 @@ def ops_companies(request: HttpRequest) -> HttpResponse:
     segment = (params.get("segment") or "active").strip().lower()
     status = (params.get("status") or "").strip().lower()
     comped = (params.get("comped") or "").strip()
+    sort = (params.get("sort") or "").strip().lower()
     export = (params.get("export") or "").strip().lower()
 
-    companies = (
-        Company.objects.all()
-        .annotate(
-            employee_count=Count("employees", filter=Q(employees__deleted_at__isnull=True), distinct=True),
-            last_login=Max("employees__user__last_login"),
-        )
-        .select_related("owner")
-        .order_by("name")
-    )
-
-    if q:
-        companies = companies.filter(
-            Q(name__icontains=q)
-            | Q(owner__email__icontains=q)
-            | Q(employees__user__email__icontains=q)
-        ).distinct()
-
-    subs = {s.company_id: s for s in CompanySubscription.objects.select_related("company")}
-
-    # Risk inputs
-    now = timezone.now()
-    cfg = SiteConfig.get_solo()
-
-    stale_hours = int(getattr(cfg, "stripe_mirror_stale_after_hours", 48) or 48)
-    stale_cutoff = now - timedelta(hours=max(1, stale_hours))
-
-    risk_payment_days = int(getattr(cfg, "risk_payment_failed_window_days", 14) or 14)
-    risk_payment_days = max(1, min(90, risk_payment_days))
-    start_fail_window = now - timedelta(days=risk_payment_days)
-
-    risk_trial_days = int(getattr(cfg, "risk_trial_ends_within_days", 7) or 7)
-    risk_trial_days = max(1, min(30, risk_trial_days))
-
-    # Risk weights (operator-tunable, clamped)
-    w_past_due = int(getattr(cfg, "risk_weight_past_due", 60) or 0)
-    w_mirror_stale = int(getattr(cfg, "risk_weight_mirror_stale", 25) or 0)
-    w_payment_failed = int(getattr(cfg, "risk_weight_payment_failed", 25) or 0)
-    w_payment_failed_sub_only = int(getattr(cfg, "risk_weight_payment_failed_sub_only", 10) or 0)
-    w_canceling = int(getattr(cfg, "risk_weight_canceling", 15) or 0)
-    w_trial_ends_soon = int(getattr(cfg, "risk_weight_trial_ends_soon", 15) or 0)
-
-    w_past_due = max(0, min(100, w_past_due))
-    w_mirror_stale = max(0, min(100, w_mirror_stale))
-    w_payment_failed = max(0, min(100, w_payment_failed))
-    w_payment_failed_sub_only = max(0, min(100, w_payment_failed_sub_only))
-    w_canceling = max(0, min(100, w_canceling))
-    w_trial_ends_soon = max(0, min(100, w_trial_ends_soon))
-
-    medium_threshold = int(getattr(cfg, "risk_level_medium_threshold", 40) or 40)
-    high_threshold = int(getattr(cfg, "risk_level_high_threshold", 80) or 80)
-    medium_threshold = max(0, min(100, medium_threshold))
-    high_threshold = max(0, min(100, high_threshold))
-    if high_threshold < medium_threshold:
-        high_threshold = min(100, medium_threshold + 1)
-
-    payment_fail_types = ["invoice.payment_failed", "payment_intent.payment_failed", "charge.failed"]
-    failed_customer_ids_14d: set[str] = set()
-    failed_sub_ids_14d: set[str] = set()
-    for e in BillingWebhookEvent.objects.filter(received_at__gte=start_fail_window, event_type__in=payment_fail_types).only("payload_json", "event_type"):
-        try:
-            obj = (e.payload_json or {}).get("data", {}).get("object", {}) or {}
-            cust = obj.get("customer") or obj.get("customer_id") or ""
-            subid = obj.get("subscription") or obj.get("subscription_id") or ""
-            if isinstance(cust, str) and cust:
-                failed_customer_ids_14d.add(cust)
-            if isinstance(subid, str) and subid:
-                failed_sub_ids_14d.add(subid)
-        except Exception:
-            continue
-
-
     # Segment presets (exec-ops friendly)
     # Segment sets defaults but still allows manual override via status/comped controls.
     if not status:
         status = "active" if segment == "active" else segment
 
-    if segment == "suspended":
-        companies = companies.filter(is_suspended=True)
+    if segment in {"suspended", "discounted"}:
         status = "all"
     elif segment == "comped":
         comped = "1"
         status = "all"
-    elif segment == "discounted":
-        status = "all"
-    elif segment in {"trialing", "past_due", "canceled", "ended", "all", "active"}:
-        # Handled by subscription status logic below.
-        pass
-    else:
+    elif segment not in {"trialing", "past_due", "canceled", "ended", "all", "active"}:
         segment = "active"
         status = "active"
+    if sort != "risk":
+        sort = "name"
 
-    rows = []
-    for c in companies:
-        sub = subs.get(c.id)
-
-        # Segment-specific filters that depend on subscription
-        if segment == "discounted":
-            if not sub or not sub.discount_is_active() or int(sub.discount_percent or 0) <= 0:
-                continue
-        if status and status != "all":
-            st = (getattr(sub, "status", "") or "").lower()
-            if status == "active":
-                if st not in {SubscriptionStatus.ACTIVE, SubscriptionStatus.PAST_DUE}:
-                    continue
-            elif status == "trialing":
-                if st != SubscriptionStatus.TRIALING:
-                    continue
-            elif status == "past_due":
-                if st != SubscriptionStatus.PAST_DUE:
-                    continue
-            elif status == "canceled":
-                if st != SubscriptionStatus.CANCELED:
-                    continue
-            elif status == "ended":
-                if st != SubscriptionStatus.ENDED:
-                    continue
-
-        if comped == "1":
-            if not sub or not sub.is_comped_active():
-                continue
-
-        mrr, arr = _subscription_monthly_equivalent(sub)
-        seats_limit = seats_limit_for(sub) if sub else 1
-
-        # Tenant risk scoring (ops triage)
-        risk = _compute_tenant_risk(
-            c,
-            sub,
-            cfg=cfg,
-            now=now,
-            failed_customer_ids=failed_customer_ids_14d,
-            failed_subscription_ids=failed_sub_ids_14d,
-        )
-        risk_score = risk["score"]
-        risk_level = risk["level"]
-        risk_flags = risk["flags"]
-        rows.append(
-            {
-                "company": c,
-                "subscription": sub,
-                "employee_count": getattr(c, "employee_count", 0) or 0,
-                "last_login": getattr(c, "last_login", None),
-                "mrr": mrr,
-                "arr": arr,
-                "seats_limit": seats_limit,
-                "risk_score": risk_score,
-                "risk_level": risk_level,
-                "risk_flags": risk_flags,
-            }
-        )
+    companies = _ops_company_directory_qs(q=q, segment=segment, status=status, comped=comped, sort=sort)
+    pricing = _load_pricing()
 
     # Export (CSV) for ops workflows
     if export == "csv":
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(
-            [
-                "company_id",
-                "company_name",
-                "owner_email",
-                "is_suspended",
-                "subscription_status",
-                "plan",
-                "interval",
-                "extra_seats",
-                "comped",
-                "discount_percent",
-                "mrr",
-                "arr",
-                "users",
-                "last_login",
-            ]
-        )
-        for r in rows:
-            c = r["company"]
-            sub = r["subscription"]
-            writer.writerow(
-                [
-                    str(c.id),
-                    c.name,
-                    getattr(c.owner, "email", ""),
-                    "1" if c.is_suspended else "0",
-                    getattr(sub, "status", "") if sub else "",
-                    getattr(sub, "plan", "") if sub else "",
-                    getattr(sub, "billing_interval", "") if sub else "",
-                    str(getattr(sub, "extra_seats", "") if sub else ""),
-                    "1" if (sub and sub.is_comped_active()) else "0",
-                    str(getattr(sub, "discount_percent", "") if sub else ""),
-                    str(r["mrr"]),
-                    str(r["arr"]),
-                    str(r["employee_count"]),
-                    r["last_login"].isoformat() if r["last_login"] else "",
-                ]
-            )
+        return _ops_companies_csv_response(companies, pricing=pricing)
 
-        resp = HttpResponse(output.getvalue(), content_type="text/csv")
-        resp["Content-Disposition"] = "attachment; filename=ez360pm_companies.csv"
-        return resp
-
-    paginator = Paginator(rows, 50)
+    paginator = Paginator(companies, 50)
     page_obj = paginator.get_page(request.GET.get("page") or 1)
+    page_obj.object_list = [_ops_company_row(c, pricing=pricing) for c in page_obj.object_list]
 
 
     return render(
@@ -1016,6 +999,7 @@ def ops_companies(request: HttpRequest) -> HttpResponse:
             "segment": segment,
             "status": status,
             "comped": comped,
+            "sort": sort,
             "page_obj": page_obj,
             "support_mode": get_support_mode(request),
             "presets": presets_qs,
@@ -1592,7 +1576,7 @@ def ops_slo_dashboard(request: HttpRequest) -> HttpResponse:
     webhook_last_received_at = getattr(last_webhook, "received_at", None)
     last_webhook_ok = BillingWebhookEvent.objects.filter(ok=True).order_by("-received_at").first()
     webhook_last_ok_at = getattr(last_webhook_ok, "received_at", None)
-    webhook_fail_24h = BillingWebhookEvent.objects.filter(ok=False, received_at__gte=window_24h).count()
+    webhook_fail_24h = BillingWebhookEvent.objects.filter(status__in=WEBHOOK_FAILED_STATUSES, received_at__gte=window_24h).count()
 
     recent_alerts = OpsAlertEvent.objects.filter(created_at__gte=window_24h).select_related("company").order_by("-created_at")[:50]
 
@@ -2872,23 +2856,9 @@ def ops_company_detail(request: HttpRequest, company_id: int) -> HttpResponse:
     now = timezone.now()
 
     # Risk drill-down (uses same operator-tunable weights as Companies directory)
-    payment_fail_types = ["invoice.payment_failed", "payment_intent.payment_failed", "charge.failed"]
-    risk_payment_days = int(getattr(cfg, "risk_payment_failed_window_days", 14) or 14)
-    risk_payment_days = max(1, min(90, risk_payment_days))
-    start_fail_window = now - timedelta(days=risk_payment_days)
-    failed_customer_ids: set[str] = set()
-    failed_subscription_ids: set[str] = set()
-    for e in BillingWebhookEvent.objects.filter(received_at__gte=start_fail_window, event_type__in=payment_fail_types).only("payload_json", "event_type"):
-        try:
-            obj = (e.payload_json or {}).get("data", {}).get("object", {}) or {}
-            cust = obj.get("customer") or obj.get("customer_id") or ""
-            subid = obj.get("subscription") or obj.get("subscription_id") or ""
-            if isinstance(cust, str) and cust:
-                failed_customer_ids.add(cust)
-            if isinstance(subid, str) and subid:
-                failed_subscription_ids.add(subid)
-        except Exception:
-            continue
+    from .services_risk import failed_payment_ids
+
+    failed_customer_ids, failed_subscription_ids = failed_payment_ids(cfg, now)
 
     risk = _compute_tenant_risk(
         company,
@@ -3755,10 +3725,7 @@ def ops_drift_recalc(request: HttpRequest) -> HttpResponse:
 @user_passes_test(_is_staff)
 @require_POST
 def ops_drift_post_missing(request: HttpRequest) -> HttpResponse:
-    from documents.models import Document, DocumentType, DocumentStatus
-    from payments.models import Payment, PaymentStatus
-    from expenses.models import Expense, ExpenseStatus
-    from accounting.services import post_invoice_if_needed, post_payment_if_needed, post_expense_if_needed
+    from accounting.services import ChartAccounts, iter_batch_source_chunks, post_batch
     from .forms import DriftCompanyActionForm
 
     form = DriftCompanyActionForm(request.POST)
@@ -3770,30 +3737,10 @@ def ops_drift_post_missing(request: HttpRequest) -> HttpResponse:
 
     posted = {"invoices": 0, "payments": 0, "expenses": 0}
 
-    invoices = (
-        Document.objects.filter(company=company, doc_type=DocumentType.INVOICE, deleted_at__isnull=True)
-        .exclude(status__in=[DocumentStatus.DRAFT, DocumentStatus.VOID])
-        .order_by("created_at")
-    )
-    for inv in invoices.iterator(chunk_size=200):
-        if post_invoice_if_needed(inv):
-            posted["invoices"] += 1
-
-    payments = (
-        Payment.objects.filter(company=company, status=PaymentStatus.SUCCEEDED, deleted_at__isnull=True)
-        .order_by("created_at")
-    )
-    for p in payments.iterator(chunk_size=200):
-        if post_payment_if_needed(p):
-            posted["payments"] += 1
-
-    expenses = (
-        Expense.objects.filter(company=company, status__in=[ExpenseStatus.SUBMITTED, ExpenseStatus.APPROVED], deleted_at__isnull=True)
-        .order_by("created_at")
-    )
-    for e in expenses.iterator(chunk_size=200):
-        if post_expense_if_needed(e):
-            posted["expenses"] += 1
+    accounts = ChartAccounts(company)
+    for source_type, label in (("invoice", "invoices"), ("payment", "payments"), ("expense", "expenses")):
+        for chunk in iter_batch_source_chunks(company, source_type):
+            posted[label] += post_batch(company, source_type, chunk, accounts=accounts).posted
 
     messages.success(
         request,
@@ -4936,12 +4883,11 @@ def ops_activity_export_csv(request: HttpRequest) -> HttpResponse:
                 | Q(status__icontains=q)
             )
 
-        resp = HttpResponse(content_type="text/csv")
-        resp["Content-Disposition"] = 'attachment; filename="ops_stripe_actions.csv"'
-        w = csv.writer(resp)
-        w.writerow(["created_at", "company", "subscription_id", "action_type", "status", "requested_by", "approved_by", "executed_by", "error"])
-        for row in qs.order_by("-created_at")[:50000]:
-            w.writerow([
+        return queryset_csv_response(
+            "ops_stripe_actions.csv",
+            ["created_at", "company", "subscription_id", "action_type", "status", "requested_by", "approved_by", "executed_by", "error"],
+            qs.order_by("-created_at")[:50000],
+            lambda row: [
                 row.created_at.isoformat(),
                 getattr(row.company, "name", ""),
                 row.subscription_id_snapshot,
@@ -4951,8 +4897,8 @@ def ops_activity_export_csv(request: HttpRequest) -> HttpResponse:
                 row.approved_by_email,
                 row.executed_by_email,
                 (row.error or "")[:2000],
-            ])
-        return resp
+            ],
+        )
 
     logs = OpsActionLog.objects.select_related("company").filter(created_at__gte=since)
     if company_id:
@@ -4969,12 +4915,11 @@ def ops_activity_export_csv(request: HttpRequest) -> HttpResponse:
             | Q(company__name__icontains=q)
         )
 
-    resp = HttpResponse(content_type="text/csv")
-    resp["Content-Disposition"] = 'attachment; filename="ops_activity.csv"'
-    w = csv.writer(resp)
-    w.writerow(["created_at", "actor_email", "company", "action", "summary", "ip", "user_agent"])
-    for row in logs.order_by("-created_at")[:50000]:
-        w.writerow([
+    return queryset_csv_response(
+        "ops_activity.csv",
+        ["created_at", "actor_email", "company", "action", "summary", "ip", "user_agent"],
+        logs.order_by("-created_at")[:50000],
+        lambda row: [
             row.created_at.isoformat(),
             row.actor_email,
             getattr(row.company, "name", ""),
@@ -4982,8 +4927,8 @@ def ops_activity_export_csv(request: HttpRequest) -> HttpResponse:
             row.summary,
             row.ip_address,
             row.user_agent,
-        ])
-    return resp
+        ],
+    )
 
 
 # --------------------------------------------------------------------
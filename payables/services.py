@@ -4,6 +4,7 @@ from django.db import transaction
 from django.utils import timezone
 
 from accounting.models import JournalEntry, JournalLine, DefaultAccountCodes, get_account
+from accounting.services_balances import apply_entry_to_balances
 from companies.models import Company, EmployeeProfile
 
 from .models import Bill, BillPayment
@@ -35,16 +36,20 @@ def _replace_lines(entry: JournalEntry, lines: list[dict]) -> None:
     if debit_total != credit_total:
         raise ValueError("Unbalanced journal entry (debits must equal credits).")
 
+    created = []
     for l in lines:
-        JournalLine.objects.create(
-            entry=entry,
-            account=l["account"],
-            description=(l.get("description") or "")[:240],
-            debit_cents=int(l.get("debit_cents") or 0),
-            credit_cents=int(l.get("credit_cents") or 0),
-            client=l.get("client"),
-            project=l.get("project"),
+        created.append(
+            JournalLine.objects.create(
+                entry=entry,
+                account=l["account"],
+                description=(l.get("description") or "")[:240],
+                debit_cents=int(l.get("debit_cents") or 0),
+                credit_cents=int(l.get("credit_cents") or 0),
+                client=l.get("client"),
+                project=l.get("project"),
+            )
         )
+    apply_entry_to_balances(entry, created)
 
 
 @transaction.atomic
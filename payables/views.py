@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import csv
 from datetime import timedelta
 
 from django.contrib import messages
@@ -14,6 +13,7 @@ from audit.services import log_event
 from companies.decorators import require_min_role
 from companies.models import EmployeeRole
 
+from core.csv_utils import queryset_csv_response
 from core.pagination import paginate
 from core.services.private_media import build_private_access_url
 from core.s3_presign import presign_private_download, delete_private_object
@@ -241,13 +241,7 @@ def ap_aging_report_csv(request):
         .order_by("vendor__name", "due_date", "issue_date")
     )
 
-    resp = HttpResponse(content_type="text/csv")
-    resp["Content-Disposition"] = f'attachment; filename="ap_aging_{today.isoformat()}.csv"'
-
-    w = csv.writer(resp)
-    w.writerow(["Vendor", "Bill #", "Issue Date", "Due Date", "Days Overdue", "Balance (cents)", "Bucket"])
-
-    for b in qs:
+    def _row(b: Bill) -> list:
         due = b.due_date
         days_over = 0
         if due:
@@ -263,7 +257,7 @@ def ap_aging_report_csv(request):
             else:
                 bucket = "90+"
 
-        w.writerow([
+        return [
             b.vendor.name,
             b.bill_number,
             b.issue_date.isoformat() if b.issue_date else "",
@@ -271,9 +265,14 @@ def ap_aging_report_csv(request):
             max(days_over, 0) if due else 0,
             int(b.balance_cents or 0),
             bucket,
-        ])
+        ]
 
-    return resp
+    return queryset_csv_response(
+        f"ap_aging_{today.isoformat()}.csv",
+        ["Vendor", "Bill #", "Issue Date", "Due Date", "Days Overdue", "Balance (cents)", "Bucket"],
+        qs,
+        _row,
+    )
 
 
 @require_min_role(EmployeeRole.MANAGER)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from core.jobs import job_handler
+
+from .models import DropboxSyncStatus, Project, ProjectFile
+from .services_dropbox import dropbox_connection_for, sync_project_files_to_dropbox
+
+
+@job_handler("projects.dropbox_sync")
+def dropbox_sync(*, project_id: str) -> dict | None:
+    """Upload a project's queued files to Dropbox; see projects/services_dropbox.py."""
+    project = Project.objects.select_related("company").filter(id=project_id).first()
+    if project is None:
+        return {"skipped": "project not found"}
+
+    pending = ProjectFile.objects.filter(project=project, dropbox_status__in=[DropboxSyncStatus.QUEUED, DropboxSyncStatus.UPLOADING])
+    conn = dropbox_connection_for(project.company)
+    if conn is None:
+        pending.update(dropbox_status=DropboxSyncStatus.FAILED, dropbox_error="Dropbox is not connected or not enabled.")
+        return {"skipped": "not connected"}
+
+    try:
+        return sync_project_files_to_dropbox(project, conn=conn)
+    except Exception as exc:
+        # Leave the files retryable: the job is retried with backoff and picks them up again.
+        pending.update(dropbox_status=DropboxSyncStatus.QUEUED, dropbox_error=f"{exc.__class__.__name__}: {exc}"[:255])
+        raise
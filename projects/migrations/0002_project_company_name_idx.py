@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_company_onboarding_flags'),
+        ('crm', '0002_client_import_progress'),
+        ('projects', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['company', 'name'], name='projects_pr_company_703d94_idx'),
+        ),
+    ]
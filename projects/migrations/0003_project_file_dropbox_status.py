@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:07
+
+from django.db import migrations, models
+
+
+def mark_synced(apps, schema_editor):
+    ProjectFile = apps.get_model("projects", "ProjectFile")
+    ProjectFile.objects.exclude(dropbox_shared_url="").update(dropbox_status="synced")
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_company_name_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectfile',
+            name='dropbox_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='projectfile',
+            name='dropbox_status',
+            field=models.CharField(blank=True, choices=[('', 'Not synced'), ('queued', 'Queued'), ('uploading', 'Uploading'), ('synced', 'Synced'), ('failed', 'Failed')], default='', max_length=16),
+        ),
+        migrations.RunPython(mark_synced, migrations.RunPython.noop),
+    ]
@@ -44,6 +44,7 @@ class Project(SyncModel):
         indexes = [
             models.Index(fields=["company", "is_active"]),
             models.Index(fields=["company", "project_number"]),
+            models.Index(fields=["company", "name"]),
             models.Index(fields=["company", "assigned_to"]),
             models.Index(fields=["company", "client"]),
             models.Index(fields=["company", "updated_at"]),
@@ -72,6 +73,14 @@ class ProjectService(SyncModel):
 
 
 
+class DropboxSyncStatus(models.TextChoices):
+    NONE = "", "Not synced"
+    QUEUED = "queued", "Queued"
+    UPLOADING = "uploading", "Uploading"
+    SYNCED = "synced", "Synced"
+    FAILED = "failed", "Failed"
+
+
 def project_file_upload_to(instance: "ProjectFile", filename: str) -> str:
     # Keep paths stable and company-scoped
     return f"projects/{instance.company_id}/{instance.project_id}/{filename}"
@@ -94,6 +103,9 @@ class ProjectFile(SyncModel):
     )
     dropbox_path = models.CharField(max_length=512, blank=True, default="")
     dropbox_shared_url = models.URLField(blank=True, default="")
+    # Per-file progress of the background Dropbox sync (projects.dropbox_sync job).
+    dropbox_status = models.CharField(max_length=16, choices=DropboxSyncStatus.choices, blank=True, default="")
+    dropbox_error = models.CharField(max_length=255, blank=True, default="")
 
     class Meta:
         indexes = [
@@ -0,0 +1,123 @@
+"""Project file -> Dropbox sync (runs as the `projects.dropbox_sync` background job).
+
+Views only mark files QUEUED and enqueue the job; the job uploads them through
+`integrations.dropbox_transfer` (pooled session, chunked upload sessions, a
+bounded thread pool, rate-limit backoff) and records each file's outcome on
+`ProjectFile.dropbox_status` as it finishes, which the files page shows.
+"""
+
+from __future__ import annotations
+
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.jobs import enqueue, extend_lease
+from integrations.dropbox_transfer import DropboxClient, TransferItem, transfer_files
+from integrations.services import build_dropbox_project_folder
+
+from .models import DropboxSyncStatus, Project, ProjectFile
+
+_ACTIVE = (DropboxSyncStatus.QUEUED, DropboxSyncStatus.UPLOADING)
+
+
+def dropbox_connection_for(company):
+    """The company's active Dropbox connection when project-file sync is enabled, else None."""
+    cfg = getattr(company, "integration_config", None)
+    conn = getattr(company, "dropbox_connection", None)
+    if cfg and cfg.use_dropbox_for_project_files and conn and conn.is_active and conn.access_token:
+        return conn
+    return None
+
+
+def unsynced_files(project: Project):
+    return (
+        ProjectFile.objects.filter(company_id=project.company_id, project=project, dropbox_shared_url="")
+        .exclude(file="")
+        .order_by("created_at")
+    )
+
+
+def queue_project_dropbox_sync(project: Project, *, file_ids=None):
+    """Mark unsynced files (or just `file_ids`) QUEUED and enqueue one sync job per project."""
+    qs = unsynced_files(project)
+    if file_ids is not None:
+        qs = qs.filter(id__in=list(file_ids))
+    queued = qs.exclude(dropbox_status__in=_ACTIVE).update(dropbox_status=DropboxSyncStatus.QUEUED, dropbox_error="")
+    enqueue(
+        "projects.dropbox_sync",
+        company=project.company,
+        payload={"project_id": str(project.id)},
+        dedupe_key=f"dropbox_sync:{project.id}",
+    )
+    return queued
+
+
+def _dropbox_name(pf: ProjectFile) -> str:
+    name = os.path.basename(pf.file.name) or "file"
+    return name.replace("\\", "_").replace("/", "_")
+
+
+def _claim_pending(project: Project) -> dict:
+    """The project's queued/uploading files, marked UPLOADING."""
+    files = {pf.id: pf for pf in unsynced_files(project).filter(dropbox_status__in=_ACTIVE)}
+    if files:
+        ProjectFile.objects.filter(id__in=list(files)).update(dropbox_status=DropboxSyncStatus.UPLOADING)
+    return files
+
+
+def sync_project_files_to_dropbox(project: Project, *, conn, client: DropboxClient | None = None, max_workers: int | None = None) -> dict:
+    """Upload the project's QUEUED/UPLOADING files; returns {synced, failed}.
+
+    Runs until no queued files are left: a file queued while this job is
+    running finds the job already active (its enqueue is deduped), so the
+    running job picks it up in its next round.
+    """
+    files = _claim_pending(project)
+    if not files:
+        return {"synced": 0, "failed": 0}
+
+    workers = max_workers or int(getattr(settings, "DROPBOX_UPLOAD_WORKERS", 4) or 4)
+    own_client = client is None
+    client = client or DropboxClient(conn.access_token, pool_size=workers)
+    folder = build_dropbox_project_folder(project.company, project)
+    synced = failed = 0
+    try:
+        client.ensure_folder(folder)
+        while files:
+            items = [
+                TransferItem(key=pf.id, dropbox_path=f"{folder}/{_dropbox_name(pf)}", open=lambda pf=pf: pf.file.open("rb"))
+                for pf in files.values()
+            ]
+            for res in transfer_files(client, items, max_workers=workers):
+                extend_lease()
+                pf = files[res.key]
+                if not res.ok:
+                    failed += 1
+                    ProjectFile.objects.filter(id=pf.id).update(dropbox_status=DropboxSyncStatus.FAILED, dropbox_error=res.error)
+                    continue
+                synced += 1
+                pf.storage_backend = "dropbox"
+                pf.dropbox_path = res.dropbox_path
+                pf.dropbox_shared_url = res.shared_url
+                pf.dropbox_status = DropboxSyncStatus.SYNCED
+                pf.dropbox_error = ""
+                pf.updated_at = timezone.now()
+                pf.revision = int(pf.revision or 0) + 1
+                pf.save(
+                    update_fields=[
+                        "storage_backend",
+                        "dropbox_path",
+                        "dropbox_shared_url",
+                        "dropbox_status",
+                        "dropbox_error",
+                        "updated_at",
+                        "revision",
+                    ]
+                )
+            files = _claim_pending(project)
+    finally:
+        if own_client:
+            client.close()
+    return {"synced": synced, "failed": failed}
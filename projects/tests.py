@@ -1,3 +1,75 @@
-from django.test import TestCase
+from __future__ import annotations
 
-# Create your tests here.
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from companies.models import Company
+from core.models import BackgroundJob
+from integrations import dropbox_transfer
+from integrations.fakes import FakeDropboxSession
+from integrations.models import DropboxConnection, IntegrationConfig
+from projects.models import DropboxSyncStatus, Project, ProjectFile
+from projects.services_dropbox import queue_project_dropbox_sync
+
+
+class DropboxProjectSyncJobTests(TestCase):
+    def setUp(self):
+        override = override_settings(EZ360_JOBS_RUN_INLINE=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Serve file bytes without touching the configured (possibly remote) private storage.
+        storage = ProjectFile._meta.get_field("file").storage
+        patcher = mock.patch.object(storage, "open", side_effect=lambda name, mode="rb": ContentFile(b"data", name=name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.company = Company.objects.create(name="Acme Co")
+        IntegrationConfig.objects.create(company=self.company, use_dropbox_for_project_files=True)
+        DropboxConnection.objects.create(company=self.company, access_token="tok", is_active=True)
+        self.project = Project.objects.create(company=self.company, name="Build")
+
+    def _file(self, name):
+        return ProjectFile.objects.create(company=self.company, project=self.project, file=f"projects/{self.company.id}/{self.project.id}/{name}")
+
+    def test_job_uploads_queued_files_and_records_per_file_status(self):
+        good = self._file("plan.pdf")
+        bad = self._file("notes.txt")
+        session = FakeDropboxSession({"files/upload": [(200, {"path_display": "/x/plan.pdf"}, {}), (400, {}, {})]})
+
+        with mock.patch("integrations.dropbox_transfer._new_session", return_value=session):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(queue_project_dropbox_sync(self.project), 2)
+
+        statuses = dict(ProjectFile.objects.values_list("id", "dropbox_status"))
+        self.assertEqual(sorted(statuses.values()), [DropboxSyncStatus.FAILED, DropboxSyncStatus.SYNCED])
+        synced = ProjectFile.objects.get(dropbox_status=DropboxSyncStatus.SYNCED)
+        self.assertEqual((synced.storage_backend, synced.dropbox_shared_url), ("dropbox", "https://dropbox.test/s/abc"))
+        self.assertTrue(ProjectFile.objects.get(dropbox_status=DropboxSyncStatus.FAILED).dropbox_error)
+        self.assertEqual([c[0] for c in session.calls].count("files/create_folder_v2"), 1)
+        self.assertTrue(session.closed)
+        self.assertEqual(BackgroundJob.objects.get(name="projects.dropbox_sync").result, {"synced": 1, "failed": 1})
+        self.assertEqual({good.id, bad.id}, set(statuses))
+
+    def test_file_queued_while_the_job_runs_is_uploaded_by_that_job(self):
+        self._file("first.pdf")
+        real = dropbox_transfer.transfer_files
+        late = {}
+
+        def transfer_and_queue_another(*args, **kwargs):
+            if not late:
+                late["file"] = self._file("late.pdf")
+                # The running job dedupes this enqueue away.
+                queue_project_dropbox_sync(self.project, file_ids=[late["file"].id])
+            yield from real(*args, **kwargs)
+
+        with mock.patch("integrations.dropbox_transfer._new_session", return_value=FakeDropboxSession()):
+            with mock.patch("projects.services_dropbox.transfer_files", side_effect=transfer_and_queue_another):
+                with self.captureOnCommitCallbacks(execute=True):
+                    queue_project_dropbox_sync(self.project, file_ids=[ProjectFile.objects.get().id])
+
+        self.assertEqual(BackgroundJob.objects.filter(name="projects.dropbox_sync").count(), 1)
+        late["file"].refresh_from_db()
+        self.assertEqual(late["file"].dropbox_status, DropboxSyncStatus.SYNCED)
+        self.assertEqual(BackgroundJob.objects.get().result, {"synced": 2, "failed": 0})
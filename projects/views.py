@@ -1,34 +1,29 @@
 from __future__ import annotations
 
 from decimal import Decimal
-import os
 
 from django.contrib import messages
 from django.conf import settings
-from django.db.models import Q, Sum
-from django.db.models.functions import Coalesce
+from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
 from django.http import FileResponse
 
 from audit.services import log_event
 from companies.decorators import company_context_required, require_min_role
 from companies.models import EmployeeRole
-from timetracking.models import TimeEntry, TimeStatus
+from timetracking.models import TimeEntry
+from timetracking.services_rollup import project_minutes, rollup_minutes
 
 from core.pagination import paginate
 from core.services.private_media import build_private_access_url
 from core.s3_presign import delete_private_object
 
+from core.models import BackgroundJob, JobStatus
 from integrations.models import DropboxConnection, IntegrationConfig
-from integrations.services import (
-    build_dropbox_project_folder,
-    dropbox_ensure_folder,
-    dropbox_upload_bytes,
-    dropbox_create_shared_link,
-)
 
 from .forms import ProjectForm, ProjectServiceFormSet, ProjectFileForm
 from .models import Project, ProjectFile
+from .services_dropbox import dropbox_connection_for, queue_project_dropbox_sync
 
 
 def _cents_to_dollars(cents: int) -> Decimal:
@@ -49,22 +44,7 @@ def project_list(request):
     if employee.role == EmployeeRole.STAFF:
         qs = qs.filter(assigned_to=employee)
 
-    qs = qs.select_related('client', 'assigned_to').annotate(
-        total_minutes=Coalesce(
-            Sum(
-                'timeentry__duration_minutes',
-                filter=Q(timeentry__deleted_at__isnull=True) & ~Q(timeentry__status=TimeStatus.VOID),
-            ),
-            0,
-        ),
-        unbilled_minutes=Coalesce(
-            Sum(
-                'timeentry__duration_minutes',
-                filter=Q(timeentry__deleted_at__isnull=True) & ~Q(timeentry__status__in=[TimeStatus.BILLED, TimeStatus.VOID]),
-            ),
-            0,
-        ),
-    ).order_by('-updated_at')
+    qs = qs.select_related('client', 'assigned_to').order_by('-updated_at')
 
     q = (request.GET.get('q') or '').strip()
     if q:
@@ -77,6 +57,10 @@ def project_list(request):
         )
 
     paged = paginate(request, qs)
+    # Time totals for the visible page only, from the per-day rollup.
+    minutes = project_minutes(company, [p.id for p in paged.object_list])
+    for p in paged.object_list:
+        p.total_minutes, p.unbilled_minutes = minutes.get(p.id, (0, 0))
     return render(
         request,
         'projects/project_list.html',
@@ -134,10 +118,7 @@ def project_detail(request, pk):
         .order_by('-started_at', '-updated_at')
     )
 
-    totals = time_qs.aggregate(
-        total_minutes=Coalesce(Sum('duration_minutes'), 0),
-        unbilled_minutes=Coalesce(Sum('duration_minutes', filter=~Q(status=TimeStatus.BILLED) & ~Q(status=TimeStatus.VOID)), 0),
-    )
+    _total, unbilled_minutes = project_minutes(company, [obj.id]).get(obj.id, (0, 0))
 
     return render(
         request,
@@ -145,8 +126,8 @@ def project_detail(request, pk):
         {
             'project': obj,
             'time_entries': time_qs[:200],
-            'total_minutes': int(totals['total_minutes'] or 0),
-            'unbilled_minutes': int(totals['unbilled_minutes'] or 0),
+            'total_minutes': rollup_minutes(company, project=obj),
+            'unbilled_minutes': unbilled_minutes,
             '_cents_to_dollars': _cents_to_dollars,
         },
     )
@@ -192,52 +173,14 @@ def project_files_sync_dropbox(request, pk):
     company = request.active_company
     project = get_object_or_404(Project, id=pk, company=company, deleted_at__isnull=True)
 
-    cfg = getattr(company, 'integration_config', None)
-    conn = getattr(company, 'dropbox_connection', None)
-    if not (cfg and cfg.use_dropbox_for_project_files and conn and conn.is_active and conn.access_token):
+    if request.method != "POST":
+        return redirect("projects:project_files", pk=project.id)
+    if dropbox_connection_for(company) is None:
         messages.error(request, "Dropbox is not connected or not enabled for project files.")
         return redirect("projects:project_files", pk=project.id)
 
-    folder = build_dropbox_project_folder(company, project)
-
-    synced = 0
-    skipped = 0
-    failed = 0
-
-    qs = ProjectFile.objects.filter(company=company, project=project, deleted_at__isnull=True).order_by("created_at")
-    for pf in qs:
-        if pf.dropbox_shared_url:
-            skipped += 1
-            continue
-        if not pf.file:
-            skipped += 1
-            continue
-        try:
-            # Read local file bytes
-            with pf.file.open("rb") as f:
-                content_bytes = f.read()
-            if not content_bytes:
-                skipped += 1
-                continue
-
-            dropbox_ensure_folder(conn.access_token, folder)
-            original_name = os.path.basename(pf.file.name) or "file"
-            safe_name = original_name.replace('\\', '_').replace('/', '_')
-            dropbox_path = f"{folder}/{safe_name}"
-
-            meta = dropbox_upload_bytes(conn.access_token, dropbox_path=dropbox_path, content=content_bytes)
-            actual_path = str(meta.get('path_display') or meta.get('path_lower') or dropbox_path)
-            shared = dropbox_create_shared_link(conn.access_token, dropbox_path=actual_path)
-
-            pf.storage_backend = 'dropbox'
-            pf.dropbox_path = actual_path
-            pf.dropbox_shared_url = shared
-            pf.save(update_fields=['storage_backend','dropbox_path','dropbox_shared_url','updated_at','revision'])
-            synced += 1
-        except Exception:
-            failed += 1
-
-    messages.success(request, f"Dropbox sync complete: {synced} synced, {skipped} skipped, {failed} failed.")
+    queued = queue_project_dropbox_sync(project)
+    messages.success(request, f"Dropbox sync started for {queued} file(s). Progress is shown below.")
     return redirect("projects:project_files", pk=project.id)
 
 
@@ -279,7 +222,6 @@ def project_files(request, pk):
             # Either traditional multipart upload OR S3 direct upload (file_s3_key).
             upload = request.FILES.get('file')
             file_s3_key = (form.cleaned_data.get("file_s3_key") or "").strip()
-            content_bytes = upload.read() if upload else b''
 
             if file_s3_key and not upload:
                 # Validate key prefix to prevent cross-company/project access.
@@ -292,26 +234,9 @@ def project_files(request, pk):
 
             pf.save()
 
-            # Optional: also upload to Dropbox if connected + enabled
-            try:
-                cfg = getattr(company, 'integration_config', None)
-                conn = getattr(company, 'dropbox_connection', None)
-                if cfg and cfg.use_dropbox_for_project_files and conn and conn.is_active and conn.access_token and content_bytes:
-                    original_name = upload.name if upload else 'file'
-                    safe_name = original_name.replace('\\', '_').replace('/', '_')
-                    folder = build_dropbox_project_folder(company, project)
-                    dropbox_ensure_folder(conn.access_token, folder)
-                    dropbox_path = f"{folder}/{safe_name}"
-                    meta = dropbox_upload_bytes(conn.access_token, dropbox_path=dropbox_path, content=content_bytes)
-                    actual_path = str(meta.get('path_display') or meta.get('path_lower') or dropbox_path)
-                    shared = dropbox_create_shared_link(conn.access_token, dropbox_path=actual_path)
-                    pf.storage_backend = 'dropbox'
-                    pf.dropbox_path = actual_path
-                    pf.dropbox_shared_url = shared
-                    pf.save(update_fields=['storage_backend','dropbox_path','dropbox_shared_url','updated_at','revision'])
-            except Exception as e:
-                # Do not block local file storage
-                messages.warning(request, f"Dropbox upload failed (saved locally): {e}")
+            # Optional: also upload to Dropbox if connected + enabled (in the background).
+            if dropbox_connection_for(company) is not None:
+                queue_project_dropbox_sync(project, file_ids=[pf.id])
 
             log_event(
                 request,
@@ -326,12 +251,17 @@ def project_files(request, pk):
     else:
         form = ProjectFileForm()
 
+    sync_in_progress = BackgroundJob.objects.filter(
+        dedupe_key=f"dropbox_sync:{project.id}", status__in=[JobStatus.QUEUED, JobStatus.RUNNING]
+    ).exists()
+
     return render(
         request,
         "projects/project_files.html",
         {
             "project": project,
             "files": qs,
+            "dropbox_sync_in_progress": sync_in_progress,
             "form": form,
             "dropbox_enabled": bool(getattr(getattr(company, "integration_config", None), "use_dropbox_for_project_files", False)),
             "dropbox_connected": bool(getattr(getattr(company, "dropbox_connection", None), "is_active", False)),
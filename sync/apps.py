@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SyncConfig(AppConfig):
     name = "sync"
+
+    def ready(self):
+        # Register change-log signals
+        from . import signals  # noqa
@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
+from typing import Any, Dict, Iterable, List, Type
+
+from django.db import models, transaction
+
+from .models import SyncChange
+from .registry import sync_model_registry
+
+
+# Child models without a direct company FK: the parent FK used to resolve the tenant.
+PARENT_COMPANY_FIELDS: Dict[str, str] = {
+    "crm.ClientPhone": "client",
+    "projects.ProjectService": "project",
+    "documents.DocumentLineItem": "document",
+    "timetracking.TimeEntryService": "time_entry",
+}
+
+
+@lru_cache(maxsize=1)
+def synced_model_keys() -> Dict[Type[models.Model], str]:
+    """Map model class -> canonical registry key (back-compat aliases skipped)."""
+
+    out: Dict[Type[models.Model], str] = {}
+    for model_cls in sync_model_registry().values():
+        out.setdefault(model_cls, f"{model_cls._meta.app_label}.{model_cls.__name__}")
+    return out
+
+
+def sync_key_for(model_cls: Type[models.Model]) -> str | None:
+    return synced_model_keys().get(model_cls)
+
+
+def company_path_for(model_key: str) -> str:
+    """ORM path from a synced model to its company id ("pk" for Company itself)."""
+
+    if model_key == "companies.Company":
+        return "pk"
+    parent = PARENT_COMPANY_FIELDS.get(model_key)
+    if parent:
+        return f"{parent}__company_id"
+    return "company_id"
+
+
+def resolve_company_id(obj: models.Model) -> Any | None:
+    """Best-effort tenant resolution for a single instance (may hit the parent row)."""
+
+    key = sync_key_for(type(obj))
+    if key == "companies.Company":
+        return obj.pk
+    parent = PARENT_COMPANY_FIELDS.get(key or "")
+    if parent:
+        parent_obj = getattr(obj, parent, None)
+        return getattr(parent_obj, "company_id", None)
+    return getattr(obj, "company_id", None)
+
+
+def _change_for(obj: models.Model, *, model_key: str, company_id: Any) -> SyncChange:
+    return SyncChange(
+        company_id=company_id,
+        model_key=model_key,
+        object_id=obj.pk,
+        revision=int(getattr(obj, "revision", 0) or 0),
+        is_deleted=bool(getattr(obj, "deleted_at", None)),
+    )
+
+
+def record_change(obj: models.Model) -> SyncChange | None:
+    """Append one change-log row for a saved/soft-deleted synced object."""
+
+    key = sync_key_for(type(obj))
+    if not key:
+        return None
+    company_id = resolve_company_id(obj)
+    if not company_id:
+        return None
+    change = _change_for(obj, model_key=key, company_id=company_id)
+    change.save(force_insert=True)
+    publish_on_commit([company_id])
+    return change
+
+
+def record_changes(objs: Iterable[models.Model], *, company_id: Any | None = None) -> int:
+    """Append change-log rows for objects written via bulk_create/bulk_update.
+
+    Bulk writes bypass post_save, so callers that use them must log explicitly.
+    Pass company_id when the caller already knows the tenant (skips parent lookups).
+    """
+
+    rows: List[SyncChange] = []
+    for obj in objs:
+        key = sync_key_for(type(obj))
+        if not key:
+            continue
+        obj_company_id = company_id or resolve_company_id(obj)
+        if not obj_company_id:
+            continue
+        rows.append(_change_for(obj, model_key=key, company_id=obj_company_id))
+    if rows:
+        SyncChange.objects.bulk_create(rows, batch_size=1000)
+        publish_on_commit({row.company_id for row in rows})
+    return len(rows)
+
+
+def record_changes_for_pks(model_cls: Type[models.Model], pks: Iterable[Any]) -> int:
+    """Append change-log rows for rows changed via QuerySet.update()."""
+
+    key = sync_key_for(model_cls)
+    pks = list(pks)
+    if not key or not pks:
+        return 0
+
+    company_path = company_path_for(key)
+    values = model_cls._base_manager.filter(pk__in=pks).values_list("pk", "revision", "deleted_at", company_path)
+    rows = [
+        SyncChange(
+            company_id=company_id,
+            model_key=key,
+            object_id=pk,
+            revision=int(revision or 0),
+            is_deleted=bool(deleted_at),
+        )
+        for pk, revision, deleted_at, company_id in values
+        if company_id
+    ]
+    if rows:
+        SyncChange.objects.bulk_create(rows, batch_size=1000)
+        publish_on_commit({row.company_id for row in rows})
+    return len(rows)
+
+
+# Unpublished rows given a position per publish_changes() call.
+PUBLISH_BATCH = 5000
+
+
+def publish_changes(company_id: Any, *, batch_size: int = PUBLISH_BATCH) -> int:
+    """Assign pull positions to a company's committed, unpublished log rows.
+
+    Log ids come from a sequence at insert time, so a long transaction (an
+    import chunk, a bank review chunk) can commit a lower id after a client has
+    read past it. Positions are handed out here instead, to rows that are
+    already committed, under a lock on the company row: a row that commits
+    later always gets a higher position than anything a client has seen.
+    Returns how many rows were published (== batch_size: more may remain).
+    """
+
+    pending = SyncChange.objects.filter(company_id=company_id, position__isnull=True)
+    if not pending.exists():
+        return 0
+
+    from companies.models import Company
+
+    with transaction.atomic():
+        # Serializes publishers of one company; the lock is released on commit.
+        list(Company.all_objects.select_for_update(no_key=True).filter(pk=company_id).values_list("pk", flat=True))
+        head = (
+            SyncChange.objects.filter(company_id=company_id, position__isnull=False)
+            .order_by("-position")
+            .values_list("position", flat=True)
+            .first()
+        )
+        ids = list(pending.order_by("id").values_list("id", flat=True)[:batch_size])
+        rows = [SyncChange(id=pk, position=int(head or 0) + n) for n, pk in enumerate(ids, start=1)]
+        SyncChange.objects.bulk_update(rows, ["position"], batch_size=1000)
+    return len(rows)
+
+
+def publish_all_changes(company_id: Any) -> int:
+    """Publish every pending log row of a company, one batch per transaction."""
+
+    total = 0
+    while True:
+        published = publish_changes(company_id)
+        total += published
+        if published < PUBLISH_BATCH:
+            return total
+
+
+# company_id -> pending publish token of this thread's open transaction.
+_publish_tokens = threading.local()
+
+
+def _publish_once(company_id: Any, token: dict) -> None:
+    if token["done"]:
+        return
+    token["done"] = True
+    if getattr(_publish_tokens, "by_company", {}).get(company_id) is token:
+        del _publish_tokens.by_company[company_id]
+    publish_all_changes(company_id)
+
+
+def publish_on_commit(company_ids: Iterable[Any]) -> None:
+    """Publish the companies' new log rows once the writing transaction commits.
+
+    Publishing happens on the write side so pulls stay read-only. Every call
+    registers a callback, but callbacks of one transaction share a token and
+    only the first publishes. A failed publish is logged and picked up by the
+    company's next write.
+    """
+
+    by_company = _publish_tokens.__dict__.setdefault("by_company", {})
+    for company_id in set(company_ids):
+        token = by_company.get(company_id)
+        if token is None or token["done"]:
+            token = by_company[company_id] = {"done": False}
+        transaction.on_commit(partial(_publish_once, company_id, token), robust=True)
+
+
+def latest_cursor(company_id: Any) -> int:
+    last = (
+        SyncChange.objects.filter(company_id=company_id, position__isnull=False)
+        .order_by("-position")
+        .values_list("position", flat=True)
+        .first()
+    )
+    return int(last or 0)
+
+
+@dataclass
+class ChangePage:
+    """One keyset page of the change log, resolved to entity rows."""
+
+    # model_key -> list of changed object ids (deduped, log order)
+    object_ids: "OrderedDict[str, List[Any]]" = field(default_factory=OrderedDict)
+    # (model_key, object_id) -> (revision, logged_at); used to emit tombstones for hard-deleted rows
+    logged: Dict[tuple, tuple] = field(default_factory=dict)
+    next_cursor: int = 0
+    has_more: bool = False
+    change_count: int = 0
+
+
+def read_change_page(*, company_id: Any, cursor: int, limit: int) -> ChangePage:
+    """Read up to `limit` published log rows after `cursor` (a position) for one company.
+
+    Read-only: writers publish their rows on commit (see publish_on_commit()).
+    """
+
+    qs = SyncChange.objects.filter(company_id=company_id, position__gt=int(cursor or 0))
+    rows = list(
+        qs.order_by("position").values_list("position", "model_key", "object_id", "revision", "created_at")[: limit + 1]
+    )
+
+    page = ChangePage(next_cursor=int(cursor or 0))
+    page.has_more = len(rows) > limit
+    rows = rows[:limit]
+    page.change_count = len(rows)
+
+    for seq, model_key, object_id, revision, created_at in rows:
+        page.next_cursor = int(seq)
+        if (model_key, object_id) not in page.logged:
+            page.object_ids.setdefault(model_key, []).append(object_id)
+        page.logged[(model_key, object_id)] = (int(revision or 0), created_at)
+
+    return page
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from companies.models import Company
+from sync.changelog import company_path_for, publish_all_changes, synced_model_keys
+from sync.models import SyncChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the sync change log with one row per existing synced object so cursor=0 pulls "
+        "return full history. Idempotent: objects that already have a change row are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--company-id", default=None, help="Optional Company ID (UUID) to scope backfill.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        company_id = (str(opts.get("company_id") or "").strip() or None)
+        batch_size = max(1, int(opts.get("batch_size") or 1000))
+        dry_run = bool(opts.get("dry_run"))
+
+        company_ids = list(Company.all_objects.values_list("id", flat=True).order_by("id"))
+        if company_id:
+            company_ids = [cid for cid in company_ids if str(cid) == company_id]
+
+        total = 0
+        for cid in company_ids:
+            company_total = 0
+            for model_cls, key in synced_model_keys().items():
+                company_total += self._backfill_model(
+                    model_cls, key=key, company_id=cid, batch_size=batch_size, dry_run=dry_run
+                )
+            total += company_total
+            if company_total:
+                if not dry_run:
+                    publish_all_changes(cid)
+                self.stdout.write(f"company={cid} logged={company_total}")
+
+        mode = "DRY-RUN" if dry_run else "DONE"
+        self.stdout.write(self.style.SUCCESS(f"[{mode}] change-log rows written: {total}"))
+
+    def _backfill_model(self, model_cls, *, key: str, company_id, batch_size: int, dry_run: bool) -> int:
+        company_path = company_path_for(key)
+        qs = (
+            model_cls._base_manager.filter(**{company_path: company_id})
+            .order_by("pk")
+            .values_list("pk", "revision", "deleted_at")
+        )
+
+        written = 0
+        last_pk = None
+        while True:
+            chunk_qs = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            chunk = list(chunk_qs[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1][0]
+
+            existing = set(
+                SyncChange.objects.filter(
+                    company_id=company_id,
+                    model_key=key,
+                    object_id__in=[row[0] for row in chunk],
+                ).values_list("object_id", flat=True)
+            )
+            rows = [
+                SyncChange(
+                    company_id=company_id,
+                    model_key=key,
+                    object_id=pk,
+                    revision=int(revision or 0),
+                    is_deleted=bool(deleted_at),
+                )
+                for pk, revision, deleted_at in chunk
+                if pk not in existing
+            ]
+            if rows and not dry_run:
+                with transaction.atomic():
+                    SyncChange.objects.bulk_create(rows, batch_size=batch_size)
+            written += len(rows)
+
+        return written
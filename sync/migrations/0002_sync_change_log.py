@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 19:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_company_suspension_fields'),
+        ('sync', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model_key', models.CharField(max_length=80)),
+                ('object_id', models.UUIDField()),
+                ('revision', models.BigIntegerField(default=0)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_changes', to='companies.company')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'id'], name='sync_change_company_seq_idx'), models.Index(fields=['company', 'model_key', 'object_id'], name='sync_change_object_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_positions(apps, schema_editor):
+    # Existing cursors are change ids: keep them valid by publishing old rows at their id.
+    SyncChange = apps.get_model("sync", "SyncChange")
+    SyncChange.objects.filter(position__isnull=True).update(position=F("id"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_sync_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='syncchange',
+            name='position',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['company', 'position'], name='sync_change_company_pos_idx'),
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+    ]
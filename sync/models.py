@@ -46,3 +46,41 @@ class SyncCursor(SyncModel):
         constraints = [
             models.UniqueConstraint(fields=["company", "device"], name="uniq_company_device_cursor")
         ]
+
+
+class SyncChange(models.Model):
+    """
+    Append-only change log for sync pulls.
+
+    One row is written whenever a synced SyncModel row is saved or soft-deleted.
+    `position` is the pull cursor: clients read `position > cursor` for their
+    company, which is a single indexed range scan regardless of how many synced
+    tables exist. Positions are assigned by the writer right after it commits
+    (see `sync.changelog.publish_on_commit`), so they follow commit order; the `id`
+    sequence follows insert order, and a long transaction can commit a lower id
+    after a client has already read past it.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="sync_changes")
+
+    # registry key, e.g. "crm.Client"
+    model_key = models.CharField(max_length=80)
+    object_id = models.UUIDField()
+    revision = models.BigIntegerField(default=0)
+    is_deleted = models.BooleanField(default=False)
+
+    # Per-company pull position; NULL until the committed row is published.
+    position = models.BigIntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["company", "id"], name="sync_change_company_seq_idx"),
+            models.Index(fields=["company", "position"], name="sync_change_company_pos_idx"),
+            models.Index(fields=["company", "model_key", "object_id"], name="sync_change_object_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"SyncChange({self.id}, {self.model_key}, {self.object_id})"
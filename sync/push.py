@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Type
+
+from django.db import models
+
+from core.onboarding import CREATE_LATCH_STEPS, STEP_BITS, latch_onboarding_steps
+from core.search import index_pks
+from crm.models import Client
+
+from .changelog import PARENT_COMPANY_FIELDS, record_changes, sync_key_for
+from .utils import SYNC_STAMP_FIELDS, apply_lww_change, assign_sync_fields, parse_iso_datetime, stamp_sync_write
+
+
+# Models whose save() enforces invariants (invoice locks, client/project alignment)
+# or that drive post_save side effects (journal posting, subscription bootstrap,
+# tenant cache invalidation). These always go through the per-row path so nothing
+# is silently bypassed. The batched path refreshes the remaining derived state
+# (change log, search index, onboarding latch) explicitly.
+ROW_APPLY_MODELS = {
+    "companies.Company",
+    "companies.EmployeeProfile",
+    "projects.ProjectService",
+    "documents.Document",
+    "documents.DocumentLineItem",
+    "timetracking.TimeEntry",
+    "timetracking.TimerState",
+    "expenses.Expense",
+    "payments.Payment",
+}
+
+
+def _result(obj_id: Any, *, status: str, obj: models.Model | None = None) -> Dict[str, Any]:
+    if obj is None:
+        return {"id": obj_id, "status": status}
+    return {
+        "id": obj_id,
+        "status": status,
+        "server_revision": int(getattr(obj, "revision", 0) or 0),
+        "server_updated_at": obj.updated_at.isoformat() if getattr(obj, "updated_at", None) else None,
+    }
+
+
+def supports_batched_push(model_cls: Type[models.Model]) -> bool:
+    key = sync_key_for(model_cls)
+    return bool(key) and key not in ROW_APPLY_MODELS
+
+
+def apply_changes_row_by_row(
+    *,
+    model_cls: Type[models.Model],
+    change_list: List[Dict[str, Any]],
+    company,
+    user,
+    device,
+    server_now: datetime,
+) -> List[Dict[str, Any]]:
+    """Apply pushed changes one row at a time through Model.save()."""
+
+    model_results: List[Dict[str, Any]] = []
+    for change in change_list or []:
+        obj_id = change.get("id")
+        client_updated_at = parse_iso_datetime(change.get("updated_at"))
+        deleted_at = parse_iso_datetime(change.get("deleted_at"))
+        fields = change.get("fields") or {}
+
+        obj, _created = model_cls.objects.get_or_create(id=obj_id)
+
+        # enforce company scoping
+        if hasattr(obj, "company_id"):
+            if getattr(obj, "company_id", None) and obj.company_id != company.id:
+                model_results.append(_result(obj_id, status="rejected_wrong_company"))
+                continue
+            obj.company_id = company.id
+
+        # deletes
+        if deleted_at:
+            # LWW on deletes too
+            applied = False
+            if not getattr(obj, "deleted_at", None) or (client_updated_at and client_updated_at > obj.updated_at):
+                obj.deleted_at = server_now
+                obj.updated_at = server_now
+                obj.revision = int(getattr(obj, "revision", 0) or 0) + 1
+                obj.updated_by_user = user
+                obj.updated_by_device = device.id
+                obj.save()
+                applied = True
+
+            model_results.append(_result(obj_id, status="applied" if applied else "conflict_overwritten", obj=obj))
+            continue
+
+        # normal update
+        _obj, applied = apply_lww_change(
+            obj=obj,
+            fields=fields,
+            client_updated_at=client_updated_at,
+            server_now=server_now,
+            updated_by_user_id=user.id,
+            updated_by_device=str(device.id),
+        )
+        model_results.append(_result(obj_id, status="applied" if applied else "conflict_overwritten", obj=obj))
+
+    return model_results
+
+
+def _parent_company_ids(model_cls: Type[models.Model], parent_field: str, parent_ids: set) -> Dict[Any, Any]:
+    if not parent_ids:
+        return {}
+    parent_model = model_cls._meta.get_field(parent_field).related_model
+    return dict(parent_model._base_manager.filter(pk__in=parent_ids).values_list("pk", "company_id"))
+
+
+def apply_changes_batched(
+    *,
+    model_cls: Type[models.Model],
+    change_list: List[Dict[str, Any]],
+    company,
+    user,
+    device,
+    server_now: datetime,
+) -> List[Dict[str, Any]]:
+    """Set-based push for one model.
+
+    One locked prefetch (`id__in`) loads every existing row; last-writer-wins is
+    resolved in memory; writes go out as one bulk_create plus one bulk_update.
+    Result statuses match apply_changes_row_by_row. Must run inside a transaction.
+    """
+
+    key = sync_key_for(model_cls)
+    parent_field = PARENT_COMPANY_FIELDS.get(key or "")
+    has_company = any(f.name == "company" for f in model_cls._meta.fields)
+
+    changes = [c for c in (change_list or []) if c.get("id")]
+    ids = {str(c["id"]) for c in changes}
+    existing: Dict[str, models.Model] = {
+        str(obj.pk): obj for obj in model_cls._base_manager.select_for_update().filter(pk__in=ids)
+    }
+
+    # Child rows carry no company column: validate the parent's tenant in one query.
+    parent_company: Dict[Any, Any] = {}
+    if parent_field:
+        attname = f"{parent_field}_id"
+        parent_ids = {getattr(obj, attname) for obj in existing.values() if getattr(obj, attname, None)}
+        for c in changes:
+            pid = (c.get("fields") or {}).get(parent_field)
+            if pid:
+                parent_ids.add(pid)
+        parent_company = {str(k): v for k, v in _parent_company_ids(model_cls, parent_field, parent_ids).items()}
+
+    def _owned(obj: models.Model) -> bool:
+        if has_company:
+            return not obj.company_id or obj.company_id == company.id
+        if parent_field:
+            pid = getattr(obj, f"{parent_field}_id", None)
+            return pid is None or parent_company.get(str(pid)) == company.id
+        return True
+
+    to_create: Dict[str, models.Model] = {}
+    to_update: Dict[str, models.Model] = {}
+    update_fields: set = set(SYNC_STAMP_FIELDS)
+    results: List[Dict[str, Any]] = []
+
+    for change in changes:
+        obj_id = change.get("id")
+        sid = str(obj_id)
+        client_updated_at = parse_iso_datetime(change.get("updated_at"))
+        deleted_at = parse_iso_datetime(change.get("deleted_at"))
+        fields = change.get("fields") or {}
+
+        obj = existing.get(sid) or to_create.get(sid)
+        is_new = obj is None
+
+        if obj is not None and not _owned(obj):
+            results.append(_result(obj_id, status="rejected_wrong_company"))
+            continue
+
+        if deleted_at:
+            if is_new:
+                # Like the row path: store a tombstone so other devices pull the delete.
+                obj = model_cls(id=obj_id)
+                if has_company:
+                    obj.company_id = company.id
+                elif parent_field:
+                    assign_sync_fields(obj, {parent_field: fields.get(parent_field)})
+                    if getattr(obj, f"{parent_field}_id", None) is None:
+                        # No parent to hang the tombstone on; the delete is already true here.
+                        results.append({"id": obj_id, "status": "applied", "server_revision": 0, "server_updated_at": None})
+                        continue
+                    if not _owned(obj):
+                        results.append(_result(obj_id, status="rejected_wrong_company"))
+                        continue
+                obj.deleted_at = server_now
+                obj.created_at = server_now
+                stamp_sync_write(obj, server_now=server_now, updated_by_user_id=user.id, updated_by_device=str(device.id))
+                to_create[sid] = obj
+                results.append(_result(obj_id, status="applied", obj=obj))
+                continue
+            applied = False
+            if not getattr(obj, "deleted_at", None) or (client_updated_at and client_updated_at > obj.updated_at):
+                obj.deleted_at = server_now
+                stamp_sync_write(obj, server_now=server_now, updated_by_user_id=user.id, updated_by_device=str(device.id))
+                update_fields.add("deleted_at")
+                if sid not in to_create:
+                    to_update[sid] = obj
+                applied = True
+            results.append(_result(obj_id, status="applied" if applied else "conflict_overwritten", obj=obj))
+            continue
+
+        if is_new:
+            obj = model_cls(id=obj_id)
+        elif client_updated_at and obj.updated_at and client_updated_at <= obj.updated_at:
+            results.append(_result(obj_id, status="conflict_overwritten", obj=obj))
+            continue
+
+        assigned = assign_sync_fields(obj, fields)
+        if has_company:
+            obj.company_id = company.id
+            assigned.add("company")
+        if not _owned(obj):
+            results.append(_result(obj_id, status="rejected_wrong_company"))
+            continue
+
+        stamp_sync_write(obj, server_now=server_now, updated_by_user_id=user.id, updated_by_device=str(device.id))
+        if is_new:
+            obj.created_at = server_now
+            to_create[sid] = obj
+        elif sid not in to_create:
+            update_fields |= assigned
+            to_update[sid] = obj
+        results.append(_result(obj_id, status="applied", obj=obj))
+
+    if to_create:
+        model_cls._base_manager.bulk_create(list(to_create.values()), batch_size=500)
+    if to_update:
+        model_cls._base_manager.bulk_update(list(to_update.values()), sorted(update_fields), batch_size=500)
+    written = [*to_create.values(), *to_update.values()]
+    record_changes(written, company_id=company.id)
+
+    # Bulk writes skip post_save: keep the global search index in step (a phone
+    # change re-indexes its client) and latch the onboarding step a created row marks.
+    if key == "crm.ClientPhone":
+        index_pks(Client, {obj.client_id for obj in written if obj.client_id})
+    else:
+        index_pks(model_cls, [obj.pk for obj in written])
+    step = CREATE_LATCH_STEPS.get(key or "")
+    if step and any(obj.deleted_at is None for obj in to_create.values()):
+        latch_onboarding_steps(company.id, STEP_BITS[step])
+
+    return results
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from core.signals import sync_rows_soft_deleted
+
+from .changelog import record_change, record_changes_for_pks, sync_key_for
+
+
+@receiver(post_save)
+def _log_synced_save(sender, instance, raw: bool = False, **kwargs):
+    # Fixture loads (raw) are not client-visible writes.
+    if raw or not sync_key_for(sender):
+        return
+    record_change(instance)
+
+
+@receiver(sync_rows_soft_deleted)
+def _log_synced_bulk_soft_delete(sender, pks, **kwargs):
+    if not sync_key_for(sender):
+        return
+    record_changes_for_pks(sender, pks)
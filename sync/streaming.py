@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import zlib
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .changelog import read_change_page
+from .registry import sync_model_registry
+from .utils import sync_field_plan, sync_values_to_dict
+
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Rows fetched per `pk__in` query while streaming one model's changes.
+STREAM_FETCH_CHUNK = 1000
+
+# Lines buffered between gzip flushes: small enough that the first bytes
+# leave immediately, large enough to keep the compression ratio useful.
+GZIP_FLUSH_EVERY = 500
+
+_encoder = JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+
+def _line(obj: dict) -> bytes:
+    return (_encoder.encode(obj) + "\n").encode("utf-8")
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Lets DRF negotiate `Accept: application/x-ndjson` / `?format=ndjson`.
+
+    Streamed pulls bypass rendering entirely; this only renders regular
+    Response payloads (errors, legacy pulls) as a single NDJSON line.
+    """
+
+    media_type = NDJSON_CONTENT_TYPE
+    format = "ndjson"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return _line(data)
+
+
+def wants_ndjson(request) -> bool:
+    renderer = getattr(request, "accepted_renderer", None)
+    return getattr(renderer, "format", None) == NDJSONRenderer.format
+
+
+def accepts_gzip(request) -> bool:
+    return "gzip" in str(request.META.get("HTTP_ACCEPT_ENCODING") or "").lower()
+
+
+def iter_pull_ndjson(*, company_id: Any, cursor: int, limit: int, server_now: datetime) -> Iterator[bytes]:
+    """Yield one change-log pull page as newline-delimited JSON.
+
+    Line types:
+      {"type": "meta", "server_time", "cursor", "next_cursor", "has_more", "changes"}
+      {"type": "entity", "model": "<key>", "id", "revision", "updated_at", "deleted_at", "fields"}
+      {"type": "end", "next_cursor", "has_more", "entities"}
+
+    Rows are read with `.values_list()` in fixed-size chunks, so memory use is
+    bounded by STREAM_FETCH_CHUNK regardless of tenant size.
+    """
+
+    page = read_change_page(company_id=company_id, cursor=cursor, limit=limit)
+    registry = sync_model_registry()
+
+    yield _line(
+        {
+            "type": "meta",
+            "server_time": server_now.isoformat(),
+            "cursor": str(cursor),
+            "next_cursor": str(page.next_cursor),
+            "has_more": page.has_more,
+            "changes": page.change_count,
+        }
+    )
+
+    emitted = 0
+    for key, object_ids in page.object_ids.items():
+        model_cls = registry.get(key)
+        if not model_cls:
+            continue
+        plan = sync_field_plan(model_cls)
+
+        for start in range(0, len(object_ids), STREAM_FETCH_CHUNK):
+            chunk = object_ids[start : start + STREAM_FETCH_CHUNK]
+            found: set = set()
+            rows = model_cls._base_manager.filter(pk__in=chunk).values_list(*plan.columns)
+            for values in rows.iterator(chunk_size=STREAM_FETCH_CHUNK):
+                found.add(values[0])
+                yield _line({"type": "entity", "model": key, **sync_values_to_dict(plan, values)})
+                emitted += 1
+
+            # Rows hard-deleted after they were logged: emit tombstones.
+            for object_id in chunk:
+                if object_id in found:
+                    continue
+                revision, logged_at = page.logged[(key, object_id)]
+                yield _line(
+                    {
+                        "type": "entity",
+                        "model": key,
+                        "id": str(object_id),
+                        "revision": revision,
+                        "updated_at": logged_at.isoformat(),
+                        "deleted_at": logged_at.isoformat(),
+                        "fields": {},
+                    }
+                )
+                emitted += 1
+
+    yield _line({"type": "end", "next_cursor": str(page.next_cursor), "has_more": page.has_more, "entities": emitted})
+
+
+def gzip_stream(lines: Iterable[bytes], *, flush_every: int = GZIP_FLUSH_EVERY) -> Iterator[bytes]:
+    """Gzip-compress an iterable of byte chunks incrementally."""
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    first = True
+    for line in lines:
+        out = compressor.compress(line)
+        pending += 1
+        # Flush the first line right away so the client sees the header immediately.
+        if first or pending >= flush_every:
+            first = False
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
@@ -1,3 +1,252 @@
+from __future__ import annotations
+
+import gzip
+import json
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Company, EmployeeProfile, EmployeeRole
+from core.onboarding import STEP_BITS
+from core.search import search
+from crm.models import Client, ClientPhone
+from sync.changelog import publish_changes
+from sync.models import SyncChange, SyncDevice
+
+
+class SyncChangeLogPullTests(TestCase):
+    """Pulls read the append-only change log with a keyset cursor."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            email="sync@example.com",
+            username="syncuser",
+            password="pass12345",
+        )
+        if hasattr(self.user, "email_verified"):
+            self.user.email_verified = True
+            self.user.save(update_fields=["email_verified"])
+        self.company = Company.objects.create(name="Sync Co")
+        self.other = Company.objects.create(name="Other Co")
+        EmployeeProfile.objects.create(
+            company=self.company,
+            user=self.user,
+            username_public="syncuser",
+            role=EmployeeRole.OWNER,
+        )
+        self.client.force_login(self.user)
+
+    def _pull(self, cursor, limit=5000):
+        url = reverse("sync:pull")
+        resp = self.client.get(url, {"company_id": str(self.company.id), "cursor": cursor, "limit": limit})
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_save_and_soft_delete_are_logged_per_company(self):
+        c = Client.objects.create(company=self.company, first_name="Ada")
+        ClientPhone.objects.create(client=c, number="555-0100")
+        Client.objects.create(company=self.other, first_name="Not mine")
+
+        keys = list(SyncChange.objects.filter(company=self.company).values_list("model_key", flat=True))
+        self.assertIn("crm.Client", keys)
+        self.assertIn("crm.ClientPhone", keys)
+        self.assertEqual(SyncChange.objects.filter(company=self.other, model_key="crm.Client").count(), 1)
+
+        Client.objects.filter(pk=c.pk).delete()
+        last = SyncChange.objects.filter(company=self.company, object_id=c.pk).order_by("-id").first()
+        self.assertTrue(last.is_deleted)
+
+    def test_cursor_pages_until_has_more_is_false(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                Client.objects.create(company=self.company, first_name=f"C{i}")
+
+        seen: set[str] = set()
+        cursor = "0"
+        pages = 0
+        while True:
+            data = self._pull(cursor, limit=2)
+            pages += 1
+            for row in data["entities"].get("crm.Client", []):
+                seen.add(row["id"])
+            cursor = data["next_cursor"]
+            if not data["has_more"]:
+                break
+            self.assertLess(pages, 20)
+
+        self.assertEqual(len(seen), 5)
+        self.assertGreater(pages, 1)
+        # Nothing new after the final cursor.
+        self.assertEqual(self._pull(cursor)["entities"], {})
+
+    def test_lower_id_committed_after_a_pull_is_not_skipped(self):
+        placeholder_id = SyncChange.objects.create(company=self.company, model_key="crm.Client", object_id=uuid.uuid4()).id
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(company=self.company, first_name="Early")
+        SyncChange.objects.filter(id=placeholder_id).delete()
+        cursor = self._pull("0")["next_cursor"]
+
+        # A slow transaction commits a change-log row whose id is below the cursor's rows.
+        late = Client(company=self.company, first_name="Late")
+        Client.objects.bulk_create([late])
+        SyncChange.objects.create(id=placeholder_id, company=self.company, model_key="crm.Client", object_id=late.id)
+
+        # Pulls are read-only: the row shows up once its writer publishes it on commit.
+        self.assertEqual(self._pull(cursor)["entities"], {})
+        self.assertIsNone(SyncChange.objects.get(id=placeholder_id).position)
+        publish_changes(self.company.id)
+
+        ids = [row["id"] for row in self._pull(cursor)["entities"].get("crm.Client", [])]
+        self.assertEqual(ids, [str(late.id)])
+
+    def test_legacy_since_pull_resumes_after_the_last_returned_row(self):
+        base = timezone.now() - timedelta(hours=1)
+        for i in range(3):
+            c = Client.objects.create(company=self.company, first_name=f"L{i}")
+            Client.all_objects.filter(pk=c.pk).update(updated_at=base + timedelta(minutes=i))
+
+        url = reverse("sync:pull")
+        since = (base - timedelta(minutes=1)).isoformat()
+        seen: set[str] = set()
+        for _ in range(5):
+            data = self.client.get(url, {"company_id": str(self.company.id), "since": since, "limit": 2}).json()
+            seen.update(row["id"] for row in data["entities"].get("crm.Client", []))
+            since = data["next_since"]
+            if not data["has_more"]:
+                break
+        self.assertEqual(len(seen), 3)
+
+    def test_ndjson_stream_matches_json_page(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            c = Client.objects.create(company=self.company, first_name="Grace")
+        json_rows = self._pull("0")["entities"]["crm.Client"]
+
+        url = reverse("sync:pull")
+        resp = self.client.get(
+            url,
+            {"company_id": str(self.company.id), "cursor": "0"},
+            HTTP_ACCEPT="application/x-ndjson",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+        body = gzip.decompress(b"".join(resp.streaming_content)).decode("utf-8")
+        lines = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual(lines[0]["type"], "meta")
+        self.assertEqual(lines[-1]["type"], "end")
+        self.assertFalse(lines[-1]["has_more"])
+        streamed = [ln for ln in lines if ln["type"] == "entity" and ln["model"] == "crm.Client"]
+        self.assertEqual(len(streamed), 1)
+        row = {k: v for k, v in streamed[0].items() if k not in {"type", "model"}}
+        self.assertEqual(row, json_rows[0])
+        self.assertEqual(row["id"], str(c.id))
+
+
+class SyncBatchedPushTests(TestCase):
+    """Batched push keeps the per-row LWW statuses of the row-by-row path."""
+
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(
+            email="push@example.com",
+            username="pushuser",
+            password="pass12345",
+        )
+        if hasattr(self.user, "email_verified"):
+            self.user.email_verified = True
+            self.user.save(update_fields=["email_verified"])
+        self.company = Company.objects.create(name="Push Co")
+        self.other = Company.objects.create(name="Other Push Co")
+        EmployeeProfile.objects.create(
+            company=self.company,
+            user=self.user,
+            username_public="pushuser",
+            role=EmployeeRole.OWNER,
+        )
+        self.device = SyncDevice.objects.create(company=self.company, user=self.user, platform="windows")
+        self.client.force_login(self.user)
+
+    def _push(self, changes):
+        url = reverse("sync:push")
+        payload = {"company_id": str(self.company.id), "device_id": str(self.device.id), "changes": changes}
+        resp = self.client.post(url, payload, content_type="application/json")
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()["results"]
+
+    def test_statuses_for_create_update_conflict_delete_and_foreign_rows(self):
+        existing = Client.objects.create(company=self.company, first_name="Old")
+        stale = Client.objects.create(company=self.company, first_name="Keep")
+        doomed = Client.objects.create(company=self.company, first_name="Gone")
+        foreign = Client.objects.create(company=self.other, first_name="Theirs")
+        new_id = str(uuid.uuid4())
+        future = (timezone.now() + timedelta(minutes=5)).isoformat()
+        past = (timezone.now() - timedelta(days=1)).isoformat()
+
+        results = self._push(
+            {
+                "crm.Client": [
+                    {"id": new_id, "updated_at": past, "fields": {"first_name": "New"}},
+                    {"id": str(existing.id), "updated_at": future, "fields": {"first_name": "Updated"}},
+                    {"id": str(stale.id), "updated_at": past, "fields": {"first_name": "Lost"}},
+                    {"id": str(doomed.id), "updated_at": future, "deleted_at": future, "fields": {}},
+                    {"id": str(foreign.id), "updated_at": future, "fields": {"first_name": "Hijack"}},
+                ],
+                "crm.ClientPhone": [
+                    {"id": str(uuid.uuid4()), "fields": {"client": str(foreign.id), "number": "555"}},
+                ],
+            }
+        )
+
+        statuses = {r["id"]: r["status"] for r in results["crm.Client"]}
+        self.assertEqual(statuses[new_id], "applied")
+        self.assertEqual(statuses[str(existing.id)], "applied")
+        self.assertEqual(statuses[str(stale.id)], "conflict_overwritten")
+        self.assertEqual(statuses[str(doomed.id)], "applied")
+        self.assertEqual(statuses[str(foreign.id)], "rejected_wrong_company")
+        self.assertEqual(results["crm.ClientPhone"][0]["status"], "rejected_wrong_company")
+
+        self.assertEqual(Client.objects.get(id=new_id).company_id, self.company.id)
+        existing.refresh_from_db()
+        stale.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(existing.first_name, "Updated")
+        self.assertEqual(stale.first_name, "Keep")
+        self.assertEqual(foreign.first_name, "Theirs")
+        self.assertTrue(Client.all_objects.get(id=doomed.id).deleted_at)
+        self.assertTrue(SyncChange.objects.filter(company=self.company, object_id=new_id).exists())
+
+    def test_batched_push_updates_the_search_index(self):
+        client_id = str(uuid.uuid4())
+        self._push({"crm.Client": [{"id": client_id, "fields": {"company_name": "Pushed Plumbing"}}]})
+        self.assertEqual([e.object_id for e in search(self.company, "pushed")["client"]], [client_id])
+
+        self._push({"crm.ClientPhone": [{"id": str(uuid.uuid4()), "fields": {"client": client_id, "number": "555-867-5309"}}]})
+        self.assertEqual([e.object_id for e in search(self.company, "5558675309")["client"]], [client_id])
+
+    def test_batched_push_tombstones_unknown_deletes_and_latches_onboarding(self):
+        Company.objects.filter(pk=self.company.pk).update(onboarding_flags=0)
+        gone_id, new_id = str(uuid.uuid4()), str(uuid.uuid4())
+        now = timezone.now().isoformat()
+
+        results = self._push(
+            {
+                "crm.Client": [
+                    {"id": gone_id, "updated_at": now, "deleted_at": now, "fields": {}},
+                    {"id": new_id, "updated_at": now, "fields": {"first_name": "Fresh"}},
+                ]
+            }
+        )["crm.Client"]
+        self.assertEqual([(r["status"], r["server_revision"]) for r in results], [("applied", 1), ("applied", 1)])
 
-# Create your tests here.
+        tombstone = Client.all_objects.get(id=gone_id)
+        self.assertEqual((tombstone.company_id, tombstone.updated_by_device), (self.company.id, self.device.id))
+        self.assertIsNotNone(tombstone.deleted_at)
+        self.assertTrue(SyncChange.objects.filter(company=self.company, object_id=gone_id, is_deleted=True).exists())
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.onboarding_flags & STEP_BITS["clients"])
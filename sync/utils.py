@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Iterable, Tuple
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Set, Tuple, Type
 
 from django.db import models, transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 
+# Server-owned columns: never written from client payloads.
+SYNC_PROTECTED_FIELDS = {"id", "created_at", "updated_at", "revision", "deleted_at", "updated_by_user", "updated_by_device"}
+
+# Columns stamped on every accepted sync write.
+SYNC_STAMP_FIELDS = ["revision", "updated_at", "updated_by_user", "updated_by_device"]
+
+
 def parse_iso_datetime(value: str | None) -> datetime | None:
     if not value:
         return None
@@ -19,31 +28,77 @@ def parse_iso_datetime(value: str | None) -> datetime | None:
     return dt
 
 
-def model_to_sync_dict(obj: models.Model) -> Dict[str, Any]:
-    """Serialize a SyncModel instance into a JSON-friendly dict."""
+@dataclass(frozen=True)
+class SyncFieldPlan:
+    """Precompiled serialization plan for one synced model.
 
-    data: Dict[str, Any] = {
-        "id": str(obj.pk),
-        "revision": int(getattr(obj, "revision", 0) or 0),
-        "updated_at": getattr(obj, "updated_at", None).isoformat() if getattr(obj, "updated_at", None) else None,
-        "deleted_at": getattr(obj, "deleted_at", None).isoformat() if getattr(obj, "deleted_at", None) else None,
-        "fields": {},
-    }
+    `columns` is usable directly with `.values_list(*columns)`: the first four
+    entries are pk/revision/updated_at/deleted_at, followed by one column per
+    synced field (attname, so FKs read the raw id without a join).
+    """
+
+    columns: Tuple[str, ...]
+    names: Tuple[str, ...]
+    kinds: Tuple[str, ...]
 
-    for field in obj._meta.fields:
-        name = field.name
-        if name in {"id", "created_at", "updated_at", "revision", "deleted_at", "updated_by_user", "updated_by_device"}:
+
+_ENVELOPE_COLUMNS = ("pk", "revision", "updated_at", "deleted_at")
+
+
+@lru_cache(maxsize=None)
+def sync_field_plan(model_cls: Type[models.Model]) -> SyncFieldPlan:
+    columns: List[str] = list(_ENVELOPE_COLUMNS)
+    names: List[str] = []
+    kinds: List[str] = []
+    for field in model_cls._meta.fields:
+        if field.name in SYNC_PROTECTED_FIELDS:
             continue
         if isinstance(field, models.ForeignKey):
-            data["fields"][name] = str(getattr(obj, f"{name}_id") or "") or None
+            kind = "fk"
+        elif isinstance(field, models.FileField):
+            kind = "file"
         else:
-            value = getattr(obj, name)
-            if isinstance(value, datetime):
-                data["fields"][name] = value.isoformat()
-            else:
-                data["fields"][name] = value
+            kind = "value"
+        columns.append(field.attname)
+        names.append(field.name)
+        kinds.append(kind)
+    return SyncFieldPlan(columns=tuple(columns), names=tuple(names), kinds=tuple(kinds))
+
+
+def _encode_sync_value(kind: str, value: Any) -> Any:
+    if kind == "fk":
+        return str(value or "") or None
+    if kind == "file":
+        # Storage path only; file contents are not synced.
+        return getattr(value, "name", value) or None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def sync_values_to_dict(plan: SyncFieldPlan, values: Iterable[Any]) -> Dict[str, Any]:
+    """Build the sync payload from one `.values_list(*plan.columns)` row."""
+
+    values = tuple(values)
+    pk, revision, updated_at, deleted_at = values[:4]
+    return {
+        "id": str(pk),
+        "revision": int(revision or 0),
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "deleted_at": deleted_at.isoformat() if deleted_at else None,
+        "fields": {
+            name: _encode_sync_value(kind, value)
+            for name, kind, value in zip(plan.names, plan.kinds, values[4:])
+        },
+    }
+
 
-    return data
+def model_to_sync_dict(obj: models.Model) -> Dict[str, Any]:
+    """Serialize a SyncModel instance into a JSON-friendly dict."""
+
+    plan = sync_field_plan(type(obj))
+    values = [obj.pk] + [getattr(obj, column, None) for column in plan.columns[1:]]
+    return sync_values_to_dict(plan, values)
 
 
 def _coerce_field_value(field: models.Field, value: Any) -> Any:
@@ -71,39 +126,35 @@ def _coerce_field_value(field: models.Field, value: Any) -> Any:
     return value
 
 
-@transaction.atomic
-def apply_lww_change(
-    *,
-    obj: models.Model,
-    fields: Dict[str, Any],
-    client_updated_at: datetime | None,
-    server_now: datetime,
-    updated_by_user_id: Any | None,
-    updated_by_device: str | None,
-) -> Tuple[models.Model, bool]:
-    """Apply change if it wins LWW.
+def assign_sync_fields(obj: models.Model, fields: Dict[str, Any]) -> Set[str]:
+    """Copy client-supplied field values onto obj (in memory).
 
-    Returns: (obj, applied)
+    Returns the names of the model fields that were assigned.
     """
 
-    server_updated_at = getattr(obj, "updated_at", None)
-    if client_updated_at and server_updated_at and client_updated_at <= server_updated_at:
-        return obj, False
-
-    # apply
     field_map = {f.name: f for f in obj._meta.fields}
+    assigned: Set[str] = set()
     for name, value in fields.items():
-        if name not in field_map:
+        if name not in field_map or name in SYNC_PROTECTED_FIELDS:
             continue
         field = field_map[name]
-        if name in {"id", "created_at", "updated_at", "revision", "deleted_at", "updated_by_user", "updated_by_device"}:
-            continue
         if isinstance(field, models.ForeignKey):
             setattr(obj, f"{name}_id", value or None)
         else:
             setattr(obj, name, _coerce_field_value(field, value))
+        assigned.add(name)
+    return assigned
+
+
+def stamp_sync_write(
+    obj: models.Model,
+    *,
+    server_now: datetime,
+    updated_by_user_id: Any | None,
+    updated_by_device: str | None,
+) -> None:
+    """Bump revision and stamp server-owned provenance for an accepted write."""
 
-    # bump revision, stamp updated_at
     if hasattr(obj, "revision"):
         obj.revision = int(getattr(obj, "revision", 0) or 0) + 1
     if hasattr(obj, "updated_at"):
@@ -113,5 +164,33 @@ def apply_lww_change(
     if hasattr(obj, "updated_by_device"):
         obj.updated_by_device = updated_by_device
 
+
+@transaction.atomic
+def apply_lww_change(
+    *,
+    obj: models.Model,
+    fields: Dict[str, Any],
+    client_updated_at: datetime | None,
+    server_now: datetime,
+    updated_by_user_id: Any | None,
+    updated_by_device: str | None,
+) -> Tuple[models.Model, bool]:
+    """Apply change if it wins LWW.
+
+    Returns: (obj, applied)
+    """
+
+    server_updated_at = getattr(obj, "updated_at", None)
+    if client_updated_at and server_updated_at and client_updated_at <= server_updated_at:
+        return obj, False
+
+    assign_sync_fields(obj, fields)
+    stamp_sync_write(
+        obj,
+        server_now=server_now,
+        updated_by_user_id=updated_by_user_id,
+        updated_by_device=updated_by_device,
+    )
+
     obj.save()
     return obj, True
\ No newline at end of file
@@ -1,20 +1,26 @@
 from __future__ import annotations
 
+from datetime import timedelta
 from typing import Any, Dict, List
 
 from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db.models import Q
 
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework.views import APIView
 
 from billing.services import build_subscription_summary
 from companies.models import Company
+from .changelog import latest_cursor, read_change_page
 from .models import SyncDevice, SyncCursor, DevicePlatform
 from .registry import sync_model_registry
-from .utils import model_to_sync_dict, parse_iso_datetime, apply_lww_change
+from .streaming import NDJSON_CONTENT_TYPE, NDJSONRenderer, accepts_gzip, gzip_stream, iter_pull_ndjson, wants_ndjson
+from .push import apply_changes_batched, apply_changes_row_by_row, supports_batched_push
+from .utils import model_to_sync_dict, parse_iso_datetime
 
 
 class DeviceRegisterAPI(APIView):
@@ -102,21 +108,63 @@ class LicenseCheckAPI(APIView):
 
 class SyncPullAPI(APIView):
     permission_classes = [IsAuthenticated]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    max_limit = 5000
+    # Streamed pages hold only change ids in memory, so they can be much larger.
+    ndjson_max_limit = 50000
 
     def get(self, request):
+        """Incremental pull.
+
+        Preferred (change log): ?company_id=...&cursor=<int>&limit=<n>
+          -> {"cursor": "<int>", "next_cursor": "<int>", "has_more": bool, "entities": {...}}
+          Clients loop while has_more is true, passing next_cursor back as cursor.
+          cursor=0 returns the full history (initial sync).
+          With ?format=ndjson (or Accept: application/x-ndjson) the page is streamed
+          as newline-delimited JSON, gzip-compressed when Accept-Encoding allows.
+
+        Legacy (timestamp): ?company_id=...&since=<iso>
+          Scans every synced table. Kept for older desktop builds; the response
+          includes next_cursor so they can switch to the change log.
+        """
         company_id = request.query_params.get("company_id")
         since_raw = request.query_params.get("since")
-        limit = int(request.query_params.get("limit") or 5000)
+        cursor_raw = request.query_params.get("cursor")
+        stream = cursor_raw is not None and wants_ndjson(request)
+        max_limit = self.ndjson_max_limit if stream else self.max_limit
+        try:
+            limit = int(request.query_params.get("limit") or max_limit)
+        except (TypeError, ValueError):
+            limit = max_limit
+        limit = max(1, min(limit, max_limit))
 
         company = Company.objects.get(id=company_id)
         if not company.employees.filter(user=request.user, deleted_at__isnull=True).exists():
             return Response({"detail": "Not a member of this company."}, status=403)
 
-        since = parse_iso_datetime(since_raw) if since_raw else None
         server_now = timezone.now()
 
+        if cursor_raw is not None:
+            try:
+                cursor = max(0, int(cursor_raw))
+            except (TypeError, ValueError):
+                return Response({"detail": "cursor must be an integer."}, status=400)
+            if stream:
+                return self._pull_changelog_stream(
+                    request, company=company, cursor=cursor, limit=limit, server_now=server_now
+                )
+            return self._pull_changelog(company=company, cursor=cursor, limit=limit, server_now=server_now)
+
+        since = parse_iso_datetime(since_raw) if since_raw else None
+        # Read the cursor before scanning so nothing written during the scan is skipped.
+        next_cursor = latest_cursor(company.id)
+
         registry = sync_model_registry()
         entities: Dict[str, List[Dict[str, Any]]] = {}
+        has_more = False
+        # Oldest updated_at among the last rows of truncated tables: the next page resumes there.
+        boundary = None
 
         for key, model_cls in registry.items():
             mgr = getattr(model_cls, "all_objects", model_cls.objects)
@@ -127,15 +175,85 @@ class SyncPullAPI(APIView):
             if since:
                 qs = qs.filter(Q(updated_at__gt=since) | Q(deleted_at__gt=since))
 
-            qs = qs.order_by("updated_at")[:limit]
-            items = [model_to_sync_dict(obj) for obj in qs]
+            rows = list(qs.order_by("updated_at")[: limit + 1])
+            if len(rows) > limit:
+                has_more = True
+                rows = rows[:limit]
+                last = rows[-1].updated_at
+                boundary = last if boundary is None else min(boundary, last)
+            items = [model_to_sync_dict(obj) for obj in rows]
+            if items:
+                entities[key] = items
+
+        next_since = server_now
+        if has_more and boundary is not None:
+            # Step back 1µs so rows sharing the boundary timestamp are re-sent rather than
+            # skipped (pushes apply by revision, so repeats are harmless), unless that
+            # would not move past `since`.
+            next_since = boundary - timedelta(microseconds=1)
+            if since and next_since <= since:
+                next_since = boundary
+
+        return Response(
+            {
+                "server_time": server_now.isoformat(),
+                "next_since": next_since.isoformat(),
+                "next_cursor": str(next_cursor),
+                "has_more": has_more,
+                "entities": entities,
+            }
+        )
+
+    def _pull_changelog_stream(self, request, *, company: Company, cursor: int, limit: int, server_now):
+        lines = iter_pull_ndjson(company_id=company.id, cursor=cursor, limit=limit, server_now=server_now)
+        gzip = accepts_gzip(request)
+        response = StreamingHttpResponse(gzip_stream(lines) if gzip else lines, content_type=NDJSON_CONTENT_TYPE)
+        if gzip:
+            response["Content-Encoding"] = "gzip"
+        response["Vary"] = "Accept, Accept-Encoding"
+        response["Cache-Control"] = "no-store"
+        # Ask reverse proxies not to buffer the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    def _pull_changelog(self, *, company: Company, cursor: int, limit: int, server_now) -> Response:
+        page = read_change_page(company_id=company.id, cursor=cursor, limit=limit)
+        registry = sync_model_registry()
+        entities: Dict[str, List[Dict[str, Any]]] = {}
+
+        for key, object_ids in page.object_ids.items():
+            model_cls = registry.get(key)
+            if not model_cls:
+                continue
+            mgr = getattr(model_cls, "all_objects", model_cls.objects)
+            found = {obj.pk: obj for obj in mgr.filter(pk__in=object_ids)}
+
+            items: List[Dict[str, Any]] = []
+            for object_id in object_ids:
+                obj = found.get(object_id)
+                if obj is not None:
+                    items.append(model_to_sync_dict(obj))
+                    continue
+                # Row was hard-deleted after it was logged: emit a tombstone.
+                revision, logged_at = page.logged[(key, object_id)]
+                items.append(
+                    {
+                        "id": str(object_id),
+                        "revision": revision,
+                        "updated_at": logged_at.isoformat(),
+                        "deleted_at": logged_at.isoformat(),
+                        "fields": {},
+                    }
+                )
             if items:
                 entities[key] = items
 
         return Response(
             {
                 "server_time": server_now.isoformat(),
-                "next_since": server_now.isoformat(),
+                "cursor": str(cursor),
+                "next_cursor": str(page.next_cursor),
+                "has_more": page.has_more,
                 "entities": entities,
             }
         )
@@ -161,6 +279,8 @@ class SyncPushAPI(APIView):
 
         server_now = timezone.now()
         registry = sync_model_registry()
+        # "row" forces Model.save() for every change (debugging / older behavior).
+        row_mode = str(payload.get("mode") or "").lower() == "row"
 
         results: Dict[str, List[Dict[str, Any]]] = {}
 
@@ -169,64 +289,18 @@ class SyncPushAPI(APIView):
             if not model_cls:
                 continue
 
-            model_results: List[Dict[str, Any]] = []
-            for change in change_list or []:
-                obj_id = change.get("id")
-                client_updated_at = parse_iso_datetime(change.get("updated_at"))
-                deleted_at = parse_iso_datetime(change.get("deleted_at"))
-                fields = change.get("fields") or {}
-
-                obj, _created = model_cls.objects.get_or_create(id=obj_id)
-
-                # enforce company scoping
-                if hasattr(obj, "company_id"):
-                    if getattr(obj, "company_id", None) and obj.company_id != company.id:
-                        model_results.append({"id": obj_id, "status": "rejected_wrong_company"})
-                        continue
-                    obj.company_id = company.id
-
-                # deletes
-                if deleted_at:
-                    # LWW on deletes too
-                    applied = False
-                    if not getattr(obj, "deleted_at", None) or (client_updated_at and client_updated_at > obj.updated_at):
-                        obj.deleted_at = server_now
-                        obj.updated_at = server_now
-                        obj.revision = int(getattr(obj, "revision", 0) or 0) + 1
-                        obj.updated_by_user = request.user
-                        obj.updated_by_device = device.id
-                        obj.save()
-                        applied = True
-
-                    model_results.append(
-                        {
-                            "id": obj_id,
-                            "status": "applied" if applied else "conflict_overwritten",
-                            "server_revision": int(obj.revision or 0),
-                            "server_updated_at": obj.updated_at.isoformat() if obj.updated_at else None,
-                        }
-                    )
-                    continue
-
-                # normal update
-                _obj, applied = apply_lww_change(
-                    obj=obj,
-                    fields=fields,
-                    client_updated_at=client_updated_at,
-                    server_now=server_now,
-                    updated_by_user_id=request.user.id,
-                    updated_by_device=str(device.id),
-                )
-
-                model_results.append(
-                    {
-                        "id": obj_id,
-                        "status": "applied" if applied else "conflict_overwritten",
-                        "server_revision": int(obj.revision or 0),
-                        "server_updated_at": obj.updated_at.isoformat() if obj.updated_at else None,
-                    }
-                )
-
+            apply = apply_changes_row_by_row
+            if not row_mode and supports_batched_push(model_cls):
+                apply = apply_changes_batched
+
+            model_results = apply(
+                model_cls=model_cls,
+                change_list=change_list or [],
+                company=company,
+                user=request.user,
+                device=device,
+                server_now=server_now,
+            )
             if model_results:
                 results[model_key] = model_results
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TimetrackingConfig(AppConfig):
     name = "timetracking"
+
+    def ready(self) -> None:  # pragma: no cover
+        from . import signals  # noqa: F401
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollup(apps, schema_editor):
+    from timetracking.services_rollup import rebuild_company_rollup
+
+    Company = apps.get_model("companies", "Company")
+    for company_id in Company.objects.values_list("id", flat=True).iterator():
+        rebuild_company_rollup(company_id, apps=apps)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_company_onboarding_flags'),
+        ('projects', '0002_project_company_name_idx'),
+        ('timetracking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimeEntryDaily',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=160)),
+                ('day', models.DateField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('submitted', 'Submitted'), ('approved', 'Approved'), ('billed', 'Billed'), ('void', 'Void')], max_length=20)),
+                ('billable', models.BooleanField(default=True)),
+                ('minutes', models.BigIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='time_daily', to='companies.company')),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='companies.employeeprofile')),
+                ('project', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['company', 'day'], name='timetrackin_company_03b787_idx'), models.Index(fields=['company', 'employee', 'day'], name='timetrackin_company_dda88c_idx'), models.Index(fields=['company', 'project'], name='timetrackin_company_40ff63_idx')],
+                'constraints': [models.UniqueConstraint(fields=('company', 'key'), name='time_daily_company_key_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_company_onboarding_flags'),
+        ('projects', '0003_project_file_dropbox_status'),
+        ('timetracking', '0002_time_entry_daily'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='timeentrydaily',
+            name='employee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='companies.employeeprofile'),
+        ),
+        migrations.AlterField(
+            model_name='timeentrydaily',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='projects.project'),
+        ),
+    ]
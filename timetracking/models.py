@@ -191,3 +191,44 @@ class TimeTrackingSettings(SyncModel):
         constraints = [
             models.UniqueConstraint(fields=["company", "employee"], name="uniq_time_settings_company_employee"),
         ]
+
+
+class TimeEntryDaily(models.Model):
+    """Per-company/employee/project/day minutes, kept current by timetracking signals.
+
+    One row per (day, employee, project, status, billable) group of live entries,
+    where `day` is the local date of `started_at` (NULL for duration-only entries,
+    so date ranges skip them as the list does). List totals, the weekly strip and project totals read
+    these rows instead of summing TimeEntry. Rebuild with
+    `python manage.py ez360_time_rollup`.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name="time_daily")
+    # "<day>|<employee>|<project>|<status>|<billable>": NULL-safe uniqueness across databases.
+    key = models.CharField(max_length=160)
+    day = models.DateField(null=True, blank=True)
+    # SET_NULL like TimeEntry: a hard delete moves entries into the NULL group, and
+    # their rollup minutes must move with them (signals then re-key those rows).
+    employee = models.ForeignKey(EmployeeProfile, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    project = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    status = models.CharField(max_length=20, choices=TimeStatus.choices)
+    billable = models.BooleanField(default=True)
+
+    minutes = models.BigIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["company", "key"], name="time_daily_company_key_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["company", "day"]),
+            models.Index(fields=["company", "employee", "day"]),
+            models.Index(fields=["company", "project"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.company_id} {self.day} {self.minutes}m"
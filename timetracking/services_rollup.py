@@ -0,0 +1,201 @@
+"""Time-entry minutes rollup (timetracking.TimeEntryDaily) and date-range filters.
+
+Entries are grouped by (local day of `started_at`, employee, project, status,
+billable); duration-only entries (no `started_at`) land in a NULL-day group.
+A save/delete/soft delete of a TimeEntry recomputes the groups it left and
+entered from source rows (see `signals.py`), so every rollup row is the truth
+for its group:
+
+- `started_at_range()` turns inclusive local dates into a half-open, timezone
+  aware `started_at` range. Unlike `started_at__date__gte`, that compares the
+  raw column, so the (company, [employee,] status, started_at) partial indexes
+  can range-scan it;
+- `rollup_minutes()` / `minutes_by_day()` / `project_minutes()` answer list
+  totals, the weekly strip and project totals from a few rollup rows.
+
+QuerySet.update()/bulk_create() bypass signals; call `refresh_rollup_for_rows()`
+after bulk writes, and `python manage.py ez360_time_rollup` to rebuild.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import TimeEntry, TimeEntryDaily, TimeStatus
+
+UNBILLED_EXCLUDED_STATUSES = (TimeStatus.BILLED, TimeStatus.VOID)
+
+Group = tuple  # (employee_id, project_id, day)
+
+
+def _day_start(day: datetime.date) -> datetime.datetime:
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def started_at_range(start: datetime.date | None, end: datetime.date | None) -> Q:
+    """Entries started on local days start..end (inclusive), as `started_at >= a AND started_at < b`."""
+    q = Q()
+    if start:
+        q &= Q(started_at__gte=_day_start(start))
+    if end:
+        q &= Q(started_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    return q
+
+
+def _key(day, employee_id, project_id, status, billable) -> str:
+    return f"{day.isoformat() if day else '-'}|{employee_id or '-'}|{project_id or '-'}|{status}|{int(bool(billable))}"
+
+
+def group_of(entry: TimeEntry) -> Group:
+    day = timezone.localdate(entry.started_at) if entry.started_at else None
+    return (entry.employee_id, entry.project_id, day)
+
+
+def _live(company_id, Entry=TimeEntry):
+    return Entry.objects.filter(company_id=company_id, deleted_at__isnull=True)
+
+
+def _rows_from(company_id, values: Iterable[dict], Daily=TimeEntryDaily) -> list[TimeEntryDaily]:
+    return [
+        Daily(
+            company_id=company_id,
+            key=_key(v["day"], v["employee_id"], v["project_id"], v["status"], v["billable"]),
+            day=v["day"],
+            employee_id=v["employee_id"],
+            project_id=v["project_id"],
+            status=v["status"],
+            billable=v["billable"],
+            minutes=int(v["minutes"] or 0),
+            entries=int(v["entries"] or 0),
+        )
+        for v in values
+    ]
+
+
+def _grouped(qs, *extra: str):
+    return qs.values(*extra, "employee_id", "project_id", "status", "billable").annotate(
+        minutes=Coalesce(Sum("duration_minutes"), 0), entries=Count("id")
+    )
+
+
+def refresh_rollup(company_id, groups: Iterable[Group]) -> None:
+    """Recompute the rollup rows of the given (employee, project, day) groups from source rows."""
+    groups = set(groups)
+    if not company_id or not groups:
+        return
+    with transaction.atomic():
+        for employee_id, project_id, day in groups:
+            when = started_at_range(day, day) if day else Q(started_at__isnull=True)
+            values = _grouped(_live(company_id).filter(when, employee_id=employee_id, project_id=project_id)).order_by()
+            rows = _rows_from(company_id, [{**v, "day": day} for v in values])
+            stale = TimeEntryDaily.objects.filter(company_id=company_id, day=day, employee_id=employee_id, project_id=project_id)
+            if rows:
+                stale = stale.exclude(key__in=[r.key for r in rows])
+            stale.delete()
+            if rows:
+                TimeEntryDaily.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["company", "key"],
+                    update_fields=["minutes", "entries", "updated_at"],
+                )
+
+
+def refresh_rollup_for_rows(rows: Iterable[TimeEntry]) -> None:
+    """Refresh the groups of entries written without signals (QuerySet.update/bulk writes)."""
+    by_company: dict[object, set] = defaultdict(set)
+    for entry in rows:
+        by_company[entry.company_id].add(group_of(entry))
+    for company_id, groups in by_company.items():
+        refresh_rollup(company_id, groups)
+
+
+def _all_rows(company_id, *, apps=None) -> list[TimeEntryDaily]:
+    Entry = apps.get_model("timetracking", "TimeEntry") if apps else TimeEntry
+    Daily = apps.get_model("timetracking", "TimeEntryDaily") if apps else TimeEntryDaily
+    qs = _live(company_id, Entry).annotate(day=TruncDate("started_at", tzinfo=timezone.get_current_timezone()))
+    return _rows_from(company_id, _grouped(qs, "day").order_by(), Daily)
+
+
+def rebuild_company_rollup(company_id, *, apps=None) -> int:
+    """Recompute every rollup row for a company from source rows. Returns rows written."""
+    Daily = apps.get_model("timetracking", "TimeEntryDaily") if apps else TimeEntryDaily
+    rows = _all_rows(company_id, apps=apps)
+    with transaction.atomic():
+        Daily.objects.filter(company_id=company_id).delete()
+        Daily.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def verify_company_rollup(company_id) -> list[tuple[str, int, int]]:
+    """Rollup rows that disagree with source rows: (key, expected minutes, actual minutes)."""
+    expected = {r.key: r.minutes for r in _all_rows(company_id)}
+    actual = dict(TimeEntryDaily.objects.filter(company_id=company_id).values_list("key", "minutes"))
+    return [
+        (key, expected.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(expected) | set(actual))
+        if expected.get(key, 0) != actual.get(key, 0)
+    ]
+
+
+# -----------------------------------------------------------------------------
+# Readers
+# -----------------------------------------------------------------------------
+
+
+def _rollup_qs(company, *, start=None, end=None, employee=None, project=None, status="", billable=None):
+    qs = TimeEntryDaily.objects.filter(company=company)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if employee is not None:
+        qs = qs.filter(employee=employee)
+    if project is not None:
+        qs = qs.filter(project=project)
+    if status:
+        qs = qs.filter(status=status)
+    if billable is not None:
+        qs = qs.filter(billable=billable)
+    return qs
+
+
+def rollup_minutes(company, **filters) -> int:
+    """Total minutes of live entries started in [start, end] (see `_rollup_qs` filters)."""
+    return int(_rollup_qs(company, **filters).aggregate(total=Coalesce(Sum("minutes"), 0))["total"])
+
+
+def minutes_by_day(company, start: datetime.date, end: datetime.date, *, employee=None) -> dict[datetime.date, int]:
+    """Minutes per local day in [start, end] (excluding void time), zero-filled."""
+    rows = (
+        _rollup_qs(company, start=start, end=end, employee=employee)
+        .exclude(status=TimeStatus.VOID)
+        .values("day")
+        .annotate(total=Sum("minutes"))
+        .order_by()
+    )
+    totals = {r["day"]: int(r["total"] or 0) for r in rows}
+    days = (start + datetime.timedelta(days=i) for i in range((end - start).days + 1))
+    return {d: totals.get(d, 0) for d in days}
+
+
+def project_minutes(company, project_ids: Iterable) -> dict[object, tuple[int, int]]:
+    """(total, unbilled) minutes per project, excluding void time."""
+    rows = (
+        TimeEntryDaily.objects.filter(company=company, project_id__in=list(project_ids))
+        .exclude(status=TimeStatus.VOID)
+        .values("project_id")
+        .annotate(
+            total=Coalesce(Sum("minutes"), 0),
+            unbilled=Coalesce(Sum("minutes", filter=~Q(status__in=UNBILLED_EXCLUDED_STATUSES)), 0),
+        )
+        .order_by()
+    )
+    return {r["project_id"]: (int(r["total"]), int(r["unbilled"])) for r in rows}
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from django.core.cache import cache
 from django.db import transaction
 
 from companies.models import Company, EmployeeProfile
+from core.cache_utils import get_or_set
 
 from .models import TimerState, TimeTrackingSettings
 
+TIMER_SNAPSHOT_TTL_SECONDS = 300
+
 
 def _get_or_create_time_settings(company: Company, employee: EmployeeProfile) -> TimeTrackingSettings:
     obj, _ = TimeTrackingSettings.objects.get_or_create(company=company, employee=employee)
@@ -77,3 +81,62 @@ def clear_timer_defaults(company: Company, employee: EmployeeProfile) -> None:
             "updated_at",
         ]
     )
+
+
+def _timer_snapshot_key(employee_id) -> str:
+    return f"ez360:timer:e{employee_id}"
+
+
+def _build_timer_snapshot(company: Company, employee: EmployeeProfile) -> dict:
+    row = (
+        TimerState.objects.filter(company=company, employee=employee)
+        .select_related("project", "service_catalog_item")
+        .first()
+    )
+    if row is None:
+        return {
+            "exists": False,
+            "is_running": False,
+            "is_paused": False,
+            "started_at": None,
+            "paused_at": None,
+            "elapsed_seconds": 0,
+            "project_id": None,
+            "project": "",
+            "service_catalog_item_id": None,
+            "service_catalog_item": "",
+            "service_name": "",
+            "note": "",
+        }
+    return {
+        "exists": True,
+        "is_running": bool(row.is_running),
+        "is_paused": bool(row.is_paused),
+        "started_at": row.started_at,
+        "paused_at": row.paused_at,
+        "elapsed_seconds": int(row.elapsed_seconds or 0),
+        "project_id": row.project_id,
+        "project": str(row.project) if row.project else "",
+        "service_catalog_item_id": row.service_catalog_item_id,
+        "service_catalog_item": str(row.service_catalog_item) if row.service_catalog_item else "",
+        "service_name": row.service_name or "",
+        "note": row.note or "",
+    }
+
+
+def timer_snapshot(company: Company, employee: EmployeeProfile) -> dict:
+    """Compact, read-only view of the employee's TimerState for the navbar.
+
+    One query (selected project/service labels included) and cached when
+    `EZ360_CACHE_ENABLED`; TimerState writes drop the cached copy (see signals).
+    Unlike `get_timer_state`, this never creates the row.
+    """
+    return get_or_set(
+        _timer_snapshot_key(employee.pk),
+        TIMER_SNAPSHOT_TTL_SECONDS,
+        lambda: _build_timer_snapshot(company, employee),
+    ).value
+
+
+def invalidate_timer_snapshot(employee_id) -> None:
+    cache.delete(_timer_snapshot_key(employee_id))
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from catalog.models import CatalogItem
+from companies.models import EmployeeProfile
+from core.cache_utils import cache_enabled
+from core.signals import sync_rows_soft_deleted
+from projects.models import Project
+
+from .models import TimeEntry, TimeEntryDaily, TimerState
+from .services_rollup import group_of, refresh_rollup, refresh_rollup_for_rows
+from .services_timer import invalidate_timer_snapshot
+
+logger = logging.getLogger(__name__)
+
+_GROUP_FIELDS = ("started_at", "employee_id", "project_id")
+
+
+def _drop_timer_snapshots_on_commit(employee_ids) -> None:
+    # After commit: dropping earlier lets a concurrent navbar request re-cache the old state.
+    ids = [e for e in set(employee_ids) if e]
+    if ids:
+        transaction.on_commit(lambda: [invalidate_timer_snapshot(e) for e in ids])
+
+
+@receiver(post_save, sender=TimerState)
+@receiver(post_delete, sender=TimerState)
+def _drop_timer_snapshot(sender, instance, **kwargs):
+    _drop_timer_snapshots_on_commit([instance.employee_id])
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=CatalogItem)
+def _drop_timer_labels(sender, instance, raw: bool = False, created: bool = False, **kwargs):
+    # Snapshots embed the selected project/service labels.
+    if raw or created or not cache_enabled():
+        return
+    field = "project" if sender is Project else "service_catalog_item"
+    _drop_timer_snapshots_on_commit(TimerState.objects.filter(**{field: instance}).values_list("employee_id", flat=True))
+
+
+def _remember_group(instance) -> None:
+    # Read from __dict__ so deferred fields (.only()) are not fetched on load.
+    if all(f in instance.__dict__ for f in _GROUP_FIELDS):
+        instance._rollup_prev_group = group_of(instance)
+
+
+def _refresh_entry_rollup(instance) -> None:
+    groups = {group_of(instance), getattr(instance, "_rollup_prev_group", None)} - {None}
+    try:
+        with transaction.atomic():
+            refresh_rollup(instance.company_id, groups)
+    except Exception:
+        # Derived data: never block the write. `ez360_time_rollup --fix` repairs drift.
+        logger.warning("time_rollup_refresh_failed pk=%s", instance.pk, exc_info=True)
+
+
+@receiver(post_init, sender=TimeEntry)
+def _time_entry_init(sender, instance, **kwargs):
+    _remember_group(instance)
+
+
+@receiver(post_save, sender=TimeEntry)
+def _time_entry_saved(sender, instance, raw: bool = False, **kwargs):
+    if raw:
+        return
+    _refresh_entry_rollup(instance)
+    _remember_group(instance)
+
+
+@receiver(post_delete, sender=TimeEntry)
+def _time_entry_deleted(sender, instance, **kwargs):
+    _refresh_entry_rollup(instance)
+
+
+@receiver(pre_delete, sender=Project)
+@receiver(pre_delete, sender=EmployeeProfile)
+def _rekey_rollup_on_hard_delete(sender, instance, **kwargs):
+    # The delete SET_NULLs entries and rollup rows alike (totals stay right), but the
+    # rows keep keys naming the deleted id; recompute their NULL groups once committed.
+    field = "project" if sender is Project else "employee"
+    rows = TimeEntryDaily.objects.filter(**{field: instance}).values_list("company_id", "employee_id", "project_id", "day")
+    by_company: dict = {}
+    for company_id, employee_id, project_id, day in rows:
+        group = (employee_id, None, day) if sender is Project else (None, project_id, day)
+        by_company.setdefault(company_id, set()).add(group)
+
+    def _refresh() -> None:
+        for company_id, groups in by_company.items():
+            try:
+                refresh_rollup(company_id, groups)
+            except Exception:
+                logger.warning("time_rollup_refresh_failed company=%s", company_id, exc_info=True)
+
+    if by_company:
+        transaction.on_commit(_refresh)
+
+
+@receiver(sync_rows_soft_deleted)
+def _time_entries_soft_deleted(sender, pks, **kwargs):
+    if sender is TimeEntry:
+        refresh_rollup_for_rows(TimeEntry.all_objects.filter(pk__in=pks).only("company", "started_at", "employee", "project"))
@@ -1,3 +1,158 @@
-from django.test import TestCase
+from __future__ import annotations
 
-# Create your tests here.
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from companies.models import Company, EmployeeProfile, EmployeeRole
+from companies.services import ACTIVE_COMPANY_SESSION_KEY
+from projects.models import Project
+from timetracking.models import TimeEntry, TimeEntryDaily, TimerState, TimeStatus
+from timetracking.services_rollup import project_minutes, rollup_minutes, started_at_range, verify_company_rollup
+from timetracking.services_timer import timer_snapshot
+
+
+class NavbarTimerTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        user = get_user_model().objects.create_user(email="t@example.com", username="t", password="pass12345")
+        user.email_verified = True
+        user.save(update_fields=["email_verified"])
+        self.employee = EmployeeProfile.objects.create(company=self.company, user=user, username_public="t", role=EmployeeRole.OWNER)
+        self.client.force_login(user)
+        session = self.client.session
+        session[ACTIVE_COMPANY_SESSION_KEY] = str(self.company.id)
+        session.save()
+
+    def test_project_options_are_prefix_filtered_and_paged(self):
+        Project.objects.bulk_create(
+            [Project(company=self.company, project_number=f"P{i:03d}", name=f"Alpha {i}") for i in range(25)]
+            + [Project(company=self.company, project_number="Z1", name="Beta")]
+        )
+        url = reverse("timetracking:timer_project_options")
+
+        data = self.client.get(url, {"q": "alp"}).json()
+        self.assertEqual((len(data["results"]), data["has_more"]), (20, True))
+        self.assertEqual(data["results"][0]["text"], str(Project.objects.get(project_number="P000")))
+
+        data = self.client.get(url, {"q": "alp", "page": 2}).json()
+        self.assertEqual((len(data["results"]), data["has_more"]), (5, False))
+        self.assertEqual([r["text"] for r in self.client.get(url, {"q": "z1"}).json()["results"]], [str(Project.objects.get(name="Beta"))])
+
+    def test_navbar_renders_without_loading_project_list(self):
+        project = Project.objects.create(company=self.company, project_number="P1", name="Selected")
+        Project.objects.bulk_create([Project(company=self.company, name=f"Other {i}") for i in range(50)])
+        TimerState.objects.create(company=self.company, employee=self.employee, project=project)
+
+        resp = self.client.get(reverse("core:app_dashboard"))
+        self.assertContains(resp, f'<option value="{project.id}" selected>{project}</option>', html=False)
+        self.assertNotContains(resp, "Other 1")
+
+    def test_time_and_project_lists_read_totals_from_rollup(self):
+        project = Project.objects.create(company=self.company, name="Build")
+        now = timezone.now()
+        TimeEntry.objects.create(company=self.company, employee=self.employee, project=project, started_at=now, duration_minutes=90)
+        TimeEntry.objects.create(company=self.company, employee=self.employee, project=project, duration_minutes=30, status=TimeStatus.BILLED)
+
+        resp = self.client.get(reverse("timetracking:entry_list"), {"preset": "today"})
+        self.assertEqual(resp.context["total_minutes"], 90)
+        self.assertEqual(resp.context["week_total_minutes"], 90)
+        self.assertEqual(self.client.get(reverse("timetracking:entry_list"), {"preset": "today", "q": "zzz"}).context["total_minutes"], 0)
+
+        row = self.client.get(reverse("projects:project_list")).context["projects"][0]
+        self.assertEqual((row.total_minutes, row.unbilled_minutes), (120, 90))
+
+    @override_settings(EZ360_CACHE_ENABLED=True)
+    def test_snapshot_is_cached_and_dropped_on_timer_writes(self):
+        self.assertFalse(timer_snapshot(self.company, self.employee)["exists"])
+        with self.assertNumQueries(0):
+            timer_snapshot(self.company, self.employee)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TimerState.objects.create(company=self.company, employee=self.employee, note="Drafting")
+        self.assertEqual(timer_snapshot(self.company, self.employee)["note"], "Drafting")
+
+    @override_settings(EZ360_CACHE_ENABLED=True)
+    def test_snapshot_is_dropped_after_commit_and_on_project_rename(self):
+        project = Project.objects.create(company=self.company, project_number="P1", name="Old name")
+        with self.captureOnCommitCallbacks(execute=True):
+            state = TimerState.objects.create(company=self.company, employee=self.employee, project=project)
+        self.assertEqual(timer_snapshot(self.company, self.employee)["project"], str(project))
+
+        # Not before commit: a concurrent reader would re-cache the uncommitted state.
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            state.note = "Drafting"
+            state.save()
+            self.assertEqual(timer_snapshot(self.company, self.employee)["note"], "")
+        for callback in callbacks:
+            callback()
+        self.assertEqual(timer_snapshot(self.company, self.employee)["note"], "Drafting")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            project.name = "New name"
+            project.save()
+        self.assertEqual(timer_snapshot(self.company, self.employee)["project"], str(project))
+
+
+class TimeRollupTests(TestCase):
+    def setUp(self):
+        self.company = Company.objects.create(name="Acme Co")
+        user = get_user_model().objects.create_user(email="r@example.com", username="r", password="pass12345")
+        self.employee = EmployeeProfile.objects.create(company=self.company, user=user, username_public="r", role=EmployeeRole.OWNER)
+        self.project = Project.objects.create(company=self.company, name="Build")
+        self.day = datetime.date(2026, 10, 14)
+
+    def _at(self, day, hour, minute=0):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)))
+
+    def _entry(self, started_at, minutes, **kwargs):
+        return TimeEntry.objects.create(
+            company=self.company, employee=self.employee, project=self.project, started_at=started_at, duration_minutes=minutes, **kwargs
+        )
+
+    def test_half_open_local_day_range(self):
+        late = self._entry(self._at(self.day, 23, 59), 10)
+        self._entry(self._at(self.day + datetime.timedelta(days=1), 0, 0), 20)
+        ids = set(TimeEntry.objects.filter(started_at_range(self.day, self.day)).values_list("id", flat=True))
+        self.assertEqual(ids, {late.id})
+
+    def test_rollup_follows_edits_moves_and_deletes(self):
+        a = self._entry(self._at(self.day, 9), 60)
+        self._entry(self._at(self.day, 13), 30, status=TimeStatus.BILLED)
+        self._entry(None, 15)  # duration-only: no day
+        self.assertEqual(rollup_minutes(self.company, start=self.day, end=self.day), 90)
+        self.assertEqual(project_minutes(self.company, [self.project.id])[self.project.id], (105, 75))
+
+        a = TimeEntry.objects.get(pk=a.pk)
+        a.started_at = self._at(self.day + datetime.timedelta(days=1), 9)
+        a.duration_minutes = 45
+        a.save()
+        self.assertEqual(rollup_minutes(self.company, start=self.day, end=self.day), 30)
+        self.assertEqual(rollup_minutes(self.company, start=self.day + datetime.timedelta(days=1), end=self.day + datetime.timedelta(days=1)), 45)
+
+        a.soft_delete()
+        TimeEntry.objects.filter(status=TimeStatus.BILLED).delete()
+        self.assertEqual(rollup_minutes(self.company), 15)
+        self.assertEqual(verify_company_rollup(self.company.id), [])
+        self.assertEqual(TimeEntryDaily.objects.filter(company=self.company).count(), 1)
+
+    def test_hard_deleting_a_project_or_employee_keeps_rollup_totals(self):
+        self._entry(self._at(self.day, 9), 60)
+        other = Project.objects.create(company=self.company, name="Other")
+        TimeEntry.objects.create(company=self.company, employee=self.employee, project=None, started_at=self._at(self.day, 11), duration_minutes=20)
+        TimeEntry.objects.create(company=self.company, employee=self.employee, project=other, started_at=self._at(self.day, 13), duration_minutes=5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.delete(hard=True)
+            self.assertEqual(rollup_minutes(self.company, start=self.day, end=self.day), 85)
+        self.assertEqual(rollup_minutes(self.company, start=self.day, end=self.day), 85)
+        self.assertEqual(verify_company_rollup(self.company.id), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.delete(hard=True)
+        self.assertEqual(rollup_minutes(self.company, start=self.day, end=self.day), 85)
+        self.assertEqual(verify_company_rollup(self.company.id), [])
+        self.assertEqual(TimeEntryDaily.objects.filter(company=self.company).count(), 2)
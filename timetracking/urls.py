@@ -23,4 +23,6 @@ urlpatterns = [
     path("time/timer/resume/", views.timer_resume, name="timer_resume"),
     path("time/timer/stop/", views.timer_stop, name="timer_stop"),
     path("time/timer/clear/", views.timer_clear, name="timer_clear"),
+    path("time/timer/options/projects/", views.timer_project_options, name="timer_project_options"),
+    path("time/timer/options/services/", views.timer_service_options, name="timer_service_options"),
 ]
@@ -6,6 +6,7 @@ from typing import Any
 from django.contrib import messages
 from django.db import transaction
 from django.db.models import Q, Sum
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 
@@ -22,6 +23,7 @@ from crm.models import Client
 from .forms import TimeEntryForm, TimeEntryServiceFormSet, TimeFilterForm, TimerStartForm, TimeSettingsForm
 from .models import TimeEntry, TimeEntryService, TimeStatus, TimerState, TimeTrackingSettings
 
+from .services_rollup import minutes_by_day, rollup_minutes, started_at_range
 from .services_timer import clear_timer_defaults, get_timer_state, persist_timer_defaults
 
 from core.pagination import paginate
@@ -79,6 +81,7 @@ def time_entry_list(request):
     preset = (request.GET.get("preset") or "last7").strip()
     start, end = _preset_dates(preset)
 
+    q = status = billable = ""
     if form.is_valid():
         q = (form.cleaned_data.get("q") or "").strip()
         status = (form.cleaned_data.get("status") or "").strip()
@@ -101,13 +104,28 @@ def time_entry_list(request):
         if billable in {"0", "1"}:
             qs = qs.filter(billable=(billable == "1"))
 
-    if start:
-        qs = qs.filter(started_at__date__gte=start)
-    if end:
-        qs = qs.filter(started_at__date__lte=end)
+    # Half-open local-day range on the raw column (index range scan, no per-row date cast).
+    if start or end:
+        qs = qs.filter(started_at_range(start, end))
 
-    totals = qs.aggregate(total_minutes=Sum("duration_minutes"))
-    total_minutes = int(totals.get("total_minutes") or 0)
+    staff_only = employee.role == EmployeeRole.STAFF
+    if q:
+        # Free-text matches can't be answered from the rollup.
+        total_minutes = int(qs.aggregate(total_minutes=Sum("duration_minutes")).get("total_minutes") or 0)
+    else:
+        # Without a date range the list also shows duration-only entries (NULL-day rollup rows).
+        total_minutes = rollup_minutes(
+            company,
+            start=start,
+            end=end,
+            employee=employee if staff_only else None,
+            status=status,
+            billable=(billable == "1") if billable in {"0", "1"} else None,
+        )
+
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    week_minutes = minutes_by_day(company, week_start, week_start + timedelta(days=6), employee=employee)
 
     # timer state (single global timer)
     timer_state = get_timer_state(company=company, employee=employee)
@@ -125,6 +143,8 @@ def time_entry_list(request):
             "page_obj": paged.page_obj,
             "per_page": paged.per_page,
             "total_minutes": total_minutes,
+            "week_minutes": week_minutes,
+            "week_total_minutes": sum(week_minutes.values()),
             "timer_state": timer_state,
             "timer_running": timer_running,
         },
@@ -634,3 +654,47 @@ def timer_clear(request):
 
     messages.success(request, "Timer selections cleared.")
     return redirect("timetracking:timer_panel")
+
+
+TIMER_OPTIONS_PAGE_SIZE = 20
+
+
+def _option_page(request, qs, label) -> JsonResponse:
+    """One page of {id, text} typeahead options (`?q=` prefix filter, `?page=` 1-based)."""
+    try:
+        page = max(1, int(request.GET.get("page") or 1))
+    except ValueError:
+        page = 1
+    start = (page - 1) * TIMER_OPTIONS_PAGE_SIZE
+    rows = list(qs[start : start + TIMER_OPTIONS_PAGE_SIZE + 1])
+    return JsonResponse(
+        {
+            "results": [{"id": str(obj.pk), "text": label(obj)} for obj in rows[:TIMER_OPTIONS_PAGE_SIZE]],
+            "page": page,
+            "has_more": len(rows) > TIMER_OPTIONS_PAGE_SIZE,
+        }
+    )
+
+
+@company_context_required
+def timer_project_options(request):
+    """Typeahead source for the timer's project picker (prefix match on number or name)."""
+    q = (request.GET.get("q") or "").strip()[:80]
+    qs = Project.objects.filter(company=request.active_company).only("id", "project_number", "name")
+    if q:
+        qs = qs.filter(Q(name__istartswith=q) | Q(project_number__istartswith=q))
+    return _option_page(request, qs.order_by("project_number", "name", "id"), str)
+
+
+@company_context_required
+def timer_service_options(request):
+    """Typeahead source for the timer's catalog service picker."""
+    from catalog.models import CatalogItem, CatalogItemType
+
+    q = (request.GET.get("q") or "").strip()[:80]
+    qs = CatalogItem.objects.filter(
+        company=request.active_company, item_type=CatalogItemType.SERVICE, is_active=True
+    ).only("id", "name")
+    if q:
+        qs = qs.filter(name__istartswith=q)
+    return _option_page(request, qs.order_by("name", "id"), str)